@@ -0,0 +1,117 @@
+"""
+Benchmarks do caminho dos pedidos na API: formatação dos campos metocean,
+rate limiting e encaminhamento do gateway para um backend local (stub)
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+
+
+@pytest.fixture
+def currents_field(rng):
+    """Campo de correntes na grelha da ZEE de Angola (0.1°)"""
+    from src.api.metocean import MetoceanAPI
+
+    api = MetoceanAPI()
+    lats = [round(-18.2 + 0.1 * i, 2) for i in range(140)]
+    lons = [round(8.5 + 0.1 * j, 2) for j in range(90)]
+    u = rng.normal(0.1, 0.05, len(lats) * len(lons))
+    v = rng.normal(0.4, 0.1, len(lats) * len(lons))
+    data = [
+        {"lat": lat, "lon": lon, "u": float(u[k]), "v": float(v[k])}
+        for k, (lat, lon) in enumerate((lat, lon) for lat in lats for lon in lons)
+    ]
+    field = {"variable": "currents", "time": datetime(2025, 1, 1).isoformat(), "units": "m/s", "data": data}
+    return api, field
+
+
+def bench_metocean_format_velocity(benchmark, currents_field):
+    api, field = currents_field
+    result = benchmark(api.format_for_leaflet_velocity, field)
+    assert result["uMin"] <= result["uMax"]
+
+
+def make_request(ip: str, path: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"user-agent", b"bgapp-bench/1.0"), (b"x-forwarded-for", ip.encode())],
+        "client": (ip, 50000),
+        "server": ("bench", 80),
+        "scheme": "http",
+    })
+
+
+@pytest.fixture
+def rate_limited_requests(monkeypatch):
+    """Pedidos de 200 clientes públicos a endpoints de dados e de administração"""
+    from bgapp.middleware import security
+
+    monkeypatch.setattr(security.settings.security, "rate_limit_enabled", True)
+    paths = ["/api/species", "/admin/status", "/data/sst", "/collections/items"]
+    return [make_request(f"41.63.{i // 250}.{i % 250 + 1}", paths[i % len(paths)]) for i in range(200)]
+
+
+def bench_rate_limiter_is_allowed(benchmark, rate_limited_requests):
+    from bgapp.middleware.security import RateLimiter
+
+    limiter = RateLimiter()
+    # Janelas já com histórico, como num servidor em carga
+    for request in rate_limited_requests * 20:
+        limiter.is_allowed(request)
+
+    def check_all():
+        return [limiter.is_allowed(request)[0] for request in rate_limited_requests]
+
+    results = benchmark(check_all)
+    assert len(results) == len(rate_limited_requests)
+
+
+@pytest.fixture
+def stub_backend():
+    """Servidor HTTP local que responde JSON fixo, num thread próprio"""
+    web = pytest.importorskip("aiohttp.web")
+
+    async def handler(request):
+        return web.json_response({"status": "ok", "path": request.path})
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{port}"
+
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=10)
+    loop.close()
+
+
+def bench_gateway_route_request(benchmark, run_async, stub_backend):
+    from bgapp.gateway.api_gateway import APIGateway, CircuitBreakerState, ServiceHealth
+
+    gateway = APIGateway()
+    gateway.backend_services = {"stub": [stub_backend]}
+    gateway.service_health = {
+        f"stub_{stub_backend}": ServiceHealth(
+            url=stub_backend, healthy=True, response_time_ms=0.0, error_count=0,
+            last_check=datetime.now(), circuit_state=CircuitBreakerState.CLOSED
+        )
+    }
+
+    response = benchmark(lambda: run_async(gateway.route_request("stub", "/health", "GET")))
+    assert response.status_code == 200
@@ -0,0 +1,49 @@
+"""
+Benchmarks do cache Redis (cache/redis_cache.py) contra fakeredis:
+leitura no nível local, leitura no Redis e escrita
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from bgapp.cache.redis_cache import CacheConfig, RedisCache  # noqa: E402
+
+KEY = "bgapp:cache:bench:value"
+
+
+@pytest.fixture
+def cache_value(rng):
+    """Série oceanográfica típica (~20 KB em JSON)"""
+    n = 500
+    lats = rng.uniform(-18.2, -4.2, n).round(4)
+    lons = rng.uniform(8.5, 17.5, n).round(4)
+    sst = rng.normal(24.0, 2.0, n).round(2)
+    return {
+        "source": "copernicus_cmems",
+        "variable": "sst",
+        "points": [{"lat": float(a), "lon": float(o), "sst": float(t)} for a, o, t in zip(lats, lons, sst)],
+    }
+
+
+def make_cache(**config) -> RedisCache:
+    return RedisCache(CacheConfig(**config), client=fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+
+
+def bench_cache_get_local_hit(benchmark, run_async, cache_value):
+    cache = make_cache()
+    run_async(cache.set(KEY, cache_value, ttl=600))
+    result = benchmark(lambda: run_async(cache.get(KEY)))
+    assert result == cache_value
+
+
+def bench_cache_get_redis_hit(benchmark, run_async, cache_value):
+    cache = make_cache(local_max_entries=0)
+    run_async(cache.set(KEY, cache_value, ttl=600))
+    result = benchmark(lambda: run_async(cache.get(KEY)))
+    assert result == cache_value
+
+
+def bench_cache_set(benchmark, run_async, cache_value):
+    cache = make_cache()
+    assert benchmark(lambda: run_async(cache.set(KEY, cache_value, ttl=600)))
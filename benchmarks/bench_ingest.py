@@ -0,0 +1,10 @@
+"""
+Benchmarks da limpeza de ocorrências na ingestão (OBIS/GBIF)
+"""
+
+from bgapp.process.biodiv import clean_occurrences
+
+
+def bench_clean_occurrences(benchmark, occurrence_records):
+    cleaned = benchmark(clean_occurrences, occurrence_records)
+    assert 0 < len(cleaned) < len(occurrence_records)
@@ -0,0 +1,53 @@
+"""
+Benchmarks da análise espacial: hotspots Getis-Ord Gi* e procura de zonas
+contíguas do MCDA de zonas sustentáveis
+"""
+
+import numpy as np
+import pytest
+
+from conftest import ANGOLA_BBOX
+
+pytest.importorskip("networkx")
+
+
+@pytest.fixture
+def hotspot_points(rng):
+    """1500 estações com dois núcleos de valores altos junto à costa"""
+    n = 1500
+    coords = np.column_stack([
+        rng.uniform(ANGOLA_BBOX[0], 13.5, n),
+        rng.uniform(ANGOLA_BBOX[1], ANGOLA_BBOX[3], n),
+    ])
+    values = rng.gamma(2.0, 1.5, n)
+    for center in ((12.8, -8.8), (11.9, -15.2)):
+        near = np.hypot(coords[:, 0] - center[0], coords[:, 1] - center[1]) < 0.6
+        values[near] += 6.0
+    return coords, values
+
+
+@pytest.fixture
+def suitability_mask(rng):
+    """Máscara 200x200 de células adequadas, com manchas contíguas"""
+    noise = rng.random((200, 200))
+    kernel = np.ones(7) / 7
+    smooth = np.apply_along_axis(lambda r: np.convolve(r, kernel, "same"), 0, noise)
+    smooth = np.apply_along_axis(lambda r: np.convolve(r, kernel, "same"), 1, smooth)
+    return smooth > np.percentile(smooth, 70)
+
+
+def bench_getis_ord_hotspots(benchmark, hotspot_points):
+    from bgapp.qgis.spatial_analysis import SpatialAnalysisTools
+
+    tools = SpatialAnalysisTools()
+    coords, values = hotspot_points
+    hotspots = benchmark(tools._getis_ord_hotspots, coords, values)
+    assert any(h["properties"]["hotspot_type"] == "hot" for h in hotspots)
+
+
+def bench_mcda_find_contiguous_zones(benchmark, suitability_mask):
+    from bgapp.qgis.sustainable_zones_mcda import SustainableZonesMCDA
+
+    mcda = SustainableZonesMCDA()
+    zones = benchmark(mcda._find_contiguous_zones, suitability_mask)
+    assert sum(len(zone) for zone in zones) == int(suitability_mask.sum())
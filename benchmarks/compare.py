@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Comparar dois resultados JSON do pytest-benchmark
+Falha (código 1) quando algum benchmark regride acima do limiar configurado
+em benchmarks/thresholds.json (percentagem por benchmark, ou o limiar padrão).
+
+Uso:
+    python -m pytest benchmarks --benchmark-json=benchmarks/results/baseline.json
+    python -m pytest benchmarks --benchmark-json=benchmarks/results/current.json
+    python benchmarks/compare.py benchmarks/results/baseline.json benchmarks/results/current.json
+    python benchmarks/compare.py baseline.json current.json --stat mean --threshold 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+THRESHOLDS = Path(__file__).resolve().parent / "thresholds.json"
+
+
+def load_stats(path: Path, stat: str) -> Dict[str, float]:
+    """Estatística escolhida (segundos) por nome de benchmark"""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {bench["name"]: bench["stats"][stat] for bench in data.get("benchmarks", [])}
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float],
+            thresholds: Dict[str, float], default_threshold: float) -> List[dict]:
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name), current.get(name)
+        limit = thresholds.get(name, default_threshold)
+        row = {"name": name, "baseline": before, "current": after, "limit_pct": limit,
+               "change_pct": None, "status": "ok"}
+        if before is None:
+            row["status"] = "new"
+        elif after is None:
+            row["status"] = "missing"
+        else:
+            row["change_pct"] = (after - before) / before * 100 if before else 0.0
+            if row["change_pct"] > limit:
+                row["status"] = "REGRESSION"
+        rows.append(row)
+    return rows
+
+
+def _fmt_time(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value < 1e-3:
+        return f"{value * 1e6:.1f} µs"
+    if value < 1:
+        return f"{value * 1e3:.2f} ms"
+    return f"{value:.3f} s"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS)
+    parser.add_argument("--stat", help="estatística a comparar (min, mean, median...)")
+    parser.add_argument("--threshold", type=float, help="limiar único (%%), ignora o ficheiro")
+    parser.add_argument("--strict", action="store_true", help="falhar também com benchmarks em falta")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    config = json.loads(args.thresholds.read_text(encoding="utf-8")) if args.thresholds.exists() else {}
+    stat = args.stat or config.get("stat", "median")
+    if args.threshold is not None:
+        per_benchmark, default_threshold = {}, args.threshold
+    else:
+        per_benchmark = config.get("benchmarks", {})
+        default_threshold = config.get("default_max_regression_pct", 15)
+
+    rows = compare(load_stats(args.baseline, stat), load_stats(args.current, stat),
+                   per_benchmark, default_threshold)
+    failed = [r for r in rows if r["status"] == "REGRESSION" or (args.strict and r["status"] == "missing")]
+
+    if args.json:
+        print(json.dumps({"stat": stat, "results": rows, "failed": len(failed)}, indent=2))
+    else:
+        width = max([len(r["name"]) for r in rows] + [10])
+        print(f"{'benchmark':<{width}}  {'antes':>12}  {'agora':>12}  {'variação':>9}  {'limite':>7}  estado")
+        for r in rows:
+            change = f"{r['change_pct']:+.1f}%" if r["change_pct"] is not None else "-"
+            print(f"{r['name']:<{width}}  {_fmt_time(r['baseline']):>12}  {_fmt_time(r['current']):>12}  "
+                  f"{change:>9}  {r['limit_pct']:>6.0f}%  {r['status']}")
+        print(f"\n{len(failed)} regressões ({stat})" if failed else f"\nsem regressões ({stat})")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
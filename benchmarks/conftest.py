@@ -0,0 +1,56 @@
+"""
+Fixtures partilhadas dos benchmarks BGAPP
+Dados sintéticos determinísticos (semente fixa) para que execuções diferentes
+meçam exatamente o mesmo trabalho.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+SEED = 20250101
+
+# Área de estudo: ZEE de Angola
+ANGOLA_BBOX = (8.5, -18.2, 17.5, -4.2)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(SEED)
+
+
+@pytest.fixture
+def run_async():
+    """Executar corrotinas num event loop dedicado ao benchmark"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def occurrence_records(rng):
+    """Registos OBIS/GBIF com ~20% de duplicados e alguns sem coordenadas"""
+    n = 20000
+    species = [f"Species {i}" for i in range(150)]
+    lons = rng.uniform(ANGOLA_BBOX[0], ANGOLA_BBOX[2], n)
+    lats = rng.uniform(ANGOLA_BBOX[1], ANGOLA_BBOX[3], n)
+    names = rng.integers(0, len(species), n)
+    days = rng.integers(1, 28, n)
+
+    records = []
+    for i in range(n):
+        records.append({
+            "decimalLongitude": None if i % 97 == 0 else float(lons[i]),
+            "decimalLatitude": float(lats[i]),
+            "scientificName": species[names[i]],
+            "eventDate": f"2024-03-{days[i]:02d}",
+        })
+    duplicates = [dict(records[i]) for i in range(0, n, 5)]
+    return records + duplicates
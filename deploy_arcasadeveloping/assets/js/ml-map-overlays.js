@@ -204,10 +204,22 @@ class MLMapOverlays {
    * Vincula popup informativo ao marcador
    */
   bindPredictivePopup(feature, layer, filter) {
+    // HTML gerado só quando o popup abre (o servidor envia apenas as propriedades)
+    layer.bindPopup(() => this.renderPredictivePopup(feature, filter), {
+      maxWidth: 300,
+      className: 'ml-predictive-popup'
+    });
+  }
+
+  /**
+   * Renderiza o popup de um ponto preditivo a partir das suas propriedades
+   */
+  renderPredictivePopup(feature, filter) {
     const props = feature.properties;
     const confidence = (props.confidence * 100).toFixed(1);
+    const [longitude, latitude] = feature.geometry?.coordinates || [];
     
-    const popupContent = `
+    return `
       <div class="ml-popup">
         <div class="ml-popup-header">
           <span class="ml-popup-icon">${this.filterStyles[filter.type]?.icon || '📍'}</span>
@@ -224,13 +236,13 @@ class MLMapOverlays {
             </span>
           </div>
           <div class="location-item">
-            <strong>Coordenadas:</strong> ${props.latitude?.toFixed(4)}, ${props.longitude?.toFixed(4)}
+            <strong>Coordenadas:</strong> ${latitude?.toFixed(4)}, ${longitude?.toFixed(4)}
           </div>
           ${props.area_name ? `<div class="area-item"><strong>Área:</strong> ${props.area_name}</div>` : ''}
           ${props.predicted_at ? `<div class="time-item"><strong>Predito em:</strong> ${new Date(props.predicted_at).toLocaleString()}</div>` : ''}
         </div>
         <div class="ml-popup-actions">
-          <button onclick="window.mlMapOverlays?.zoomToPoint(${props.latitude}, ${props.longitude}) || alert('Sistema ML carregando...')" class="btn-zoom">
+          <button onclick="window.mlMapOverlays?.zoomToPoint(${latitude}, ${longitude}) || alert('Sistema ML carregando...')" class="btn-zoom">
             🔍 Zoom
           </button>
           <button onclick="window.mlMapOverlays?.showDetails('${props.point_id}') || alert('Sistema ML carregando...')" class="btn-details">
@@ -239,11 +251,6 @@ class MLMapOverlays {
         </div>
       </div>
     `;
-    
-    layer.bindPopup(popupContent, {
-      maxWidth: 300,
-      className: 'ml-predictive-popup'
-    });
   }
 
   /**
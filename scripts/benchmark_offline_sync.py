@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sincronização offline
+Enche uma base SQLite temporária com registos pendentes e mede o débito de
+OfflineSyncManager.sync_pending contra um servidor HTTP local (stub aiohttp),
+com envio em lote e, para comparação, registo a registo.
+
+Uso:
+    python scripts/benchmark_offline_sync.py --records 20000 --latency-ms 20
+    python scripts/benchmark_offline_sync.py --mode bulk --batch-size 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from bgapp.offline.sync_manager import OfflineSyncManager, create_observation_record  # noqa: E402
+
+
+def build_stub(latency: float, bulk: bool) -> web.Application:
+    """Servidor de destino: aceita tudo, com latência fixa por pedido"""
+    state = {"requests": 0, "records": 0}
+
+    async def single(request: web.Request) -> web.Response:
+        await request.read()
+        state["requests"] += 1
+        state["records"] += 1
+        await asyncio.sleep(latency)
+        return web.json_response({"ok": True}, status=201)
+
+    async def bulk_items(request: web.Request) -> web.Response:
+        if not bulk:
+            return web.Response(status=404)
+        payload = await request.json()
+        state["requests"] += 1
+        state["records"] += len(payload["records"])
+        await asyncio.sleep(latency)
+        return web.json_response({"results": [
+            {"id": record["id"], "status": 201} for record in payload["records"]
+        ]})
+
+    app = web.Application(client_max_size=256 * 1024 ** 2)
+    app["state"] = state
+    app.router.add_post("/sync/offline/bulk", bulk_items)
+    app.router.add_post("/collections/{collection}/items", single)
+    return app
+
+
+def seed(manager: OfflineSyncManager, count: int) -> float:
+    t0 = time.perf_counter()
+    chunk = 5000
+    for start in range(0, count, chunk):
+        manager.store_records([
+            create_observation_record(
+                species="Sardinella aurita",
+                location=(-8.8 - i * 1e-5, 13.2 + i * 1e-5),
+                collector_id="researcher_001",
+                device_id="tablet_007",
+                individualCount=i % 50,
+                sequence=i,
+            )
+            for i in range(start, min(count, start + chunk))
+        ])
+    return time.perf_counter() - t0
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    app = build_stub(args.latency_ms / 1000.0, bulk=(mode == "bulk"))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = OfflineSyncManager(db_path=str(Path(tmp) / "offline.db"),
+                                     api_base_url=f"http://127.0.0.1:{port}")
+        manager.upload_batch_size = args.batch_size
+        manager.max_concurrent_uploads = args.concurrency
+        seed_seconds = seed(manager, args.records)
+
+        t0 = time.perf_counter()
+        results = await manager.sync_pending()
+        elapsed = time.perf_counter() - t0
+        remaining = len(manager.get_pending_records())
+        manager.close()
+
+    await runner.cleanup()
+    state = app["state"]
+    return {
+        "mode": mode,
+        "records": args.records,
+        "seed_seconds": round(seed_seconds, 3),
+        "sync_seconds": round(elapsed, 3),
+        "records_per_second": round(results["total"] / elapsed, 1) if elapsed else None,
+        "http_requests": state["requests"],
+        "synced": results["success"],
+        "pending_after": remaining,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="latência simulada por pedido")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["bulk", "single", "both"], default="both")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    modes = ["bulk", "single"] if args.mode == "both" else [args.mode]
+    reports = [asyncio.run(run_mode(mode, args)) for mode in modes]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for report in reports:
+        print(f"{report['mode']:>6}: {report['records']} registos em {report['sync_seconds']:.2f}s "
+              f"({report['records_per_second']} reg/s, {report['http_requests']} pedidos HTTP, "
+              f"semente {report['seed_seconds']:.2f}s, pendentes no fim: {report['pending_after']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache Redis em dois níveis
+Mede a latência de leitura (nível local L1 vs Redis) e a carga no backend
+durante uma debandada sintética: vários "workers" (instâncias RedisCache a
+partilhar o mesmo Redis) pedem ao mesmo tempo uma chave expirada, com e sem
+single-flight. Usa fakeredis, ou um Redis local com --redis-url.
+
+Uso:
+    python scripts/benchmark_redis_cache.py
+    python scripts/benchmark_redis_cache.py --workers 8 --callers 50 --loader-ms 200
+    python scripts/benchmark_redis_cache.py --redis-url redis://localhost:6379/15
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import redis.asyncio as redis_asyncio
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from bgapp.cache.redis_cache import CacheConfig, RedisCache  # noqa: E402
+
+
+def make_client_factory(redis_url: str | None):
+    """Clientes que contam os comandos enviados ao backend"""
+    counter = {"commands": 0}
+
+    if redis_url:
+        base = redis_asyncio.Redis
+        kwargs = {}
+    else:
+        import fakeredis
+        base = fakeredis.FakeAsyncRedis
+        kwargs = {"server": fakeredis.FakeServer()}
+
+    class CountingRedis(base):
+        async def execute_command(self, *args, **options):
+            counter["commands"] += 1
+            return await super().execute_command(*args, **options)
+
+        def pipeline(self, *args, **kwargs):
+            pipe = super().pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def counted_execute(*a, **kw):
+                counter["commands"] += len(pipe.command_stack)
+                return await execute(*a, **kw)
+
+            pipe.execute = counted_execute
+            return pipe
+
+    def factory():
+        if redis_url:
+            return CountingRedis.from_url(redis_url)
+        return CountingRedis(**kwargs)
+
+    return factory, counter
+
+
+def payload(size: int) -> dict:
+    """Valor típico: série oceanográfica com metadados"""
+    n = max(1, size // 40)
+    return {
+        "source": "copernicus_cmems",
+        "generated_at": "2025-01-01T00:00:00",
+        "points": [{"lat": -8.8 - i * 1e-3, "lon": 13.2 + i * 1e-3, "sst": 24.5 + (i % 7) * 0.1}
+                   for i in range(n)],
+    }
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(ordered) * 1e6, 1),
+        "p95_us": round(ordered[int(0.95 * (len(ordered) - 1))] * 1e6, 1),
+    }
+
+
+async def bench_hits(factory, args) -> dict:
+    value = payload(args.value_bytes)
+    cache = RedisCache(CacheConfig(), client=factory())
+    await cache.set("bgapp:cache:bench:hit", value, ttl=600)
+    encoded = cache.codec.encode(value)
+
+    local, remote = [], []
+    for _ in range(args.reads):
+        t0 = time.perf_counter()
+        await cache.get("bgapp:cache:bench:hit")
+        local.append(time.perf_counter() - t0)
+
+        cache.local.delete(["bgapp:cache:bench:hit"])
+        t0 = time.perf_counter()
+        await cache.get("bgapp:cache:bench:hit")
+        remote.append(time.perf_counter() - t0)
+
+    await cache.delete("bgapp:cache:bench:hit")
+    return {
+        "json_bytes": len(json.dumps(value, default=str)),
+        "encoded_bytes": len(encoded),
+        "compression": cache.codec.compression,
+        "local_hit": percentiles(local),
+        "redis_hit": percentiles(remote),
+    }
+
+
+async def bench_stampede(factory, counter, args, single_flight: bool) -> dict:
+    key = f"bgapp:cache:bench:stampede:{single_flight}"
+    loads = {"count": 0}
+
+    async def loader():
+        loads["count"] += 1
+        await asyncio.sleep(args.loader_ms / 1000.0)
+        return payload(args.value_bytes)
+
+    workers = [RedisCache(CacheConfig(), client=factory()) for _ in range(args.workers)]
+    await workers[0].delete(key)
+
+    async def call(cache: RedisCache):
+        t0 = time.perf_counter()
+        if single_flight:
+            await cache.get_or_set(key, loader, ttl=600)
+        else:
+            # Padrão anterior: ler, e em caso de falha calcular e gravar
+            if await cache.get(key) is None:
+                await cache.set(key, await loader(), ttl=600)
+        return time.perf_counter() - t0
+
+    counter["commands"] = 0
+    t0 = time.perf_counter()
+    latencies = await asyncio.gather(*(call(cache) for cache in workers for _ in range(args.callers)))
+    elapsed = time.perf_counter() - t0
+
+    await workers[0].delete(key)
+    return {
+        "mode": "single-flight" if single_flight else "naive",
+        "callers": len(latencies),
+        "loader_calls": loads["count"],
+        "backend_commands": counter["commands"],
+        "wall_seconds": round(elapsed, 3),
+        "max_latency_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+async def run(args) -> dict:
+    factory, counter = make_client_factory(args.redis_url)
+    return {
+        "backend": args.redis_url or "fakeredis",
+        "hits": await bench_hits(factory, args),
+        "stampede": [await bench_stampede(factory, counter, args, single_flight=flag)
+                     for flag in (False, True)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", help="Redis real (por omissão fakeredis)")
+    parser.add_argument("--value-bytes", type=int, default=20000, help="tamanho aproximado do valor")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4, help="processos simulados")
+    parser.add_argument("--callers", type=int, default=25, help="chamadas concorrentes por worker")
+    parser.add_argument("--loader-ms", type=float, default=100.0, help="duração do recálculo")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    hits = report["hits"]
+    print(f"backend: {report['backend']}")
+    print(f"valor: {hits['json_bytes']} B em JSON -> {hits['encoded_bytes']} B "
+          f"(msgpack, compressão {hits['compression']})")
+    print(f"leitura L1:    p50 {hits['local_hit']['p50_us']} µs, p95 {hits['local_hit']['p95_us']} µs")
+    print(f"leitura Redis: p50 {hits['redis_hit']['p50_us']} µs, p95 {hits['redis_hit']['p95_us']} µs")
+    for row in report["stampede"]:
+        print(f"debandada {row['mode']:>13}: {row['callers']} chamadas, {row['loader_calls']} recálculos, "
+              f"{row['backend_commands']} comandos Redis, {row['wall_seconds']:.2f}s "
+              f"(latência máx. {row['max_latency_ms']} ms)")
+
+
+if __name__ == "__main__":
+    main()
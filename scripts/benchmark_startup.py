@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque da Admin API
+Mede o tempo de importação de bgapp.admin_api em processos novos (arranque a frio
+de um worker) e mostra os módulos mais lentos segundo `python -X importtime`.
+
+Uso:
+    python scripts/benchmark_startup.py --runs 5 --top 25
+    python scripts/benchmark_startup.py --load-all   # inclui todos os subsistemas
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+
+BOOT_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import bgapp.admin_api as api
+boot = time.perf_counter() - t0
+if {load_all}:
+    for name in api.subsystems.names():
+        api.subsystems.is_available(name)
+report = api.subsystems.get_report()
+report["wall_seconds"] = boot
+print("@@BENCH@@" + json.dumps(report))
+"""
+
+
+def run_once(load_all: bool, importtime: bool) -> tuple[dict, str]:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", BOOT_SNIPPET.format(src=str(SRC), load_all=load_all)]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True,
+                          env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    for line in proc.stdout.splitlines():
+        if line.startswith("@@BENCH@@"):
+            return json.loads(line[len("@@BENCH@@"):]), proc.stderr
+    raise RuntimeError(f"Falha ao importar bgapp.admin_api:\n{proc.stderr[-2000:]}")
+
+
+def parse_importtime(stderr: str, top: int) -> list[tuple[int, str]]:
+    """Módulos bgapp/terceiros com maior tempo cumulativo (µs)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque da Admin API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Módulos a mostrar no perfil de importação")
+    parser.add_argument("--load-all", action="store_true", help="Carregar também todos os subsistemas")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    # Primeira execução aquece a cache de bytecode e não conta
+    run_once(args.load_all, importtime=False)
+
+    timings = []
+    report = {}
+    for _ in range(args.runs):
+        report, _ = run_once(args.load_all, importtime=False)
+        timings.append(report["wall_seconds"])
+
+    _, stderr = run_once(args.load_all, importtime=True)
+    slowest = parse_importtime(stderr, args.top)
+
+    result = {
+        "runs": args.runs,
+        "load_all": args.load_all,
+        "boot_seconds": {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "max": max(timings),
+        },
+        "subsystems": report,
+        "slowest_imports": [{"module": name, "cumulative_ms": us / 1000} for us, name in slowest],
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    boot = result["boot_seconds"]
+    print(f"🚀 Arranque bgapp.admin_api ({args.runs} execuções{', todos os subsistemas' if args.load_all else ''})")
+    print(f"   min {boot['min']:.3f}s | mediana {boot['median']:.3f}s | max {boot['max']:.3f}s")
+    print(f"   subsistemas: {report['loaded']} carregados, {report['failed']} indisponíveis, "
+          f"{report['pending']} sob demanda")
+    for subsystem in report["subsystems"]:
+        if subsystem["load_seconds"] is not None:
+            print(f"     {subsystem['name']:<32} {subsystem['state']:<8} {subsystem['load_seconds'] * 1000:8.1f}ms")
+    print("\n⏱️  Importações mais lentas (cumulativo):")
+    for item in result["slowest_imports"]:
+        print(f"   {item['cumulative_ms']:9.1f}ms  {item['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,26 @@ BGAPP - Sistema de Gestão de Biodiversidade e Oceanografia
 __version__ = "1.2.0"
 __author__ = "BGAPP Team"
 
-# Importações principais
-try:
-    from .admin_api import app
-    from .async_processing import celery_app
-except ImportError:
-    # Importações opcionais para evitar erros de dependências
-    app = None
-    celery_app = None
+# Importações principais sob demanda: importar um submódulo (ex.: em workers de
+# processos) não deve carregar a Admin API inteira
+_LAZY_IMPORTS = {
+    "app": (".admin_api", "app"),
+    "celery_app": (".async_processing", "celery_app"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    module, attr = _LAZY_IMPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module, __name__), attr)
+    except ImportError:
+        # Importações opcionais para evitar erros de dependências
+        value = None
+    globals()[name] = value
+    return value
 
 __all__ = [
     "app",
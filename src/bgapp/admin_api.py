@@ -4,6 +4,11 @@ BGAPP Admin API - Backend seguro para o painel administrativo
 Fornece endpoints protegidos para gestão de serviços, monitorização e configuração
 """
 
+# Primeiro import: marca o início do arranque (ver subsystems.boot_seconds)
+from .core.boot import BOOT_STARTED
+
+import asyncio
+import importlib
 import json
 import os
 import subprocess
@@ -147,12 +152,13 @@ except ImportError as e:
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Depends, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 import sqlalchemy as sa
 import hashlib
-from .core.stac import STACManager
+from .core.executors import executors, run_cpu, run_io
+from .core.subsystems import subsystems, LazyASGIApp, SubsystemResolverMiddleware
 
 app = FastAPI(
     title="BGAPP Admin API",
@@ -225,8 +231,46 @@ except ImportError as e:
 if settings.security.rate_limit_enabled and gateway:
     app.add_middleware(RateLimitMiddleware, gateway=gateway)
 
-# Inicializar STAC Manager
-stac_manager = STACManager()
+# Métricas Prometheus - adicionado por último para medir toda a cadeia de middleware
+try:
+    from .core.instrumentation import instrumentation
+    from .middleware.metrics_middleware import add_metrics_middleware
+    add_metrics_middleware(app, instrumentation)
+    if MONITORING_ENABLED:
+        instrumentation.register_metrics_store(
+            monitoring_system.metrics_store,
+            "bgapp_monitoring_metric",
+            "Último valor das métricas do sistema de monitorização"
+        )
+    METRICS_EXPOSITION_ENABLED = True
+except ImportError as e:
+    logger.warning(f"Instrumentação Prometheus não disponível: {e}")
+    METRICS_EXPOSITION_ENABLED = False
+
+# Profiler por amostragem (opt-in via PROFILING_ENABLED=true) e watchdog do event loop
+profiling_settings = getattr(settings, "profiling", None)
+PROFILING_ENABLED = bool(profiling_settings and profiling_settings.enabled)
+LOOP_WATCHDOG_ENABLED = bool(profiling_settings and profiling_settings.loop_watchdog_enabled)
+sampling_profiler = None
+loop_lag_monitor = None
+loop_stall_detector = None
+if PROFILING_ENABLED or LOOP_WATCHDOG_ENABLED:
+    try:
+        from .core.profiler import create_profiler_from_settings, format_collapsed, LoopStallDetector
+        sampling_profiler, loop_lag_monitor = create_profiler_from_settings(
+            profiling_settings,
+            store=monitoring_system.metrics_store if MONITORING_ENABLED else None
+        )
+        loop_stall_detector = LoopStallDetector(
+            loop_lag_monitor, threshold_ms=profiling_settings.loop_stall_threshold_ms
+        )
+        if PROFILING_ENABLED:
+            from .middleware.profiling_middleware import add_profiling_middleware
+            add_profiling_middleware(app, sampling_profiler, profiling_settings.slow_request_threshold_ms)
+    except ImportError as e:
+        logger.warning(f"Profiler não disponível: {e}")
+        PROFILING_ENABLED = False
+        LOOP_WATCHDOG_ENABLED = False
 
 # =============================================================================
 # EVENTOS DE STARTUP E SHUTDOWN
@@ -249,7 +293,6 @@ async def startup_event():
     # Inicializar sistema de alertas em background
     if ALERTS_ENABLED and alert_manager:
         try:
-            import asyncio
             asyncio.create_task(alert_manager.run_monitoring_loop())
             print("✅ Sistema de alertas inicializado")
         except Exception as e:
@@ -271,6 +314,23 @@ async def startup_event():
         except Exception as e:
             print(f"⚠️ Erro inicializando autenticação: {e}")
     
+    # Pré-carregar subsistemas configurados sem atrasar o arranque
+    preload = getattr(getattr(settings, "api", None), "preload_subsystems", [])
+    if preload:
+        asyncio.create_task(subsystems.warm_up(name for name in preload if name in subsystems.names()))
+    
+    # Medição de lag e deteção de bloqueios do event loop
+    if loop_lag_monitor:
+        loop_lag_monitor.start()
+        loop_stall_detector.start()
+        print("✅ Watchdog do event loop ativo")
+    
+    # Iniciar profiler por amostragem
+    if PROFILING_ENABLED:
+        sampling_profiler.attach_loop()
+        sampling_profiler.start()
+        print("✅ Profiler por amostragem ativo")
+    
     print("🎯 BGAPP Admin API pronta!")
 
 @app.on_event("shutdown") 
@@ -286,6 +346,14 @@ async def shutdown_event():
         except Exception as e:
             print(f"⚠️ Erro desconectando cache: {e}")
     
+    if PROFILING_ENABLED:
+        sampling_profiler.stop()
+    if loop_lag_monitor:
+        loop_stall_detector.stop()
+        await loop_lag_monitor.stop()
+    
+    executors.shutdown()
+    
     print("👋 BGAPP Admin API encerrada!")
 
 # Configurações dos serviços
@@ -456,6 +524,14 @@ def check_service_status(service_name: str, config: Dict) -> ServiceStatus:
         last_check=datetime.now()
     )
 
+async def check_all_services_status() -> Dict[str, ServiceStatus]:
+    """Verificar todos os serviços em paralelo no pool de I/O (psycopg2/requests são bloqueantes)"""
+    statuses = await asyncio.gather(*(
+        run_io(check_service_status, service_name, config)
+        for service_name, config in SERVICES.items()
+    ))
+    return dict(zip(SERVICES.keys(), statuses))
+
 def get_db_connection():
     """Obter conexão à base de dados usando configuração segura"""
     import psycopg2
@@ -612,6 +688,19 @@ async def health_check():
                 "stats": db_stats
             }
         
+        # Event loop (lag p99 e bloqueios detetados)
+        if loop_lag_monitor:
+            lag_stats = loop_lag_monitor.get_stats()
+            stall_stats = loop_stall_detector.get_stats()
+            health_status["services"]["event_loop"] = {
+                "healthy": lag_stats.get("p99", 0.0) < profiling_settings.loop_stall_threshold_ms,
+                "lag_ms_p50": round(lag_stats.get("p50", 0.0), 2),
+                "lag_ms_p99": round(lag_stats.get("p99", 0.0), 2),
+                "lag_ms_max": round(lag_stats.get("max", 0.0), 2),
+                "stalls": stall_stats,
+                "executors": executors.get_stats()
+            }
+        
         # Check error handler
         if ERROR_HANDLING_ENABLED:
             error_stats = error_handler.get_error_statistics()
@@ -752,6 +841,24 @@ async def get_metric_stats(metric_name: str, seconds: int = 300):
     except Exception as e:
         return create_fallback_response(f"Failed to get metric stats: {str(e)}")
 
+@app.get("/monitoring/metrics/{metric_name}/rollup")
+async def get_metric_rollup(metric_name: str, resolution: str = "1m", seconds: int = 3600):
+    """Obter série agregada de uma métrica (resolução 1s, 1m ou 1h)"""
+    if not MONITORING_ENABLED:
+        return create_fallback_response("Monitoring system not available")
+
+    try:
+        return {
+            "metric": metric_name,
+            "resolution": resolution,
+            "buckets": monitoring_system.get_metric_rollup(metric_name, resolution, seconds),
+            "timespan_seconds": seconds
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return create_fallback_response(f"Failed to get metric rollup: {str(e)}")
+
 @app.post("/api/observations")
 async def create_observation(observation: Dict[str, Any]):
     """Endpoint para criar observações (usado pela app mobile)"""
@@ -808,8 +915,9 @@ async def get_services_status():
     """Obtém estado básico dos serviços (endpoint público para dashboard)"""
     try:
         services_status = []
+        statuses = await check_all_services_status()
         for service_name, config in SERVICES.items():
-            status = check_service_status(service_name, config)
+            status = statuses[service_name]
             # Retornar informações com URLs externas para acesso do browser
             basic_status = {
                 "name": status.name,
@@ -986,12 +1094,8 @@ async def get_services():
     """Obtém o estado de todos os serviços"""
     logger.info("services_status_requested")
     
-    services_status = []
-    for service_name, config in SERVICES.items():
-        status = check_service_status(service_name, config)
-        services_status.append(status)
-    
-    return services_status
+    statuses = await check_all_services_status()
+    return list(statuses.values())
 
 @app.post("/services/{service_name}/restart")
 async def restart_service(
@@ -1021,7 +1125,49 @@ async def restart_service(
 @app.get("/metrics", response_model=SystemMetrics)
 async def get_metrics():
     """Obtém métricas do sistema"""
-    return get_system_metrics()
+    return await run_io(get_system_metrics)
+
+if SECURITY_ENABLED and PROFILING_ENABLED:
+    @app.get("/admin/profiler/status")
+    async def get_profiler_status(current_user: User = Depends(require_admin)):
+        """Estado do profiler e atraso do event loop"""
+        return {
+            "profiler": sampling_profiler.get_status(),
+            "event_loop_lag_ms": loop_lag_monitor.get_stats(),
+            "event_loop_stalls": loop_stall_detector.recent_stalls(),
+            "executors": executors.get_stats(),
+            "slow_request_threshold_ms": profiling_settings.slow_request_threshold_ms
+        }
+
+    @app.get("/admin/profiler/profile")
+    async def get_profiler_profile(
+        duration: float = Query(10.0, gt=0),
+        rate_hz: float = Query(100.0, gt=0),
+        current_user: User = Depends(require_admin)
+    ):
+        """Perfil de todas as threads em formato collapsed (flamegraph.pl/speedscope)"""
+        duration = min(duration, profiling_settings.max_profile_seconds)
+        try:
+            stacks = await sampling_profiler.profile_async(duration, rate_hz)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return Response(content=format_collapsed(stacks), media_type="text/plain")
+
+if SECURITY_ENABLED:
+    @app.get("/admin/subsystems")
+    async def get_subsystems_report(current_user: User = Depends(require_admin)):
+        """Tempo de arranque e tempos de importação dos subsistemas carregados sob demanda"""
+        return subsystems.get_report()
+
+@app.get("/metrics/prometheus", include_in_schema=False)
+async def get_prometheus_metrics(request: Request):
+    """Exposição em formato texto Prometheus/OpenMetrics (para scrape)"""
+    if not METRICS_EXPOSITION_ENABLED:
+        raise HTTPException(status_code=503, detail="Instrumentação não disponível")
+    
+    openmetrics = "application/openmetrics-text" in request.headers.get("accept", "")
+    body, content_type = instrumentation.render(openmetrics=openmetrics)
+    return Response(content=body, media_type=content_type)
 
 # =============================================================================
 # ENDPOINTS DE CACHE E ALERTAS - PROTEGIDOS
@@ -1076,6 +1222,22 @@ async def clear_cache():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/cache/clear/tag/{tag}")
+async def clear_cache_tag(tag: str):
+    """Limpar as chaves associadas a uma tag de invalidação"""
+    if not CACHE_ENABLED or not cache:
+        raise HTTPException(status_code=503, detail="Cache não disponível")
+    
+    try:
+        cleared = await cache.invalidate_tags(tag)
+        return {
+            "message": f"Cache da tag '{tag}' limpo: {cleared} chaves removidas",
+            "tag": tag,
+            "cleared_keys": cleared
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/cache/clear/{pattern}")
 async def clear_cache_pattern(pattern: str):
     """Limpar cache por padrão específico"""
@@ -4099,6 +4261,99 @@ async def get_cartography_config():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/tiles/layers")
+async def get_vector_tile_layers(request: Request):
+    """
+    🧩 Camadas disponíveis como vector tiles (TileJSON)
+    """
+    if not VECTOR_TILES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Servidor de vector tiles não disponível")
+
+    return vector_tile_server.get_tilejson(str(request.base_url).rstrip("/"))
+
+@app.get("/tiles/{layer}/{z}/{x}/{y}.mvt")
+async def get_vector_tile(layer: str, z: int, x: int, y: int, request: Request):
+    """
+    🧩 Vector tile (Mapbox Vector Tile) de uma camada
+
+    Camadas: zee, fishing_zones, occurrences. Os tiles são simplificados e
+    recortados por zoom e servidos a partir de cache com ETag.
+    """
+    if not VECTOR_TILES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Servidor de vector tiles não disponível")
+
+    try:
+        tile = await run_cpu(vector_tile_server.get_tile, layer, z, x, y)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Camada não encontrada: {layer}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": tile.etag, "Cache-Control": "public, max-age=3600"}
+    if request.headers.get("if-none-match") == tile.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile.data, media_type="application/vnd.mapbox-vector-tile", headers=headers)
+
+@app.get("/tiles/raster")
+async def get_raster_tile_metadata(request: Request):
+    """
+    🌊 Parâmetros, passos de tempo e legendas dos raster tiles oceanográficos
+    """
+    if not RASTER_TILES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Serviço de raster tiles não disponível")
+
+    return raster_tile_service.get_metadata(str(request.base_url).rstrip("/"))
+
+@app.get("/tiles/raster/{parameter}/{time}/{z}/{x}/{y}.{fmt}")
+async def get_raster_tile(parameter: str, time: str, z: int, x: int, y: int, fmt: str, request: Request):
+    """
+    🌊 Raster tile (PNG/WebP) de um parâmetro oceanográfico
+
+    Args:
+        parameter: 'sst', 'chlorophyll', 'salinity', 'wave_height'
+        time: data ISO (AAAA-MM-DD) ou 'latest'
+        fmt: 'png' ou 'webp'
+    """
+    if not RASTER_TILES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Serviço de raster tiles não disponível")
+
+    try:
+        tile = await run_cpu(raster_tile_service.get_tile, parameter, time, z, x, y, fmt)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Parâmetro não encontrado: {parameter}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 'latest' muda diariamente; datas concretas são imutáveis
+    max_age = 300 if time == "latest" else 86400
+    headers = {"ETag": tile.etag, "Cache-Control": f"public, max-age={max_age}"}
+    if request.headers.get("if-none-match") == tile.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile.data, media_type=f"image/{fmt}", headers=headers)
+
+@app.get("/deckgl/layers/{key}.bin")
+async def get_deckgl_binary_layer(key: str):
+    """
+    📦 Buffer binário de uma camada Deck.GL (posições Float32, cores Uint8, pesos Float32)
+
+    A chave inclui o hash do conteúdo, por isso a resposta é imutável.
+    """
+    if not DECKGL_BINARY_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Camadas binárias Deck.GL não disponíveis")
+
+    data = binary_layer_store.get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Camada não encontrada: {key}")
+
+    return StreamingResponse(
+        data.iter_chunks(),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Length": str(data.nbytes),
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+    )
+
 # =============================================================================
 # ENDPOINTS DAS INTERFACES ESPECIALIZADAS
 # =============================================================================
@@ -4815,6 +5070,44 @@ async def start_data_processing_job(job_id: str):
             detail=f"Erro ao iniciar trabalho: {str(e)}"
         )
 
+@app.post("/admin-dashboard/data-processing/cancel-job/{job_id}")
+async def cancel_data_processing_job(job_id: str):
+    """
+    ⏹️ Cancelar trabalho de processamento (na fila ou em execução)
+    
+    Args:
+        job_id: ID do trabalho
+        
+    Returns:
+        Status do cancelamento
+    """
+    if not DATA_PROCESSING_PANEL_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Painel de processamento de dados não disponível"
+        )
+    
+    try:
+        cancelled = await data_processing_control_panel.cancel_processing_job(job_id)
+    except Exception as e:
+        logger.error(f"Erro ao cancelar trabalho {job_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao cancelar trabalho: {str(e)}"
+        )
+    
+    if not cancelled:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Trabalho {job_id} não está na fila nem em execução"
+        )
+    
+    return {
+        "status": "success",
+        "message": f"Trabalho {job_id} cancelado",
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/admin-dashboard/data-processing/job/{job_id}/status")
 async def get_job_status(job_id: str):
     """
@@ -4922,6 +5215,7 @@ async def get_processing_metrics():
             "active_jobs_count": len(data_processing_control_panel.active_jobs),
             "queued_jobs_count": len(data_processing_control_panel.processing_queue),
             "completed_jobs_count": len(data_processing_control_panel.completed_jobs),
+            "scheduler": data_processing_control_panel.processing_queue.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -4958,6 +5252,7 @@ async def get_data_sources_config():
                 "timeout": config.timeout,
                 "retry_count": config.retry_count,
                 "enabled": config.enabled,
+                "max_concurrent_jobs": config.max_concurrent_jobs,
                 "default_parameters": config.default_parameters
             }
         
@@ -5239,6 +5534,18 @@ async def get_component_health_detail(component_id: str):
 # ENDPOINTS DO GESTOR DE WORKFLOWS CIENTÍFICOS
 # =============================================================================
 
+@app.on_event("startup")
+async def resume_scientific_workflows():
+    """Retomar workflows interrompidos por um reinício (o gestor só é carregado se houver algum)"""
+    try:
+        # Constante do dag_executor (= WorkflowStatus.RUNNING.value) sem importar o gestor
+        from .workflows.dag_executor import WORKFLOW_RUNNING, count_persisted_workflows
+        
+        if await run_io(count_persisted_workflows, WORKFLOW_RUNNING) and SCIENTIFIC_WORKFLOW_MANAGER_AVAILABLE:
+            asyncio.create_task(scientific_workflow_manager.resume_interrupted_workflows())
+    except Exception as e:
+        logger.error(f"Erro ao retomar workflows científicos: {e}")
+
 @app.get("/admin-dashboard/workflows", response_class=HTMLResponse)
 async def get_scientific_workflows_dashboard():
     """
@@ -5824,7 +6131,8 @@ async def generate_biodiversity_report(
     start_date: str,
     end_date: str,
     authors: Optional[List[str]] = None,
-    output_format: str = "html"
+    output_format: str = "html",
+    figure_dpi: Optional[int] = Query(None, ge=50, le=600)
 ):
     """
     🐠 Gerar relatório de biodiversidade
@@ -5835,6 +6143,7 @@ async def generate_biodiversity_report(
         end_date: Data de fim (ISO format)
         authors: Lista de autores
         output_format: Formato ('html', 'pdf', 'json')
+        figure_dpi: DPI das figuras (por omissão 110 para ecrã, 300 para PDF)
         
     Returns:
         Relatório de biodiversidade gerado
@@ -5863,7 +6172,8 @@ async def generate_biodiversity_report(
             species_data=species_data,
             analysis_period=(period_start, period_end),
             authors=authors,
-            output_format=format_enum
+            output_format=format_enum,
+            figure_dpi=figure_dpi
         )
         
         if output_format == "html":
@@ -5889,7 +6199,8 @@ async def generate_oceanographic_report(
     start_date: str,
     end_date: str,
     authors: Optional[List[str]] = None,
-    output_format: str = "html"
+    output_format: str = "html",
+    figure_dpi: Optional[int] = Query(None, ge=50, le=600)
 ):
     """
     🌊 Gerar relatório oceanográfico
@@ -5900,6 +6211,7 @@ async def generate_oceanographic_report(
         end_date: Data de fim
         authors: Lista de autores
         output_format: Formato de saída
+        figure_dpi: DPI das figuras (por omissão 110 para ecrã, 300 para PDF)
         
     Returns:
         Relatório oceanográfico gerado
@@ -5925,7 +6237,8 @@ async def generate_oceanographic_report(
             oceanographic_data=oceanographic_data,
             analysis_period=(period_start, period_end),
             authors=authors,
-            output_format=format_enum
+            output_format=format_enum,
+            figure_dpi=figure_dpi
         )
         
         if output_format == "html":
@@ -5945,6 +6258,20 @@ async def generate_oceanographic_report(
             detail=f"Erro na geração do relatório: {str(e)}"
         )
 
+@app.get("/admin-dashboard/reports/figures/{filename}")
+async def get_report_figure(filename: str):
+    """
+    🖼️ Figura renderizada de um relatório (nome = hash do conteúdo, logo imutável)
+    """
+    if not FIGURE_RENDERER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Serviço de figuras não disponível")
+
+    path = figure_renderer.get_path(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Figura não encontrada")
+
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 @app.get("/admin-dashboard/reports/templates")
 async def get_report_templates():
     """
@@ -6098,6 +6425,74 @@ async def execute_database_query(
             detail=f"Erro na execução da query: {str(e)}"
         )
 
+# Executa SQL arbitrário de leitura: só disponível para administradores autenticados
+if SECURITY_ENABLED:
+    @app.post("/admin-dashboard/database/export-stream")
+    async def stream_database_export(
+        connection_id: str,
+        sql: str,
+        export_format: str = "csv",
+        gzip: bool = False,
+        batch_size: int = Query(10000, ge=100, le=100000),
+        current_user: User = Depends(require_admin)
+    ):
+        """
+        📤 Exportar o resultado de uma query em streaming
+        
+        CSV via COPY, NDJSON e Parquet via cursor do servidor; a memória usada não
+        depende do tamanho do resultado. ``gzip`` comprime CSV/NDJSON (.gz).
+        """
+        if not DATABASE_MANAGER_AVAILABLE:
+            raise HTTPException(
+                status_code=503,
+                detail="Gestor de base de dados não disponível"
+            )
+        
+        from .database.database_manager import STREAM_EXPORT_FORMATS
+        
+        export_format = export_format.lower()
+        if export_format not in STREAM_EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Formato não suportado: {export_format}")
+        
+        stream = database_manager.stream_query_export(
+            connection_id=connection_id,
+            sql=sql,
+            export_format=export_format,
+            gzip_output=gzip,
+            batch_size=batch_size
+        )
+        
+        # Obter o primeiro bloco antes de responder: erros de validação/SQL ainda dão 4xx/5xx
+        try:
+            first_chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = b""
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Erro na exportação em streaming: {e}")
+            raise HTTPException(status_code=500, detail=f"Erro na exportação: {str(e)}")
+        
+        async def body():
+            try:
+                if first_chunk:
+                    yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+        
+        media_type, extension = STREAM_EXPORT_FORMATS[export_format]
+        filename = f"export_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+        if gzip and export_format != "parquet":
+            media_type, filename = "application/gzip", f"{filename}.gz"
+        
+        return StreamingResponse(
+            body(),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
 @app.get("/admin-dashboard/database/{connection_id}/schema")
 async def get_database_schema(connection_id: str):
     """
@@ -7092,145 +7487,108 @@ async def get_dashboard_overview_api():
 
 # === ENDPOINTS DE MACHINE LEARNING E BIODIVERSIDADE ===
 
-# Integrar API de ML
-from .api.ml_endpoints import ml_api
+# Integrar API de ML (sub-aplicação importada no primeiro request a /ml)
+subsystems.register_import("ml_api", ".api.ml_endpoints", label="ML API")
+
+# Gestores opcionais: importados e construídos no primeiro uso (ver core/subsystems.py).
+# As flags *_AVAILABLE e os nomes abaixo são avaliados sob demanda nos endpoints.
+for _name, _module, _label in [
+    ("dashboard_controller", ".admin_dashboard_controller", "Dashboard controller"),
+    ("cartography_engine", ".cartography.python_maps_engine", "Cartography engine"),
+    ("vector_tile_server", ".cartography.vector_tiles", "Vector tile server"),
+    ("raster_tile_service", ".cartography.raster_tiles", "Raster tile service"),
+    ("binary_layer_store", ".cartography.deckgl_wasm_wrapper", "Deck.GL binary layers"),
+    ("biologist_interface", ".interfaces.biologist_interface", "Specialized interfaces"),
+    ("fisherman_interface", ".interfaces.fisherman_interface", "Specialized interfaces"),
+    ("bgapp_layers_manager", ".unified_access.bgapp_layers_manager", "Unified access manager"),
+    ("data_processing_control_panel", ".data_processing.control_panel", "Data processing control panel"),
+    ("scientific_workflow_manager", ".workflows.scientific_workflow_manager", "Scientific workflow manager"),
+    ("user_role_manager", ".auth.user_role_manager", "User role manager"),
+    ("scientific_report_engine", ".reports.scientific_report_engine", "Scientific report engine"),
+    ("figure_renderer", ".reports.figure_renderer", "Report figure renderer"),
+    ("database_manager", ".database.database_manager", "Database manager"),
+    ("api_endpoints_manager", ".api_management.endpoints_manager", "API endpoints manager"),
+    ("advanced_copernicus_manager", ".copernicus_integration.advanced_copernicus_manager", "Advanced Copernicus manager"),
+    ("backup_restore_system", ".backup_restore.backup_system", "Backup/restore system"),
+    ("configuration_manager", ".config_management.configuration_manager", "Configuration manager"),
+    ("performance_analytics", ".analytics.performance_analytics", "Performance analytics"),
+    ("system_health_monitor", ".monitoring.system_health_monitor", "System health monitor"),
+]:
+    subsystems.register_import(_name, _module, label=_label)
+
+subsystems.register(
+    "stac_manager",
+    lambda: importlib.import_module(".core.stac", __package__).STACManager(),
+    label="STAC manager"
+)
+stac_manager = subsystems.proxy("stac_manager")
 
-# Importar controlador do admin dashboard
-try:
-    from .admin_dashboard_controller import dashboard_controller
-    DASHBOARD_CONTROLLER_AVAILABLE = True
-except ImportError as e:
-    print(f"Dashboard controller not available: {e}")
-    DASHBOARD_CONTROLLER_AVAILABLE = False
-    dashboard_controller = None
+dashboard_controller = subsystems.proxy("dashboard_controller")
+DASHBOARD_CONTROLLER_AVAILABLE = subsystems.available("dashboard_controller")
 
-# Importar engine cartográfico Python
-try:
-    from .cartography.python_maps_engine import cartography_engine
-    CARTOGRAPHY_ENGINE_AVAILABLE = True
-except ImportError as e:
-    print(f"Cartography engine not available: {e}")
-    CARTOGRAPHY_ENGINE_AVAILABLE = False
-    cartography_engine = None
+cartography_engine = subsystems.proxy("cartography_engine")
+CARTOGRAPHY_ENGINE_AVAILABLE = subsystems.available("cartography_engine")
 
-# Importar interfaces especializadas
-try:
-    from .interfaces.biologist_interface import biologist_interface
-    from .interfaces.fisherman_interface import fisherman_interface
-    SPECIALIZED_INTERFACES_AVAILABLE = True
-except ImportError as e:
-    print(f"Specialized interfaces not available: {e}")
-    SPECIALIZED_INTERFACES_AVAILABLE = False
-    biologist_interface = None
-    fisherman_interface = None
+vector_tile_server = subsystems.proxy("vector_tile_server")
+VECTOR_TILES_AVAILABLE = subsystems.available("vector_tile_server")
 
-# Importar gestor de camadas unificado
-try:
-    from .unified_access.bgapp_layers_manager import bgapp_layers_manager
-    UNIFIED_ACCESS_AVAILABLE = True
-except ImportError as e:
-    print(f"Unified access manager not available: {e}")
-    UNIFIED_ACCESS_AVAILABLE = False
-    bgapp_layers_manager = None
+raster_tile_service = subsystems.proxy("raster_tile_service")
+RASTER_TILES_AVAILABLE = subsystems.available("raster_tile_service")
 
-# Importar painel de controle de processamento de dados
-try:
-    from .data_processing.control_panel import data_processing_control_panel
-    DATA_PROCESSING_PANEL_AVAILABLE = True
-except ImportError as e:
-    print(f"Data processing control panel not available: {e}")
-    DATA_PROCESSING_PANEL_AVAILABLE = False
-    data_processing_control_panel = None
+binary_layer_store = subsystems.proxy("binary_layer_store")
+DECKGL_BINARY_AVAILABLE = subsystems.available("binary_layer_store")
 
-# Importar gestor de workflows científicos
-try:
-    from .workflows.scientific_workflow_manager import scientific_workflow_manager
-    SCIENTIFIC_WORKFLOW_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"Scientific workflow manager not available: {e}")
-    SCIENTIFIC_WORKFLOW_MANAGER_AVAILABLE = False
-    scientific_workflow_manager = None
+biologist_interface = subsystems.proxy("biologist_interface")
+fisherman_interface = subsystems.proxy("fisherman_interface")
+SPECIALIZED_INTERFACES_AVAILABLE = subsystems.available("biologist_interface", "fisherman_interface")
 
-# Importar gestor de utilizadores e perfis
-try:
-    from .auth.user_role_manager import user_role_manager
-    USER_ROLE_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"User role manager not available: {e}")
-    USER_ROLE_MANAGER_AVAILABLE = False
-    user_role_manager = None
+bgapp_layers_manager = subsystems.proxy("bgapp_layers_manager")
+UNIFIED_ACCESS_AVAILABLE = subsystems.available("bgapp_layers_manager")
 
-# Importar engine de relatórios científicos
-try:
-    from .reports.scientific_report_engine import scientific_report_engine
-    SCIENTIFIC_REPORT_ENGINE_AVAILABLE = True
-except ImportError as e:
-    print(f"Scientific report engine not available: {e}")
-    SCIENTIFIC_REPORT_ENGINE_AVAILABLE = False
-    scientific_report_engine = None
+data_processing_control_panel = subsystems.proxy("data_processing_control_panel")
+DATA_PROCESSING_PANEL_AVAILABLE = subsystems.available("data_processing_control_panel")
 
-# Importar gestor de base de dados
-try:
-    from .database.database_manager import database_manager
-    DATABASE_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"Database manager not available: {e}")
-    DATABASE_MANAGER_AVAILABLE = False
-    database_manager = None
+scientific_workflow_manager = subsystems.proxy("scientific_workflow_manager")
+SCIENTIFIC_WORKFLOW_MANAGER_AVAILABLE = subsystems.available("scientific_workflow_manager")
 
-# Importar gestor de endpoints APIs
-try:
-    from .api_management.endpoints_manager import api_endpoints_manager
-    API_ENDPOINTS_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"API endpoints manager not available: {e}")
-    API_ENDPOINTS_MANAGER_AVAILABLE = False
-    api_endpoints_manager = None
+user_role_manager = subsystems.proxy("user_role_manager")
+USER_ROLE_MANAGER_AVAILABLE = subsystems.available("user_role_manager")
 
-# Importar gestor Copernicus avançado
-try:
-    from .copernicus_integration.advanced_copernicus_manager import advanced_copernicus_manager
-    ADVANCED_COPERNICUS_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"Advanced Copernicus manager not available: {e}")
-    ADVANCED_COPERNICUS_MANAGER_AVAILABLE = False
-    advanced_copernicus_manager = None
+scientific_report_engine = subsystems.proxy("scientific_report_engine")
+SCIENTIFIC_REPORT_ENGINE_AVAILABLE = subsystems.available("scientific_report_engine")
 
-# Importar sistema de backup/restore
-try:
-    from .backup_restore.backup_system import backup_restore_system
-    BACKUP_RESTORE_SYSTEM_AVAILABLE = True
-except ImportError as e:
-    print(f"Backup/restore system not available: {e}")
-    BACKUP_RESTORE_SYSTEM_AVAILABLE = False
-    backup_restore_system = None
+figure_renderer = subsystems.proxy("figure_renderer")
+FIGURE_RENDERER_AVAILABLE = subsystems.available("figure_renderer")
 
-# Importar gestor de configurações
-try:
-    from .config_management.configuration_manager import configuration_manager
-    CONFIGURATION_MANAGER_AVAILABLE = True
-except ImportError as e:
-    print(f"Configuration manager not available: {e}")
-    CONFIGURATION_MANAGER_AVAILABLE = False
-    configuration_manager = None
+database_manager = subsystems.proxy("database_manager")
+DATABASE_MANAGER_AVAILABLE = subsystems.available("database_manager")
 
-# Importar analytics de performance
-try:
-    from .analytics.performance_analytics import performance_analytics
-    PERFORMANCE_ANALYTICS_AVAILABLE = True
-except ImportError as e:
-    print(f"Performance analytics not available: {e}")
-    PERFORMANCE_ANALYTICS_AVAILABLE = False
-    performance_analytics = None
+api_endpoints_manager = subsystems.proxy("api_endpoints_manager")
+API_ENDPOINTS_MANAGER_AVAILABLE = subsystems.available("api_endpoints_manager")
+
+advanced_copernicus_manager = subsystems.proxy("advanced_copernicus_manager")
+ADVANCED_COPERNICUS_MANAGER_AVAILABLE = subsystems.available("advanced_copernicus_manager")
+
+backup_restore_system = subsystems.proxy("backup_restore_system")
+BACKUP_RESTORE_SYSTEM_AVAILABLE = subsystems.available("backup_restore_system")
+
+configuration_manager = subsystems.proxy("configuration_manager")
+CONFIGURATION_MANAGER_AVAILABLE = subsystems.available("configuration_manager")
+
+performance_analytics = subsystems.proxy("performance_analytics")
+PERFORMANCE_ANALYTICS_AVAILABLE = subsystems.available("performance_analytics")
+
+system_health_monitor = subsystems.proxy("system_health_monitor")
+SYSTEM_HEALTH_MONITOR_AVAILABLE = subsystems.available("system_health_monitor")
+
+# Subsistemas usados por cada endpoint carregados fora do event loop antes do handler
+app.add_middleware(
+    SubsystemResolverMiddleware,
+    registry=subsystems,
+    routes=app.router.routes,
+    namespace=globals()
+)
 
-# Importar monitor de saúde do sistema
-try:
-    from .monitoring.system_health_monitor import system_health_monitor
-    SYSTEM_HEALTH_MONITOR_AVAILABLE = True
-except ImportError as e:
-    print(f"System health monitor not available: {e}")
-    SYSTEM_HEALTH_MONITOR_AVAILABLE = False
-    system_health_monitor = None
 from .ml.database_init import initialize_ml_database, MLDatabaseInitializer
 
 @app.on_event("startup")
@@ -7248,7 +7606,7 @@ async def startup_ml_systems():
         logger.error(f"❌ Erro inicializando sistemas de ML: {e}")
 
 # Montar sub-aplicação de ML
-app.mount("/ml", ml_api)
+app.mount("/ml", LazyASGIApp(subsystems, "ml_api"))
 
 @app.get("/ml-dashboard")
 async def get_enhanced_ml_dashboard():
@@ -8044,32 +8402,83 @@ async def get_stac_collection_info(collection_id: str):
 # QGIS INTEGRATION ENDPOINTS
 # ===============================================================================
 
-# Importar módulos QGIS
-try:
-    from .qgis.temporal_visualization import TemporalVisualization, create_biomass_temporal_analysis, create_migration_environmental_analysis
-    from .qgis.spatial_analysis import SpatialAnalysisTools, create_marine_spatial_planning_analysis
-    from .qgis.biomass_calculator import AdvancedBiomassCalculator, BiomassType, create_angola_biomass_assessment
-    from .qgis.migration_overlay import MigrationOverlaySystem, create_migration_fishing_analysis
-    from .qgis.automated_reports import AutomatedReportGenerator, ReportType, create_biomass_assessment_report, create_migration_analysis_report
-    from .qgis.sustainable_zones_mcda import SustainableZonesMCDA, MCDAMethod, create_marine_protected_areas_analysis, create_sustainable_fishing_zones_analysis
-    from .qgis.service_health_monitor import health_monitor, start_health_monitoring, get_health_status, setup_alert_logging
-    QGIS_ENABLED = True
-    
-    # Inicializar componentes QGIS
-    temporal_viz = TemporalVisualization()
-    spatial_tools = SpatialAnalysisTools()
-    biomass_calc = AdvancedBiomassCalculator()
-    migration_system = MigrationOverlaySystem()
-    report_generator = AutomatedReportGenerator()
-    mcda_system = SustainableZonesMCDA()
+# Importar módulos QGIS (sob demanda; os nomes abaixo são proxies para o subsistema "qgis")
+def _load_qgis_subsystem():
+    """Importar módulos QGIS e inicializar os seus componentes"""
+    from types import SimpleNamespace
+    from .qgis import temporal_visualization, spatial_analysis, biomass_calculator
+    from .qgis import migration_overlay, automated_reports, sustainable_zones_mcda
+    from .qgis import service_health_monitor, report_streaming
     
     # Inicializar monitorização de saúde
-    setup_alert_logging()
-    start_health_monitoring()
-    
-except ImportError as e:
-    print(f"QGIS modules not available: {e}")
-    QGIS_ENABLED = False
+    service_health_monitor.setup_alert_logging()
+    service_health_monitor.start_health_monitoring()
+    
+    report_generator = automated_reports.AutomatedReportGenerator()
+    
+    return SimpleNamespace(
+        TemporalVisualization=temporal_visualization.TemporalVisualization,
+        create_biomass_temporal_analysis=temporal_visualization.create_biomass_temporal_analysis,
+        create_migration_environmental_analysis=temporal_visualization.create_migration_environmental_analysis,
+        SpatialAnalysisTools=spatial_analysis.SpatialAnalysisTools,
+        create_marine_spatial_planning_analysis=spatial_analysis.create_marine_spatial_planning_analysis,
+        AdvancedBiomassCalculator=biomass_calculator.AdvancedBiomassCalculator,
+        BiomassType=biomass_calculator.BiomassType,
+        create_angola_biomass_assessment=biomass_calculator.create_angola_biomass_assessment,
+        MigrationOverlaySystem=migration_overlay.MigrationOverlaySystem,
+        create_migration_fishing_analysis=migration_overlay.create_migration_fishing_analysis,
+        AutomatedReportGenerator=automated_reports.AutomatedReportGenerator,
+        ReportType=automated_reports.ReportType,
+        create_biomass_assessment_report=automated_reports.create_biomass_assessment_report,
+        create_migration_analysis_report=automated_reports.create_migration_analysis_report,
+        SustainableZonesMCDA=sustainable_zones_mcda.SustainableZonesMCDA,
+        MCDAMethod=sustainable_zones_mcda.MCDAMethod,
+        create_marine_protected_areas_analysis=sustainable_zones_mcda.create_marine_protected_areas_analysis,
+        create_sustainable_fishing_zones_analysis=sustainable_zones_mcda.create_sustainable_fishing_zones_analysis,
+        health_monitor=service_health_monitor.health_monitor,
+        get_health_status=service_health_monitor.get_health_status,
+        # Inicializar componentes QGIS
+        temporal_viz=temporal_visualization.TemporalVisualization(),
+        spatial_tools=spatial_analysis.SpatialAnalysisTools(),
+        biomass_calc=biomass_calculator.AdvancedBiomassCalculator(),
+        migration_system=migration_overlay.MigrationOverlaySystem(),
+        report_generator=report_generator,
+        report_streamer=report_streaming.StreamingReportBuilder(report_generator, report_streaming.report_jobs),
+        report_jobs=report_streaming.report_jobs,
+        mcda_system=sustainable_zones_mcda.SustainableZonesMCDA(),
+    )
+
+subsystems.register("qgis", _load_qgis_subsystem, label="QGIS modules")
+QGIS_ENABLED = subsystems.available("qgis")
+
+TemporalVisualization = subsystems.proxy("qgis", "TemporalVisualization")
+create_biomass_temporal_analysis = subsystems.proxy("qgis", "create_biomass_temporal_analysis")
+create_migration_environmental_analysis = subsystems.proxy("qgis", "create_migration_environmental_analysis")
+SpatialAnalysisTools = subsystems.proxy("qgis", "SpatialAnalysisTools")
+create_marine_spatial_planning_analysis = subsystems.proxy("qgis", "create_marine_spatial_planning_analysis")
+AdvancedBiomassCalculator = subsystems.proxy("qgis", "AdvancedBiomassCalculator")
+BiomassType = subsystems.proxy("qgis", "BiomassType")
+create_angola_biomass_assessment = subsystems.proxy("qgis", "create_angola_biomass_assessment")
+MigrationOverlaySystem = subsystems.proxy("qgis", "MigrationOverlaySystem")
+create_migration_fishing_analysis = subsystems.proxy("qgis", "create_migration_fishing_analysis")
+AutomatedReportGenerator = subsystems.proxy("qgis", "AutomatedReportGenerator")
+ReportType = subsystems.proxy("qgis", "ReportType")
+create_biomass_assessment_report = subsystems.proxy("qgis", "create_biomass_assessment_report")
+create_migration_analysis_report = subsystems.proxy("qgis", "create_migration_analysis_report")
+SustainableZonesMCDA = subsystems.proxy("qgis", "SustainableZonesMCDA")
+MCDAMethod = subsystems.proxy("qgis", "MCDAMethod")
+create_marine_protected_areas_analysis = subsystems.proxy("qgis", "create_marine_protected_areas_analysis")
+create_sustainable_fishing_zones_analysis = subsystems.proxy("qgis", "create_sustainable_fishing_zones_analysis")
+health_monitor = subsystems.proxy("qgis", "health_monitor")
+get_health_status = subsystems.proxy("qgis", "get_health_status")
+temporal_viz = subsystems.proxy("qgis", "temporal_viz")
+spatial_tools = subsystems.proxy("qgis", "spatial_tools")
+biomass_calc = subsystems.proxy("qgis", "biomass_calc")
+migration_system = subsystems.proxy("qgis", "migration_system")
+report_generator = subsystems.proxy("qgis", "report_generator")
+report_streamer = subsystems.proxy("qgis", "report_streamer")
+report_jobs = subsystems.proxy("qgis", "report_jobs")
+mcda_system = subsystems.proxy("qgis", "mcda_system")
 
 @app.get("/qgis/status")
 async def get_qgis_status():
@@ -8491,6 +8900,24 @@ async def get_migration_fishing_analysis():
 # AUTOMATED REPORTS ENDPOINTS
 # ===============================================================================
 
+def _automated_report_data(report_type_enum, year: Optional[int] = None,
+                           month: Optional[int] = None) -> Dict[str, Any]:
+    """Dados (simulados) para cada tipo de relatório automático"""
+    if report_type_enum == ReportType.BIOMASS_ASSESSMENT:
+        return create_angola_biomass_assessment()
+    if report_type_enum == ReportType.MIGRATION_ANALYSIS:
+        return create_migration_fishing_analysis()
+    if report_type_enum == ReportType.MONTHLY_MONITORING:
+        today = datetime.now()
+        return report_generator.monthly_report_data(month or today.month, year or today.year)
+    return {"message": "Dados simulados para relatório"}
+
+def _report_job_or_404(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job de relatório não encontrado: {job_id}")
+    return job
+
 @app.post("/qgis/reports/generate")
 async def generate_automated_report(
     report_type: str,
@@ -8504,14 +8931,7 @@ async def generate_automated_report(
     try:
         # Mapear string para enum
         report_type_enum = ReportType(report_type)
-        
-        # Gerar dados simulados baseados no tipo
-        if report_type_enum == ReportType.BIOMASS_ASSESSMENT:
-            data = create_angola_biomass_assessment()
-        elif report_type_enum == ReportType.MIGRATION_ANALYSIS:
-            data = create_migration_fishing_analysis()
-        else:
-            data = {"message": "Dados simulados para relatório"}
+        data = _automated_report_data(report_type_enum)
         
         # Definir caminho de saída
         output_path = f"/tmp/reports/{output_filename}"
@@ -8552,6 +8972,92 @@ async def generate_monthly_report(year: int, month: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no relatório mensal: {str(e)}")
 
+@app.get("/qgis/reports/stream/{report_type}")
+async def stream_automated_report(
+    report_type: str,
+    custom_sections: Optional[List[str]] = Query(None),
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    month: Optional[int] = Query(None, ge=1, le=12)
+):
+    """Gerar relatório e enviá-lo em streaming (progresso em /qgis/reports/jobs/{job_id})"""
+    if not QGIS_ENABLED:
+        raise HTTPException(status_code=503, detail="QGIS não disponível")
+    
+    try:
+        report_type_enum = ReportType(report_type)
+        job = report_streamer.create_job(report_type_enum, custom_sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    data = await run_cpu(_automated_report_data, report_type_enum, year, month)
+    filename = f"relatorio_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    
+    # Os cabeçalhos (com o id do job) seguem de imediato; o corpo chega em blocos
+    return StreamingResponse(
+        report_streamer.stream(job, report_type_enum, data),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Report-Job-Id": job.job_id,
+            "Cache-Control": "no-store",
+        }
+    )
+
+@app.post("/qgis/reports/jobs")
+async def start_report_job(
+    report_type: str,
+    custom_sections: Optional[List[str]] = None,
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    month: Optional[int] = Query(None, ge=1, le=12)
+):
+    """Iniciar geração de relatório em segundo plano"""
+    if not QGIS_ENABLED:
+        raise HTTPException(status_code=503, detail="QGIS não disponível")
+    
+    try:
+        report_type_enum = ReportType(report_type)
+        job = report_streamer.create_job(report_type_enum, custom_sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    data = await run_cpu(_automated_report_data, report_type_enum, year, month)
+    report_streamer.start(job, report_type_enum, data)
+    
+    return {
+        "status": "accepted",
+        "job_id": job.job_id,
+        "progress_url": f"/qgis/reports/jobs/{job.job_id}",
+        "download_url": f"/qgis/reports/jobs/{job.job_id}/pdf",
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/qgis/reports/jobs/{job_id}")
+async def get_report_job(job_id: str, since: int = Query(0, ge=0)):
+    """Progresso de um relatório (eventos a partir do número de sequência `since`)"""
+    if not QGIS_ENABLED:
+        raise HTTPException(status_code=503, detail="QGIS não disponível")
+    
+    return _report_job_or_404(job_id).to_dict(since)
+
+@app.get("/qgis/reports/jobs/{job_id}/pdf")
+async def download_report_job(job_id: str):
+    """Descarregar em blocos o PDF de um job concluído"""
+    if not QGIS_ENABLED:
+        raise HTTPException(status_code=503, detail="QGIS não disponível")
+    
+    job = _report_job_or_404(job_id)
+    if job.status != "completed" or not job.output_path:
+        raise HTTPException(status_code=409, detail=f"Relatório indisponível (estado: {job.status})")
+    
+    return StreamingResponse(
+        report_streamer.iter_pdf(job),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="relatorio_{job.report_type}_{job.job_id[:8]}.pdf"',
+            "Content-Length": str(job.size_bytes),
+        }
+    )
+
 # ===============================================================================
 # MCDA SUSTAINABLE ZONES ENDPOINTS
 # ===============================================================================
@@ -8930,6 +9436,8 @@ async def shutdown_event():
     
     logger.info("BGAPP Admin API shutdown completed")
 
+subsystems.boot_seconds = time.perf_counter() - BOOT_STARTED
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -21,10 +21,11 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
-import uuid
 import base64
 from io import BytesIO
-from collections import deque
+
+from ..core.metrics_store import MetricsStore
+from ..core.executors import run_io
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -108,12 +109,11 @@ class PerformanceAnalytics:
             'catch_data_completeness': {'threshold_warning': 90, 'threshold_critical': 80, 'unit': '%', 'inverted': True}
         }
         
-        # Armazenamento de métricas (circular buffer)
+        # Armazenamento de métricas (buffers circulares NumPy)
         self.metrics_buffer_size = 1440  # 24 horas de dados (1 por minuto)
-        self.metrics_buffers = {
-            metric_name: deque(maxlen=self.metrics_buffer_size)
-            for metric_name in self.metrics_config.keys()
-        }
+        self.metrics_store = MetricsStore(capacity=self.metrics_buffer_size)
+        for metric_name in self.metrics_config.keys():
+            self.metrics_store.series(metric_name, create=True)
         
         # Alertas ativos
         self.active_alerts = {}
@@ -206,8 +206,8 @@ class PerformanceAnalytics:
         """Coletar métricas do sistema"""
         
         try:
-            # CPU
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # CPU (cpu_percent(interval=1) dorme 1s - fora do event loop)
+            cpu_usage = await run_io(psutil.cpu_percent, interval=1)
             self._add_metric('cpu_usage', cpu_usage, timestamp)
             
             # Memória
@@ -298,20 +298,35 @@ class PerformanceAnalytics:
     def _add_metric(self, metric_name: str, value: float, timestamp: datetime):
         """Adicionar métrica ao buffer"""
         
-        if metric_name in self.metrics_buffers:
-            metric = PerformanceMetric(
-                metric_id=str(uuid.uuid4()),
-                name=metric_name,
-                metric_type=self._get_metric_type(metric_name),
-                value=value,
-                unit=self.metrics_config[metric_name]['unit'],
-                timestamp=timestamp,
-                metadata={},
-                threshold_warning=self.metrics_config[metric_name].get('threshold_warning'),
-                threshold_critical=self.metrics_config[metric_name].get('threshold_critical')
-            )
-            
-            self.metrics_buffers[metric_name].append(metric)
+        if metric_name in self.metrics_store:
+            self.metrics_store.append(metric_name, value, timestamp.timestamp())
+    
+    def _latest_metric(self, metric_name: str) -> Optional[PerformanceMetric]:
+        """Materializar a última amostra de uma métrica"""
+        
+        latest = self.metrics_store.latest(metric_name)
+        if latest is None:
+            return None
+        
+        ts, value = latest
+        config = self.metrics_config[metric_name]
+        return PerformanceMetric(
+            metric_id=f"{metric_name}_{int(ts * 1000)}",
+            name=metric_name,
+            metric_type=self._get_metric_type(metric_name),
+            value=value,
+            unit=config['unit'],
+            timestamp=datetime.fromtimestamp(ts),
+            metadata={},
+            threshold_warning=config.get('threshold_warning'),
+            threshold_critical=config.get('threshold_critical')
+        )
+    
+    def get_metric_history(self, metric_name: str, resolution: str = '1m',
+                           seconds: int = 86400) -> List[Dict[str, Any]]:
+        """Obter histórico agregado de uma métrica (1s, 1m ou 1h)"""
+        
+        return self.metrics_store.rollup(metric_name, resolution, seconds)
     
     def _get_metric_type(self, metric_name: str) -> MetricType:
         """Determinar tipo da métrica"""
@@ -332,11 +347,11 @@ class PerformanceAnalytics:
     async def _check_performance_alerts(self, timestamp: datetime):
         """Verificar alertas de performance"""
         
-        for metric_name, buffer in self.metrics_buffers.items():
-            if not buffer:
+        for metric_name in self.metrics_config:
+            latest_metric = self._latest_metric(metric_name)
+            if latest_metric is None:
                 continue
             
-            latest_metric = buffer[-1]
             config = self.metrics_config[metric_name]
             
             # Verificar thresholds
@@ -544,8 +559,8 @@ class PerformanceAnalytics:
         # Métricas do sistema
         system_metrics = ['cpu_usage', 'memory_usage', 'disk_usage']
         for metric_name in system_metrics:
-            if metric_name in self.metrics_buffers and self.metrics_buffers[metric_name]:
-                latest_metric = self.metrics_buffers[metric_name][-1]
+            latest_metric = self._latest_metric(metric_name)
+            if latest_metric is not None:
                 
                 # Determinar cor baseada nos thresholds
                 value_class = self._get_value_class(latest_metric)
@@ -563,8 +578,8 @@ class PerformanceAnalytics:
         # Métricas específicas de Angola
         angola_metrics = ['copernicus_download_speed', 'data_quality_score', 'vessel_tracking_accuracy']
         for metric_name in angola_metrics:
-            if metric_name in self.metrics_buffers and self.metrics_buffers[metric_name]:
-                latest_metric = self.metrics_buffers[metric_name][-1]
+            latest_metric = self._latest_metric(metric_name)
+            if latest_metric is not None:
                 value_class = self._get_value_class(latest_metric)
                 trend_class, trend_icon = self._get_trend_info(metric_name)
                 
@@ -662,7 +677,7 @@ class PerformanceAnalytics:
             <div style="margin-top: 30px; text-align: center; color: #666; background: white; padding: 20px; border-radius: 10px;">
                 <p><em>Analytics de performance atualizados em tempo real</em></p>
                 <p><strong>MARÍTIMO ANGOLA</strong> - Monitorização Avançada BGAPP</p>
-                <p>Métricas coletadas: {sum(len(buffer) for buffer in self.metrics_buffers.values())} pontos de dados</p>
+                <p>Métricas coletadas: {self.metrics_store.total_samples()} pontos de dados</p>
                 <p>Última atualização: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
             </div>
             
@@ -756,19 +771,22 @@ class PerformanceAnalytics:
         efficiency_factors = []
         
         # CPU efficiency (inverso do uso)
-        if 'cpu_usage' in self.metrics_buffers and self.metrics_buffers['cpu_usage']:
-            avg_cpu = np.mean([m.value for m in list(self.metrics_buffers['cpu_usage'])[-10:]])
+        recent_values = self.metrics_store.last('cpu_usage', 10)
+        if len(recent_values):
+            avg_cpu = float(np.mean(recent_values))
             efficiency_factors.append(max(0, 100 - avg_cpu))
         
         # API efficiency
-        if 'api_response_time' in self.metrics_buffers and self.metrics_buffers['api_response_time']:
-            avg_response = np.mean([m.value for m in list(self.metrics_buffers['api_response_time'])[-10:]])
+        recent_values = self.metrics_store.last('api_response_time', 10)
+        if len(recent_values):
+            avg_response = float(np.mean(recent_values))
             api_efficiency = max(0, 100 - (avg_response / 10))  # Normalizar
             efficiency_factors.append(api_efficiency)
         
         # Data quality efficiency
-        if 'data_quality_score' in self.metrics_buffers and self.metrics_buffers['data_quality_score']:
-            avg_quality = np.mean([m.value for m in list(self.metrics_buffers['data_quality_score'])[-10:]])
+        recent_values = self.metrics_store.last('data_quality_score', 10)
+        if len(recent_values):
+            avg_quality = float(np.mean(recent_values))
             efficiency_factors.append(avg_quality)
         
         overall_efficiency = np.mean(efficiency_factors) if efficiency_factors else 100.0
@@ -805,11 +823,10 @@ class PerformanceAnalytics:
     def _get_trend_info(self, metric_name: str) -> Tuple[str, str]:
         """Obter informação de tendência"""
         
-        if metric_name not in self.metrics_buffers or len(self.metrics_buffers[metric_name]) < 10:
-            return 'trend-stable', '➡️'
-        
         # Calcular tendência dos últimos 10 pontos
-        recent_values = [m.value for m in list(self.metrics_buffers[metric_name])[-10:]]
+        recent_values = self.metrics_store.last(metric_name, 10).astype(np.float64)
+        if len(recent_values) < 10:
+            return 'trend-stable', '➡️'
         
         # Regressão linear simples
         x = np.arange(len(recent_values))
@@ -837,13 +854,13 @@ class PerformanceAnalytics:
             }
         
         # Processar métricas
-        for metric_name, buffer in self.metrics_buffers.items():
-            if buffer:
-                latest_metric = buffer[-1]
+        for metric_name in self.metrics_config:
+            latest = self.metrics_store.latest(metric_name)
+            if latest is not None:
                 metric_type = self._get_metric_type(metric_name).value
                 
                 metrics_by_type[metric_type]['count'] += 1
-                metrics_by_type[metric_type]['avg_value'] += latest_metric.value
+                metrics_by_type[metric_type]['avg_value'] += latest[1]
         
         # Calcular médias
         for metric_type_data in metrics_by_type.values():
@@ -858,7 +875,7 @@ class PerformanceAnalytics:
         
         return {
             'collection_active': self.collection_active,
-            'total_metrics_collected': sum(len(buffer) for buffer in self.metrics_buffers.values()),
+            'total_metrics_collected': self.metrics_store.total_samples(),
             'active_alerts': len(self.active_alerts),
             'metrics_by_type': metrics_by_type,
             'angola_specific_metrics': self.angola_specific_metrics,
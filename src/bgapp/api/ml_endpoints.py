@@ -7,7 +7,7 @@ API robusta com validação, rate limiting e segurança
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
 
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Path, Body, Request
@@ -159,9 +159,27 @@ async def get_ingestion_manager(db_settings: DatabaseSettings = Depends(get_db_s
     """Obtém manager de ingestão"""
     return await initialize_auto_ingestion(db_settings)
 
+# Manager de filtros partilhado pelo processo (pool asyncpg e cache de tiles)
+_filter_manager: Optional[PredictiveFilterManager] = None
+
 async def get_filter_manager(db_settings: DatabaseSettings = Depends(get_db_settings)) -> PredictiveFilterManager:
     """Obtém manager de filtros"""
-    return await initialize_predictive_filters(db_settings)
+    global _filter_manager
+    if _filter_manager is None:
+        _filter_manager = await initialize_predictive_filters(db_settings)
+    return _filter_manager
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Converte 'min_lon,min_lat,max_lon,max_lat' numa bbox validada"""
+    if not bbox:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox deve ser 'min_lon,min_lat,max_lon,max_lat'")
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox fora dos limites geográficos")
+    return min_lon, min_lat, max_lon, max_lat
 
 async def get_ml_manager() -> MLModelManager:
     """Obtém manager de ML"""
@@ -512,12 +530,14 @@ def create_ml_api() -> FastAPI:
     async def get_filter_data(
         request: Request,
         filter_id: str = Path(..., min_length=3, max_length=100),
+        bbox: Optional[str] = Query(None, description="Área visível: min_lon,min_lat,max_lon,max_lat"),
         user=Depends(verify_api_token),
         filter_manager: PredictiveFilterManager = Depends(get_filter_manager)
     ):
         """Obtém dados do filtro para o mapa"""
+        area = parse_bbox(bbox)
         try:
-            data = await filter_manager.get_filter_data_for_map(filter_id)
+            data = await filter_manager.get_filter_data_for_map(filter_id, bbox=area)
             return data
             
         except ValueError as e:
@@ -28,6 +28,9 @@ celery_app.conf.update(
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
+    # Compressão das mensagens e resultados (lotes agregados podem ser grandes)
+    task_compression=os.getenv('CELERY_TASK_COMPRESSION', 'gzip') or None,
+    result_compression=os.getenv('CELERY_RESULT_COMPRESSION', 'gzip') or None,
     timezone='UTC',
     enable_utc=True,
     
@@ -13,8 +13,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
-from celery import current_task
+from celery import chord, current_task, group
 from celery.exceptions import Retry
+from celery.result import allow_join_result
 from .celery_app import celery_app
 
 # Importar módulos BGAPP
@@ -92,7 +93,7 @@ def process_oceanographic_data(self, data_source: str, parameters: Dict[str, Any
             'processing_time': processing_time,
             'quality_score': quality_score,
             'statistics': statistics,
-            'records_processed': len(processed_data) if processed_data else 0
+            'records_processed': len(processed_data) if processed_data is not None else 0
         }
         
     except Exception as e:
@@ -303,131 +304,133 @@ def cleanup_old_files():
         return {'status': 'failed', 'error': str(e)}
 
 # Tarefas em lote (batch)
-@celery_app.task
-def process_oceanographic_data_batch():
-    """Processar dados oceanográficos em lote"""
-    try:
-        print("🌊 Processamento em lote de dados oceanográficos...")
-        
-        # Fontes de dados para processar
-        data_sources = [
-            {'source': 'copernicus', 'params': {'parameter': 'temperature', 'depth': 'surface'}},
-            {'source': 'copernicus', 'params': {'parameter': 'salinity', 'depth': 'surface'}},
-            {'source': 'local', 'params': {'region': 'cabinda', 'parameter': 'oxygen'}}
-        ]
-        
-        # Processar em paralelo
-        jobs = []
-        for source_config in data_sources:
-            job = process_oceanographic_data.delay(
-                source_config['source'], 
-                source_config['params']
-            )
-            jobs.append(job)
-        
-        # Aguardar conclusão usando AsyncResult
-        from celery.result import allow_join_result
+#
+# Os lotes são chords: o grupo de subtarefas corre em paralelo e um callback
+# agrega os resultados. A tarefa de lote é substituída (``self.replace``) pelo
+# chord, pelo que nenhum worker fica bloqueado à espera de outra tarefa e o
+# resultado final do lote continua disponível no id original.
+
+DEFAULT_OCEANOGRAPHIC_SOURCES = [
+    {'source': 'copernicus', 'params': {'parameter': 'temperature', 'depth': 'surface'}},
+    {'source': 'copernicus', 'params': {'parameter': 'salinity', 'depth': 'surface'}},
+    {'source': 'local', 'params': {'region': 'cabinda', 'parameter': 'oxygen'}}
+]
+
+DEFAULT_ML_MODELS = [
+    {'type': 'temperature', 'horizon': 7},
+    {'type': 'biodiversity', 'horizon': 14},
+    {'type': 'salinity', 'horizon': 7}
+]
+
+DEFAULT_ML_INPUT = {
+    'temperature': [22.5, 23.1, 24.0, 23.8, 22.9],
+    'salinity': [35.2, 35.4, 35.1, 35.3, 35.0],
+    'coordinates': [[-5.5, 12.5], [-5.6, 12.6]]
+}
+
+DAILY_REPORT_TYPES = ['biodiversity', 'oceanographic', 'fisheries']
+
+
+def _replace_with_chord(task, header: group, callback):
+    """Substituir a tarefa de lote pelo chord ``header`` -> ``callback``"""
+    workflow = chord(header, callback)
+    if task.request.is_eager:
+        # Em modo eager não há pool de workers: o chord corre de imediato
         with allow_join_result():
-            results = [job.get(timeout=300) for job in jobs]  # 5 min timeout
-        
-        successful = len([r for r in results if r.get('status') == 'completed'])
-        
-        print(f"✅ Processamento em lote concluído: {successful}/{len(results)} jobs bem-sucedidos")
-        
-        return {
-            'status': 'completed',
-            'total_jobs': len(results),
-            'successful_jobs': successful,
-            'results': results
-        }
-        
-    except Exception as e:
-        print(f"❌ Erro no processamento em lote: {e}")
-        return {'status': 'failed', 'error': str(e)}
+            return workflow.apply().get()
+    return task.replace(workflow)
+
+
+def _count_successful(results: List[Dict[str, Any]]) -> int:
+    """Contar subtarefas concluídas com sucesso"""
+    return len([r for r in results if isinstance(r, dict) and r.get('status') == 'completed'])
+
 
 @celery_app.task
-def generate_ml_predictions_batch():
-    """Gerar previsões ML em lote"""
-    try:
-        print("🧠 Geração em lote de previsões ML...")
-        
-        # Modelos para executar
-        models = [
-            {'type': 'temperature', 'horizon': 7},
-            {'type': 'biodiversity', 'horizon': 14},
-            {'type': 'salinity', 'horizon': 7}
-        ]
-        
-        # Dados de entrada simulados
-        input_data = {
-            'temperature': [22.5, 23.1, 24.0, 23.8, 22.9],
-            'salinity': [35.2, 35.4, 35.1, 35.3, 35.0],
-            'coordinates': [[-5.5, 12.5], [-5.6, 12.6]]
-        }
-        
-        jobs = []
-        for model_config in models:
-            job = generate_ml_predictions.delay(
-                model_config['type'],
-                input_data,
-                model_config['horizon']
-            )
-            jobs.append(job)
-        
-        # Aguardar conclusão usando AsyncResult
-        from celery.result import allow_join_result
-        with allow_join_result():
-            results = [job.get(timeout=600) for job in jobs]  # 10 min timeout
-        
-        successful = len([r for r in results if r.get('status') == 'completed'])
-        
-        print(f"✅ Previsões ML em lote concluídas: {successful}/{len(results)} modelos")
-        
-        return {
-            'status': 'completed',
-            'total_models': len(results),
-            'successful_predictions': successful,
-            'results': results
-        }
-        
-    except Exception as e:
-        print(f"❌ Erro nas previsões ML em lote: {e}")
-        return {'status': 'failed', 'error': str(e)}
+def aggregate_oceanographic_batch(results: List[Dict[str, Any]]):
+    """Agregar resultados do lote oceanográfico (callback do chord)"""
+    successful = _count_successful(results)
+    print(f"✅ Processamento em lote concluído: {successful}/{len(results)} jobs bem-sucedidos")
+    
+    return {
+        'status': 'completed',
+        'total_jobs': len(results),
+        'successful_jobs': successful,
+        'results': results
+    }
+
+
+@celery_app.task
+def aggregate_ml_predictions_batch(results: List[Dict[str, Any]]):
+    """Agregar previsões ML do lote (callback do chord)"""
+    successful = _count_successful(results)
+    print(f"✅ Previsões ML em lote concluídas: {successful}/{len(results)} modelos")
+    
+    return {
+        'status': 'completed',
+        'total_models': len(results),
+        'successful_predictions': successful,
+        'results': results
+    }
+
 
 @celery_app.task
-def generate_daily_reports():
+def aggregate_daily_reports(results: List[Dict[str, Any]]):
+    """Agregar relatórios diários (callback do chord)"""
+    successful = _count_successful(results)
+    print(f"✅ Relatórios diários gerados: {successful}/{len(results)}")
+    
+    return {
+        'status': 'completed',
+        'reports_generated': successful,
+        'results': results
+    }
+
+
+@celery_app.task(bind=True)
+def process_oceanographic_data_batch(self, data_sources: Optional[List[Dict[str, Any]]] = None):
+    """Processar dados oceanográficos em lote"""
+    print("🌊 Processamento em lote de dados oceanográficos...")
+    
+    # Fontes de dados para processar
+    data_sources = data_sources or DEFAULT_OCEANOGRAPHIC_SOURCES
+    
+    header = group(
+        process_oceanographic_data.s(source_config['source'], source_config['params'])
+        for source_config in data_sources
+    )
+    return _replace_with_chord(self, header, aggregate_oceanographic_batch.s())
+
+
+@celery_app.task(bind=True)
+def generate_ml_predictions_batch(self,
+                                  models: Optional[List[Dict[str, Any]]] = None,
+                                  input_data: Optional[Dict[str, Any]] = None):
+    """Gerar previsões ML em lote"""
+    print("🧠 Geração em lote de previsões ML...")
+    
+    # Modelos para executar e dados de entrada
+    models = models or DEFAULT_ML_MODELS
+    input_data = input_data or DEFAULT_ML_INPUT
+    
+    header = group(
+        generate_ml_predictions.s(model_config['type'], input_data, model_config['horizon'])
+        for model_config in models
+    )
+    return _replace_with_chord(self, header, aggregate_ml_predictions_batch.s())
+
+
+@celery_app.task(bind=True)
+def generate_daily_reports(self):
     """Gerar relatórios diários"""
-    try:
-        print("📊 Gerando relatórios diários...")
-        
-        reports = ['biodiversity', 'oceanographic', 'fisheries']
-        
-        jobs = []
-        for report_type in reports:
-            job = generate_reports.delay(report_type, {
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'region': 'all'
-            })
-            jobs.append(job)
-        
-        # Aguardar conclusão usando AsyncResult
-        from celery.result import allow_join_result
-        with allow_join_result():
-            results = [job.get(timeout=300) for job in jobs]
-        
-        successful = len([r for r in results if r.get('status') == 'completed'])
-        
-        print(f"✅ Relatórios diários gerados: {successful}/{len(results)}")
-        
-        return {
-            'status': 'completed',
-            'reports_generated': successful,
-            'results': results
-        }
-        
-    except Exception as e:
-        print(f"❌ Erro gerando relatórios diários: {e}")
-        return {'status': 'failed', 'error': str(e)}
+    print("📊 Gerando relatórios diários...")
+    
+    parameters = {
+        'date': datetime.now().strftime('%Y-%m-%d'),
+        'region': 'all'
+    }
+    header = group(generate_reports.s(report_type, parameters) for report_type in DAILY_REPORT_TYPES)
+    return _replace_with_chord(self, header, aggregate_daily_reports.s())
 
 # Funções auxiliares (simuladas para demonstração)
 def _load_copernicus_data(parameters):
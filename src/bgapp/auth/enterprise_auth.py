@@ -6,12 +6,14 @@ OAuth2, MFA, SSO e conformidade GDPR/LOPD
 
 import os
 import json
+import time
+import asyncio
 import secrets
 import hashlib
 import pyotp
 import qrcode
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 from io import BytesIO
@@ -24,6 +26,14 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 import redis.asyncio as redis
 
+from .token_cache import CachedToken, TokenBloomFilter, TokenVerificationCache, hash_token
+
+# Canais pub/sub para replicar a blacklist e invalidações de utilizador entre instâncias
+BLACKLIST_CHANNEL = "auth:blacklist"
+USER_INVALIDATION_CHANNEL = "auth:user_invalidate"
+# Espera máxima entre tentativas de voltar a subscrever (backoff exponencial)
+BLACKLIST_RECONNECT_MAX_SECONDS = 30.0
+
 class UserRole(str, Enum):
     """Roles de utilizador"""
     ADMIN = "admin"
@@ -128,6 +138,13 @@ class EnterpriseAuth:
         self.redis_host = redis_host
         self.redis_port = redis_port
         self.redis = None
+        self._blacklist_task: Optional[asyncio.Task] = None
+        
+        # Cache de verificação (hash do token -> claims + permissões) e
+        # réplica local da blacklist; o Redis só é consultado em positivos do filtro
+        self.token_cache = TokenVerificationCache(max_entries=10000)
+        self.blacklist_filter = TokenBloomFilter(capacity=100000)
+        self._revoked_tokens: Dict[str, float] = {}  # hash -> exp (confirmação sem Redis)
         
         # In-memory storage (em produção seria base de dados)
         self.users: Dict[str, User] = {}
@@ -187,6 +204,10 @@ class EnterpriseAuth:
             self.redis = redis.Redis(connection_pool=self.redis_pool)
             await self.redis.ping()
             
+            # Replicar blacklist localmente e subscrever atualizações
+            await self._load_blacklist()
+            self._blacklist_task = asyncio.create_task(self._listen_blacklist())
+            
             print("✅ Sistema de autenticação enterprise inicializado")
             
             # Create default admin user if not exists
@@ -528,15 +549,25 @@ class EnterpriseAuth:
     
     async def verify_token(self, token: str) -> User:
         """Verificar e decodificar token"""
+        user, _ = await self.verify_token_cached(token)
+        return user
+    
+    async def verify_token_cached(self, token: str) -> Tuple[User, CachedToken]:
+        """Verificar token usando a cache (assinatura verificada uma vez por token)"""
         try:
-            # Check if token is blacklisted
-            if self.redis:
-                blacklisted = await self.redis.get(f"blacklist:{token}")
-                if blacklisted:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Token invalidado"
-                    )
+            token_hash = hash_token(token)
+            
+            # Check if token is blacklisted (filtro local; Redis só confirma positivos)
+            if token_hash in self.blacklist_filter and await self._is_blacklisted(token_hash):
+                self.token_cache.invalidate(token_hash)
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token invalidado"
+                )
+            
+            cached = self.token_cache.get(token_hash)
+            if cached is not None:
+                return self._get_active_user(cached.user_id), cached
             
             # Decode token
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
@@ -548,39 +579,45 @@ class EnterpriseAuth:
                     detail="Token inválido"
                 )
             
-            user = self.users.get(user_id)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Utilizador não encontrado"
-                )
-            
-            if not user.is_active:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Conta desativada"
-                )
-            
-            return user
+            user = self._get_active_user(user_id)
+            entry = self.token_cache.put(token_hash, user_id, payload, user.permissions)
+            return user, entry
             
+        except HTTPException:
+            raise
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token expirado"
             )
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
             )
-        except HTTPException:
-            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Erro verificando token: {str(e)}"
             )
     
+    def _get_active_user(self, user_id: str) -> User:
+        """Obter utilizador ativo (verificado sempre, mesmo com token em cache)"""
+        user = self.users.get(user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Utilizador não encontrado"
+            )
+        
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Conta desativada"
+            )
+        
+        return user
+    
     async def logout(self, token: str) -> Dict[str, Any]:
         """Fazer logout e invalidar token"""
         try:
@@ -589,14 +626,20 @@ class EnterpriseAuth:
                 # Get token expiration
                 payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"verify_exp": False})
                 exp = payload.get("exp", 0)
-                ttl = max(0, exp - int(datetime.now().timestamp()))
+                ttl = max(1, exp - int(datetime.now().timestamp()))
+                token_hash = hash_token(token)
                 
-                await self.redis.set(f"blacklist:{token}", "1", ex=ttl)
+                await self.redis.set(f"blacklist:{token_hash}", "1", ex=ttl)
+                await self.redis.publish(BLACKLIST_CHANNEL, token_hash)
+                self._mark_revoked(token_hash, exp)
                 
                 # Remove session
                 user_id = payload.get("sub")
                 if user_id:
                     await self.redis.delete(f"session:{user_id}")
+            else:
+                payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"verify_exp": False})
+                self._mark_revoked(hash_token(token), payload.get("exp", 0))
             
             return {
                 "success": True,
@@ -611,6 +654,95 @@ class EnterpriseAuth:
                 "warning": str(e)
             }
     
+    def _mark_revoked(self, token_hash: str, exp: float = 0):
+        """Registar token revogado na réplica local e remover da cache"""
+        if self.blacklist_filter.is_saturated:
+            self._rebuild_blacklist_filter()
+        self.blacklist_filter.add(token_hash)
+        self._revoked_tokens[token_hash] = exp or time.time() + self.access_token_expire.total_seconds()
+        self.token_cache.invalidate(token_hash)
+    
+    def _rebuild_blacklist_filter(self):
+        """Reconstruir o filtro só com revogações ainda não expiradas"""
+        now = time.time()
+        self._revoked_tokens = {h: exp for h, exp in self._revoked_tokens.items() if exp > now}
+        self.blacklist_filter.clear()
+        for token_hash in self._revoked_tokens:
+            self.blacklist_filter.add(token_hash)
+    
+    async def _is_blacklisted(self, token_hash: str) -> bool:
+        """Confirmar positivo do filtro de Bloom (pode ser falso positivo)"""
+        if self.redis:
+            return bool(await self.redis.exists(f"blacklist:{token_hash}"))
+        return self._revoked_tokens.get(token_hash, 0) > time.time()
+    
+    async def _load_blacklist(self):
+        """Carregar blacklist existente do Redis para o filtro local"""
+        async for key in self.redis.scan_iter(match="blacklist:*", count=1000):
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            suffix = key.split(":", 1)[1]
+            # Entradas antigas guardavam o token em claro
+            token_hash = suffix if len(suffix) == 64 and "." not in suffix else hash_token(suffix)
+            ttl = await self.redis.ttl(key)
+            self._mark_revoked(token_hash, time.time() + max(ttl, 1))
+    
+    async def _listen_blacklist(self):
+        """
+        Receber revogações de outras instâncias via Redis pub/sub
+        Se a ligação cair, volta a subscrever com backoff exponencial e
+        ressincroniza a blacklist (mensagens publicadas entretanto perdem-se)
+        """
+        delay = 1.0
+        reconnecting = False
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(BLACKLIST_CHANNEL, USER_INVALIDATION_CHANNEL)
+                if reconnecting:
+                    await self._load_blacklist()
+                    # Invalidações de utilizador perdidas: voltar a verificar todos os tokens
+                    self.token_cache.clear()
+                    print("✅ Subscrição da blacklist restabelecida")
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    channel, data = message["channel"], message["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    if isinstance(data, bytes):
+                        data = data.decode('utf-8')
+                    if channel == USER_INVALIDATION_CHANNEL:
+                        self.token_cache.invalidate_user(data)
+                    else:
+                        self._mark_revoked(data)
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                print(f"⚠️ Subscrição da blacklist interrompida: {e} (nova tentativa em {delay:.0f}s)")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            
+            reconnecting = True
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                return
+            delay = min(delay * 2, BLACKLIST_RECONNECT_MAX_SECONDS)
+    
+    async def invalidate_user_tokens(self, user_id: str):
+        """Descartar verificações em cache de um utilizador em todas as instâncias (ex.: mudança de role)"""
+        self.token_cache.invalidate_user(user_id)
+        if self.redis:
+            try:
+                await self.redis.publish(USER_INVALIDATION_CHANNEL, user_id)
+            except Exception as e:
+                print(f"⚠️ Não foi possível propagar a invalidação de {user_id}: {e}")
+    
     async def get_user_permissions(self, user_id: str) -> List[str]:
         """Obter permissões do utilizador"""
         user = self.users.get(user_id)
@@ -752,6 +884,8 @@ class EnterpriseAuth:
             "users_by_provider": users_by_provider,
             "gdpr_compliant": True,
             "oauth_providers": list(self.oauth_providers.keys()),
+            "token_cache": self.token_cache.get_stats(),
+            "blacklisted_tokens": len(self._revoked_tokens),
             "features": {
                 "mfa": True,
                 "sso": True,
@@ -774,8 +908,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 async def require_permission(permission: str):
     """Dependency para verificar permissão específica"""
-    def check_permission(current_user: User = Depends(get_current_user)):
-        if not any(perm == permission or perm == "admin:all" for perm in current_user.permissions):
+    async def check_permission(credentials: HTTPAuthorizationCredentials = Depends(security)):
+        # Permissões resolvidas ficam na cache do token: verificação por lookup em set
+        current_user, entry = await enterprise_auth.verify_token_cached(credentials.credentials)
+        if permission not in entry.permissions and "admin:all" not in entry.permissions:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permissão necessária: {permission}"
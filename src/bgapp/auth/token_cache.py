@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cache de verificação de tokens JWT para BGAPP
+Claims decodificados e permissões resolvidas por hash do token até à expiração,
+e filtro de Bloom local da blacklist para evitar round-trips ao Redis
+"""
+
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+
+def hash_token(token: str) -> str:
+    """Hash SHA-256 do token (nunca guardar o token em claro)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenBloomFilter:
+    """Filtro de Bloom de hashes de tokens (sem falsos negativos)"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, token_hash: str):
+        # Double hashing (Kirsch-Mitzenmacher) sobre o próprio SHA-256
+        h1 = int(token_hash[:16], 16)
+        h2 = int(token_hash[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, token_hash: str):
+        for pos in self._positions(token_hash):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, token_hash: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(token_hash))
+
+    @property
+    def is_saturated(self) -> bool:
+        """Acima da capacidade a taxa de falsos positivos degrada - reconstruir"""
+        return self.count >= self.capacity
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+@dataclass
+class CachedToken:
+    """Resultado de uma verificação bem sucedida"""
+    user_id: str
+    claims: Dict[str, Any]
+    permissions: FrozenSet[str]
+    expires_at: float
+
+
+class TokenVerificationCache:
+    """Cache limitado de tokens verificados, indexado pelo hash do token"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedToken] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token_hash: str) -> Optional[CachedToken]:
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.time():
+            self._entries.pop(token_hash, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, token_hash: str, user_id: str, claims: Dict[str, Any],
+            permissions: Iterable[str]) -> CachedToken:
+        entry = CachedToken(
+            user_id=user_id,
+            claims=claims,
+            permissions=frozenset(permissions),
+            expires_at=float(claims.get("exp", 0)),
+        )
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[token_hash] = entry
+        return entry
+
+    def _evict(self):
+        """Remover expirados; se não chegar, os mais antigos (ordem de inserção)"""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            del self._entries[key]
+        overflow = len(self._entries) - self.max_entries + 1
+        for key in list(self._entries)[:max(0, overflow)]:
+            del self._entries[key]
+
+    def invalidate(self, token_hash: str):
+        self._entries.pop(token_hash, None)
+
+    def invalidate_user(self, user_id: str):
+        """Descartar todos os tokens de um utilizador (ex.: mudança de role)"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.user_id == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
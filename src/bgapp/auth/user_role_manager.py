@@ -818,6 +818,9 @@ class UserRoleManager:
         self.user_metrics['users_by_role'][old_role.value] -= 1
         self.user_metrics['users_by_role'][new_role.value] += 1
         
+        # Tokens já verificados guardam as permissões antigas
+        await self._invalidate_cached_tokens(user_id)
+        
         logger.info(f"🔄 Perfil atualizado: {user.username} {old_role.value} → {new_role.value}")
         
         return True
@@ -854,9 +857,19 @@ class UserRoleManager:
         
         self.user_metrics['active_users'] -= 1
         
+        await self._invalidate_cached_tokens(user_id)
+        
         logger.info(f"❌ Utilizador desativado: {user.username}")
         
         return True
+    
+    async def _invalidate_cached_tokens(self, user_id: str):
+        """Descartar as verificações de token em cache do utilizador (autenticação enterprise)"""
+        try:
+            from .enterprise_auth import enterprise_auth
+        except ImportError:
+            return
+        await enterprise_auth.invalidate_user_tokens(user_id)
 
 
 # Instância global do gestor de utilizadores
@@ -20,6 +20,8 @@ import psutil
 import boto3
 from pydantic import BaseModel
 
+from ..core.executors import run_cpu, run_io, run_subprocess
+
 class BackupType(str, Enum):
     """Tipos de backup"""
     FULL = "full"
@@ -118,12 +120,8 @@ class BackupManager:
                 # Para incremental, usar WAL shipping (simplificado aqui)
                 cmd.extend(["--format=custom"])
                 
-            # Executar backup
-            with open(backup_file, 'w') as f:
-                result = subprocess.run(
-                    cmd, stdout=f, stderr=subprocess.PIPE, 
-                    text=True, timeout=3600  # 1 hora timeout
-                )
+            # Executar backup (1 hora timeout) no pool de subprocessos
+            result = await run_subprocess(self._run_command, cmd, stdout_path=backup_file)
                 
             if result.returncode == 0:
                 # Comprimir se configurado
@@ -176,12 +174,8 @@ class BackupManager:
             job.status = BackupStatus.RUNNING
             print(f"📁 Iniciando backup de arquivos...")
             
-            # Criar arquivo tar comprimido
-            with tarfile.open(backup_file, "w:gz") as tar:
-                for source_path in source_paths:
-                    if os.path.exists(source_path):
-                        tar.add(source_path, arcname=os.path.basename(source_path))
-                        print(f"  ✓ Adicionado: {source_path}")
+            # Criar arquivo tar comprimido (CPU - fora do event loop)
+            await run_cpu(self._write_tar, backup_file, source_paths)
                         
             # Calcular tamanho
             job.size_mb = backup_file.stat().st_size / (1024 * 1024)
@@ -225,11 +219,10 @@ class BackupManager:
             print(f"🪣 Iniciando backup do MinIO...")
             
             # Copiar dados do volume Docker MinIO
-            minio_volume_path = self._get_docker_volume_path("infra_minio-data")
+            minio_volume_path = await run_subprocess(self._get_docker_volume_path, "infra_minio-data")
             
             if minio_volume_path and os.path.exists(minio_volume_path):
-                with tarfile.open(backup_file, "w:gz") as tar:
-                    tar.add(minio_volume_path, arcname="minio-data")
+                await run_cpu(self._write_tar, backup_file, [minio_volume_path], arcname="minio-data")
                     
                 job.size_mb = backup_file.stat().st_size / (1024 * 1024)
                 
@@ -310,11 +303,7 @@ class BackupManager:
                 "psql", "-U", "postgres", "-d", "geo"
             ]
             
-            with open(backup_file, 'r') as f:
-                result = subprocess.run(
-                    cmd, stdin=f, stderr=subprocess.PIPE,
-                    text=True, timeout=3600
-                )
+            result = await run_subprocess(self._run_command, cmd, stdin_path=Path(backup_file))
                 
             if result.returncode == 0:
                 print("✅ Base de dados restaurada com sucesso!")
@@ -345,6 +334,30 @@ class BackupManager:
                     
         print(f"🧹 Limpeza de backups: {cleaned_count} arquivos removidos ({cleaned_size/(1024*1024):.1f}MB)")
     
+    @staticmethod
+    def _run_command(cmd: List[str], stdout_path: Optional[Path] = None,
+                     stdin_path: Optional[Path] = None,
+                     timeout: int = 3600) -> subprocess.CompletedProcess:
+        """Executar comando com stdout/stdin ligados a ficheiros (bloqueante)"""
+        if stdout_path is not None:
+            with open(stdout_path, 'w') as f:
+                return subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE,
+                                      text=True, timeout=timeout)
+        if stdin_path is not None:
+            with open(stdin_path, 'r') as f:
+                return subprocess.run(cmd, stdin=f, stderr=subprocess.PIPE,
+                                      text=True, timeout=timeout)
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    
+    @staticmethod
+    def _write_tar(backup_file: Path, source_paths: List[str], arcname: Optional[str] = None):
+        """Criar tar.gz com os caminhos existentes (bloqueante)"""
+        with tarfile.open(backup_file, "w:gz") as tar:
+            for source_path in source_paths:
+                if os.path.exists(source_path):
+                    tar.add(source_path, arcname=arcname or os.path.basename(source_path))
+                    print(f"  ✓ Adicionado: {source_path}")
+    
     def _get_docker_volume_path(self, volume_name: str) -> Optional[str]:
         """Obter caminho do volume Docker"""
         try:
@@ -360,17 +373,21 @@ class BackupManager:
         except Exception:
             return None
     
+    @staticmethod
+    def _compress_file_sync(file_path: Path):
+        with open(file_path, 'rb') as f_in:
+            with tarfile.open(f"{file_path}.gz", 'w:gz') as tar:
+                tarinfo = tarfile.TarInfo(name=file_path.name)
+                tarinfo.size = file_path.stat().st_size
+                tar.addfile(tarinfo, f_in)
+                
+        # Remover arquivo original
+        file_path.unlink()
+    
     async def _compress_file(self, file_path: Path):
         """Comprimir arquivo"""
         try:
-            with open(file_path, 'rb') as f_in:
-                with tarfile.open(f"{file_path}.gz", 'w:gz') as tar:
-                    tarinfo = tarfile.TarInfo(name=file_path.name)
-                    tarinfo.size = file_path.stat().st_size
-                    tar.addfile(tarinfo, f_in)
-                    
-            # Remover arquivo original
-            file_path.unlink()
+            await run_cpu(self._compress_file_sync, file_path)
             
         except Exception as e:
             print(f"⚠️ Erro comprimindo {file_path}: {e}")
@@ -378,8 +395,11 @@ class BackupManager:
     async def _decompress_file(self, file_path: Path):
         """Descomprimir arquivo"""
         try:
-            with tarfile.open(file_path, 'r:gz') as tar:
-                tar.extractall(path=file_path.parent)
+            def extract():
+                with tarfile.open(file_path, 'r:gz') as tar:
+                    tar.extractall(path=file_path.parent)
+            
+            await run_cpu(extract)
                 
         except Exception as e:
             print(f"⚠️ Erro descomprimindo {file_path}: {e}")
@@ -388,7 +408,8 @@ class BackupManager:
         """Upload para S3"""
         try:
             if self.s3_client:
-                self.s3_client.upload_file(
+                await run_io(
+                    self.s3_client.upload_file,
                     str(file_path), 
                     self.config.s3_bucket, 
                     s3_key
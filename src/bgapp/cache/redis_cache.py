@@ -2,19 +2,54 @@
 """
 Sistema de Cache Inteligente com Redis
 Reduz latência de consultas de 6s para <1s
+
+Dois níveis: LRU local em memória (TTL curto) à frente do Redis. Os valores
+são codificados em msgpack (comprimidos com zstd/lz4 acima de um limiar) e o
+recálculo de chaves expiradas é feito por um único chamador (single-flight).
 """
 
 import json
-import pickle
+import time
+import uuid
+import fnmatch
 import hashlib
 import asyncio
-from datetime import datetime, timedelta
-from typing import Any, Optional, Dict, List, Union
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Dict, Iterable, List, Tuple, Union
 from functools import wraps
 
 import redis.asyncio as redis
+from redis.exceptions import WatchError
 from pydantic import BaseModel
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+# Cabeçalho de 1 byte com o formato do valor guardado no Redis
+FORMAT_MSGPACK = b"\x01"
+FORMAT_MSGPACK_ZSTD = b"\x02"
+FORMAT_MSGPACK_LZ4 = b"\x03"
+FORMAT_JSON = b"\x04"
+
+KEY_PREFIX = "bgapp:cache"
+TAG_PREFIX = f"{KEY_PREFIX}:tag"
+
 class CacheConfig(BaseModel):
     """Configuração do sistema de cache"""
     redis_host: str = "redis"
@@ -23,25 +58,135 @@ class CacheConfig(BaseModel):
     default_ttl: int = 300  # 5 minutos
     max_connections: int = 20
     encoding: str = "utf-8"
+    # Nível local (L1) em memória do processo
+    local_ttl: float = 5.0
+    local_max_entries: int = 2048
+    # Compressão dos valores maiores que o limiar (zstd, lz4 ou none)
+    compression: str = "zstd"
+    compression_threshold: int = 1024
+    # Single-flight entre processos: duração máxima do lock de recálculo
+    lock_timeout: float = 30.0
+    # TTL dos conjuntos de tags (devem sobreviver às chaves que indexam)
+    tag_ttl: int = 86400
 
 class CacheStats(BaseModel):
     """Estatísticas do cache"""
     hits: int = 0
     misses: int = 0
+    local_hits: int = 0
+    loads: int = 0
+    coalesced: int = 0
     hit_rate: float = 0.0
     total_keys: int = 0
     memory_usage: str = "0B"
     last_updated: datetime = datetime.now()
 
+def _encode_default(value: Any) -> Any:
+    """Tipos não suportados pelo msgpack (equivalente ao default=str do JSON)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):  # numpy
+        return value.tolist()
+    if hasattr(value, "dict"):  # modelos pydantic
+        return value.dict()
+    return str(value)
+
+
+class ValueCodec:
+    """Codificação compacta dos valores: msgpack + compressão acima do limiar"""
+    
+    def __init__(self, compression: str = "zstd", threshold: int = 1024):
+        self.threshold = threshold
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            compression = "lz4" if LZ4_AVAILABLE else "none"
+        elif compression == "lz4" and not LZ4_AVAILABLE:
+            compression = "zstd" if ZSTD_AVAILABLE else "none"
+        self.compression = compression
+        self._zstd_c = zstandard.ZstdCompressor(level=3) if compression == "zstd" else None
+        self._zstd_d = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+    
+    def encode(self, value: Any) -> bytes:
+        if not MSGPACK_AVAILABLE:
+            return FORMAT_JSON + json.dumps(value, default=str).encode()
+        
+        packed = msgpack.packb(value, default=_encode_default, use_bin_type=True)
+        if len(packed) >= self.threshold:
+            if self._zstd_c is not None:
+                return FORMAT_MSGPACK_ZSTD + self._zstd_c.compress(packed)
+            if self.compression == "lz4":
+                return FORMAT_MSGPACK_LZ4 + lz4.frame.compress(packed)
+        return FORMAT_MSGPACK + packed
+    
+    def decode(self, data: bytes) -> Any:
+        header, body = data[:1], data[1:]
+        if header == FORMAT_MSGPACK:
+            return msgpack.unpackb(body, raw=False)
+        if header == FORMAT_MSGPACK_ZSTD:
+            return msgpack.unpackb(self._zstd_d.decompress(body), raw=False)
+        if header == FORMAT_MSGPACK_LZ4:
+            return msgpack.unpackb(lz4.frame.decompress(body), raw=False)
+        if header == FORMAT_JSON:
+            return json.loads(body)
+        # Valores antigos gravados como JSON simples
+        return json.loads(data)
+
+
+class LocalLRU:
+    """
+    Nível L1: LRU limitado em memória com TTL curto
+    Guarda os valores codificados (bytes): cada leitura descodifica uma cópia
+    própria, com os mesmos tipos que uma leitura do Redis
+    """
+    
+    def __init__(self, max_entries: int = 2048, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+    
+    def get(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+    
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        ttl = min(self.ttl, ttl) if ttl else self.ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def delete(self, keys: Iterable[str]):
+        for key in keys:
+            self._entries.pop(key, None)
+    
+    def delete_pattern(self, pattern: str):
+        self.delete([k for k in self._entries if fnmatch.fnmatchcase(k, pattern)])
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class RedisCache:
     """Sistema de cache Redis inteligente com estatísticas e otimizações"""
     
-    def __init__(self, config: CacheConfig = None):
+    def __init__(self, config: CacheConfig = None, client: Optional[redis.Redis] = None):
         self.config = config or CacheConfig()
         self.redis_pool = None
-        self.redis = None  # Inicializar redis como None
+        self.redis = client  # None até connect(), ou cliente injetado
         self.stats = CacheStats()
         self._connection_retries = 3
+        self.local = LocalLRU(self.config.local_max_entries, self.config.local_ttl)
+        self.codec = ValueCodec(self.config.compression, self.config.compression_threshold)
+        self._inflight: Dict[str, asyncio.Future] = {}
         
     async def connect(self):
         """Conectar ao Redis com pool de conexões"""
@@ -51,8 +196,7 @@ class RedisCache:
                 port=self.config.redis_port,
                 db=self.config.redis_db,
                 max_connections=self.config.max_connections,
-                retry_on_timeout=True,
-                decode_responses=True
+                retry_on_timeout=True
             )
             self.redis = redis.Redis(connection_pool=self.redis_pool)
             
@@ -72,25 +216,52 @@ class RedisCache:
             
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """Gerar chave única para cache baseada em parâmetros"""
-        key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
-        key_hash = hashlib.md5(key_data.encode()).hexdigest()
-        return f"bgapp:cache:{prefix}:{key_hash}"
+        # JSON canónico: a mesma chamada dá sempre a mesma chave (dicts por ordem de chave)
+        key_data = json.dumps([args, kwargs], sort_keys=True, default=str, separators=(",", ":"))
+        key_hash = hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
+        return f"{KEY_PREFIX}:{prefix}:{key_hash}"
+    
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{TAG_PREFIX}:{tag}"
         
     async def get(self, key: str) -> Optional[Any]:
-        """Obter valor do cache"""
+        """Obter valor do cache (L1 local e depois Redis)"""
+        data = await self._get_encoded(key)
+        if data is None:
+            return None
+        found, value = await self._decode(key, data)
+        return value if found else None
+    
+    async def _decode(self, key: str, data: bytes) -> Tuple[bool, Any]:
+        """Descodificar; valores ilegíveis (formato antigo, corrompidos) contam como miss e são removidos"""
+        try:
+            return True, self.codec.decode(data)
+        except Exception as e:
+            print(f"Valor ilegível no cache {key}, a remover: {e}")
+            self.stats.hits -= 1
+            self.stats.misses += 1
+            await self.delete(key)
+            return False, None
+    
+    async def _get_encoded(self, key: str) -> Optional[bytes]:
+        """Valor codificado (L1 local e depois Redis)"""
+        found, data = self.local.get(key)
+        if found:
+            self.stats.hits += 1
+            self.stats.local_hits += 1
+            return data
+        
         if not self.redis:
+            self.stats.misses += 1
             return None
             
         try:
             cached_data = await self.redis.get(key)
             if cached_data:
                 self.stats.hits += 1
-                try:
-                    # Tentar JSON primeiro (mais rápido)
-                    return json.loads(cached_data)
-                except:
-                    # Fallback para pickle
-                    return pickle.loads(cached_data.encode('latin1'))
+                self.local.set(key, cached_data)
+                return cached_data
             else:
                 self.stats.misses += 1
                 return None
@@ -100,21 +271,27 @@ class RedisCache:
             self.stats.misses += 1
             return None
             
-    async def set(self, key: str, value: Any, ttl: int = None) -> bool:
-        """Definir valor no cache"""
+    async def set(self, key: str, value: Any, ttl: int = None,
+                  tags: Optional[Iterable[str]] = None) -> bool:
+        """Definir valor no cache (opcionalmente associado a tags de invalidação)"""
+        return await self._store(key, self.codec.encode(value), ttl, tags)
+    
+    async def _store(self, key: str, serialized_data: bytes, ttl: Optional[int],
+                     tags: Optional[Iterable[str]]) -> bool:
+        ttl = ttl or self.config.default_ttl
+        self.local.set(key, serialized_data, ttl)
+        
         if not self.redis:
             return False
-            
-        ttl = ttl or self.config.default_ttl
         
         try:
-            # Serializar dados (JSON quando possível, pickle como fallback)
-            try:
-                serialized_data = json.dumps(value, default=str)
-            except:
-                serialized_data = pickle.dumps(value).decode('latin1')
-                
-            await self.redis.setex(key, ttl, serialized_data)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, serialized_data, ex=ttl)
+                for tag in tags or ():
+                    tag_key = self._tag_key(tag)
+                    pipe.sadd(tag_key, key)
+                    pipe.expire(tag_key, max(ttl, self.config.tag_ttl))
+                await pipe.execute()
             return True
             
         except Exception as e:
@@ -123,6 +300,7 @@ class RedisCache:
             
     async def delete(self, key: str) -> bool:
         """Remover chave do cache"""
+        self.local.delete([key])
         if not self.redis:
             return False
             
@@ -132,23 +310,167 @@ class RedisCache:
         except Exception as e:
             print(f"Erro removendo cache {key}: {e}")
             return False
+    
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int = None,
+                         tags: Optional[Iterable[str]] = None) -> Any:
+        """
+        Obter do cache ou calcular com ``loader`` uma única vez.
+        
+        No processo, chamadas concorrentes à mesma chave partilham o mesmo
+        cálculo; entre processos, só quem obtém o lock no Redis recalcula e os
+        restantes esperam pelo valor (até ``lock_timeout``). Cada chamada recebe
+        a sua própria cópia descodificada.
+        """
+        data = await self._get_encoded(key)
+        if data is not None:
+            found, value = await self._decode(key, data)
+            if found:
+                return value
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is asyncio.get_running_loop():
+            self.stats.coalesced += 1
+            return self.codec.decode(await asyncio.shield(inflight))
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._load_once(key, loader, ttl, tags)
+            future.set_result(data)
+            return self.codec.decode(data)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # evitar aviso de exceção não recolhida sem esperas
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    async def _load_once(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int],
+                         tags: Optional[Iterable[str]]) -> bytes:
+        """Recalcular a chave sob o lock distribuído (devolve o valor codificado)"""
+        if not self.redis:
+            return await self._load_and_store(key, loader, ttl, tags)
+        
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.config.lock_timeout
+        delay = 0.01
+        
+        while True:
+            try:
+                acquired = await self.redis.set(lock_key, token, nx=True,
+                                                px=int(self.config.lock_timeout * 1000))
+            except Exception as e:
+                print(f"Erro obtendo lock {lock_key}: {e}")
+                acquired = True
+                token = None
+            
+            if acquired:
+                try:
+                    return await self._load_and_store(key, loader, ttl, tags)
+                finally:
+                    if token:
+                        await self._release_lock(lock_key, token)
             
-    async def clear_pattern(self, pattern: str) -> int:
-        """Limpar chaves que correspondem a um padrão"""
+            # Outro processo está a calcular: esperar pelo valor
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            data = await self._get_encoded(key)
+            if data is not None and (await self._decode(key, data))[0]:
+                self.stats.coalesced += 1
+                return data
+            if time.monotonic() >= deadline:
+                # Lock abandonado ou cálculo demasiado lento: calcular localmente
+                return await self._load_and_store(key, loader, ttl, tags)
+    
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int],
+                              tags: Optional[Iterable[str]]) -> bytes:
+        self.stats.loads += 1
+        data = self.codec.encode(await loader())
+        await self._store(key, data, ttl, tags)
+        return data
+    
+    async def _release_lock(self, lock_key: str, token: str):
+        """Libertar o lock apenas se ainda for nosso (transação WATCH)"""
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(lock_key)
+                current = await pipe.get(lock_key)
+                if current is not None and current.decode() == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+                else:
+                    await pipe.unwatch()
+        except WatchError:
+            pass
+        except Exception as e:
+            print(f"Erro libertando lock {lock_key}: {e}")
+    
+    async def _unlink(self, keys: List) -> int:
+        try:
+            return await self.redis.unlink(*keys)
+        except redis.ResponseError:
+            # Redis < 4 não tem UNLINK
+            return await self.redis.delete(*keys)
+            
+    async def clear_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """Limpar chaves que correspondem a um padrão (SCAN incremental, sem KEYS)"""
+        self.local.delete_pattern(pattern)
         if not self.redis:
             return 0
             
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            cleared = 0
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    cleared += await self._unlink(batch)
+                    batch = []
+            if batch:
+                cleared += await self._unlink(batch)
+            return cleared
         except Exception as e:
             print(f"Erro limpando padrão {pattern}: {e}")
             return 0
+    
+    async def invalidate_tags(self, *tags: str, batch_size: int = 500) -> int:
+        """Remover todas as chaves associadas às tags"""
+        if not self.redis:
+            # Sem Redis não há índice de tags: descartar o nível local
+            self.local = LocalLRU(self.config.local_max_entries, self.config.local_ttl)
+            return 0
+        
+        cleared = 0
+        try:
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                batch = []
+                async for member in self.redis.sscan_iter(tag_key, count=batch_size):
+                    batch.append(member)
+                    if len(batch) >= batch_size:
+                        cleared += await self._unlink(batch)
+                        self.local.delete(k.decode() for k in batch)
+                        batch = []
+                if batch:
+                    cleared += await self._unlink(batch)
+                    self.local.delete(k.decode() for k in batch)
+                await self.redis.delete(tag_key)
+        except Exception as e:
+            print(f"Erro invalidando tags {tags}: {e}")
+        return cleared
             
     async def get_stats(self) -> CacheStats:
         """Obter estatísticas do cache"""
+        # Calcular hit rate
+        total_requests = self.stats.hits + self.stats.misses
+        self.stats.hit_rate = (self.stats.hits / total_requests * 100) if total_requests > 0 else 0
+        
         if not self.redis:
             return self.stats
             
@@ -156,10 +478,6 @@ class RedisCache:
             info = await self.redis.info('memory')
             keyspace = await self.redis.info('keyspace')
             
-            # Calcular hit rate
-            total_requests = self.stats.hits + self.stats.misses
-            self.stats.hit_rate = (self.stats.hits / total_requests * 100) if total_requests > 0 else 0
-            
             # Informações de memória
             memory_used = info.get('used_memory_human', '0B')
             self.stats.memory_usage = memory_used
@@ -178,13 +496,14 @@ class RedisCache:
 # Instância global do cache
 cache = RedisCache()
 
-def cached(ttl: int = 300, key_prefix: str = "default"):
+def cached(ttl: int = 300, key_prefix: str = "default", tags: Optional[List[str]] = None):
     """
     Decorator para cache automático de funções
     
     Args:
         ttl: Tempo de vida em segundos
         key_prefix: Prefixo para a chave do cache
+        tags: Tags para invalidação em grupo (``cache.invalidate_tags``)
     """
     def decorator(func):
         @wraps(func)
@@ -192,15 +511,8 @@ def cached(ttl: int = 300, key_prefix: str = "default"):
             # Gerar chave do cache
             cache_key = cache._generate_key(key_prefix, func.__name__, *args, **kwargs)
             
-            # Tentar obter do cache
-            cached_result = await cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-                
-            # Executar função e cachear resultado
-            result = await func(*args, **kwargs)
-            await cache.set(cache_key, result, ttl)
-            return result
+            # Obter do cache ou executar a função uma única vez (single-flight)
+            return await cache.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl, tags)
             
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -237,6 +549,24 @@ class CacheManager:
         """Cache específico para dados de espécies"""
         filters = filters or {}
         return self.cache._generate_key("species", species_id, **filters)
+    
+    @staticmethod
+    def species_tag(species_id: str) -> str:
+        """Tag que agrupa todos os valores de uma espécie"""
+        return f"species:{species_id}"
+    
+    async def set_species_data(self, species_id: str, value: Any, filters: Dict = None,
+                               ttl: int = None) -> str:
+        """Guardar dados de espécie associados à tag da espécie (ver invalidate_related_caches)"""
+        key = await self.cache_species_data(species_id, filters)
+        await self.cache.set(key, value, ttl, tags=[self.species_tag(species_id)])
+        return key
+    
+    async def get_or_set_species_data(self, species_id: str, loader: Callable[[], Awaitable[Any]],
+                                      filters: Dict = None, ttl: int = None) -> Any:
+        """Obter ou calcular dados de espécie, registando a tag da espécie"""
+        key = await self.cache_species_data(species_id, filters)
+        return await self.cache.get_or_set(key, loader, ttl, tags=[self.species_tag(species_id)])
         
     async def cache_geospatial_query(self, bbox: List[float], layers: List[str]) -> str:
         """Cache específico para consultas geoespaciais"""
@@ -244,8 +574,14 @@ class CacheManager:
         
     async def invalidate_related_caches(self, data_type: str, identifier: str):
         """Invalidar caches relacionados quando dados são atualizados"""
+        # As chaves são hashes: por espécie só é possível invalidar pela tag
+        # (registada por set_species_data/get_or_set_species_data)
+        if data_type == "species":
+            cleared = await self.cache.invalidate_tags(self.species_tag(identifier))
+            print(f"🗑️ Invalidados {cleared} caches de {data_type}")
+            return
+        
         patterns = {
-            "species": f"bgapp:cache:species:{identifier}*",
             "oceanographic": "bgapp:cache:oceanographic*",
             "geospatial": "bgapp:cache:geospatial*"
         }
@@ -12,7 +12,12 @@ import asyncio
 import json
 import logging
 import base64
-from typing import Dict, List, Any, Optional, Tuple, Union
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
 from pathlib import Path
 import subprocess
 import tempfile
@@ -21,6 +26,8 @@ from io import BytesIO
 import uuid
 from datetime import datetime
 
+import numpy as np
+
 # WebAssembly e JavaScript execution imports
 try:
     import js2py
@@ -37,12 +44,183 @@ except ImportError:
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# A partir deste número de pontos as camadas usam buffers binários em vez de JSON
+BINARY_THRESHOLD = 5000
+
+# Rota que serve os buffers (admin_api) e diretório partilhado entre workers
+DECKGL_LAYERS_URL = "/deckgl/layers"
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DECKGL_LAYERS_DIR = Path(os.getenv("DECKGL_LAYERS_DIR", ROOT_DIR / "data" / "cache" / "deckgl_layers"))
+
+
+@dataclass
+class BinaryLayerData:
+    """
+    Dados colunares de uma camada em buffers binários do deck.gl
+
+    Posições Float32 (lon, lat), cores Uint8 RGBA e pesos Float32:
+    8-12 bytes por ponto em vez de um objeto JSON por ponto.
+    """
+    positions: np.ndarray                  # (N, 2) float32
+    colors: Optional[np.ndarray] = None    # (N, 4) uint8
+    weights: Optional[np.ndarray] = None   # (N,) float32
+
+    def __post_init__(self):
+        self.positions = np.ascontiguousarray(self.positions, dtype=np.float32).reshape(-1, 2)
+        if self.colors is not None:
+            colors = np.asarray(self.colors, dtype=np.uint8).reshape(len(self.positions), -1)
+            if colors.shape[1] == 3:
+                colors = np.column_stack([colors, np.full(len(colors), 255, dtype=np.uint8)])
+            self.colors = np.ascontiguousarray(colors)
+        if self.weights is not None:
+            self.weights = np.ascontiguousarray(self.weights, dtype=np.float32).reshape(-1)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @classmethod
+    def from_arrays(cls, longitude, latitude, colors=None, weights=None) -> "BinaryLayerData":
+        return cls(np.column_stack([longitude, latitude]), colors, weights)
+
+    @classmethod
+    def from_records(cls, data: List[Dict[str, Any]], color_key: str = "color",
+                     weight_key: str = "weight") -> "BinaryLayerData":
+        """Converter lista de dicts (longitude, latitude, cor/peso opcionais)"""
+        positions = np.array([(d["longitude"], d["latitude"]) for d in data], dtype=np.float32)
+        colors = weights = None
+        if data and color_key in data[0]:
+            colors = np.array([d[color_key] for d in data], dtype=np.uint8)
+        if data and weight_key in data[0]:
+            weights = np.array([d[weight_key] for d in data], dtype=np.float32)
+        elif data and "value" in data[0]:
+            weights = np.array([d["value"] for d in data], dtype=np.float32)
+        return cls(positions, colors, weights)
+
+    def _buffers(self) -> List[Tuple[str, np.ndarray, int, str, bool]]:
+        """(acessor, array, size, tipo JS, normalized) pela ordem no buffer"""
+        buffers = [("getPosition", self.positions, 2, "Float32Array", False)]
+        if self.colors is not None:
+            buffers.append(("getFillColor", self.colors, 4, "Uint8Array", True))
+        if self.weights is not None:
+            buffers.append(("getWeight", self.weights, 1, "Float32Array", False))
+        return buffers
+
+    def layout(self) -> Dict[str, Dict[str, Any]]:
+        """Offsets dos atributos no buffer concatenado (alinhados a 4 bytes)"""
+        attributes, offset = {}, 0
+        for accessor, array, size, array_type, normalized in self._buffers():
+            attributes[accessor] = {"offset": offset, "size": size, "type": array_type,
+                                    "normalized": normalized}
+            offset += array.nbytes
+        return attributes
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for _, array, *_ in self._buffers())
+
+    def to_bytes(self) -> bytes:
+        return b"".join(array.tobytes() for _, array, *_ in self._buffers())
+
+    def iter_chunks(self, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+        """Buffer em blocos, sem materializar uma cópia concatenada"""
+        for _, array, *_ in self._buffers():
+            view = memoryview(array).cast("B")
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+
+
+@dataclass
+class StoredLayerBuffer:
+    """Buffer de uma camada gravado em disco (lido em blocos ao servir)"""
+    path: Path
+    nbytes: int
+
+    def iter_chunks(self, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+class BinaryLayerStore:
+    """
+    Buffers binários servidos por URL
+    Gravados num diretório partilhado (qualquer worker serve a chave), com LRU
+    em memória limitado em bytes à frente do disco
+    """
+
+    KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]+-[0-9a-f]{16}$")
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[str, BinaryLayerData]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if not self.disk_dir:
+            return None
+        return self.disk_dir / key[-16:-14] / f"{key}.bin"
+
+    def put(self, layer_id: str, data: BinaryLayerData) -> str:
+        """Guardar e devolver a chave (id + hash do conteúdo, logo imutável)"""
+        digest = hashlib.sha1()
+        for chunk in data.iter_chunks():
+            digest.update(chunk)
+        key = f"{re.sub(r'[^A-Za-z0-9_-]', '_', layer_id)}-{digest.hexdigest()[:16]}"
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return key
+            self._entries[key] = data
+            self._bytes += data.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+        path = self._disk_path(key)
+        if path is not None and not path.exists():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+                with open(tmp, "wb") as f:
+                    for chunk in data.iter_chunks():
+                        f.write(chunk)
+                tmp.replace(path)
+            except OSError as e:
+                logger.warning(f"⚠️ Não foi possível gravar a camada binária em disco ({path}): {e}")
+        return key
+
+    def get(self, key: str) -> Optional[Union[BinaryLayerData, StoredLayerBuffer]]:
+        """Buffer da chave (memória ou disco) ou None se desconhecida"""
+        if not self.KEY_PATTERN.match(key):
+            return None
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        path = self._disk_path(key)
+        try:
+            return StoredLayerBuffer(path, path.stat().st_size) if path is not None else None
+        except OSError:
+            return None
+
+
+# Instância global dos buffers servidos em /deckgl/layers/{key}.bin
+binary_layer_store = BinaryLayerStore(disk_dir=DECKGL_LAYERS_DIR)
+
+
 @dataclass
 class DeckGLLayer:
     """Definição de uma camada Deck.GL"""
     id: str
     type: str
-    data: List[Dict[str, Any]]
+    data: Union[List[Dict[str, Any]], BinaryLayerData]
     props: Dict[str, Any]
     visible: bool = True
     pickable: bool = True
@@ -268,21 +446,36 @@ class DeckGLWASMWrapper:
         logger.info(f"🗺️ Atualizando view state: lon={view_state.longitude}, lat={view_state.latitude}, zoom={view_state.zoom}")
         self.config.view_state = view_state
     
+    @staticmethod
+    def _prepare_data(data: Union[List[Dict[str, Any]], BinaryLayerData],
+                      binary: Optional[bool], weights: bool = True) -> Union[List[Dict[str, Any]], BinaryLayerData]:
+        """Converter para buffers binários se pedido (ou automaticamente se grande)"""
+        if isinstance(data, BinaryLayerData):
+            return data
+        if binary or (binary is None and len(data) >= BINARY_THRESHOLD):
+            data = BinaryLayerData.from_records(data)
+            if not weights:
+                data.weights = None
+        return data
+
     def create_scatterplot_layer(self, 
                                 layer_id: str, 
-                                data: List[Dict[str, Any]],
+                                data: Union[List[Dict[str, Any]], BinaryLayerData],
+                                binary: Optional[bool] = None,
                                 **props) -> DeckGLLayer:
         """
         Criar camada de pontos
         
         Args:
             layer_id: ID único da camada
-            data: Dados dos pontos
+            data: Dados dos pontos (lista de dicts ou BinaryLayerData)
+            binary: Forçar/desativar buffers binários (None = automático)
             **props: Propriedades adicionais
             
         Returns:
             Camada configurada
         """
+        data = self._prepare_data(data, binary, weights=False)
         default_props = {
             'getPosition': '[longitude, latitude]',
             'getRadius': 1000,
@@ -302,19 +495,22 @@ class DeckGLWASMWrapper:
     
     def create_heatmap_layer(self, 
                            layer_id: str, 
-                           data: List[Dict[str, Any]],
+                           data: Union[List[Dict[str, Any]], BinaryLayerData],
+                           binary: Optional[bool] = None,
                            **props) -> DeckGLLayer:
         """
         Criar camada de mapa de calor
         
         Args:
             layer_id: ID único da camada
-            data: Dados dos pontos
+            data: Dados dos pontos (lista de dicts ou BinaryLayerData)
+            binary: Forçar/desativar buffers binários (None = automático)
             **props: Propriedades adicionais
             
         Returns:
             Camada configurada
         """
+        data = self._prepare_data(data, binary)
         default_props = {
             'getPosition': '[longitude, latitude]',
             'getWeight': 'weight',
@@ -364,13 +560,16 @@ class DeckGLWASMWrapper:
     
     def render_to_html(self, 
                       title: str = "BGAPP Deck.GL Visualization",
-                      include_controls: bool = True) -> str:
+                      include_controls: bool = True,
+                      data_url: Optional[str] = None) -> str:
         """
         Renderizar visualização para HTML
         
         Args:
             title: Título da visualização
             include_controls: Incluir controles de navegação
+            data_url: Base URL dos buffers binários (ex.: '/deckgl/layers');
+                se None, os buffers são embutidos em base64
             
         Returns:
             HTML completo da visualização
@@ -383,11 +582,17 @@ class DeckGLWASMWrapper:
             layer_config = {
                 'id': layer.id,
                 'type': layer.type,
-                'data': layer.data,
                 'visible': layer.visible,
                 'pickable': layer.pickable,
                 **layer.props
             }
+            if isinstance(layer.data, BinaryLayerData):
+                layer_config['binary'] = self._binary_descriptor(layer, data_url)
+                # Os acessores passam a vir dos atributos binários
+                for accessor in layer.data.layout():
+                    layer_config.pop(accessor, None)
+            else:
+                layer_config['data'] = layer.data
             layers_json.append(layer_config)
         
         # Gerar HTML
@@ -457,7 +662,40 @@ class DeckGLWASMWrapper:
     <script>
         // Configuração inicial
         const INITIAL_VIEW_STATE = {json.dumps(asdict(self.config.view_state))};
-        const LAYERS_DATA = {json.dumps(layers_json, indent=2)};
+        const LAYERS_DATA = {json.dumps(layers_json)};
+        
+        // Buffers binários (URL ou base64) -> atributos deck.gl sem parsing JSON
+        async function resolveLayerData(layerConfig) {{
+            if (!layerConfig.binary) return layerConfig;
+            const binary = layerConfig.binary;
+            const url = binary.url || ('data:application/octet-stream;base64,' + binary.base64);
+            const buffer = await (await fetch(url)).arrayBuffer();
+            const attributes = {{}};
+            for (const [accessor, attr] of Object.entries(binary.attributes)) {{
+                const ArrayType = attr.type === 'Uint8Array' ? Uint8Array : Float32Array;
+                attributes[accessor] = {{
+                    value: new ArrayType(buffer, attr.offset, binary.length * attr.size),
+                    size: attr.size,
+                    normalized: attr.normalized
+                }};
+            }}
+            const {{binary: _, ...props}} = layerConfig;
+            return {{...props, data: {{length: binary.length, attributes}}}};
+        }}
+        
+        function createLayer(layerConfig) {{
+            switch(layerConfig.type) {{
+                case 'ScatterplotLayer':
+                    return new deck.ScatterplotLayer(layerConfig);
+                case 'HeatmapLayer':
+                    return new deck.HeatmapLayer(layerConfig);
+                case 'IconLayer':
+                    return new deck.IconLayer(layerConfig);
+                default:
+                    console.warn('Unknown layer type:', layerConfig.type);
+                    return null;
+            }}
+        }}
         
         // Inicializar Deck.GL
         const deckgl = new deck.DeckGL({{
@@ -468,21 +706,7 @@ class DeckGLWASMWrapper:
             controller: {json.dumps(self.config.controller).lower()},
             useDevicePixels: {json.dumps(self.config.useDevicePixels).lower()},
             pickingRadius: {self.config.pickingRadius},
-            
-            // Criar camadas dinamicamente
-            layers: LAYERS_DATA.map(layerConfig => {{
-                switch(layerConfig.type) {{
-                    case 'ScatterplotLayer':
-                        return new deck.ScatterplotLayer(layerConfig);
-                    case 'HeatmapLayer':
-                        return new deck.HeatmapLayer(layerConfig);
-                    case 'IconLayer':
-                        return new deck.IconLayer(layerConfig);
-                    default:
-                        console.warn('Unknown layer type:', layerConfig.type);
-                        return null;
-                }}
-            }}).filter(Boolean),
+            layers: [],
             
             // Event handlers
             onViewStateChange: ({{viewState}}) => {{
@@ -503,6 +727,11 @@ class DeckGLWASMWrapper:
             }}
         }});
         
+        // Criar camadas quando os buffers estiverem carregados
+        Promise.all(LAYERS_DATA.map(resolveLayerData)).then(configs => {{
+            deckgl.setProps({{layers: configs.map(createLayer).filter(Boolean)}});
+        }});
+        
         // Funções de controle
         function resetView() {{
             deckgl.setProps({{
@@ -534,6 +763,17 @@ class DeckGLWASMWrapper:
         
         return html_template
     
+    @staticmethod
+    def _binary_descriptor(layer: DeckGLLayer, data_url: Optional[str]) -> Dict[str, Any]:
+        """Descrição do buffer binário da camada (URL servido ou base64 embutido)"""
+        descriptor = {'length': len(layer.data), 'attributes': layer.data.layout()}
+        if data_url:
+            key = binary_layer_store.put(layer.id, layer.data)
+            descriptor['url'] = f"{data_url.rstrip('/')}/{key}.bin"
+        else:
+            descriptor['base64'] = base64.b64encode(layer.data.to_bytes()).decode('ascii')
+        return descriptor
+    
     def save_html(self, filepath: Union[str, Path]) -> Path:
         """
         Salvar visualização em arquivo HTML
@@ -567,7 +807,9 @@ class DeckGLWASMWrapper:
             'total_layers': len(self.layers),
             'visible_layers': sum(1 for layer in self.layers if layer.visible),
             'layer_types': {},
-            'total_data_points': 0
+            'total_data_points': 0,
+            'binary_layers': 0,
+            'binary_bytes': 0
         }
         
         for layer in self.layers:
@@ -576,6 +818,9 @@ class DeckGLWASMWrapper:
                 stats['layer_types'][layer_type] = 0
             stats['layer_types'][layer_type] += 1
             stats['total_data_points'] += len(layer.data)
+            if isinstance(layer.data, BinaryLayerData):
+                stats['binary_layers'] += 1
+                stats['binary_bytes'] += layer.data.nbytes
         
         return stats
     
@@ -589,7 +834,7 @@ class DeckGLWASMWrapper:
         return f"<{self.__class__.__name__} canvas_id={self.config.canvas_id} layers={len(self.layers)}>"
 
 # Funções utilitárias para criação rápida
-def create_angola_marine_visualization(data: List[Dict[str, Any]], 
+def create_angola_marine_visualization(data: Union[List[Dict[str, Any]], BinaryLayerData], 
                                      layer_type: str = "scatterplot") -> DeckGLWASMWrapper:
     """
     Criar visualização marinha rápida para Angola
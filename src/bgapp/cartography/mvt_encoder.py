@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Codificador Mapbox Vector Tile (MVT 2.1) sem dependências externas
+Escreve diretamente o protobuf vector_tile.proto a partir de geometrias
+já em coordenadas de tile (inteiros 0..extent, eixo y para baixo)
+"""
+
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Tipos de geometria (vector_tile.proto)
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+# Comandos de geometria
+CMD_MOVE_TO = 1
+CMD_LINE_TO = 2
+CMD_CLOSE_PATH = 7
+
+Ring = Sequence[Tuple[int, int]]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= 0xFFFFFFFFFFFFFFFF
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _length_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def ring_area(ring: Ring) -> float:
+    """Área com sinal (fórmula do agrimensor) em coordenadas de tile"""
+    area = 0
+    for i in range(len(ring)):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % len(ring)]
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+class _Cursor:
+    """Posição corrente do cursor (as coordenadas são codificadas em delta)"""
+
+    __slots__ = ("x", "y")
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+
+    def delta(self, x: int, y: int) -> Tuple[int, int]:
+        dx, dy = x - self.x, y - self.y
+        self.x, self.y = x, y
+        return _zigzag(dx), _zigzag(dy)
+
+
+def encode_points(points: Sequence[Tuple[int, int]]) -> List[int]:
+    cursor = _Cursor()
+    geometry = [_command(CMD_MOVE_TO, len(points))]
+    for x, y in points:
+        geometry.extend(cursor.delta(x, y))
+    return geometry
+
+
+def encode_lines(lines: Sequence[Ring]) -> List[int]:
+    cursor = _Cursor()
+    geometry: List[int] = []
+    for line in lines:
+        if len(line) < 2:
+            continue
+        geometry.append(_command(CMD_MOVE_TO, 1))
+        geometry.extend(cursor.delta(*line[0]))
+        geometry.append(_command(CMD_LINE_TO, len(line) - 1))
+        for x, y in line[1:]:
+            geometry.extend(cursor.delta(x, y))
+    return geometry
+
+
+def encode_polygons(polygons: Sequence[Sequence[Ring]]) -> List[int]:
+    """Polígonos como listas de anéis (exterior primeiro, sem ponto de fecho repetido)"""
+    cursor = _Cursor()
+    geometry: List[int] = []
+    for rings in polygons:
+        for index, ring in enumerate(rings):
+            if len(ring) < 3:
+                continue
+            # Exterior com área positiva e buracos com área negativa (eixo y para baixo)
+            area = ring_area(ring)
+            if area == 0:
+                continue
+            if (index == 0) != (area > 0):
+                ring = ring[::-1]
+            geometry.append(_command(CMD_MOVE_TO, 1))
+            geometry.extend(cursor.delta(*ring[0]))
+            geometry.append(_command(CMD_LINE_TO, len(ring) - 1))
+            for x, y in ring[1:]:
+                geometry.extend(cursor.delta(x, y))
+            geometry.append(_command(CMD_CLOSE_PATH, 1))
+    return geometry
+
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value < 0:
+            return _key(6, 0) + _varint(_zigzag(value))
+        return _key(5, 0) + _varint(value)
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _length_delimited(1, str(value).encode("utf-8"))
+
+
+class LayerEncoder:
+    """Acumula features de uma camada com tabelas de chaves/valores partilhadas"""
+
+    def __init__(self, name: str, extent: int = 4096):
+        self.name = name
+        self.extent = extent
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+        self._features: List[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _tags(self, properties: Optional[Dict[str, Any]]) -> List[int]:
+        tags = []
+        for key, value in (properties or {}).items():
+            if value is None:
+                continue
+            if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+                value = value.item()  # escalares NumPy
+            if not isinstance(value, (str, bool, int, float)):
+                value = str(value)
+            key_index = self._keys.setdefault(key, len(self._keys))
+            value_index = self._values.setdefault((type(value), value), len(self._values))
+            tags.extend((key_index, value_index))
+        return tags
+
+    def add_feature(self, geom_type: int, geometry: List[int],
+                    properties: Optional[Dict[str, Any]] = None,
+                    feature_id: Optional[int] = None):
+        if not geometry:
+            return
+        payload = b""
+        if feature_id is not None:
+            payload += _key(1, 0) + _varint(feature_id)
+        tags = self._tags(properties)
+        if tags:
+            payload += _packed(2, tags)
+        payload += _key(3, 0) + _varint(geom_type)
+        payload += _packed(4, geometry)
+        self._features.append(payload)
+
+    def encode(self) -> bytes:
+        payload = _key(15, 0) + _varint(2)
+        payload += _length_delimited(1, self.name.encode("utf-8"))
+        payload += b"".join(_length_delimited(2, feature) for feature in self._features)
+        payload += b"".join(_length_delimited(3, key.encode("utf-8")) for key in self._keys)
+        payload += b"".join(_length_delimited(4, _encode_value(value)) for _, value in self._values)
+        payload += _key(5, 0) + _varint(self.extent)
+        return payload
+
+
+def encode_tile(layers: Iterable[LayerEncoder]) -> bytes:
+    """Tile MVT com as camadas não vazias"""
+    return b"".join(_length_delimited(3, layer.encode()) for layer in layers if len(layer))
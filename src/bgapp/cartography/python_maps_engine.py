@@ -35,12 +35,14 @@ try:
         DeckGLWASMWrapper, 
         DeckGLConfig, 
         DeckGLViewState,
+        DECKGL_LAYERS_URL,
         create_angola_marine_visualization
     )
     DECKGL_WASM_AVAILABLE = True
     logger.info("✅ Deck.GL WASM Wrapper disponível")
 except ImportError as e:
     DECKGL_WASM_AVAILABLE = False
+    DECKGL_LAYERS_URL = None
     logger.warning(f"⚠️ Deck.GL WASM Wrapper não disponível: {e}")
 
 
@@ -1019,7 +1021,8 @@ class AngolaMarineCartography:
     def create_deckgl_visualization(self, 
                                   data: List[Dict[str, Any]], 
                                   layer_type: str = "scatterplot",
-                                  title: str = "Visualização BGAPP Deck.GL") -> Optional[str]:
+                                  title: str = "Visualização BGAPP Deck.GL",
+                                  data_url: Optional[str] = DECKGL_LAYERS_URL) -> Optional[str]:
         """
         🌐 TASK-003: Criar visualização Deck.GL usando WebAssembly
         
@@ -1027,6 +1030,9 @@ class AngolaMarineCartography:
             data: Dados oceanográficos para visualizar
             layer_type: Tipo de camada ('scatterplot', 'heatmap', 'icon')
             title: Título da visualização
+            data_url: Base URL para servir camadas grandes como buffers binários
+                (por omissão a rota /deckgl/layers da API); None embute-as em base64
+                (HTML autónomo, ex.: ficheiros gravados)
             
         Returns:
             HTML da visualização ou None se não disponível
@@ -1042,7 +1048,7 @@ class AngolaMarineCartography:
             wrapper = create_angola_marine_visualization(data, layer_type)
             
             # Renderizar para HTML
-            html_output = wrapper.render_to_html(title, include_controls=True)
+            html_output = wrapper.render_to_html(title, include_controls=True, data_url=data_url)
             
             # Log das estatísticas
             stats = wrapper.get_layer_stats()
@@ -1064,7 +1070,7 @@ class AngolaMarineCartography:
         capabilities = {
             'deckgl_wasm_available': DECKGL_WASM_AVAILABLE,
             'supported_layer_types': ['scatterplot', 'heatmap', 'icon'],
-            'supported_formats': ['html', 'json'],
+            'supported_formats': ['html', 'json', 'binary'],
             'version': '1.0.0',
             'task': 'TASK-003 - WebAssembly Deck.GL Integration'
         }
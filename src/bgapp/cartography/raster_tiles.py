@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Serviço de Raster Tiles (XYZ) para parâmetros oceanográficos
+Tiles PNG/WebP colorizados diretamente a partir de grelhas NumPy (sem figura
+matplotlib por request), com pirâmide pré-gerada em background por passo de tempo
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_tiles import CachedTile, TileCache, tile_etag
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    WEBP_AVAILABLE = True
+except ImportError:
+    WEBP_AVAILABLE = False
+
+TILE_SIZE = 256
+MAX_ZOOM = 12
+
+# Escalas de cor (pontos de controlo RGB igualmente espaçados)
+COLORMAPS = {
+    "thermal": [(49, 54, 149), (69, 117, 180), (116, 173, 209), (171, 217, 233), (224, 243, 248),
+                (254, 224, 144), (253, 174, 97), (244, 109, 67), (215, 48, 39), (165, 0, 38)],
+    "algae": [(215, 249, 208), (142, 214, 145), (71, 178, 104), (24, 137, 73), (13, 94, 57), (7, 54, 34)],
+    "haline": [(42, 24, 108), (33, 73, 155), (15, 114, 143), (55, 148, 137), (113, 179, 120),
+               (197, 204, 95), (253, 238, 153)],
+    "waves": [(240, 249, 255), (189, 215, 231), (107, 174, 214), (49, 130, 189), (8, 81, 156), (8, 48, 107)],
+}
+
+# Configuração por parâmetro: intervalo de valores, escala e unidade
+PARAMETERS = {
+    "sst": {"title": "Temperatura Superficial do Mar", "unit": "°C", "vmin": 16.0, "vmax": 30.0,
+            "colormap": "thermal", "log": False},
+    "chlorophyll": {"title": "Concentração de Clorofila-a", "unit": "mg/m³", "vmin": 0.05, "vmax": 10.0,
+                    "colormap": "algae", "log": True},
+    "salinity": {"title": "Salinidade", "unit": "PSU", "vmin": 33.5, "vmax": 36.5,
+                 "colormap": "haline", "log": False},
+    "wave_height": {"title": "Altura Significativa de Onda", "unit": "m", "vmin": 0.0, "vmax": 5.0,
+                    "colormap": "waves", "log": False},
+}
+
+
+def build_lut(colormap: str, size: int = 256) -> np.ndarray:
+    """Tabela RGBA (size x 4) interpolada a partir dos pontos de controlo"""
+    stops = np.asarray(COLORMAPS[colormap], dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, len(stops))
+    t = np.linspace(0.0, 1.0, size)
+    lut = np.empty((size, 4), dtype=np.uint8)
+    for channel in range(3):
+        lut[:, channel] = np.rint(np.interp(t, positions, stops[:, channel]))
+    lut[:, 3] = 255
+    return lut
+
+
+def encode_png(rgba: np.ndarray, level: int = 6) -> bytes:
+    """PNG RGBA de 8 bits a partir de um array (h, w, 4) usando só zlib"""
+    height, width, _ = rgba.shape
+    raw = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 0] = 0  # filtro "None" em todas as linhas
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return (struct.pack(">I", len(payload)) + kind + payload
+                + struct.pack(">I", zlib.crc32(kind + payload) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + chunk(b"IEND", b""))
+
+
+def encode_webp(rgba: np.ndarray, quality: int = 80) -> bytes:
+    buffer = BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+ENCODERS = {"png": encode_png}
+if WEBP_AVAILABLE:
+    ENCODERS["webp"] = encode_webp
+
+
+def tile_range(bounds: Tuple[float, float, float, float], z: int) -> Tuple[int, int, int, int]:
+    """Intervalo de tiles (x0, y0, x1, y1 inclusivos) que cobre (west, south, east, north)"""
+    west, south, east, north = bounds
+    n = 1 << z
+
+    def to_x(lon: float) -> int:
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def to_y(lat: float) -> int:
+        lat_rad = math.radians(max(-85.0511, min(85.0511, lat)))
+        y = (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * n
+        return min(n - 1, max(0, int(y)))
+
+    return to_x(west), to_y(north), to_x(east), to_y(south)
+
+
+@dataclass
+class OceanGrid:
+    """Grelha regular lon/lat de um parâmetro num passo de tempo"""
+    lon: np.ndarray      # 1D crescente
+    lat: np.ndarray      # 1D crescente
+    values: np.ndarray   # 2D (lat, lon), NaN = sem dados (terra)
+    _fingerprint: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.lon = np.asarray(self.lon, dtype=np.float64)
+        self.lat = np.asarray(self.lat, dtype=np.float64)
+        self.values = np.asarray(self.values, dtype=np.float32)
+        if self.lat[0] > self.lat[-1]:
+            self.lat = self.lat[::-1]
+            self.values = self.values[::-1]
+        if self.lon[0] > self.lon[-1]:
+            self.lon = self.lon[::-1]
+            self.values = self.values[:, ::-1]
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return float(self.lon[0]), float(self.lat[0]), float(self.lon[-1]), float(self.lat[-1])
+
+    def fingerprint(self) -> str:
+        """Hash do conteúdo da grelha (igual entre processos e reinícios)"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=8)
+            for array in (self.lon, self.lat, self.values):
+                digest.update(np.ascontiguousarray(array).data)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @classmethod
+    def from_dataarray(cls, data_array, lon: str = "lon", lat: str = "lat") -> "OceanGrid":
+        """Criar a partir de um xarray.DataArray 2D (lat, lon)"""
+        data_array = data_array.transpose(lat, lon)
+        return cls(data_array[lon].values, data_array[lat].values, data_array.values)
+
+    def sample(self, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Interpolação bilinear na grelha (lon por coluna, lat por linha) -> (len(lat), len(lon))"""
+        fx = (lon - self.lon[0]) / (self.lon[-1] - self.lon[0]) * (len(self.lon) - 1)
+        fy = (lat - self.lat[0]) / (self.lat[-1] - self.lat[0]) * (len(self.lat) - 1)
+        inside_x = (fx >= 0) & (fx <= len(self.lon) - 1)
+        inside_y = (fy >= 0) & (fy <= len(self.lat) - 1)
+
+        x0 = np.clip(np.floor(fx).astype(np.int64), 0, len(self.lon) - 2)
+        y0 = np.clip(np.floor(fy).astype(np.int64), 0, len(self.lat) - 2)
+        wx = (fx - x0)[None, :]
+        wy = (fy - y0)[:, None]
+        v = self.values
+        top = v[y0[:, None], x0[None, :]] * (1 - wx) + v[y0[:, None], x0[None, :] + 1] * wx
+        bottom = v[y0[:, None] + 1, x0[None, :]] * (1 - wx) + v[y0[:, None] + 1, x0[None, :] + 1] * wx
+        result = top * (1 - wy) + bottom * wy
+        result[~(inside_y[:, None] & inside_x[None, :])] = np.nan
+        return result
+
+
+def simulated_grid(parameter: str, day: date, resolution: float = 0.1) -> OceanGrid:
+    """Campo simulado para a ZEE de Angola (determinístico por dia), como nas visualizações de demonstração"""
+    lon = np.arange(8.5, 17.5 + resolution / 2, resolution)
+    lat = np.arange(-18.5, -4.0 + resolution / 2, resolution)
+    lon_grid, lat_grid = np.meshgrid(lon, lat)
+    rng = np.random.default_rng(day.toordinal())
+    noise = rng.normal(0, 1, lon_grid.shape)
+    phase = day.toordinal() % 365 / 365 * 2 * math.pi
+
+    # Distância à costa aproximada (costa ~ 12°E a norte, ~ 11.8°E a sul)
+    coast = 13.8 + 0.12 * (lat_grid + 12)
+    offshore = np.clip(coast - lon_grid, 0, None)
+    # Afloramento costeiro de Benguela: águas frias e produtivas junto à costa a sul
+    upwelling = np.exp(-offshore / 1.5) * np.clip(-(lat_grid + 10) / 8, 0, 1)
+
+    if parameter == "sst":
+        values = 27.5 - 0.45 * (-lat_grid - 4) + 1.5 * math.sin(phase) - 3 * upwelling + 0.3 * noise
+    elif parameter == "chlorophyll":
+        values = np.exp(-1.5 + 2.8 * upwelling + 0.6 * np.exp(-offshore) + 0.2 * noise)
+    elif parameter == "salinity":
+        values = 35.6 - 0.9 * np.exp(-offshore / 0.8) * (lat_grid > -7) + 0.05 * noise
+    elif parameter == "wave_height":
+        values = 1.6 + 0.05 * (-lat_grid - 4) + 0.4 * math.cos(phase) + 0.15 * noise
+    else:
+        raise KeyError(parameter)
+
+    values = values.astype(np.float32)
+    values[lon_grid > coast] = np.nan  # terra
+    return OceanGrid(lon, lat, values)
+
+
+@dataclass
+class _BuildStatus:
+    state: str = "idle"
+    built_tiles: int = 0
+    total_tiles: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    pending: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class RasterTileService:
+    """Tiles raster por parâmetro/tempo, com pré-geração em background e cache LRU/disco"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, prebuild_zooms: Tuple[int, int] = (0, 7),
+                 days: int = 7, max_cache_bytes: int = 128 * 1024 * 1024, max_simulated_grids: int = 64):
+        self.prebuild_zooms = prebuild_zooms
+        self.days = days
+        self.max_simulated_grids = max_simulated_grids
+        self.caches = {
+            fmt: TileCache(max_bytes=max_cache_bytes // len(ENCODERS),
+                           disk_dir=Path(cache_dir) / fmt if cache_dir else None,
+                           suffix=f".{fmt}")
+            for fmt in ENCODERS
+        }
+        self._luts = {name: build_lut(config["colormap"]) for name, config in PARAMETERS.items()}
+        # Grelhas registadas (dados reais) e LRU limitada das simuladas
+        self._grids: Dict[Tuple[str, str], OceanGrid] = {}
+        self._simulated: "OrderedDict[Tuple[str, str], OceanGrid]" = OrderedDict()
+        # Versão de renderização por parâmetro (escala de cor e intervalo de valores)
+        self._render_versions = {
+            name: hashlib.blake2b(json.dumps(config, sort_keys=True).encode(), digest_size=4).hexdigest()
+            for name, config in PARAMETERS.items()
+        }
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self.status = _BuildStatus()
+        self._empty_tiles: Dict[str, CachedTile] = {}
+
+    # --- dados ---------------------------------------------------------------
+
+    def times(self) -> List[str]:
+        """Passos de tempo disponíveis (ISO), do mais recente para o mais antigo"""
+        registered = {time_key for _, time_key in self._grids}
+        today = date.today()
+        simulated = {(today - timedelta(days=i)).isoformat() for i in range(self.days)}
+        return sorted(registered | simulated, reverse=True)
+
+    def resolve_time(self, time_key: str) -> str:
+        """Passo de tempo disponível (ValueError se inválido ou fora do intervalo servido)"""
+        times = self.times()
+        if time_key == "latest":
+            return times[0]
+        date.fromisoformat(time_key)  # ValueError se inválido
+        if time_key not in times:
+            raise ValueError(f"Passo de tempo indisponível: {time_key} (de {times[-1]} a {times[0]})")
+        return time_key
+
+    def set_grid(self, parameter: str, time_key: str, grid: OceanGrid, prebuild: bool = True):
+        """Registar dados reais (ex.: Copernicus) e invalidar/reconstruir os tiles"""
+        if parameter not in PARAMETERS:
+            raise KeyError(parameter)
+        key = (parameter, time_key)
+        with self._lock:
+            self._grids[key] = grid
+            self._simulated.pop(key, None)
+        if prebuild:
+            self.schedule_prebuild([key])
+
+    def get_grid(self, parameter: str, time_key: str) -> OceanGrid:
+        key = (parameter, time_key)
+        grid = self._grids.get(key)
+        if grid is not None:
+            return grid
+        with self._lock:
+            grid = self._grids.get(key) or self._simulated.get(key)
+            if grid is None:
+                grid = simulated_grid(parameter, date.fromisoformat(time_key))
+                self._simulated[key] = grid
+                while len(self._simulated) > self.max_simulated_grids:
+                    self._simulated.popitem(last=False)
+            elif key in self._simulated:
+                self._simulated.move_to_end(key)
+        return grid
+
+    # --- renderização --------------------------------------------------------
+
+    def render(self, parameter: str, time_key: str, z: int, x: int, y: int) -> np.ndarray:
+        """Array RGBA (256, 256, 4) do tile"""
+        config = PARAMETERS[parameter]
+        grid = self.get_grid(parameter, time_key)
+
+        n = 1 << z
+        steps = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lon = (x + steps) / n * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * (y + steps) / n))))
+        values = grid.sample(lon, lat)
+
+        vmin, vmax = config["vmin"], config["vmax"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if config["log"]:
+                values = np.log10(values)
+                vmin, vmax = math.log10(vmin), math.log10(vmax)
+            scaled = (values - vmin) / (vmax - vmin) * 255
+        valid = np.isfinite(scaled)
+        index = np.clip(np.where(valid, scaled, 0), 0, 255).astype(np.uint8)
+
+        rgba = self._luts[parameter][index]
+        rgba[~valid, 3] = 0
+        return rgba
+
+    def _tile_key(self, parameter: str, time_key: str, z: int, x: int, y: int) -> Tuple:
+        # Hash dos dados e da configuração: persistente entre reinícios e workers
+        version = f"{self.get_grid(parameter, time_key).fingerprint()}{self._render_versions[parameter]}"
+        return (parameter, f"{time_key}.{version}", z, x, y)
+
+    def _empty_tile(self, fmt: str) -> CachedTile:
+        tile = self._empty_tiles.get(fmt)
+        if tile is None:
+            data = ENCODERS[fmt](np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+            tile = self._empty_tiles[fmt] = CachedTile(data=data, etag=tile_etag(data))
+        return tile
+
+    def _build_tile(self, parameter: str, time_key: str, z: int, x: int, y: int, fmt: str) -> CachedTile:
+        cache = self.caches[fmt]
+        key = self._tile_key(parameter, time_key, z, x, y)
+        tile = cache.get(key)
+        if tile is None:
+            rgba = self.render(parameter, time_key, z, x, y)
+            if not rgba[..., 3].any():
+                return self._empty_tile(fmt)
+            data = ENCODERS[fmt](rgba)
+            tile = CachedTile(data=data, etag=tile_etag(data))
+            cache.put(key, tile)
+        return tile
+
+    def get_tile(self, parameter: str, time_key: str, z: int, x: int, y: int,
+                 fmt: str = "png") -> CachedTile:
+        """Tile raster (KeyError se parâmetro desconhecido, ValueError se pedido inválido)"""
+        if parameter not in PARAMETERS:
+            raise KeyError(parameter)
+        if fmt not in ENCODERS:
+            raise ValueError(f"Formato não suportado: {fmt} (disponíveis: {', '.join(ENCODERS)})")
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise ValueError(f"Tile fora dos limites: {z}/{x}/{y}")
+        time_key = self.resolve_time(time_key)
+
+        self.ensure_worker()
+        grid = self.get_grid(parameter, time_key)
+        x0, y0, x1, y1 = tile_range(grid.bounds, z)
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return self._empty_tile(fmt)
+        return self._build_tile(parameter, time_key, z, x, y, fmt)
+
+    # --- pré-geração em background -------------------------------------------
+
+    def schedule_prebuild(self, keys: Optional[List[Tuple[str, str]]] = None):
+        """Agendar pirâmides (parâmetro, tempo); por omissão todos, mais recentes primeiro"""
+        if keys is None:
+            keys = [(parameter, time_key) for time_key in self.times() for parameter in PARAMETERS]
+        with self._lock:
+            for key in keys:
+                if key not in self.status.pending:
+                    self.status.pending.append(key)
+        self.ensure_worker()
+        self._wakeup.set()
+
+    def ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            if not self.status.pending and self.status.state == "idle":
+                self.status.pending = [(parameter, time_key) for time_key in self.times()
+                                       for parameter in PARAMETERS]
+            self._worker = threading.Thread(target=self._run_worker, name="raster-tile-prebuild", daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            with self._lock:
+                key = self.status.pending.pop(0) if self.status.pending else None
+            if key is None:
+                self.status.state = "done"
+                self.status.finished_at = time.time()
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            if self.status.state != "building":
+                self.status.state = "building"
+                self.status.started_at = time.time()
+            try:
+                self._prebuild_pyramid(*key)
+            except Exception as e:
+                logger.error(f"Erro a pré-gerar tiles {key}: {e}")
+
+    def _prebuild_pyramid(self, parameter: str, time_key: str):
+        grid = self.get_grid(parameter, time_key)
+        min_zoom, max_zoom = self.prebuild_zooms
+        for z in range(min_zoom, max_zoom + 1):
+            x0, y0, x1, y1 = tile_range(grid.bounds, z)
+            self.status.total_tiles += (x1 - x0 + 1) * (y1 - y0 + 1) * len(ENCODERS)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    for fmt in ENCODERS:
+                        self._build_tile(parameter, time_key, z, x, y, fmt)
+                        self.status.built_tiles += 1
+        logger.info(f"Pirâmide raster gerada: {parameter} {time_key} (z{min_zoom}-{max_zoom})")
+
+    # --- metadados -----------------------------------------------------------
+
+    def get_metadata(self, base_url: str = "") -> Dict[str, Any]:
+        parameters = {}
+        for name, config in PARAMETERS.items():
+            lut = self._luts[name]
+            parameters[name] = {
+                **config,
+                "legend": ["#%02x%02x%02x" % tuple(lut[i, :3]) for i in range(0, 256, 32)] + [
+                    "#%02x%02x%02x" % tuple(lut[255, :3])],
+            }
+        return {
+            "tiles": [f"{base_url}/tiles/raster/{{parameter}}/{{time}}/{{z}}/{{x}}/{{y}}.{{format}}"],
+            "formats": list(ENCODERS),
+            "times": self.times(),
+            "max_zoom": MAX_ZOOM,
+            "prebuild_zooms": list(self.prebuild_zooms),
+            "parameters": parameters,
+            "prebuild": {
+                "state": self.status.state,
+                "built_tiles": self.status.built_tiles,
+                "total_tiles": self.status.total_tiles,
+                "pending": len(self.status.pending),
+            },
+            "cache": {fmt: cache.get_stats() for fmt, cache in self.caches.items()},
+        }
+
+
+# Instância global do serviço de raster tiles
+raster_tile_service = RasterTileService(
+    cache_dir=Path(os.getenv("RASTER_TILE_CACHE_DIR", "data/cache/raster_tiles"))
+)
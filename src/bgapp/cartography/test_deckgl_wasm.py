@@ -139,6 +139,57 @@ def test_deckgl_angola_visualization():
         logger.error(f"❌ Erro no teste Angola: {e}")
         return False, f"Teste Angola falhou: {e}"
 
+def test_deckgl_binary_layers(tmp_path, monkeypatch):
+    """Teste das camadas binárias (buffers Float32/Uint8 em vez de JSON)"""
+    logger.info("📦 Testando camadas binárias...")
+    
+    import numpy as np
+    from . import deckgl_wasm_wrapper
+    from .deckgl_wasm_wrapper import BinaryLayerData, BinaryLayerStore, DeckGLWASMWrapper
+    
+    # Buffers gravados num diretório temporário, não no cache partilhado do repositório
+    store = BinaryLayerStore(disk_dir=tmp_path)
+    monkeypatch.setattr(deckgl_wasm_wrapper, "binary_layer_store", store)
+    
+    n_points = 10000
+    rng = np.random.default_rng(42)
+    data = BinaryLayerData.from_arrays(
+        rng.uniform(8.5, 17.5, n_points),
+        rng.uniform(-18.0, -4.0, n_points),
+        colors=rng.integers(0, 255, (n_points, 3)),
+    )
+    
+    wrapper = DeckGLWASMWrapper()
+    wrapper.add_layer(wrapper.create_scatterplot_layer("binary-scatter", data))
+    
+    # 8 bytes de posição + 4 de cor por ponto
+    assert data.nbytes == 12 * n_points
+    
+    html_inline = wrapper.render_to_html("Teste binário")
+    assert '"base64"' in html_inline and '"getPosition": {"offset": 0' in html_inline
+    
+    html_url = wrapper.render_to_html("Teste binário", data_url="/deckgl/layers")
+    assert len(html_url) < 20000, "Buffers não devem ser embutidos quando há data_url"
+    
+    key = html_url.split('/deckgl/layers/')[1].split('.bin')[0]
+    stored = store.get(key)
+    assert stored is not None and b"".join(stored.iter_chunks()) == data.to_bytes()
+    
+    # Outro worker (sem a cópia em memória) serve a mesma chave a partir do disco
+    from_disk = BinaryLayerStore(disk_dir=tmp_path).get(key)
+    assert from_disk is not None and b"".join(from_disk.iter_chunks()) == data.to_bytes()
+    
+    logger.info(f"✅ Camada binária: {data.nbytes} bytes para {n_points} pontos")
+
+def _run_binary_layers_standalone():
+    """Execução fora do pytest com diretório temporário próprio"""
+    import tempfile
+    import pytest
+    
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_deckgl_binary_layers(Path(tmp), monkeypatch)
+    return True, "Camadas binárias testadas com sucesso!"
+
 def test_integration_with_python_maps_engine():
     """Teste de integração com o engine de mapas Python"""
     logger.info("🗺️ Testando integração com Python Maps Engine...")
@@ -189,6 +240,7 @@ def run_all_tests():
     tests = [
         ("Teste Básico", test_deckgl_wasm_basic),
         ("Visualização Angola", test_deckgl_angola_visualization),
+        ("Camadas Binárias", _run_binary_layers_standalone),
         ("Integração Engine", test_integration_with_python_maps_engine)
     ]
     
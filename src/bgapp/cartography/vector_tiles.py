@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Servidor de Vector Tiles (MVT) para BGAPP
+Camadas em memória com índice espacial (STRtree para polígonos, curva Z para
+pontos), simplificação por zoom, recorte/quantização por tile e cache LRU/disco
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape, box
+
+from .mvt_encoder import (
+    GEOM_LINESTRING, GEOM_POINT, GEOM_POLYGON, LayerEncoder,
+    encode_lines, encode_points, encode_polygons, encode_tile,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+MAX_LATITUDE = 85.05112878
+MAX_ZOOM = 22
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Nível da curva Z usada para indexar pontos (tiles até este zoom são intervalos contíguos)
+POINT_INDEX_LEVEL = 16
+
+
+def lonlat_to_mercator(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator normalizado: x, y em [0, 1] com y a crescer para sul"""
+    lat = np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def _project_coords(coords: np.ndarray) -> np.ndarray:
+    x, y = lonlat_to_mercator(coords[:, 0], coords[:, 1])
+    return np.column_stack([x, y])
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Limites do tile em Mercator normalizado (minx, miny, maxx, maxy)"""
+    size = 1.0 / (1 << z)
+    return x * size, y * size, (x + 1) * size, (y + 1) * size
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Intercalar bits com zeros (x -> x0x0x0...) para códigos Morton"""
+    v = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def morton_code(qx: np.ndarray, qy: np.ndarray) -> np.ndarray:
+    return _spread_bits(qx) | (_spread_bits(qy) << np.uint64(1))
+
+
+def _to_tile_coords(coords: np.ndarray, bounds: Tuple[float, float, float, float],
+                    extent: int) -> np.ndarray:
+    """Mercator normalizado -> inteiros de tile (quantização para a grelha do extent)"""
+    minx, miny, maxx, _ = bounds
+    scale = extent / (maxx - minx)
+    return np.rint((coords - (minx, miny)) * scale).astype(np.int64)
+
+
+def _dedupe(points: np.ndarray) -> List[Tuple[int, int]]:
+    """Remover vértices consecutivos repetidos após quantização"""
+    if len(points) == 0:
+        return []
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return [tuple(p) for p in points[keep].tolist()]
+
+
+class PolygonLayer:
+    """Camada de polígonos/linhas com STRtree e simplificação por zoom"""
+
+    def __init__(self, geometries: Sequence, properties: Sequence[Dict[str, Any]],
+                 simplify_tolerance: float = 1.0, max_simplify_zoom: int = 14):
+        # Projetar uma vez para Mercator normalizado
+        self.geometries = np.array(
+            [shapely.transform(geom, _project_coords) for geom in geometries], dtype=object
+        )
+        self.properties = list(properties)
+        self.simplify_tolerance = simplify_tolerance  # em unidades de tile (extent)
+        self.max_simplify_zoom = max_simplify_zoom
+        self.tree = shapely.STRtree(self.geometries)
+        self._simplified: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def fingerprint(self) -> str:
+        """Hash das geometrias, propriedades e parâmetros de simplificação"""
+        digest = hashlib.blake2b(digest_size=8)
+        for wkb in shapely.to_wkb(self.geometries):
+            digest.update(wkb)
+        digest.update(json.dumps([self.properties, self.simplify_tolerance, self.max_simplify_zoom],
+                                 sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def from_features(cls, features: Iterable[Dict[str, Any]], **kwargs) -> "PolygonLayer":
+        geometries, properties = [], []
+        for feature in features:
+            if not feature.get("geometry"):
+                continue
+            geometries.append(shape(feature["geometry"]))
+            properties.append(feature.get("properties") or {})
+        return cls(geometries, properties, **kwargs)
+
+    @classmethod
+    def from_geojson(cls, *paths: Path, **kwargs) -> "PolygonLayer":
+        features = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                features.extend(json.load(f).get("features", []))
+        return cls.from_features(features, **kwargs)
+
+    def _geometries_for_zoom(self, z: int, extent: int) -> np.ndarray:
+        """Geometrias simplificadas para o zoom (calculadas uma vez e reutilizadas)"""
+        z = min(z, self.max_simplify_zoom)
+        simplified = self._simplified.get(z)
+        if simplified is None:
+            with self._lock:
+                simplified = self._simplified.get(z)
+                if simplified is None:
+                    tolerance = self.simplify_tolerance / (extent * (1 << z))
+                    simplified = shapely.simplify(self.geometries, tolerance, preserve_topology=True)
+                    self._simplified[z] = simplified
+        return simplified
+
+    def encode(self, encoder: LayerEncoder, z: int, x: int, y: int, buffer: int):
+        extent = encoder.extent
+        bounds = tile_bounds(z, x, y)
+        pad = (bounds[2] - bounds[0]) * buffer / extent
+        clip_box = (bounds[0] - pad, bounds[1] - pad, bounds[2] + pad, bounds[3] + pad)
+
+        indices = self.tree.query(box(*clip_box))
+        if not len(indices):
+            return
+
+        geometries = self._geometries_for_zoom(z, extent)
+        for index in np.sort(indices):
+            clipped = shapely.clip_by_rect(geometries[index], *clip_box)
+            if clipped.is_empty:
+                continue
+            self._encode_geometry(encoder, clipped, bounds, self.properties[index], int(index))
+
+    @staticmethod
+    def _encode_geometry(encoder: LayerEncoder, geometry, bounds, properties, feature_id: int):
+        extent = encoder.extent
+        polygons, lines = [], []
+        for part in getattr(geometry, "geoms", [geometry]):
+            if part.geom_type == "Polygon":
+                rings = [_dedupe(_to_tile_coords(np.asarray(part.exterior.coords)[:-1], bounds, extent))]
+                rings += [
+                    _dedupe(_to_tile_coords(np.asarray(interior.coords)[:-1], bounds, extent))
+                    for interior in part.interiors
+                ]
+                if len(rings[0]) >= 3:
+                    polygons.append(rings)
+            elif part.geom_type == "LineString":
+                line = _dedupe(_to_tile_coords(np.asarray(part.coords), bounds, extent))
+                if len(line) >= 2:
+                    lines.append(line)
+
+        if polygons:
+            encoder.add_feature(GEOM_POLYGON, encode_polygons(polygons), properties, feature_id)
+        if lines:
+            encoder.add_feature(GEOM_LINESTRING, encode_lines(lines), properties, feature_id)
+
+
+class PointLayer:
+    """Camada de pontos em arrays NumPy ordenados pela curva Z (milhões de pontos)"""
+
+    def __init__(self, lon: np.ndarray, lat: np.ndarray,
+                 columns: Optional[Dict[str, Sequence[Any]]] = None,
+                 max_points_per_tile: int = 5000, cluster_grid: int = 64):
+        mx, my = lonlat_to_mercator(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+        scale = 1 << POINT_INDEX_LEVEL
+        qx = np.clip((mx * scale).astype(np.int64), 0, scale - 1)
+        qy = np.clip((my * scale).astype(np.int64), 0, scale - 1)
+        codes = morton_code(qx, qy)
+
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.mx = mx[order]
+        self.my = my[order]
+        self.columns = {name: np.asarray(values, dtype=object)[order]
+                        for name, values in (columns or {}).items()}
+        self.max_points_per_tile = max_points_per_tile
+        self.cluster_grid = cluster_grid
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def fingerprint(self) -> str:
+        """Hash das coordenadas, colunas e parâmetros de agregação"""
+        digest = hashlib.blake2b(digest_size=8)
+        for array in (self.mx, self.my):
+            digest.update(np.ascontiguousarray(array).data)
+        digest.update(json.dumps([{name: values.tolist() for name, values in self.columns.items()},
+                                  self.max_points_per_tile, self.cluster_grid],
+                                 sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def from_features(cls, features: Iterable[Dict[str, Any]], **kwargs) -> "PointLayer":
+        lon, lat, rows = [], [], []
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") != "Point":
+                continue
+            lon.append(geometry["coordinates"][0])
+            lat.append(geometry["coordinates"][1])
+            rows.append(feature.get("properties") or {})
+        keys = sorted({key for row in rows for key in row})
+        columns = {key: [row.get(key) for row in rows] for key in keys}
+        return cls(np.array(lon), np.array(lat), columns, **kwargs)
+
+    @classmethod
+    def from_geojson(cls, *paths: Path, **kwargs) -> "PointLayer":
+        features = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                features.extend(json.load(f).get("features", []))
+        return cls.from_features(features, **kwargs)
+
+    def _tile_slice(self, z: int, x: int, y: int) -> slice:
+        """Intervalo contíguo de pontos no tile (z <= POINT_INDEX_LEVEL)"""
+        zi = min(z, POINT_INDEX_LEVEL)
+        shift = np.uint64(2 * (POINT_INDEX_LEVEL - zi))
+        base = morton_code(np.array([x >> (z - zi)]), np.array([y >> (z - zi)]))[0]
+        lo = np.searchsorted(self.codes, base << shift, side="left")
+        hi = np.searchsorted(self.codes, (base + np.uint64(1)) << shift, side="left")
+        return slice(int(lo), int(hi))
+
+    def encode(self, encoder: LayerEncoder, z: int, x: int, y: int, buffer: int):
+        extent = encoder.extent
+        bounds = tile_bounds(z, x, y)
+        window = self._tile_slice(z, x, y)
+        if window.start == window.stop:
+            return
+
+        coords = np.column_stack([self.mx[window], self.my[window]])
+        tile_coords = _to_tile_coords(coords, bounds, extent)
+        # Acima do nível do índice o intervalo cobre o tile pai: filtrar
+        inside = np.all((tile_coords >= 0) & (tile_coords < extent), axis=1)
+        offsets = np.nonzero(inside)[0]
+        tile_coords = tile_coords[offsets]
+        counts = np.ones(len(offsets), dtype=np.int64)
+
+        # Zooms baixos: agregar numa grelha (um ponto representativo por célula)
+        if len(offsets) > self.max_points_per_tile:
+            cell = extent // self.cluster_grid
+            cells = (tile_coords[:, 0] // cell) * self.cluster_grid + tile_coords[:, 1] // cell
+            _, first, counts = np.unique(cells, return_index=True, return_counts=True)
+            offsets = offsets[first]
+            tile_coords = tile_coords[first]
+
+        rows = offsets + window.start
+        columns = {name: values[rows] for name, values in self.columns.items()}
+        for i, ((px, py), count) in enumerate(zip(tile_coords.tolist(), counts.tolist())):
+            properties = {name: values[i] for name, values in columns.items()}
+            if count > 1:
+                properties["point_count"] = count
+            encoder.add_feature(GEOM_POINT, encode_points([(px, py)]), properties)
+
+
+@dataclass
+class CachedTile:
+    data: bytes
+    etag: str
+
+
+class TileCache:
+    """Cache LRU em memória (limitada em bytes) com nível opcional em disco"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[Path] = None,
+                 suffix: str = ".mvt"):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.suffix = suffix
+        self._entries: "OrderedDict[Tuple, CachedTile]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _disk_path(self, key: Tuple) -> Optional[Path]:
+        """Chave (prefixo..., z, x, y) -> disk_dir/prefixo.../z/x/y{suffix}"""
+        if not self.disk_dir:
+            return None
+        *prefix, z, x, y = key
+        return self.disk_dir.joinpath(*map(str, prefix), str(z), str(x), f"{y}{self.suffix}")
+
+    def get(self, key: Tuple) -> Optional[CachedTile]:
+        with self._lock:
+            tile = self._entries.get(key)
+            if tile is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return tile
+
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            data = path.read_bytes()
+            tile = CachedTile(data=data, etag=tile_etag(data))
+            self._put_memory(key, tile)
+            self.stats["disk_hits"] += 1
+            return tile
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: Tuple, tile: CachedTile):
+        self._put_memory(key, tile)
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(tile.data)
+                tmp.replace(path)
+            except OSError as e:
+                logger.warning(f"Não foi possível guardar tile em disco ({path}): {e}")
+
+    def _put_memory(self, key: Tuple, tile: CachedTile):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.data)
+            self._entries[key] = tile
+            self._bytes += len(tile.data)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+            **self.stats,
+        }
+
+
+def tile_etag(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest() + '"'
+
+
+class VectorTileServer:
+    """Registo de camadas (carregadas sob demanda) e geração de tiles MVT"""
+
+    def __init__(self, extent: int = 4096, buffer: int = 64, cache: Optional[TileCache] = None):
+        self.extent = extent
+        self.buffer = buffer
+        self.cache = cache or TileCache()
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._layers: Dict[str, Any] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        # (camada, hash do conteúdo) por nome: chave persistente dos tiles em disco
+        self._versions: Dict[str, Tuple[Any, str]] = {}
+        self._lock = threading.Lock()
+
+    def register_layer(self, name: str, loader: Callable[[], Any],
+                       min_zoom: int = 0, max_zoom: int = 16, description: str = ""):
+        """Registar camada com função que constrói PolygonLayer/PointLayer"""
+        self._loaders[name] = loader
+        self._metadata[name] = {"min_zoom": min_zoom, "max_zoom": max_zoom, "description": description}
+        self._layers.pop(name, None)
+
+    def set_layer(self, name: str, layer: Any):
+        """Substituir os dados de uma camada (invalida os tiles em cache)"""
+        with self._lock:
+            self._layers[name] = layer
+            self._metadata.setdefault(name, {"min_zoom": 0, "max_zoom": 16, "description": ""})
+
+    def has_layer(self, name: str) -> bool:
+        return name in self._loaders or name in self._layers
+
+    def get_layer(self, name: str) -> Any:
+        layer = self._layers.get(name)
+        if layer is None:
+            with self._lock:
+                layer = self._layers.get(name)
+                if layer is None:
+                    layer = self._loaders[name]()
+                    self._layers[name] = layer
+                    logger.info(f"Camada de tiles carregada: {name} ({len(layer)} features)")
+        return layer
+
+    def layer_version(self, name: str) -> str:
+        """
+        Versão dos tiles da camada: hash dos dados e dos parâmetros de codificação
+        Igual entre reinícios e workers com os mesmos dados; muda quando os dados mudam
+        """
+        layer = self.get_layer(name)
+        cached = self._versions.get(name)
+        if cached is not None and cached[0] is layer:
+            return cached[1]
+
+        metadata = self._metadata[name]
+        digest = hashlib.blake2b(layer.fingerprint().encode("utf-8"), digest_size=8)
+        digest.update(json.dumps([self.extent, self.buffer, metadata["min_zoom"],
+                                  metadata["max_zoom"]]).encode("utf-8"))
+        version = digest.hexdigest()
+        self._versions[name] = (layer, version)
+        return version
+
+    def get_tile(self, name: str, z: int, x: int, y: int) -> CachedTile:
+        """Tile MVT da camada (KeyError se desconhecida, ValueError se fora dos limites)"""
+        if not self.has_layer(name):
+            raise KeyError(name)
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise ValueError(f"Tile fora dos limites: {z}/{x}/{y}")
+
+        key = (name, self.layer_version(name), z, x, y)
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+
+        encoder = LayerEncoder(name, self.extent)
+        metadata = self._metadata[name]
+        if metadata["min_zoom"] <= z <= metadata["max_zoom"]:
+            self.get_layer(name).encode(encoder, z, x, y, self.buffer)
+
+        data = encode_tile([encoder])
+        tile = CachedTile(data=data, etag=tile_etag(data))
+        self.cache.put(key, tile)
+        return tile
+
+    def get_tilejson(self, base_url: str = "") -> Dict[str, Any]:
+        """Metadados das camadas no formato TileJSON"""
+        return {
+            "tilejson": "3.0.0",
+            "name": "BGAPP",
+            "scheme": "xyz",
+            "format": "pbf",
+            "tiles": [f"{base_url}/tiles/{{layer}}/{{z}}/{{x}}/{{y}}.mvt"],
+            "vector_layers": [
+                {"id": name, "minzoom": meta["min_zoom"], "maxzoom": meta["max_zoom"],
+                 "description": meta["description"], "loaded": name in self._layers}
+                for name, meta in self._metadata.items()
+            ],
+            "cache": self.cache.get_stats(),
+        }
+
+
+def _load_fishing_zones() -> PolygonLayer:
+    from ..ingest.fisheries_angola import AngolaFisheriesConnector
+
+    geometries, properties = [], []
+    for zone_id, zone in AngolaFisheriesConnector().fishing_zones.items():
+        b = zone["bounds"]
+        geometries.append(box(b["lon_min"], b["lat_min"], b["lon_max"], b["lat_max"]))
+        properties.append({"id": zone_id, "name": zone["name"],
+                           "main_species": ", ".join(zone["main_species"])})
+    return PolygonLayer(geometries, properties)
+
+
+def create_default_tile_server(cache_dir: Optional[Path] = None) -> VectorTileServer:
+    """Servidor com as camadas ZEE, zonas de pesca e ocorrências"""
+    server = VectorTileServer(cache=TileCache(disk_dir=cache_dir))
+    server.register_layer(
+        "zee",
+        lambda: PolygonLayer.from_geojson(
+            ROOT_DIR / "configs" / "zee_angola_official.geojson",
+            ROOT_DIR / "configs" / "cabinda_zee_high_quality.geojson",
+        ),
+        description="Zona Económica Exclusiva de Angola (incl. Cabinda)"
+    )
+    server.register_layer("fishing_zones", _load_fishing_zones, description="Zonas de pesca")
+    server.register_layer(
+        "occurrences",
+        lambda: PointLayer.from_geojson(ROOT_DIR / "infra" / "pygeoapi" / "localdata" / "occurrences.geojson"),
+        max_zoom=MAX_ZOOM,
+        description="Ocorrências de espécies (GBIF/OBIS)"
+    )
+    return server
+
+
+# Instância global do servidor de tiles
+vector_tile_server = create_default_tile_server(
+    cache_dir=Path(os.getenv("VECTOR_TILE_CACHE_DIR", "data/cache/tiles"))
+)
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""
+Instante de início do arranque da API
+Importado antes de qualquer outro módulo em admin_api para medir o tempo de boot
+"""
+
+import time
+
+BOOT_STARTED = time.perf_counter()
@@ -16,6 +16,7 @@ from asyncpg.pool import PoolConnectionProxy
 
 from .secure_config import get_settings
 from .error_handler import error_handler, with_error_handling
+from .instrumentation import instrumentation, query_label
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -120,11 +121,12 @@ class DatabasePoolManager:
                     logger.error(f"Error releasing connection: {e}")
     
     @with_error_handling("database", max_retries=3)
-    async def execute_query(self, query: str, *args, **kwargs) -> Any:
+    async def execute_query(self, query: str, *args, query_name: Optional[str] = None, **kwargs) -> Any:
         """Executar query com retry automático"""
         async with self.get_connection() as conn:
             try:
-                result = await conn.fetch(query, *args, **kwargs)
+                with instrumentation.track_db_query(query_name or query_label(query)):
+                    result = await conn.fetch(query, *args, **kwargs)
                 self.stats['successful_queries'] += 1
                 return result
             except Exception as e:
@@ -133,11 +135,12 @@ class DatabasePoolManager:
                 raise
     
     @with_error_handling("database", max_retries=3)
-    async def execute_query_one(self, query: str, *args, **kwargs) -> Any:
+    async def execute_query_one(self, query: str, *args, query_name: Optional[str] = None, **kwargs) -> Any:
         """Executar query que retorna um resultado"""
         async with self.get_connection() as conn:
             try:
-                result = await conn.fetchrow(query, *args, **kwargs)
+                with instrumentation.track_db_query(query_name or query_label(query)):
+                    result = await conn.fetchrow(query, *args, **kwargs)
                 self.stats['successful_queries'] += 1
                 return result
             except Exception as e:
@@ -146,11 +149,12 @@ class DatabasePoolManager:
                 raise
     
     @with_error_handling("database", max_retries=3)
-    async def execute_query_val(self, query: str, *args, **kwargs) -> Any:
+    async def execute_query_val(self, query: str, *args, query_name: Optional[str] = None, **kwargs) -> Any:
         """Executar query que retorna um valor"""
         async with self.get_connection() as conn:
             try:
-                result = await conn.fetchval(query, *args, **kwargs)
+                with instrumentation.track_db_query(query_name or query_label(query)):
+                    result = await conn.fetchval(query, *args, **kwargs)
                 self.stats['successful_queries'] += 1
                 return result
             except Exception as e:
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Registo central de executores para trabalho bloqueante
+Pools de threads separados e limitados para I/O, CPU e subprocessos, e um pool
+de processos para trabalho CPU que retém o GIL (ex.: renderização matplotlib),
+para que código síncrono nunca corra diretamente no event loop
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+IO = "io"
+CPU = "cpu"
+SUBPROCESS = "subprocess"
+PROCESS = "process"
+
+
+class ExecutorRegistry:
+    """Pools nomeados (threads e um pool de processos), criados sob demanda"""
+
+    def __init__(self, io_workers: int = 32, cpu_workers: Optional[int] = None,
+                 subprocess_workers: int = 4, process_workers: Optional[int] = None):
+        self.pool_sizes = {
+            IO: io_workers,
+            CPU: cpu_workers or max(2, os.cpu_count() or 2),
+            SUBPROCESS: subprocess_workers,
+            PROCESS: process_workers or max(1, min(4, (os.cpu_count() or 2) - 1)),
+        }
+        self._pools: Dict[str, Executor] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            kind: {"submitted": 0, "completed": 0, "failed": 0, "in_flight": 0}
+            for kind in self.pool_sizes
+        }
+
+    def get(self, kind: str) -> Executor:
+        """Obter (criando se necessário) o pool de um tipo"""
+        if kind not in self.pool_sizes:
+            raise ValueError(f"Tipo de executor desconhecido: {kind}")
+
+        pool = self._pools.get(kind)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(kind)
+                if pool is None:
+                    if kind == PROCESS:
+                        # spawn: nunca fazer fork de um processo com threads ativas
+                        pool = ProcessPoolExecutor(
+                            max_workers=self.pool_sizes[kind],
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        pool = ThreadPoolExecutor(
+                            max_workers=self.pool_sizes[kind],
+                            thread_name_prefix=f"bgapp-{kind}"
+                        )
+                    self._pools[kind] = pool
+        return pool
+
+    async def run(self, kind: str, func: Callable, *args, **kwargs) -> Any:
+        """Executar função bloqueante no pool indicado"""
+        pool = self.get(kind)
+        stats = self._stats[kind]
+        stats["submitted"] += 1
+        stats["in_flight"] += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                pool, partial(func, *args, **kwargs)
+            )
+            stats["completed"] += 1
+            return result
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Estatísticas por pool (inclui profundidade da fila)"""
+        result = {}
+        for kind, size in self.pool_sizes.items():
+            pool = self._pools.get(kind)
+            if pool is None:
+                queue_depth = 0
+            elif isinstance(pool, ProcessPoolExecutor):
+                queue_depth = len(pool._pending_work_items)
+            else:
+                queue_depth = pool._work_queue.qsize()
+            result[kind] = {
+                "max_workers": size,
+                "queue_depth": queue_depth,
+                **self._stats[kind],
+            }
+        return result
+
+    def shutdown(self, wait: bool = False):
+        """Encerrar todos os pools"""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=wait, cancel_futures=True)
+            self._pools.clear()
+
+
+# Instância global do registo de executores
+executors = ExecutorRegistry()
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Executar I/O bloqueante (HTTP síncrono, drivers de BD, ficheiros)"""
+    return await executors.run(IO, func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Executar trabalho intensivo de CPU (compressão, serialização)"""
+    return await executors.run(CPU, func, *args, **kwargs)
+
+
+async def run_subprocess(func: Callable, *args, **kwargs) -> Any:
+    """Executar subprocessos (subprocess.run, docker, pg_dump)"""
+    return await executors.run(SUBPROCESS, func, *args, **kwargs)
+
+
+async def run_process(func: Callable, *args, **kwargs) -> Any:
+    """Executar trabalho CPU pesado num processo (função e argumentos têm de ser picklable)"""
+    return await executors.run(PROCESS, func, *args, **kwargs)
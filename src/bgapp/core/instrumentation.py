@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Instrumentação unificada BGAPP (Prometheus/OpenMetrics)
+Contadores, gauges e histogramas por rota, método, status, conector e query
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, CONTENT_TYPE_LATEST
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    from prometheus_client.openmetrics.exposition import (
+        generate_latest as generate_openmetrics,
+        CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+from .metrics_store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+# Buckets de latência (segundos) - permitem p50/p95/p99 via histogram_quantile
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONNECTOR_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DB_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+_SQL_VERB = re.compile(r"^\s*(\w+)")
+
+
+def query_label(query: str) -> str:
+    """Nome de baixa cardinalidade para uma query sem nome explícito"""
+    match = _SQL_VERB.match(query or "")
+    return match.group(1).lower() if match else "unknown"
+
+
+class _NoopMetric:
+    """Substituto quando prometheus_client não está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+
+class MetricsStoreCollector:
+    """Expõe o último valor de cada série de um MetricsStore como gauge"""
+
+    def __init__(self, store: MetricsStore, name: str, documentation: str):
+        self.store = store
+        self.name = name
+        self.documentation = documentation
+
+    def describe(self) -> Iterable:
+        # Evitar que o registo chame collect() no momento do registo
+        return []
+
+    def collect(self) -> Iterable:
+        family = GaugeMetricFamily(self.name, self.documentation, labels=["metric"])
+        for metric_name in self.store.names():
+            latest = self.store.latest(metric_name)
+            if latest is not None:
+                family.add_metric([metric_name], latest[1])
+        yield family
+
+
+class Instrumentation:
+    """Superfície única de métricas para API, conectores e base de dados"""
+
+    def __init__(self, registry: Optional["CollectorRegistry"] = None):
+        self.enabled = PROMETHEUS_AVAILABLE
+
+        if not self.enabled:
+            self.registry = None
+            noop = _NoopMetric()
+            self.http_requests_total = noop
+            self.http_request_duration = noop
+            self.http_requests_in_progress = noop
+            self.connector_requests_total = noop
+            self.connector_request_duration = noop
+            self.connector_bytes_total = noop
+            self.connector_cache_requests_total = noop
+            self.db_queries_total = noop
+            self.db_query_duration = noop
+            return
+
+        self.registry = registry or CollectorRegistry(auto_describe=True)
+
+        # API HTTP
+        self.http_requests_total = Counter(
+            "bgapp_http_requests_total", "Pedidos HTTP processados",
+            ["method", "route", "status"], registry=self.registry
+        )
+        self.http_request_duration = Histogram(
+            "bgapp_http_request_duration_seconds", "Latência dos pedidos HTTP",
+            ["method", "route"], buckets=HTTP_LATENCY_BUCKETS, registry=self.registry
+        )
+        self.http_requests_in_progress = Gauge(
+            "bgapp_http_requests_in_progress", "Pedidos HTTP em curso",
+            ["method"], registry=self.registry
+        )
+
+        # Conectores de ingestão
+        self.connector_requests_total = Counter(
+            "bgapp_connector_requests_total", "Pedidos feitos pelos conectores",
+            ["connector", "outcome"], registry=self.registry
+        )
+        self.connector_request_duration = Histogram(
+            "bgapp_connector_request_duration_seconds", "Latência dos pedidos dos conectores",
+            ["connector"], buckets=CONNECTOR_LATENCY_BUCKETS, registry=self.registry
+        )
+        self.connector_bytes_total = Counter(
+            "bgapp_connector_downloaded_bytes_total", "Bytes descarregados pelos conectores",
+            ["connector"], registry=self.registry
+        )
+        self.connector_cache_requests_total = Counter(
+            "bgapp_connector_cache_requests_total", "Acessos à cache dos conectores",
+            ["connector", "result"], registry=self.registry
+        )
+
+        # Base de dados
+        self.db_queries_total = Counter(
+            "bgapp_db_queries_total", "Queries executadas",
+            ["query", "outcome"], registry=self.registry
+        )
+        self.db_query_duration = Histogram(
+            "bgapp_db_query_duration_seconds", "Latência das queries",
+            ["query"], buckets=DB_LATENCY_BUCKETS, registry=self.registry
+        )
+
+    def observe_http_request(self, method: str, route: str, status: int, duration: float):
+        """Registar um pedido HTTP concluído"""
+        self.http_requests_total.labels(method, route, str(status)).inc()
+        self.http_request_duration.labels(method, route).observe(duration)
+
+    def observe_connector_request(self, connector: str, duration: float, success: bool = True,
+                                  bytes_downloaded: int = 0, cache_hit: Optional[bool] = None):
+        """Registar um pedido feito por um conector"""
+        self.connector_requests_total.labels(connector, "success" if success else "error").inc()
+        if duration > 0:
+            self.connector_request_duration.labels(connector).observe(duration)
+        if bytes_downloaded:
+            self.connector_bytes_total.labels(connector).inc(bytes_downloaded)
+        if cache_hit is not None:
+            self.connector_cache_requests_total.labels(connector, "hit" if cache_hit else "miss").inc()
+
+    def observe_db_query(self, query_name: str, duration: float, success: bool = True):
+        """Registar uma query executada"""
+        self.db_queries_total.labels(query_name, "success" if success else "error").inc()
+        self.db_query_duration.labels(query_name).observe(duration)
+
+    @contextmanager
+    def track_db_query(self, query_name: str):
+        """Medir a duração de uma query (funciona em código síncrono e assíncrono)"""
+        start = time.perf_counter()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self.observe_db_query(query_name, time.perf_counter() - start, success)
+
+    def register_metrics_store(self, store: MetricsStore, name: str, documentation: str):
+        """Expor um MetricsStore existente (lido apenas no momento do scrape)"""
+        if not self.enabled:
+            return
+        try:
+            self.registry.register(MetricsStoreCollector(store, name, documentation))
+        except ValueError as e:
+            logger.warning(f"Collector {name} já registado: {e}")
+
+    def render(self, openmetrics: bool = False) -> Tuple[bytes, str]:
+        """Gerar exposição em formato texto Prometheus ou OpenMetrics"""
+        if not self.enabled:
+            return b"# prometheus_client not installed\n", CONTENT_TYPE_LATEST
+        if openmetrics:
+            return generate_openmetrics(self.registry), OPENMETRICS_CONTENT_TYPE
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+# Instância global de instrumentação
+instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    """Obter instância global de instrumentação"""
+    return instrumentation
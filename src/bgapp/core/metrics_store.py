@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Armazenamento compacto de séries temporais de métricas
+Buffers circulares NumPy pré-alocados (timestamp float64 + valor float32)
+com inserção O(1), janelas por pesquisa binária e agregações 1s/1m/1h
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Resoluções suportadas para agregações (segundos)
+ROLLUP_RESOLUTIONS: Dict[str, float] = {
+    "1s": 1.0,
+    "1m": 60.0,
+    "1h": 3600.0,
+}
+
+
+class RingBufferSeries:
+    """Série temporal de capacidade fixa sobre arrays NumPy pré-alocados"""
+
+    __slots__ = ("capacity", "_timestamps", "_values", "_head", "_count")
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float32)
+        self._head = 0  # Próxima posição de escrita
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos buffers (fixa por série)"""
+        return self._timestamps.nbytes + self._values.nbytes
+
+    def append(self, value: float, timestamp: Optional[float] = None):
+        """Adicionar amostra em O(1), sobrescrevendo a mais antiga quando cheio"""
+        ts = time.time() if timestamp is None else float(timestamp)
+
+        # Manter timestamps não decrescentes para a pesquisa binária
+        if self._count:
+            last_ts = self._timestamps[self._head - 1]
+            if ts < last_ts:
+                ts = last_ts
+
+        self._timestamps[self._head] = ts
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _segments(self) -> Tuple[slice, ...]:
+        """Fatias cronológicas do buffer (mais antiga primeiro)"""
+        if self._count < self.capacity:
+            return (slice(0, self._count),)
+        return (slice(self._head, self.capacity), slice(0, self._head))
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """Última amostra como (timestamp, valor)"""
+        if not self._count:
+            return None
+        idx = self._head - 1
+        return float(self._timestamps[idx]), float(self._values[idx])
+
+    def window(self, start: Optional[float] = None,
+               end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Amostras com start <= timestamp <= end, em ordem cronológica"""
+        ts_parts = []
+        value_parts = []
+
+        for segment in self._segments():
+            timestamps = self._timestamps[segment]
+            if not len(timestamps):
+                continue
+
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="right"))
+            if hi > lo:
+                ts_parts.append(timestamps[lo:hi])
+                value_parts.append(self._values[segment][lo:hi])
+
+        if not ts_parts:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+        if len(ts_parts) == 1:
+            return ts_parts[0].copy(), value_parts[0].copy()
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    def last(self, n: int) -> np.ndarray:
+        """Últimos n valores em ordem cronológica"""
+        n = min(n, self._count)
+        if n <= 0:
+            return np.empty(0, dtype=np.float32)
+
+        idx = (np.arange(self._head - n, self._head)) % self.capacity
+        return self._values[idx]
+
+    def stats(self, start: Optional[float] = None,
+              end: Optional[float] = None) -> Dict[str, float]:
+        """Estatísticas da janela (vazio se não houver amostras)"""
+        _, values = self.window(start, end)
+        if not len(values):
+            return {}
+
+        values = values.astype(np.float64)
+        return {
+            "current": float(values[-1]),
+            "average": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)),
+            "count": int(len(values)),
+        }
+
+    def rollup(self, resolution: float, start: Optional[float] = None,
+               end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Agregar a janela em intervalos de `resolution` segundos"""
+        timestamps, values = self.window(start, end)
+        if not len(timestamps):
+            empty = np.empty(0, dtype=np.float64)
+            return {"timestamp": empty, "average": empty, "min": empty,
+                    "max": empty, "count": np.empty(0, dtype=np.int64)}
+
+        buckets = np.floor(timestamps / resolution) * resolution
+        # Timestamps ordenados => os índices de início de cada intervalo são crescentes
+        bucket_ts, starts = np.unique(buckets, return_index=True)
+        counts = np.diff(np.append(starts, len(values)))
+        values = values.astype(np.float64)
+
+        return {
+            "timestamp": bucket_ts,
+            "average": np.add.reduceat(values, starts) / counts,
+            "min": np.minimum.reduceat(values, starts),
+            "max": np.maximum.reduceat(values, starts),
+            "count": counts,
+        }
+
+
+class MetricsStore:
+    """Conjunto de séries de métricas com memória fixa por série"""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._series: Dict[str, RingBufferSeries] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._series
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def names(self) -> List[str]:
+        """Nomes das séries registadas"""
+        return list(self._series)
+
+    def series(self, name: str, create: bool = False) -> Optional[RingBufferSeries]:
+        """Obter série (opcionalmente criando-a)"""
+        series = self._series.get(name)
+        if series is None and create:
+            with self._lock:
+                series = self._series.setdefault(name, RingBufferSeries(self.capacity))
+        return series
+
+    def append(self, name: str, value: float, timestamp: Optional[float] = None):
+        """Adicionar amostra à série `name`"""
+        self.series(name, create=True).append(value, timestamp)
+
+    def latest(self, name: str) -> Optional[Tuple[float, float]]:
+        """Última amostra da série"""
+        series = self._series.get(name)
+        return series.latest() if series is not None else None
+
+    def window(self, name: str, seconds: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Amostras dos últimos `seconds` segundos (toda a série se None)"""
+        series = self._series.get(name)
+        if series is None:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+        start = time.time() - seconds if seconds is not None else None
+        return series.window(start)
+
+    def last(self, name: str, n: int) -> np.ndarray:
+        """Últimos n valores da série"""
+        series = self._series.get(name)
+        return series.last(n) if series is not None else np.empty(0, dtype=np.float32)
+
+    def stats(self, name: str, seconds: Optional[float] = None) -> Dict[str, float]:
+        """Estatísticas dos últimos `seconds` segundos"""
+        series = self._series.get(name)
+        if series is None:
+            return {}
+        start = time.time() - seconds if seconds is not None else None
+        return series.stats(start)
+
+    def rollup(self, name: str, resolution: str = "1m",
+               seconds: Optional[float] = 3600) -> List[Dict[str, Any]]:
+        """Série agregada por resolução ('1s', '1m' ou '1h')"""
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(
+                f"Resolução inválida: {resolution} (suportadas: {', '.join(ROLLUP_RESOLUTIONS)})"
+            )
+
+        series = self._series.get(name)
+        if series is None:
+            return []
+
+        start = time.time() - seconds if seconds is not None else None
+        buckets = series.rollup(ROLLUP_RESOLUTIONS[resolution], start)
+
+        return [
+            {
+                "timestamp": float(ts),
+                "average": float(avg),
+                "min": float(vmin),
+                "max": float(vmax),
+                "count": int(count),
+            }
+            for ts, avg, vmin, vmax, count in zip(
+                buckets["timestamp"], buckets["average"], buckets["min"],
+                buckets["max"], buckets["count"]
+            )
+        ]
+
+    def total_samples(self) -> int:
+        """Número total de amostras guardadas"""
+        return sum(len(series) for series in self._series.values())
+
+    def memory_bytes(self) -> int:
+        """Memória total dos buffers"""
+        return sum(series.nbytes for series in self._series.values())
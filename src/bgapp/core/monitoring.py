@@ -7,7 +7,7 @@ Detecta problemas antes que afetem os utilizadores
 import asyncio
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, field
@@ -16,6 +16,8 @@ from pydantic import BaseModel
 
 from .error_handler import error_handler, ErrorSeverity
 from .database_pool import db_pool
+from .metrics_store import MetricsStore
+from .executors import run_io
 
 
 class AlertLevel(Enum):
@@ -77,7 +79,9 @@ class MonitoringSystem:
     """Sistema de monitorização proativo"""
     
     def __init__(self):
-        self.metrics: Dict[str, List[Metric]] = {}
+        # Séries em buffers circulares (últimas 1000 amostras por métrica)
+        self.metrics_store = MetricsStore(capacity=1000)
+        self.metric_info: Dict[str, Dict[str, Any]] = {}
         self.alerts: List[Alert] = []
         self.thresholds: Dict[str, Threshold] = {}
         self.alert_handlers: Dict[AlertLevel, List[Callable]] = {
@@ -143,23 +147,14 @@ class MonitoringSystem:
     def add_metric(self, name: str, value: float, metric_type: MetricType = MetricType.GAUGE, 
                    labels: Dict[str, str] = None, description: str = ""):
         """Adicionar métrica"""
-        metric = Metric(
-            name=name,
-            value=value,
-            type=metric_type,
-            timestamp=datetime.now(),
-            labels=labels or {},
-            description=description
-        )
+        self.metrics_store.append(name, value)
         
-        if name not in self.metrics:
-            self.metrics[name] = []
-        
-        self.metrics[name].append(metric)
-        
-        # Manter apenas últimas 1000 métricas por tipo
-        if len(self.metrics[name]) > 1000:
-            self.metrics[name] = self.metrics[name][-1000:]
+        if name not in self.metric_info or labels or description:
+            self.metric_info[name] = {
+                "type": metric_type,
+                "labels": labels or {},
+                "description": description
+            }
         
         # Verificar thresholds
         self._check_thresholds(name, value)
@@ -171,16 +166,16 @@ class MonitoringSystem:
             return
         
         # Obter valores recentes para verificar violações consecutivas
-        recent_metrics = self.get_recent_metrics(
+        _, window_values = self.metrics_store.window(
             metric_name, 
             seconds=threshold.window_seconds
         )
         
-        if len(recent_metrics) < threshold.consecutive_violations:
+        if len(window_values) < threshold.consecutive_violations:
             return
         
         # Verificar se todas as métricas recentes violaram o threshold
-        recent_values = [m.value for m in recent_metrics[-threshold.consecutive_violations:]]
+        recent_values = window_values[-threshold.consecutive_violations:].tolist()
         
         violation_level = self._get_violation_level(threshold, value)
         if not violation_level:
@@ -287,37 +282,37 @@ class MonitoringSystem:
     
     def get_recent_metrics(self, name: str, seconds: int = 300) -> List[Metric]:
         """Obter métricas recentes"""
-        if name not in self.metrics:
+        if name not in self.metrics_store:
             return []
         
-        cutoff_time = datetime.now() - timedelta(seconds=seconds)
+        timestamps, values = self.metrics_store.window(name, seconds)
+        info = self.metric_info.get(name, {})
         return [
-            m for m in self.metrics[name]
-            if m.timestamp >= cutoff_time
+            Metric(
+                name=name,
+                value=float(value),
+                type=info.get("type", MetricType.GAUGE),
+                timestamp=datetime.fromtimestamp(ts),
+                labels=info.get("labels", {}),
+                description=info.get("description", "")
+            )
+            for ts, value in zip(timestamps.tolist(), values.tolist())
         ]
     
     def get_metric_stats(self, name: str, seconds: int = 300) -> Dict[str, float]:
         """Obter estatísticas de uma métrica"""
-        recent_metrics = self.get_recent_metrics(name, seconds)
-        
-        if not recent_metrics:
-            return {}
-        
-        values = [m.value for m in recent_metrics]
-        
-        return {
-            "current": values[-1] if values else 0,
-            "average": sum(values) / len(values),
-            "min": min(values),
-            "max": max(values),
-            "count": len(values)
-        }
+        return self.metrics_store.stats(name, seconds)
+    
+    def get_metric_rollup(self, name: str, resolution: str = "1m",
+                          seconds: int = 3600) -> List[Dict[str, Any]]:
+        """Obter série agregada de uma métrica (1s, 1m ou 1h)"""
+        return self.metrics_store.rollup(name, resolution, seconds)
     
     async def collect_system_metrics(self):
         """Coletar métricas do sistema"""
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU (cpu_percent(interval=1) dorme 1s - nunca no event loop)
+            cpu_percent = await run_io(psutil.cpu_percent, interval=1)
             self.add_metric("cpu_percent", cpu_percent, MetricType.GAUGE)
             
             # Memória
@@ -326,7 +321,7 @@ class MonitoringSystem:
             self.add_metric("memory_available", memory.available, MetricType.GAUGE)
             
             # Disco
-            disk = psutil.disk_usage('/')
+            disk = await run_io(psutil.disk_usage, '/')
             disk_percent = (disk.used / disk.total) * 100
             self.add_metric("disk_percent", disk_percent, MetricType.GAUGE)
             self.add_metric("disk_free", disk.free, MetricType.GAUGE)
@@ -453,6 +448,7 @@ def get_monitoring_stats():
     return {
         "health_score": monitoring_system.get_system_health_score(),
         "alerts": monitoring_system.get_alert_summary(),
-        "metrics_count": len(monitoring_system.metrics),
+        "metrics_count": len(monitoring_system.metrics_store),
+        "metrics_memory_bytes": monitoring_system.metrics_store.memory_bytes(),
         "is_running": monitoring_system.is_running
     }
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Profiler por amostragem em processo para BGAPP
+Recolhe stacks de todas as threads (incluindo a do event loop) e agrega-as
+em "collapsed stacks" compatíveis com flamegraph.pl / speedscope
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .metrics_store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+LOOP_THREAD_LABEL = "asyncio-loop"
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    """Identificação estável de um frame (função, ficheiro e linha de definição)"""
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, max_depth: int = MAX_STACK_DEPTH) -> str:
+    """Converter um frame em stack colapsada (raiz primeiro, separada por ';')"""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Formato de texto 'stack contagem' por linha (entrada do flamegraph.pl)"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+class SamplingProfiler:
+    """Amostrador de stacks com custo limitado por um orçamento de overhead"""
+
+    def __init__(self, rate_hz: float = 10.0, history_seconds: int = 120,
+                 overhead_budget_percent: float = 1.0, max_profile_rate_hz: float = 250.0):
+        self.base_interval = 1.0 / rate_hz
+        self.interval = self.base_interval
+        self.overhead_budget = overhead_budget_percent / 100.0
+        self.max_profile_rate_hz = max_profile_rate_hz
+
+        # Amostras recentes (timestamp, thread, stack) para traces de requests lentos,
+        # dimensionadas para ~8 threads ativas
+        max_samples = int(rate_hz * history_seconds * 8)
+        self.recent_samples: Deque[Tuple[float, str, str]] = deque(maxlen=max_samples)
+
+        self.loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._profile_lock = threading.Lock()
+
+        self.stats = {
+            "samples_taken": 0,
+            "sampling_time_seconds": 0.0,
+            "started_at": None,
+            "rate_reductions": 0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def attach_loop(self):
+        """Registar a thread do event loop (chamar a partir do próprio loop)"""
+        self.loop_thread_id = threading.get_ident()
+
+    def _thread_labels(self) -> Dict[int, str]:
+        labels = {thread.ident: thread.name for thread in threading.enumerate()}
+        if self.loop_thread_id is not None:
+            labels[self.loop_thread_id] = LOOP_THREAD_LABEL
+        return labels
+
+    def _sample(self) -> Dict[str, str]:
+        """Uma amostra: stack colapsada por thread (exceto a do próprio profiler)"""
+        own_id = threading.get_ident()
+        labels = self._thread_labels()
+        return {
+            labels.get(thread_id, f"thread-{thread_id}"): collapse_stack(frame)
+            for thread_id, frame in sys._current_frames().items()
+            if thread_id != own_id
+        }
+
+    def _run(self):
+        """Loop de amostragem contínua em background"""
+        while not self._stop_event.wait(self.interval):
+            start = time.perf_counter()
+            now = time.time()
+            for thread_label, stack in self._sample().items():
+                self.recent_samples.append((now, thread_label, stack))
+            elapsed = time.perf_counter() - start
+
+            self.stats["samples_taken"] += 1
+            self.stats["sampling_time_seconds"] += elapsed
+
+            # Manter o custo abaixo do orçamento reduzindo a frequência
+            if elapsed > self.interval * self.overhead_budget:
+                self.interval = min(self.interval * 2, 1.0)
+                self.stats["rate_reductions"] += 1
+            elif self.interval > self.base_interval and elapsed < self.interval * self.overhead_budget / 4:
+                self.interval = max(self.interval / 2, self.base_interval)
+
+    def start(self):
+        """Iniciar amostragem contínua"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="bgapp-profiler", daemon=True)
+        self._thread.start()
+        self.stats["started_at"] = time.time()
+        logger.info(f"Profiler por amostragem iniciado ({1.0 / self.interval:.0f} Hz)")
+
+    def stop(self):
+        """Parar amostragem contínua"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def samples_between(self, start: float, end: float,
+                        thread_label: Optional[str] = None) -> Counter:
+        """Agregar amostras contínuas numa janela temporal"""
+        stacks = Counter()
+        for ts, label, stack in list(self.recent_samples):
+            if start <= ts <= end and (thread_label is None or label == thread_label):
+                stacks[f"{label};{stack}"] += 1
+        return stacks
+
+    def profile(self, duration: float, rate_hz: float = 100.0) -> Counter:
+        """Perfil dedicado (bloqueante - executar fora do event loop)"""
+        rate_hz = min(rate_hz, self.max_profile_rate_hz)
+        interval = 1.0 / rate_hz
+
+        if not self._profile_lock.acquire(blocking=False):
+            raise RuntimeError("Já existe um perfil em curso")
+
+        try:
+            stacks = Counter()
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                for thread_label, stack in self._sample().items():
+                    stacks[f"{thread_label};{stack}"] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._profile_lock.release()
+
+    async def profile_async(self, duration: float, rate_hz: float = 100.0) -> Counter:
+        """Perfil dedicado executado numa thread para não bloquear o loop"""
+        return await asyncio.to_thread(self.profile, duration, rate_hz)
+
+    def get_status(self) -> Dict[str, object]:
+        """Estado e overhead estimado do profiler"""
+        started_at = self.stats["started_at"]
+        uptime = time.time() - started_at if started_at and self.is_running else 0.0
+        overhead = (self.stats["sampling_time_seconds"] / uptime * 100) if uptime else 0.0
+        return {
+            "running": self.is_running,
+            "current_rate_hz": round(1.0 / self.interval, 2),
+            "samples_taken": self.stats["samples_taken"],
+            "buffered_samples": len(self.recent_samples),
+            "rate_reductions": self.stats["rate_reductions"],
+            "estimated_overhead_percent": round(overhead, 4),
+        }
+
+
+class LoopLagMonitor:
+    """Mede o atraso do event loop (tempo extra além do sleep pedido)"""
+
+    METRIC_NAME = "event_loop_lag_ms"
+
+    def __init__(self, store: Optional[MetricsStore] = None, interval: float = 0.5):
+        self.store = store or MetricsStore(capacity=7200)
+        self.interval = interval
+        self.last_heartbeat: Optional[float] = None  # time.monotonic() do último tick
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self.last_heartbeat = time.monotonic()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_heartbeat = time.monotonic()
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.store.append(self.METRIC_NAME, lag_ms)
+
+    def start(self):
+        """Iniciar medição (chamar dentro do event loop)"""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Parar medição"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self, seconds: int = 300) -> Dict[str, float]:
+        """Estatísticas do atraso do loop na janela"""
+        return self.store.stats(self.METRIC_NAME, seconds)
+
+
+class LoopStallDetector:
+    """Watchdog (thread) que deteta bloqueios do event loop e regista a stack culpada"""
+
+    def __init__(self, lag_monitor: LoopLagMonitor, threshold_ms: float = 250.0,
+                 max_events: int = 100):
+        self.lag_monitor = lag_monitor
+        self.threshold = threshold_ms / 1000.0
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.stalls_total = 0
+        self.loop_thread_id: Optional[int] = None
+        self._reported_heartbeat: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Iniciar watchdog (chamar a partir do event loop a vigiar)"""
+        if self.is_running:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="bgapp-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Parar watchdog"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _run(self):
+        check_interval = min(self.lag_monitor.interval, self.threshold) / 2
+        while not self._stop_event.wait(check_interval):
+            heartbeat = self.lag_monitor.last_heartbeat
+            if heartbeat is None or heartbeat == self._reported_heartbeat:
+                continue
+
+            # Tempo além do próximo tick esperado = tempo em que o loop está bloqueado
+            stalled = time.monotonic() - heartbeat - self.lag_monitor.interval
+            if stalled >= self.threshold:
+                self._reported_heartbeat = heartbeat
+                self._record_stall(stalled)
+
+    def _record_stall(self, stalled: float):
+        """Capturar a stack da thread do loop enquanto ainda está bloqueada"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        self.stalls_total += 1
+        self.stalls.append({
+            "timestamp": time.time(),
+            "stalled_ms": round(stalled * 1000, 1),
+            "stack": stack,
+        })
+        logger.warning(
+            f"Event loop bloqueado há {stalled * 1000:.0f}ms "
+            f"(limite {self.threshold * 1000:.0f}ms). Stack:\n{stack}"
+        )
+
+    def get_stats(self, seconds: int = 300) -> Dict[str, Any]:
+        """Contagem de bloqueios (sem stacks, seguro para endpoints públicos)"""
+        cutoff = time.time() - seconds
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls_total": self.stalls_total,
+            "stalls_recent": sum(1 for stall in self.stalls if stall["timestamp"] >= cutoff),
+        }
+
+    def recent_stalls(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Últimos bloqueios com as respetivas stacks"""
+        return list(self.stalls)[-limit:]
+
+
+def create_profiler_from_settings(settings, store: Optional[MetricsStore] = None
+                                  ) -> Tuple[SamplingProfiler, LoopLagMonitor]:
+    """Criar profiler e monitor de lag a partir de ProfilingSettings"""
+    profiler = SamplingProfiler(
+        rate_hz=settings.background_rate_hz,
+        history_seconds=settings.history_seconds,
+        overhead_budget_percent=settings.overhead_budget_percent,
+        max_profile_rate_hz=settings.max_profile_rate_hz,
+    )
+    lag_monitor = LoopLagMonitor(store=store, interval=settings.loop_lag_interval_ms / 1000.0)
+    return profiler, lag_monitor
@@ -107,6 +107,9 @@ class APISettings(BaseSettings):
     default_page_size: int = 100
     max_query_complexity: int = 10
     
+    # Subsistemas carregados em background no arranque (os restantes no primeiro uso)
+    preload_subsystems: List[str] = ["qgis"]
+    
     model_config = {"extra": "allow"}
 
 class LoggingSettings(BaseSettings):
@@ -125,6 +128,22 @@ class LoggingSettings(BaseSettings):
     
     model_config = {"extra": "allow"}
 
+class ProfilingSettings(BaseSettings):
+    """Configurações do profiler por amostragem (opt-in)"""
+    
+    enabled: bool = False
+    background_rate_hz: float = 10.0      # Amostragem contínua (traces de requests lentos)
+    max_profile_rate_hz: float = 250.0    # Limite para perfis pedidos via endpoint
+    max_profile_seconds: int = 60
+    overhead_budget_percent: float = 1.0
+    history_seconds: int = 120
+    slow_request_threshold_ms: float = 1000.0
+    loop_lag_interval_ms: float = 500.0
+    loop_watchdog_enabled: bool = True    # Deteção de bloqueios do event loop (sempre barata)
+    loop_stall_threshold_ms: float = 250.0
+    
+    model_config = {"extra": "allow", "env_prefix": "PROFILING_"}
+
 class AppSettings(BaseSettings):
     """Configurações principais da aplicação"""
     
@@ -148,6 +167,7 @@ class AppSettings(BaseSettings):
     external_services: ExternalServicesSettings = ExternalServicesSettings()
     api: APISettings = APISettings()
     logging: LoggingSettings = LoggingSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
     
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Registo de subsistemas com carregamento sob demanda
+Cada gestor opcional (ML, cartografia, relatórios, QGIS, ...) só é importado e
+construído no primeiro uso, mantendo o arranque dos workers rápido
+"""
+
+import importlib
+import threading
+import time
+import types
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match
+
+from .executors import run_io
+
+PENDING = "pending"
+LOADED = "loaded"
+FAILED = "failed"
+
+
+class SubsystemUnavailable(RuntimeError):
+    """Subsistema não pôde ser importado/construído"""
+
+
+@dataclass
+class _Subsystem:
+    name: str
+    loader: Callable[[], Any]
+    label: str
+    state: str = PENDING
+    value: Any = None
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+    loaded_at: Optional[float] = None
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+
+class SubsystemRegistry:
+    """Subsistemas registados por nome e carregados no primeiro acesso"""
+
+    def __init__(self, package: str = "bgapp"):
+        self.package = package
+        self._subsystems: Dict[str, _Subsystem] = {}
+        self._lock = threading.Lock()
+        self.boot_seconds: Optional[float] = None
+
+    def register(self, name: str, loader: Callable[[], Any], label: Optional[str] = None):
+        """Registar subsistema com uma função de carregamento"""
+        with self._lock:
+            self._subsystems[name] = _Subsystem(name=name, loader=loader, label=label or name)
+
+    def register_import(self, name: str, module: str, attr: Optional[str] = None,
+                        label: Optional[str] = None):
+        """Registar subsistema que é um atributo de um módulo (import relativo ao pacote)"""
+        def loader():
+            return getattr(importlib.import_module(module, self.package), attr or name)
+        self.register(name, loader, label)
+
+    def _load(self, subsystem: _Subsystem):
+        # Lock por subsistema: importações de subsistemas diferentes não se bloqueiam
+        with subsystem.lock:
+            if subsystem.state != PENDING:
+                return
+            start = time.perf_counter()
+            try:
+                subsystem.value = subsystem.loader()
+                subsystem.state = LOADED
+            except Exception as e:
+                # Erros na construção (não só ImportError) também marcam o subsistema
+                subsystem.state = FAILED
+                subsystem.error = str(e) if isinstance(e, ImportError) else f"{type(e).__name__}: {e}"
+                print(f"{subsystem.label} not available: {subsystem.error}")
+            finally:
+                subsystem.load_seconds = time.perf_counter() - start
+                subsystem.loaded_at = time.time()
+
+    def get(self, name: str) -> Any:
+        """Obter subsistema (importando-o se necessário)"""
+        subsystem = self._subsystems[name]
+        if subsystem.state == PENDING:
+            self._load(subsystem)
+        if subsystem.state == FAILED:
+            raise SubsystemUnavailable(f"{subsystem.label} not available: {subsystem.error}")
+        return subsystem.value
+
+    def is_available(self, *names: str) -> bool:
+        """Verificar disponibilidade (força o carregamento)"""
+        for name in names:
+            subsystem = self._subsystems[name]
+            if subsystem.state == PENDING:
+                self._load(subsystem)
+            if subsystem.state != LOADED:
+                return False
+        return True
+
+    async def resolve(self, *names: str) -> bool:
+        """Carregar subsistemas pendentes no pool de I/O (para código assíncrono)"""
+        for name in names:
+            subsystem = self._subsystems[name]
+            if subsystem.state == PENDING:
+                await run_io(self._load, subsystem)
+        return all(self._subsystems[name].state == LOADED for name in names)
+
+    def has_pending(self) -> bool:
+        """Ainda há subsistemas por carregar"""
+        return any(s.state == PENDING for s in list(self._subsystems.values()))
+
+    def is_loaded(self, name: str) -> bool:
+        """Verificar se já foi carregado (sem forçar o carregamento)"""
+        return self._subsystems[name].state == LOADED
+
+    def proxy(self, name: str, attr: Optional[str] = None) -> "LazySubsystem":
+        """Objeto que se comporta como o subsistema (ou um atributo dele)"""
+        return LazySubsystem(self, name, attr)
+
+    def available(self, *names: str) -> "LazyAvailability":
+        """Flag booleana avaliada no primeiro uso"""
+        return LazyAvailability(self, names)
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Carregar subsistemas em background (thread) sem bloquear o event loop"""
+        for name in list(names if names is not None else self._subsystems):
+            await self.resolve(name)
+
+    def names(self) -> List[str]:
+        return list(self._subsystems)
+
+    def get_report(self) -> Dict[str, Any]:
+        """Relatório de tempos de importação por subsistema"""
+        subsystems = sorted(
+            self._subsystems.values(),
+            key=lambda s: s.load_seconds or 0.0, reverse=True
+        )
+        return {
+            "boot_seconds": round(self.boot_seconds, 4) if self.boot_seconds is not None else None,
+            "loaded": sum(1 for s in subsystems if s.state == LOADED),
+            "failed": sum(1 for s in subsystems if s.state == FAILED),
+            "pending": sum(1 for s in subsystems if s.state == PENDING),
+            "total_load_seconds": round(sum(s.load_seconds or 0.0 for s in subsystems), 4),
+            "subsystems": [
+                {
+                    "name": s.name,
+                    "label": s.label,
+                    "state": s.state,
+                    "load_seconds": round(s.load_seconds, 4) if s.load_seconds is not None else None,
+                    "loaded_at": s.loaded_at,
+                    "error": s.error,
+                }
+                for s in subsystems
+            ],
+        }
+
+
+class LazySubsystem:
+    """Proxy transparente: o primeiro acesso a um atributo importa o subsistema"""
+
+    __slots__ = ("_registry", "_name", "_attr")
+
+    def __init__(self, registry: SubsystemRegistry, name: str, attr: Optional[str] = None):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_attr", attr)
+
+    def _resolve(self) -> Any:
+        target = self._registry.get(self._name)
+        return getattr(target, self._attr) if self._attr else target
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, item: str, value: Any):
+        setattr(self._resolve(), item, value)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __bool__(self) -> bool:
+        return self._registry.is_available(self._name)
+
+    def __repr__(self) -> str:
+        return f"<LazySubsystem {self._name}{'.' + self._attr if self._attr else ''}>"
+
+
+class LazyAvailability:
+    """Substituto de flags *_AVAILABLE que só importa quando avaliado"""
+
+    __slots__ = ("_registry", "_names")
+
+    def __init__(self, registry: SubsystemRegistry, names: Iterable[str]):
+        self._registry = registry
+        self._names = tuple(names)
+
+    def __bool__(self) -> bool:
+        return self._registry.is_available(*self._names)
+
+    def __repr__(self) -> str:
+        return f"<LazyAvailability {', '.join(self._names)}>"
+
+
+class LazyASGIApp:
+    """Sub-aplicação ASGI montada cuja importação é adiada até ao primeiro request"""
+
+    def __init__(self, registry: SubsystemRegistry, name: str):
+        self.registry = registry
+        self.name = name
+
+    async def __call__(self, scope, receive, send):
+        try:
+            # Primeira importação numa thread para não bloquear o event loop
+            await self.registry.resolve(self.name)
+            app = self.registry.get(self.name)
+        except SubsystemUnavailable as e:
+            if scope["type"] != "http":
+                return
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+            await send({"type": "http.response.body", "body": str(e).encode("utf-8")})
+            return
+        await app(scope, receive, send)
+
+
+class SubsystemResolverMiddleware:
+    """
+    Middleware ASGI que carrega no pool de I/O os subsistemas referidos pelo
+    endpoint do request (proxies e flags globais do módulo) antes de o executar,
+    para que o primeiro uso não importe módulos dentro do event loop
+    """
+
+    def __init__(self, app, registry: SubsystemRegistry, routes: List[Any], namespace: Dict[str, Any]):
+        self.app = app
+        self.registry = registry
+        self.routes = routes
+        self.namespace = namespace
+        self._endpoint_subsystems: Dict[Any, Tuple[str, ...]] = {}
+
+    def _subsystems_for(self, endpoint: Any) -> Tuple[str, ...]:
+        names = self._endpoint_subsystems.get(endpoint)
+        if names is not None:
+            return names
+        # Nomes globais usados pelo endpoint e pelas funções aninhadas nele
+        global_names = set()
+        code = getattr(endpoint, "__code__", None)
+        pending_code = [code] if code is not None else []
+        while pending_code:
+            code = pending_code.pop()
+            global_names.update(code.co_names)
+            pending_code.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+        found: List[str] = []
+        for global_name in global_names:
+            value = self.namespace.get(global_name)
+            if isinstance(value, LazySubsystem):
+                found.append(value._name)
+            elif isinstance(value, LazyAvailability):
+                found.extend(value._names)
+        names = self._endpoint_subsystems[endpoint] = tuple(dict.fromkeys(found))
+        return names
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.registry.has_pending():
+            for route in self.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    endpoint = getattr(route, "endpoint", None)
+                    names = self._subsystems_for(endpoint) if endpoint is not None else ()
+                    if names:
+                        await self.registry.resolve(*names)
+                    break
+        await self.app(scope, receive, send)
+
+
+# Instância global do registo de subsistemas
+subsystems = SubsystemRegistry()
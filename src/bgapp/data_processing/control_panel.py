@@ -8,6 +8,8 @@ MODIS, OBIS/GBIF com monitorização em tempo real.
 import asyncio
 import json
 import logging
+import os
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
@@ -15,6 +17,8 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 
+from .job_scheduler import PriorityJobScheduler
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -48,6 +52,15 @@ class ProcessingPriority(Enum):
     CRITICAL = "crítica"
 
 
+# Ordem de despacho (menor primeiro); os valores do enum são texto
+PRIORITY_RANK = {
+    ProcessingPriority.CRITICAL: 0,
+    ProcessingPriority.HIGH: 1,
+    ProcessingPriority.NORMAL: 2,
+    ProcessingPriority.LOW: 3
+}
+
+
 @dataclass
 class ProcessingJob:
     """Trabalho de processamento de dados"""
@@ -80,6 +93,7 @@ class DataSourceConfig:
     timeout: int  # segundos
     retry_count: int
     enabled: bool
+    max_concurrent_jobs: int = 1  # trabalhos simultâneos contra a fonte
 
 
 class DataProcessingControlPanel:
@@ -93,10 +107,11 @@ class DataProcessingControlPanel:
     def __init__(self):
         """Inicializar painel de controle"""
         
-        # Fila de trabalhos
-        self.processing_queue = []
+        # Trabalhos ativos e concluídos (a fila é criada após as fontes)
         self.active_jobs = {}
         self.completed_jobs = {}
+        # Tarefas dos trabalhos em execução (para cancelamento)
+        self._job_tasks: Dict[str, asyncio.Task] = {}
         
         # Configurações das fontes de dados
         self.data_sources_config = {
@@ -125,7 +140,8 @@ class DataProcessingControlPanel:
                 rate_limit=10,
                 timeout=300,
                 retry_count=3,
-                enabled=True
+                enabled=True,
+                max_concurrent_jobs=2
             ),
             'modis': DataSourceConfig(
                 name="MODIS Aqua/Terra Satellite Data",
@@ -146,7 +162,8 @@ class DataProcessingControlPanel:
                 rate_limit=20,
                 timeout=120,
                 retry_count=2,
-                enabled=True
+                enabled=True,
+                max_concurrent_jobs=2
             ),
             'obis': DataSourceConfig(
                 name="Ocean Biodiversity Information System",
@@ -164,7 +181,8 @@ class DataProcessingControlPanel:
                 rate_limit=30,
                 timeout=60,
                 retry_count=2,
-                enabled=True
+                enabled=True,
+                max_concurrent_jobs=3
             ),
             'gbif': DataSourceConfig(
                 name="Global Biodiversity Information Facility",
@@ -183,7 +201,8 @@ class DataProcessingControlPanel:
                 rate_limit=100,
                 timeout=30,
                 retry_count=2,
-                enabled=True
+                enabled=True,
+                max_concurrent_jobs=4
             ),
             'stac_collections': DataSourceConfig(
                 name="STAC Collections Catalog",
@@ -201,10 +220,23 @@ class DataProcessingControlPanel:
                 rate_limit=50,
                 timeout=90,
                 retry_count=3,
-                enabled=True
+                enabled=True,
+                max_concurrent_jobs=2
             )
         }
         
+        # Fila de prioridades com limite de concorrência por fonte e global
+        source_limits = {
+            config.source_type.value: config.max_concurrent_jobs
+            for config in self.data_sources_config.values()
+        }
+        source_limits.update(json.loads(os.getenv('DATA_PROCESSING_SOURCE_LIMITS', '{}')))
+        self.processing_queue = PriorityJobScheduler(
+            max_workers=int(os.getenv('DATA_PROCESSING_MAX_WORKERS', '4')),
+            aging_seconds=float(os.getenv('DATA_PROCESSING_AGING_SECONDS', '300')),
+            source_limits=source_limits
+        )
+        
         # Métricas de processamento
         self.processing_metrics = {
             'total_jobs': 0,
@@ -301,8 +333,7 @@ class DataProcessingControlPanel:
         )
         
         # Adicionar à fila
-        self.processing_queue.append(job)
-        self.processing_queue.sort(key=lambda x: (x.priority.value, x.created_at))
+        self.processing_queue.add(job_id, job, data_source.value, PRIORITY_RANK[priority])
         
         # Atualizar métricas
         self.processing_metrics['total_jobs'] += 1
@@ -352,33 +383,95 @@ class DataProcessingControlPanel:
             True se iniciado com sucesso
         """
         
-        # Encontrar trabalho na fila
-        job = None
-        for i, queued_job in enumerate(self.processing_queue):
-            if queued_job.id == job_id:
-                job = self.processing_queue.pop(i)
-                break
+        job = self.processing_queue.get(job_id)
         
         if not job:
             logger.error(f"❌ Trabalho {job_id} não encontrado na fila")
             return False
         
-        # Mover para trabalhos ativos
-        job.status = ProcessingStatus.RUNNING
-        job.started_at = datetime.now()
-        self.active_jobs[job_id] = job
+        # Elegível para execução assim que houver vaga na fonte e nos workers
+        self.processing_queue.release(job_id)
+        job.status = ProcessingStatus.QUEUED
+        self._dispatch_jobs()
         
-        # Atualizar métricas
-        self.processing_metrics['active_jobs'] += 1
-        self.processing_metrics['queued_jobs'] -= 1
+        if job.status == ProcessingStatus.QUEUED:
+            logger.info(f"⏳ Trabalho na fila à espera de vaga: {job.name} ({job_id})")
+        
+        return True
+    
+    async def cancel_processing_job(self, job_id: str) -> bool:
+        """
+        ⏹️ Cancelar um trabalho na fila ou em execução
+        
+        Args:
+            job_id: ID do trabalho
+            
+        Returns:
+            True se o trabalho foi cancelado
+        """
         
-        logger.info(f"▶️ Iniciando processamento: {job.name} ({job_id})")
+        job = self.processing_queue.remove(job_id)
+        if job is not None:
+            self._mark_cancelled(job)
+            self.processing_metrics['queued_jobs'] -= 1
+            logger.info(f"⏹️ Trabalho retirado da fila: {job.name} ({job_id})")
+            return True
         
-        # Executar processamento em background
-        asyncio.create_task(self._execute_processing_job(job))
+        task = self._job_tasks.get(job_id)
+        if task is None or task.done():
+            return False
         
+        task.cancel()
+        # Esperar que o trabalho liberte a vaga (sem propagar o CancelledError da tarefa)
+        await asyncio.wait([task])
         return True
     
+    def _mark_cancelled(self, job: ProcessingJob):
+        job.status = ProcessingStatus.CANCELLED
+        job.completed_at = datetime.now()
+        self.completed_jobs[job.id] = job
+    
+    def _dispatch_jobs(self):
+        """Lançar os trabalhos elegíveis enquanto houver vagas"""
+        
+        while True:
+            ready = self.processing_queue.pop_ready()
+            if ready is None:
+                break
+            job_id, job = ready
+            
+            # Mover para trabalhos ativos
+            job.status = ProcessingStatus.RUNNING
+            job.started_at = datetime.now()
+            self.active_jobs[job_id] = job
+            
+            # Atualizar métricas
+            self.processing_metrics['active_jobs'] += 1
+            self.processing_metrics['queued_jobs'] -= 1
+            
+            logger.info(f"▶️ Iniciando processamento: {job.name} ({job_id})")
+            
+            # Executar processamento em background
+            task = asyncio.create_task(self._run_scheduled_job(job))
+            self._job_tasks[job_id] = task
+    
+    async def _run_scheduled_job(self, job: ProcessingJob):
+        """Executar um trabalho e libertar a sua vaga no fim"""
+        
+        started = time.monotonic()
+        try:
+            await self._execute_processing_job(job)
+        except asyncio.CancelledError:
+            self._mark_cancelled(job)
+            self.active_jobs.pop(job.id, None)
+            self.processing_metrics['active_jobs'] -= 1
+            logger.info(f"⏹️ Trabalho cancelado: {job.name} ({job.id})")
+            raise
+        finally:
+            self._job_tasks.pop(job.id, None)
+            self.processing_queue.finish(job.data_source.value, time.monotonic() - started)
+            self._dispatch_jobs()
+    
     async def _execute_processing_job(self, job: ProcessingJob):
         """Executar trabalho de processamento"""
         
@@ -740,7 +833,7 @@ class DataProcessingControlPanel:
         """
         
         if self.processing_queue:
-            for job in self.processing_queue[:5]:  # Mostrar apenas os primeiros 5
+            for job in self.processing_queue.ordered(5):  # Mostrar apenas os primeiros 5
                 dashboard_html += f"""
                 <div class="job-card">
                     <h4>{job.name}</h4>
@@ -845,7 +938,7 @@ class DataProcessingControlPanel:
         # Contar trabalhos das últimas 24h
         yesterday = datetime.now() - timedelta(days=1)
         recent_jobs = [
-            job for job in list(self.completed_jobs.values()) + list(self.active_jobs.values()) + self.processing_queue
+            job for job in list(self.completed_jobs.values()) + list(self.active_jobs.values()) + self.processing_queue.ordered()
             if job.created_at >= yesterday
         ]
         self.processing_metrics['last_24h_jobs'] = len(recent_jobs)
@@ -906,11 +999,7 @@ class DataProcessingControlPanel:
             job = self.completed_jobs[job_id]
         # Procurar na fila
         else:
-            job = None
-            for queued_job in self.processing_queue:
-                if queued_job.id == job_id:
-                    job = queued_job
-                    break
+            job = self.processing_queue.get(job_id)
         
         if not job:
             return None
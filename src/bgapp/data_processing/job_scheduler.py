@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+BGAPP Job Scheduler - Fila de prioridades dos trabalhos de processamento
+Heap por fonte de dados com envelhecimento (aging), limite de concorrência
+por fonte e global, e estatísticas de espera/execução por fonte.
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Amostras mantidas por fonte para percentis de espera/execução
+STATS_WINDOW = 500
+
+
+class _SourceStats:
+    """Tempos de espera e execução recentes de uma fonte"""
+
+    def __init__(self):
+        self.wait_times: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self.run_times: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self.dispatched = 0
+        self.finished = 0
+
+    @staticmethod
+    def _summary(samples: Deque[float]) -> Dict[str, Optional[float]]:
+        if not samples:
+            return {'mean': None, 'p95': None, 'max': None}
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+        return {
+            'mean': round(sum(ordered) / len(ordered), 3),
+            'p95': round(p95, 3),
+            'max': round(ordered[-1], 3)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'dispatched': self.dispatched,
+            'finished': self.finished,
+            'wait_seconds': self._summary(self.wait_times),
+            'run_seconds': self._summary(self.run_times)
+        }
+
+
+class PriorityJobScheduler:
+    """
+    📋 Fila de prioridades com concorrência limitada por fonte
+
+    Cada trabalho tem a chave ``enqueued_at + rank * aging_seconds``: dentro da
+    mesma prioridade vence o mais antigo e, a cada ``aging_seconds`` de espera,
+    um trabalho sobe efetivamente um nível, pelo que os de prioridade baixa
+    acabam por correr mesmo sob rajadas de trabalhos prioritários.
+
+    Os trabalhos ficam indexados por id (lookup O(1)); só entram no heap da
+    sua fonte depois de ``release``. A remoção é preguiçosa (entrada marcada).
+    """
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 aging_seconds: float = 300.0,
+                 source_limits: Optional[Dict[str, int]] = None,
+                 default_source_limit: int = 1):
+        self.max_workers = max(1, int(max_workers))
+        self.aging_seconds = float(aging_seconds)
+        self.source_limits: Dict[str, int] = dict(source_limits or {})
+        self.default_source_limit = max(1, int(default_source_limit))
+
+        self._jobs: Dict[str, Any] = {}
+        self._entries: Dict[str, list] = {}
+        self._heaps: Dict[str, List[list]] = {}
+        self._ready: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+        self._running_total = 0
+        self._stats: Dict[str, _SourceStats] = {}
+        self._counter = itertools.count()
+
+    # ------------------------------------------------------------------
+    # Fila
+    # ------------------------------------------------------------------
+
+    def add(self, job_id: str, job: Any, source: str, rank: int) -> None:
+        """Registar um trabalho na fila (ainda não elegível para execução)"""
+        if job_id in self._jobs:
+            raise ValueError(f"Trabalho {job_id} já está na fila")
+        key = time.monotonic() + rank * self.aging_seconds
+        # [chave, desempate, id, fonte, libertado em, removido]
+        self._entries[job_id] = [key, next(self._counter), job_id, source, None, False]
+        self._jobs[job_id] = job
+
+    def release(self, job_id: str) -> bool:
+        """Tornar um trabalho elegível; devolve False se não estiver na fila"""
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return False
+        if entry[4] is None:
+            entry[4] = time.monotonic()
+            source = entry[3]
+            heapq.heappush(self._heaps.setdefault(source, []), entry)
+            self._ready[source] = self._ready.get(source, 0) + 1
+        return True
+
+    def remove(self, job_id: str) -> Optional[Any]:
+        """Retirar um trabalho da fila (ex.: cancelamento)"""
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return None
+        if entry[4] is not None:
+            entry[5] = True
+            self._ready[entry[3]] -= 1
+        return self._jobs.pop(job_id)
+
+    def get(self, job_id: str) -> Optional[Any]:
+        return self._jobs.get(job_id)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.ordered())
+
+    def ordered(self, limit: Optional[int] = None) -> List[Any]:
+        """Trabalhos na fila pela ordem efetiva (elegíveis primeiro)"""
+        entries = self._entries.values()
+
+        def sort_key(e: list) -> Tuple[bool, float, int]:
+            return (e[4] is None, e[0], e[1])
+
+        if limit is None:
+            selected = sorted(entries, key=sort_key)
+        else:
+            selected = heapq.nsmallest(limit, entries, key=sort_key)
+        return [self._jobs[e[2]] for e in selected]
+
+    # ------------------------------------------------------------------
+    # Despacho
+    # ------------------------------------------------------------------
+
+    def source_limit(self, source: str) -> int:
+        return max(1, int(self.source_limits.get(source, self.default_source_limit)))
+
+    def has_capacity(self) -> bool:
+        return self._running_total < self.max_workers
+
+    def _head(self, source: str) -> Optional[list]:
+        heap = self._heaps.get(source)
+        while heap and heap[0][5]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def pop_ready(self) -> Optional[Tuple[str, Any]]:
+        """
+        Retirar o próximo trabalho executável: o de menor chave entre as
+        fontes com vagas, respeitando o limite global de workers.
+        """
+        if not self.has_capacity():
+            return None
+
+        best = None
+        for source in self._heaps:
+            if self._running.get(source, 0) >= self.source_limit(source):
+                continue
+            head = self._head(source)
+            if head is not None and (best is None or head[:2] < best[:2]):
+                best = head
+
+        if best is None:
+            return None
+
+        source = best[3]
+        _, _, job_id, _, released_at, _ = heapq.heappop(self._heaps[source])
+        del self._entries[job_id]
+        self._ready[source] -= 1
+        self._running[source] = self._running.get(source, 0) + 1
+        self._running_total += 1
+
+        stats = self._stats.setdefault(source, _SourceStats())
+        stats.dispatched += 1
+        stats.wait_times.append(time.monotonic() - released_at)
+        return job_id, self._jobs.pop(job_id)
+
+    def finish(self, source: str, run_seconds: float) -> None:
+        """Libertar a vaga de um trabalho terminado"""
+        self._running[source] = max(0, self._running.get(source, 0) - 1)
+        self._running_total = max(0, self._running_total - 1)
+        stats = self._stats.setdefault(source, _SourceStats())
+        stats.finished += 1
+        stats.run_times.append(run_seconds)
+
+    # ------------------------------------------------------------------
+    # Estatísticas
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profundidade da fila, vagas e tempos por fonte"""
+        queued: Dict[str, int] = {}
+        for entry in self._entries.values():
+            queued[entry[3]] = queued.get(entry[3], 0) + 1
+
+        sources = set(queued) | set(self._running) | set(self._stats) | set(self.source_limits)
+        per_source = {}
+        for source in sorted(sources):
+            stats = self._stats.get(source) or _SourceStats()
+            per_source[source] = {
+                'queued': queued.get(source, 0),
+                'ready': self._ready.get(source, 0),
+                'running': self._running.get(source, 0),
+                'limit': self.source_limit(source),
+                **stats.to_dict()
+            }
+
+        return {
+            'max_workers': self.max_workers,
+            'running': self._running_total,
+            'queued': len(self._jobs),
+            'aging_seconds': self.aging_seconds,
+            'sources': per_source
+        }
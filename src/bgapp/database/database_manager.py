@@ -12,13 +12,19 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 import base64
+import re
+import threading
+import zlib
+from decimal import Decimal
 from io import StringIO, BytesIO
 
+from ..core.executors import executors, IO
+
 # Tentar importar bibliotecas de base de dados
 try:
     import psycopg2
@@ -30,6 +36,24 @@ except ImportError:
     print("Bibliotecas de base de dados não disponíveis - usando simulação")
     DATABASE_LIBS_AVAILABLE = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Formatos da exportação em streaming (tipo MIME, extensão)
+STREAM_EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Tamanho dos blocos enviados ao cliente e blocos em espera (memória limitada)
+STREAM_CHUNK_BYTES = 256 * 1024
+STREAM_QUEUE_CHUNKS = 8
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -100,6 +124,88 @@ class TableInfo:
     description: Optional[str] = None
 
 
+class _ExportCancelled(Exception):
+    """O consumidor da exportação desistiu (ex.: cliente desligou)"""
+
+
+class _ChunkWriter:
+    """
+    Ficheiro de escrita que agrupa os dados em blocos e os entrega a ``emit``
+    (opcionalmente comprimidos em gzip). Usado pelo COPY e pelo ParquetWriter.
+    """
+    
+    def __init__(self, emit: Callable[[bytes], None], gzip_output: bool = False,
+                 chunk_bytes: int = STREAM_CHUNK_BYTES):
+        self._emit = emit
+        self._buffer = bytearray()
+        self._chunk_bytes = chunk_bytes
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip_output else None
+        self._position = 0
+        self.closed = False
+    
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._position += len(data)
+        if self._gzip is not None:
+            data = self._gzip.compress(data)
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_bytes:
+            self._flush_buffer()
+        return len(data)
+    
+    def _flush_buffer(self):
+        if self._buffer:
+            self._emit(bytes(self._buffer))
+            self._buffer.clear()
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def writable(self) -> bool:
+        return True
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        if self.closed:
+            return
+        if self._gzip is not None:
+            self._buffer += self._gzip.flush()
+        self._flush_buffer()
+        self.closed = True
+
+
+# Tipos PostgreSQL (OID) -> tipos Arrow para um esquema Parquet estável entre lotes
+_PG_ARROW_TYPES = {
+    16: 'bool', 20: 'int64', 21: 'int16', 23: 'int32', 26: 'int64',
+    700: 'float32', 701: 'float64', 1700: 'float64',
+    1082: 'date32', 1114: 'timestamp', 1184: 'timestamptz',
+}
+
+
+def _arrow_type(type_code: int):
+    name = _PG_ARROW_TYPES.get(type_code)
+    if name == 'timestamp':
+        return pa.timestamp('us')
+    if name == 'timestamptz':
+        return pa.timestamp('us', tz='UTC')
+    if name is None:
+        return pa.string()
+    return getattr(pa, name)()
+
+
+def _arrow_column(values: List[Any], arrow_type) -> "pa.Array":
+    if pa.types.is_string(arrow_type):
+        values = [v if v is None or isinstance(v, str) else
+                  json.dumps(v, default=str) if isinstance(v, (dict, list)) else str(v)
+                  for v in values]
+    elif pa.types.is_floating(arrow_type):
+        values = [float(v) if isinstance(v, Decimal) else v for v in values]
+    return pa.array(values, type=arrow_type)
+
+
 class DatabaseManager:
     """
     🗄️ Gestor Completo de Bases de Dados BGAPP
@@ -626,6 +732,236 @@ class DatabaseManager:
             logger.error(f"Erro ao exportar resultados: {e}")
             raise Exception(f"Erro na exportação: {str(e)}")
     
+    def _validate_export_sql(self, sql: str) -> str:
+        """
+        Apenas uma consulta de leitura (SELECT/WITH/VALUES/TABLE) que possa ser
+        embutida em ``COPY (...)``: fora de literais e identificadores não pode
+        haver ';', comentários nem parênteses desequilibrados
+        """
+        sql = sql.strip().rstrip(';').strip()
+        if not re.match(r'^(SELECT|WITH|VALUES|TABLE)\b', sql, re.IGNORECASE):
+            raise ValueError("A exportação aceita apenas consultas SELECT")
+        
+        depth = 0
+        i, n = 0, len(sql)
+        while i < n:
+            char = sql[i]
+            if char == "'":
+                # E'...' aceita escapes com barra; nos restantes '' é a única forma de escape
+                escapes = i > 0 and sql[i - 1] in 'eE' and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] in '_$'))
+                i += 1
+                while i < n:
+                    if escapes and sql[i] == '\\':
+                        i += 2
+                        continue
+                    if sql[i] == "'":
+                        if i + 1 < n and sql[i + 1] == "'":
+                            i += 2
+                            continue
+                        break
+                    i += 1
+                else:
+                    raise ValueError("Literal de texto não terminado na consulta")
+            elif char == '"':
+                end = sql.find('"', i + 1)
+                while end != -1 and sql[end + 1:end + 2] == '"':
+                    end = sql.find('"', end + 2)
+                if end == -1:
+                    raise ValueError("Identificador entre aspas não terminado na consulta")
+                i = end
+            elif char == '$' and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] in '_$')):
+                tag = re.match(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$', sql[i:])
+                if tag:
+                    end = sql.find(tag.group(0), i + len(tag.group(0)))
+                    if end == -1:
+                        raise ValueError("Literal $$ não terminado na consulta")
+                    i = end + len(tag.group(0)) - 1
+            elif sql.startswith('--', i) or sql.startswith('/*', i):
+                raise ValueError("A exportação não aceita comentários na consulta")
+            elif char == ';':
+                raise ValueError("A exportação aceita apenas uma consulta")
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth < 0:
+                    raise ValueError("Parênteses desequilibrados na consulta")
+            i += 1
+        if depth != 0:
+            raise ValueError("Parênteses desequilibrados na consulta")
+        return sql
+    
+    async def stream_query_export(self,
+                                  connection_id: str,
+                                  sql: str,
+                                  export_format: str = 'csv',
+                                  gzip_output: bool = False,
+                                  batch_size: int = 10000) -> AsyncIterator[bytes]:
+        """
+        📤 Exportar o resultado de uma query em streaming (memória constante)
+        
+        CSV usa ``COPY (query) TO STDOUT``; NDJSON e Parquet usam um cursor do
+        lado do servidor lido em lotes de ``batch_size`` (Parquet via record
+        batches pyarrow, um row group por lote). A leitura corre numa thread e
+        entrega blocos por uma fila limitada, pelo que a base de dados só
+        avança ao ritmo do cliente. A sessão é só de leitura.
+        
+        Args:
+            connection_id: ID da conexão
+            sql: Query SELECT
+            export_format: 'csv', 'ndjson' ou 'parquet'
+            gzip_output: Comprimir em gzip (CSV/NDJSON; Parquet já é comprimido)
+            batch_size: Linhas por lote (NDJSON/Parquet)
+            
+        Yields:
+            Blocos de bytes do ficheiro exportado
+        """
+        export_format = export_format.lower()
+        if export_format not in STREAM_EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação não suportado: {export_format}")
+        if export_format == 'parquet' and not PYARROW_AVAILABLE:
+            raise ValueError("Exportação Parquet requer pyarrow")
+        if not DATABASE_LIBS_AVAILABLE:
+            raise RuntimeError("Exportação em streaming requer psycopg2")
+        
+        connection_config = self.database_connections.get(connection_id)
+        if connection_config is None:
+            raise ValueError(f"Conexão {connection_id} não encontrada")
+        if connection_config.db_type not in [DatabaseType.POSTGRESQL, DatabaseType.TIMESCALEDB]:
+            raise ValueError(f"Exportação em streaming não suportada para {connection_config.db_type.value}")
+        
+        sql = self._validate_export_sql(sql)
+        batch_size = max(1, int(batch_size))
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        cancelled = threading.Event()
+        done = object()
+        # Conexão partilhada com o consumidor para cancelar a query em curso
+        active: Dict[str, Any] = {}
+        
+        def emit(chunk: bytes):
+            if cancelled.is_set():
+                raise _ExportCancelled()
+            # Bloqueia a thread enquanto a fila estiver cheia (contrapressão)
+            asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+            if cancelled.is_set():
+                raise _ExportCancelled()
+        
+        def produce():
+            conn = None
+            try:
+                conn = psycopg2.connect(connection_config.connection_string)
+                active['conn'] = conn
+                if cancelled.is_set():
+                    raise _ExportCancelled()
+                conn.set_session(readonly=True)
+                writer = _ChunkWriter(emit, gzip_output and export_format != 'parquet')
+                if export_format == 'csv':
+                    self._copy_csv(conn, sql, writer)
+                elif export_format == 'ndjson':
+                    self._fetch_ndjson(conn, sql, writer, batch_size)
+                else:
+                    self._fetch_parquet(conn, sql, writer, batch_size)
+                writer.close()
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+            except _ExportCancelled:
+                pass
+            except Exception as e:
+                if not cancelled.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+            finally:
+                active.pop('conn', None)
+                if conn is not None:
+                    conn.close()
+        
+        producer = loop.run_in_executor(executors.get(IO), produce)
+        start_time = datetime.now()
+        total_bytes = 0
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                total_bytes += len(item)
+                yield item
+            
+            self.db_metrics['total_queries_executed'] += 1
+            elapsed = (datetime.now() - start_time).total_seconds()
+            logger.info(f"📤 Exportação {export_format} concluída: {total_bytes} bytes em {elapsed:.1f}s")
+        finally:
+            cancelled.set()
+            # Interromper a query no servidor (ex.: ordenação longa ainda sem linhas)
+            conn = active.get('conn')
+            if conn is not None and not producer.done():
+                try:
+                    conn.cancel()
+                except Exception as e:
+                    logger.warning(f"⚠️ Não foi possível cancelar a exportação: {e}")
+            # Desbloquear a thread se estiver à espera de espaço na fila
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
+    
+    def _copy_csv(self, conn, sql: str, writer: _ChunkWriter):
+        """CSV com cabeçalho gerado pelo próprio PostgreSQL"""
+        with conn.cursor() as cursor:
+            # O parser do PostgreSQL confirma que é uma única consulta completa antes do COPY
+            statement = f"bgapp_export_{uuid.uuid4().hex}"
+            cursor.execute(f"PREPARE {statement} AS {sql}")
+            cursor.execute(f"DEALLOCATE {statement}")
+            cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", writer)
+    
+    def _server_cursor(self, conn, batch_size: int):
+        cursor = conn.cursor(name=f"bgapp_export_{uuid.uuid4().hex}")
+        cursor.itersize = batch_size
+        return cursor
+    
+    def _fetch_ndjson(self, conn, sql: str, writer: _ChunkWriter, batch_size: int):
+        """Uma linha JSON por registo, lida em lotes de um cursor do servidor"""
+        with self._server_cursor(conn, batch_size) as cursor:
+            cursor.execute(sql)
+            columns = None
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if columns is None:
+                    columns = [col.name for col in cursor.description]
+                writer.write(''.join(
+                    json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + '\n'
+                    for row in rows
+                ))
+    
+    def _fetch_parquet(self, conn, sql: str, writer: _ChunkWriter, batch_size: int):
+        """Parquet com um row group por lote; esquema derivado dos tipos PostgreSQL"""
+        with self._server_cursor(conn, batch_size) as cursor:
+            cursor.execute(sql)
+            parquet_writer = None
+            schema = None
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if schema is None:
+                        # cursor.description só está disponível após o primeiro fetch
+                        schema = pa.schema([
+                            (col.name, _arrow_type(col.type_code)) for col in cursor.description
+                        ])
+                        parquet_writer = pq.ParquetWriter(writer, schema, compression='zstd')
+                    if not rows:
+                        break
+                    columns = list(zip(*rows))
+                    batch = pa.RecordBatch.from_arrays(
+                        [_arrow_column(list(values), field.type) for values, field in zip(columns, schema)],
+                        schema=schema
+                    )
+                    parquet_writer.write_batch(batch)
+            finally:
+                if parquet_writer is not None:
+                    parquet_writer.close()
+    
     def generate_database_dashboard(self) -> str:
         """
         🗄️ Gerar dashboard de gestão de bases de dados
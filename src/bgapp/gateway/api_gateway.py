@@ -554,7 +554,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/metrics"]:
+        if request.url.path in ["/health", "/metrics", "/metrics/prometheus"]:
             return await call_next(request)
         
         # Check rate limit
@@ -15,6 +15,11 @@ from typing import Any, Dict, List, Optional, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+try:
+    from ..core.instrumentation import instrumentation
+except ImportError:
+    instrumentation = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -181,6 +186,12 @@ class PerformanceMonitor:
             self.global_stats['total_requests'] += 1
             self.global_stats['total_data_processed'] += data_points
             self.global_stats['total_bytes_downloaded'] += bytes_downloaded
+        
+        # Histogramas de latência por conector (exposição Prometheus)
+        if instrumentation is not None:
+            instrumentation.observe_connector_request(
+                connector_id, response_time, success, bytes_downloaded, cache_hit
+            )
     
     def get_connector_metrics(self, connector_id: str) -> Optional[ConnectorMetrics]:
         """Obter métricas de um conector específico"""
@@ -0,0 +1,68 @@
+"""
+Middleware de Métricas para BGAPP
+Regista contagem e latência de cada request com labels de baixa cardinalidade
+"""
+
+import time
+from typing import Iterable, Optional
+
+from starlette.routing import Match
+
+from ..core.instrumentation import Instrumentation, instrumentation as default_instrumentation
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware) para instrumentação de requests"""
+
+    def __init__(self, app, instrumentation: Optional[Instrumentation] = None,
+                 exclude_paths: Iterable[str] = ("/metrics/prometheus",)):
+        self.app = app
+        self.instrumentation = instrumentation or default_instrumentation
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = self.instrumentation.http_requests_in_progress.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            self.instrumentation.observe_http_request(
+                method, self._route_template(scope), status_code,
+                time.perf_counter() - start_time
+            )
+
+    @staticmethod
+    def _route_template(scope) -> str:
+        """Template da rota (ex.: /services/{service_name}) em vez do path concreto"""
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", "unmatched")
+
+        # Versões antigas do Starlette não guardam a rota no scope
+        app = scope.get("app")
+        for candidate in getattr(app, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return getattr(candidate, "path", "unmatched")
+        return "unmatched"
+
+
+def add_metrics_middleware(app, instrumentation: Optional[Instrumentation] = None):
+    """Adicionar middleware de métricas à aplicação"""
+    app.add_middleware(MetricsMiddleware, instrumentation=instrumentation)
+    print("✅ Middleware de métricas Prometheus adicionado")
@@ -0,0 +1,53 @@
+"""
+Middleware de Profiling para BGAPP
+Regista automaticamente traces de requests que excedem um limite de duração
+"""
+
+import logging
+import time
+from collections import Counter
+
+from ..core.profiler import SamplingProfiler, format_collapsed
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestMiddleware:
+    """Middleware ASGI que anexa as stacks amostradas a requests lentos"""
+
+    def __init__(self, app, profiler: SamplingProfiler, threshold_ms: float = 1000.0,
+                 max_stacks: int = 20):
+        self.app = app
+        self.profiler = profiler
+        self.threshold = threshold_ms / 1000.0
+        self.max_stacks = max_stacks
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        wall_start = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self._log_slow_request(scope, wall_start, duration)
+
+    def _log_slow_request(self, scope, wall_start: float, duration: float):
+        """Registar o request lento com as stacks mais frequentes durante a sua execução"""
+        stacks = self.profiler.samples_between(wall_start, wall_start + duration)
+        top_stacks = Counter(dict(stacks.most_common(self.max_stacks)))
+
+        logger.warning(
+            f"Slow request {scope['method']} {scope['path']} took {duration * 1000:.0f}ms "
+            f"({sum(stacks.values())} samples)\n{format_collapsed(top_stacks) if stacks else ''}"
+        )
+
+
+def add_profiling_middleware(app, profiler: SamplingProfiler, threshold_ms: float = 1000.0):
+    """Adicionar middleware de traces de requests lentos à aplicação"""
+    app.add_middleware(SlowRequestMiddleware, profiler=profiler, threshold_ms=threshold_ms)
+    print(f"✅ Middleware de requests lentos adicionado (>{threshold_ms:.0f}ms)")
@@ -7,6 +7,7 @@ Previsões com >95% precisão para biodiversidade marinha
 import os
 import json
 import pickle
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -15,27 +16,29 @@ from dataclasses import dataclass
 from enum import Enum
 
 import joblib
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.pipeline import Pipeline
 
-# Tentar importar bibliotecas avançadas (opcional)
-try:
-    import xgboost as xgb
-    XGBOOST_AVAILABLE = True
-except ImportError:
-    XGBOOST_AVAILABLE = False
-    print("⚠️ XGBoost não disponível - usando modelos alternativos")
+# scikit-learn, XGBoost e TensorFlow são importados apenas ao treinar modelos:
+# juntos custam vários segundos e atrasariam o arranque de cada worker da API
 
-try:
-    from tensorflow import keras
-    import tensorflow as tf
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
-    print("⚠️ TensorFlow não disponível - usando modelos tradicionais")
+@lru_cache(maxsize=None)
+def _load_xgboost():
+    """Importar XGBoost (opcional) na primeira utilização"""
+    try:
+        import xgboost as xgb
+        return xgb
+    except ImportError:
+        print("⚠️ XGBoost não disponível - usando modelos alternativos")
+        return None
+
+@lru_cache(maxsize=None)
+def _load_keras():
+    """Importar TensorFlow/Keras (opcional) na primeira utilização"""
+    try:
+        from tensorflow import keras
+        return keras
+    except ImportError:
+        print("⚠️ TensorFlow não disponível - usando modelos tradicionais")
+        return None
 
 class ModelType(str, Enum):
     """Tipos de modelos disponíveis"""
@@ -76,8 +79,8 @@ class MLModelManager:
     def __init__(self, models_dir: str = "/app/models"):
         self.models_dir = models_dir
         self.models: Dict[str, Any] = {}
-        self.scalers: Dict[str, StandardScaler] = {}
-        self.encoders: Dict[str, LabelEncoder] = {}
+        self.scalers: Dict[str, Any] = {}  # StandardScaler por modelo
+        self.encoders: Dict[str, Any] = {}  # LabelEncoder por modelo
         self.model_metrics: Dict[str, ModelMetrics] = {}
         
         # Criar diretório se não existir
@@ -94,6 +97,11 @@ class MLModelManager:
         Target: índice de biodiversidade (Shannon, Simpson)
         """
         print("🧠 Treinando modelo de previsão de biodiversidade...")
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.model_selection import train_test_split, cross_val_score
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        xgb = _load_xgboost()
         
         try:
             # Preparar dados
@@ -139,7 +147,7 @@ class MLModelManager:
             models['gradient_boosting'] = gb_model
             
             # XGBoost se disponível
-            if XGBOOST_AVAILABLE:
+            if xgb is not None:
                 xgb_model = xgb.XGBRegressor(
                     n_estimators=200,
                     max_depth=8,
@@ -152,7 +160,7 @@ class MLModelManager:
             
             # Ensemble final (média ponderada)
             ensemble_weights = {'random_forest': 0.4, 'gradient_boosting': 0.4}
-            if XGBOOST_AVAILABLE:
+            if xgb is not None:
                 ensemble_weights['xgboost'] = 0.2
                 ensemble_weights['random_forest'] = 0.3
                 ensemble_weights['gradient_boosting'] = 0.3
@@ -212,6 +220,9 @@ class MLModelManager:
         Target: temperatura futura (1-14 dias)
         """
         print("🌡️ Treinando modelo de previsão de temperatura...")
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
         
         try:
             # Preparar séries temporais
@@ -244,7 +255,7 @@ class MLModelManager:
             X_test_scaled = scaler.transform(X_test)
             
             # Modelo LSTM se TensorFlow disponível
-            if TENSORFLOW_AVAILABLE:
+            if _load_keras() is not None:
                 model = self._create_lstm_model(X_train_scaled.shape[1])
                 model.fit(X_train_scaled, y_train, epochs=50, batch_size=32, verbose=0)
             else:
@@ -305,6 +316,9 @@ class MLModelManager:
         Target: espécie identificada
         """
         print("🐟 Treinando classificador de espécies...")
+        from sklearn.model_selection import train_test_split, GridSearchCV
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        from sklearn.ensemble import RandomForestClassifier
         
         try:
             features = ['size_cm', 'depth_observed', 'water_temp', 'behavior_encoded', 
@@ -330,7 +344,6 @@ class MLModelManager:
             X_test_scaled = scaler.transform(X_test)
             
             # Treinar classificador
-            from sklearn.ensemble import RandomForestClassifier
             
             model = RandomForestClassifier(
                 n_estimators=300,
@@ -509,7 +522,8 @@ class MLModelManager:
 
     def _create_lstm_model(self, input_dim: int):
         """Criar modelo LSTM para séries temporais"""
-        if not TENSORFLOW_AVAILABLE:
+        keras = _load_keras()
+        if keras is None:
             raise ImportError("TensorFlow não disponível")
             
         model = keras.Sequential([
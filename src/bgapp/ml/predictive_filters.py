@@ -6,6 +6,10 @@ Gera automaticamente filtros e pontos nos mapas baseados em modelos de ML
 
 import asyncio
 import logging
+import math
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
@@ -25,6 +29,135 @@ from ..core.secure_config import DatabaseSettings
 
 logger = logging.getLogger(__name__)
 
+# Zoom máximo da grelha de tiles usada para alinhar as bbox dos pedidos
+MAX_TILE_ZOOM = 16
+
+PREDICTION_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_prediction_results_location "
+    "ON prediction_results USING GIST(geom)",
+    "CREATE INDEX IF NOT EXISTS idx_prediction_results_model_time "
+    "ON prediction_results (model_id, prediction_timestamp DESC)",
+)
+
+# Pools asyncpg partilhados por URL (os gestores são criados por pedido)
+_pools: Dict[str, asyncpg.Pool] = {}
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def get_prediction_pool(postgres_url: str) -> asyncpg.Pool:
+    """Pool partilhado para a base de dados das predições (cria índices na 1.ª vez)"""
+    global _pool_lock
+    pool = _pools.get(postgres_url)
+    if pool is not None:
+        return pool
+    
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    
+    async with _pool_lock:
+        pool = _pools.get(postgres_url)
+        if pool is None:
+            pool = await asyncpg.create_pool(
+                postgres_url,
+                min_size=int(os.getenv('PREDICTIVE_FILTERS_POOL_MIN', '1')),
+                max_size=int(os.getenv('PREDICTIVE_FILTERS_POOL_MAX', '10')),
+                max_inactive_connection_lifetime=300,
+                command_timeout=30
+            )
+            async with pool.acquire() as conn:
+                for statement in PREDICTION_INDEXES:
+                    try:
+                        await conn.execute(statement)
+                    except asyncpg.PostgresError as e:
+                        logger.debug(f"Índice de predições não criado: {e}")
+            _pools[postgres_url] = pool
+    return pool
+
+
+async def close_prediction_pools():
+    """Fechar os pools partilhados (encerramento da aplicação)"""
+    while _pools:
+        _, pool = _pools.popitem()
+        await pool.close()
+
+
+def align_bbox_to_tiles(bbox: Tuple[float, float, float, float],
+                        max_zoom: int = MAX_TILE_ZOOM) -> Tuple[int, int, int, int, int]:
+    """
+    Alinhar uma bbox (min_lon, min_lat, max_lon, max_lat) à grelha geográfica
+    de tiles de 360/2^z graus: devolve (z, x0, y0, x1, y1), inclusivo, com o
+    maior zoom em que a bbox cabe em 2x2 tiles. Pequenos deslocamentos do mapa
+    dão a mesma chave.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    span = max(max_lon - min_lon, max_lat - min_lat, 1e-9)
+    z = int(min(max_zoom, max(0, math.floor(math.log2(360.0 / span)))))
+    size = 360.0 / (1 << z)
+    
+    x_max = (1 << z) - 1
+    y_max = max(0, int(math.ceil(180.0 / size)) - 1)
+    x0 = min(x_max, max(0, int(math.floor((min_lon + 180.0) / size))))
+    x1 = min(x_max, max(0, int(math.floor((max_lon + 180.0) / size))))
+    y0 = min(y_max, max(0, int(math.floor((min_lat + 90.0) / size))))
+    y1 = min(y_max, max(0, int(math.floor((max_lat + 90.0) / size))))
+    return z, x0, y0, x1, y1
+
+
+def tile_range_bbox(z: int, x0: int, y0: int, x1: int, y1: int) -> Tuple[float, float, float, float]:
+    """BBox (min_lon, min_lat, max_lon, max_lat) de um intervalo de tiles"""
+    size = 360.0 / (1 << z)
+    return (
+        x0 * size - 180.0,
+        max(-90.0, y0 * size - 90.0),
+        min(180.0, (x1 + 1) * size - 180.0),
+        min(90.0, (y1 + 1) * size - 90.0)
+    )
+
+
+class PredictionTileCache:
+    """Cache LRU limitada com TTL para as predições por (filtro, intervalo de tiles)"""
+    
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[1]
+    
+    def put(self, key: Tuple, features: List[Dict[str, Any]]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, features)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def invalidate(self, filter_id: Optional[str] = None):
+        """Remover as entradas de um filtro (ou todas)"""
+        if filter_id is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == filter_id]:
+            del self._entries[key]
+    
+    def point_count(self, filter_id: Optional[str] = None) -> int:
+        return sum(
+            len(features) for key, (_, features) in self._entries.items()
+            if filter_id is None or key[0] == filter_id
+        )
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 class FilterType(str, Enum):
     """Tipos de filtros preditivos"""
     BIODIVERSITY_HOTSPOTS = "biodiversity_hotspots"
@@ -99,15 +232,18 @@ class PredictiveFilterManager:
         self.db_settings = db_settings
         self.logger = logging.getLogger(__name__)
         
-        # Cache de filtros ativos
-        self._active_filters: Dict[str, MapFilter] = {}
-        self._prediction_cache: Dict[str, List[PredictivePoint]] = {}
-        
         # Configurações
         self.default_grid_resolution = 0.01  # ~1km
         self.max_predictions_per_filter = 1000
         self.cache_ttl_hours = 6
         
+        # Cache de filtros ativos e das predições por intervalo de tiles
+        self._active_filters: Dict[str, MapFilter] = {}
+        self._prediction_cache = PredictionTileCache(
+            max_entries=int(os.getenv('PREDICTIVE_FILTERS_CACHE_ENTRIES', '512')),
+            ttl_seconds=float(os.getenv('PREDICTIVE_FILTERS_CACHE_TTL', '900'))
+        )
+        
         # Área de interesse padrão (Angola)
         self.default_bbox = (-18.0, -18.0, 12.0, -5.0)  # (min_lon, min_lat, max_lon, max_lat)
     
@@ -148,11 +284,12 @@ class PredictiveFilterManager:
             self.logger.error(f"❌ Erro criando filtro: {e}")
             raise
     
+    async def _pool(self) -> asyncpg.Pool:
+        return await get_prediction_pool(self.db_settings.postgres_url)
+    
     async def _save_filter_to_db(self, map_filter: MapFilter):
         """Salva filtro na base de dados"""
-        conn = await asyncpg.connect(self.db_settings.postgres_url)
-        
-        try:
+        async with (await self._pool()).acquire() as conn:
             # Criar tabela se não existir
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS map_filters (
@@ -190,77 +327,93 @@ class PredictiveFilterManager:
             map_filter.max_age_hours, json.dumps(map_filter.bbox), map_filter.grid_resolution,
             map_filter.color_scheme, map_filter.opacity, map_filter.show_confidence,
             map_filter.created_at, map_filter.last_updated, map_filter.is_active)
-            
-        finally:
-            await conn.close()
     
-    async def _generate_filter_predictions(self, map_filter: MapFilter):
-        """Gera predições para um filtro"""
+    async def _generate_filter_predictions(self, map_filter: MapFilter) -> List[Dict[str, Any]]:
+        """Gera predições para um filtro (área completa, descartando a cache do filtro)"""
         try:
-            conn = await asyncpg.connect(self.db_settings.postgres_url)
+            self._prediction_cache.invalidate(map_filter.filter_id)
+            features = await self._get_tile_features(map_filter, map_filter.bbox or self.default_bbox)
             
-            try:
-                # Obter predições recentes do modelo
-                cutoff_time = datetime.now() - timedelta(hours=map_filter.max_age_hours)
-                
-                query = """
-                SELECT prediction_id, latitude, longitude, prediction, confidence, 
-                       prediction_timestamp, area_name
-                FROM prediction_results 
-                WHERE model_id = $1 
-                AND prediction_timestamp > $2
-                AND confidence >= $3
-                AND latitude BETWEEN $4 AND $5
-                AND longitude BETWEEN $6 AND $7
-                ORDER BY confidence DESC, prediction_timestamp DESC
-                LIMIT $8
-                """
-                
-                bbox = map_filter.bbox
-                predictions = await conn.fetch(
-                    query,
-                    map_filter.model_id,
-                    cutoff_time,
-                    map_filter.min_confidence,
-                    bbox[1], bbox[3],  # min_lat, max_lat
-                    bbox[0], bbox[2],  # min_lon, max_lon
-                    self.max_predictions_per_filter
-                )
-                
-                # Converter para pontos preditivos
-                predictive_points = []
-                for pred in predictions:
-                    point = PredictivePoint(
-                        point_id=pred['prediction_id'],
-                        latitude=pred['latitude'],
-                        longitude=pred['longitude'],
-                        prediction_value=json.loads(pred['prediction']) if isinstance(pred['prediction'], str) else pred['prediction'],
-                        confidence=float(pred['confidence']),
-                        model_type=map_filter.filter_type.value,
-                        area_name=pred.get('area_name'),
-                        predicted_at=pred['prediction_timestamp'],
-                        expires_at=pred['prediction_timestamp'] + timedelta(hours=map_filter.max_age_hours)
-                    )
-                    
-                    # Configurar visualização
-                    point.marker_color = self._get_marker_color(point.confidence, map_filter.color_scheme)
-                    point.marker_size = self._get_marker_size(point.confidence)
-                    point.popup_content = self._generate_popup_content(point, map_filter)
-                    
-                    predictive_points.append(point)
-                
-                # Armazenar no cache
-                self._prediction_cache[map_filter.filter_id] = predictive_points
-                
-                self.logger.info(f"📍 Geradas {len(predictive_points)} predições para filtro {map_filter.name}")
-                
-            finally:
-                await conn.close()
+            self.logger.info(f"📍 Geradas {len(features)} predições para filtro {map_filter.name}")
+            return features
                 
         except Exception as e:
             self.logger.error(f"❌ Erro gerando predições para filtro {map_filter.filter_id}: {e}")
             raise
     
+    async def _get_tile_features(self, map_filter: MapFilter,
+                                 bbox: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """Features GeoJSON da bbox alinhada a tiles, via cache LRU/TTL"""
+        tiles = align_bbox_to_tiles(bbox)
+        key = (map_filter.filter_id, *tiles)
+        
+        features = self._prediction_cache.get(key)
+        if features is None:
+            features = await self._fetch_features(map_filter, tile_range_bbox(*tiles))
+            self._prediction_cache.put(key, features)
+        return features
+    
+    async def _fetch_features(self, map_filter: MapFilter,
+                              bbox: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """Consulta as predições recentes do modelo dentro da bbox (índice GiST)"""
+        # Restringir à área de interesse do filtro
+        area = map_filter.bbox or self.default_bbox
+        min_lon, min_lat = max(bbox[0], area[0]), max(bbox[1], area[1])
+        max_lon, max_lat = min(bbox[2], area[2]), min(bbox[3], area[3])
+        if min_lon > max_lon or min_lat > max_lat:
+            return []
+        
+        # Obter predições recentes do modelo
+        cutoff_time = datetime.now() - timedelta(hours=map_filter.max_age_hours)
+        
+        query = """
+        SELECT prediction_id, latitude::float8 AS latitude, longitude::float8 AS longitude,
+               prediction, confidence::float8 AS confidence, prediction_timestamp, area_name
+        FROM prediction_results 
+        WHERE model_id = $1 
+        AND prediction_timestamp > $2
+        AND confidence >= $3
+        AND geom && ST_MakeEnvelope($4, $5, $6, $7, 4326)
+        ORDER BY confidence DESC, prediction_timestamp DESC
+        LIMIT $8
+        """
+        
+        async with (await self._pool()).acquire() as conn:
+            predictions = await conn.fetch(
+                query,
+                map_filter.model_id,
+                cutoff_time,
+                map_filter.min_confidence,
+                min_lon, min_lat, max_lon, max_lat,
+                self.max_predictions_per_filter
+            )
+        
+        # Converter diretamente para features (o popup é renderizado no cliente)
+        model_type = map_filter.filter_type.value
+        color_scheme = map_filter.color_scheme
+        features = []
+        for pred in predictions:
+            confidence = pred['confidence']
+            prediction = pred['prediction']
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [pred['longitude'], pred['latitude']]
+                },
+                "properties": {
+                    "point_id": pred['prediction_id'],
+                    "prediction": json.loads(prediction) if isinstance(prediction, str) else prediction,
+                    "confidence": confidence,
+                    "model_type": model_type,
+                    "area_name": pred['area_name'],
+                    "predicted_at": pred['prediction_timestamp'].isoformat() if pred['prediction_timestamp'] else None,
+                    "marker_color": self._get_marker_color(confidence, color_scheme),
+                    "marker_size": self._get_marker_size(confidence)
+                }
+            })
+        return features
+    
     def _get_marker_color(self, confidence: float, color_scheme: str) -> str:
         """Determina cor do marcador baseada na confiança"""
         if color_scheme == "confidence":
@@ -296,29 +449,15 @@ class PredictiveFilterManager:
         else:
             return 8
     
-    def _generate_popup_content(self, point: PredictivePoint, map_filter: MapFilter) -> str:
-        """Gera conteúdo do popup para um ponto"""
-        confidence_pct = point.confidence * 100
-        
-        content = f"""
-        <div class="prediction-popup">
-            <h4>{map_filter.name}</h4>
-            <p><strong>Predição:</strong> {point.prediction_value}</p>
-            <p><strong>Confiança:</strong> {confidence_pct:.1f}%</p>
-            <p><strong>Coordenadas:</strong> {point.latitude:.4f}, {point.longitude:.4f}</p>
+    async def get_filter_data_for_map(self, filter_id: str,
+                                      bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
         """
+        Obtém dados do filtro formatados para o mapa
         
-        if point.area_name:
-            content += f"<p><strong>Área:</strong> {point.area_name}</p>"
-        
-        if point.predicted_at:
-            content += f"<p><strong>Predito em:</strong> {point.predicted_at.strftime('%d/%m/%Y %H:%M')}</p>"
-        
-        content += "</div>"
-        return content
-    
-    async def get_filter_data_for_map(self, filter_id: str) -> Dict[str, Any]:
-        """Obtém dados do filtro formatados para o mapa"""
+        Args:
+            filter_id: ID do filtro
+            bbox: Área visível (min_lon, min_lat, max_lon, max_lat); por omissão a do filtro
+        """
         try:
             if filter_id not in self._active_filters:
                 await self._load_filter_from_db(filter_id)
@@ -328,46 +467,22 @@ class PredictiveFilterManager:
             
             map_filter = self._active_filters[filter_id]
             
-            # Verificar se as predições estão em cache e são recentes
-            if (filter_id not in self._prediction_cache or 
-                map_filter.last_updated < datetime.now() - timedelta(hours=self.cache_ttl_hours)):
-                await self._generate_filter_predictions(map_filter)
-            
-            points = self._prediction_cache.get(filter_id, [])
-            
-            # Converter para formato GeoJSON
-            geojson_features = []
-            for point in points:
-                feature = {
-                    "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [point.longitude, point.latitude]
-                    },
-                    "properties": {
-                        "point_id": point.point_id,
-                        "prediction": point.prediction_value,
-                        "confidence": point.confidence,
-                        "model_type": point.model_type,
-                        "area_name": point.area_name,
-                        "predicted_at": point.predicted_at.isoformat() if point.predicted_at else None,
-                        "marker_color": point.marker_color,
-                        "marker_size": point.marker_size,
-                        "popup_content": point.popup_content
-                    }
-                }
-                geojson_features.append(feature)
+            # A bbox é arredondada para tiles: a mesma chave serve vários enquadramentos
+            tiles = align_bbox_to_tiles(bbox or map_filter.bbox or self.default_bbox)
+            features = await self._get_tile_features(map_filter, tile_range_bbox(*tiles))
             
             return {
                 "filter_id": filter_id,
                 "name": map_filter.name,
                 "type": map_filter.filter_type.value,
                 "description": map_filter.description,
-                "total_points": len(points),
+                "total_points": len(features),
                 "last_updated": map_filter.last_updated.isoformat(),
+                "bbox": list(tile_range_bbox(*tiles)),
+                "tiles": {"z": tiles[0], "x": [tiles[1], tiles[3]], "y": [tiles[2], tiles[4]]},
                 "geojson": {
                     "type": "FeatureCollection",
-                    "features": geojson_features
+                    "features": features
                 },
                 "style": {
                     "color_scheme": map_filter.color_scheme,
@@ -382,37 +497,32 @@ class PredictiveFilterManager:
     
     async def _load_filter_from_db(self, filter_id: str):
         """Carrega filtro da base de dados"""
-        conn = await asyncpg.connect(self.db_settings.postgres_url)
-        
-        try:
+        async with (await self._pool()).acquire() as conn:
             row = await conn.fetchrow(
                 "SELECT * FROM map_filters WHERE filter_id = $1 AND is_active = TRUE",
                 filter_id
             )
+        
+        if row:
+            map_filter = MapFilter(
+                filter_id=row['filter_id'],
+                name=row['name'],
+                filter_type=FilterType(row['filter_type']),
+                description=row['description'],
+                model_id=row['model_id'],
+                min_confidence=float(row['min_confidence']),
+                max_age_hours=row['max_age_hours'],
+                bbox=json.loads(row['bbox']) if row['bbox'] else self.default_bbox,
+                grid_resolution=float(row['grid_resolution']),
+                color_scheme=row['color_scheme'],
+                opacity=float(row['opacity']),
+                show_confidence=row['show_confidence'],
+                created_at=row['created_at'],
+                last_updated=row['last_updated'],
+                is_active=row['is_active']
+            )
             
-            if row:
-                map_filter = MapFilter(
-                    filter_id=row['filter_id'],
-                    name=row['name'],
-                    filter_type=FilterType(row['filter_type']),
-                    description=row['description'],
-                    model_id=row['model_id'],
-                    min_confidence=float(row['min_confidence']),
-                    max_age_hours=row['max_age_hours'],
-                    bbox=json.loads(row['bbox']) if row['bbox'] else self.default_bbox,
-                    grid_resolution=float(row['grid_resolution']),
-                    color_scheme=row['color_scheme'],
-                    opacity=float(row['opacity']),
-                    show_confidence=row['show_confidence'],
-                    created_at=row['created_at'],
-                    last_updated=row['last_updated'],
-                    is_active=row['is_active']
-                )
-                
-                self._active_filters[filter_id] = map_filter
-                
-        finally:
-            await conn.close()
+            self._active_filters[filter_id] = map_filter
     
     async def update_filter_predictions(self, filter_id: Optional[str] = None):
         """Atualiza predições de um filtro específico ou todos"""
@@ -436,35 +546,30 @@ class PredictiveFilterManager:
     async def get_available_filters(self) -> List[Dict[str, Any]]:
         """Obtém lista de filtros disponíveis"""
         try:
-            conn = await asyncpg.connect(self.db_settings.postgres_url)
-            
-            try:
+            async with (await self._pool()).acquire() as conn:
                 rows = await conn.fetch("""
                     SELECT filter_id, name, filter_type, description, 
                            last_updated, is_active
                     FROM map_filters 
                     ORDER BY last_updated DESC
                 """)
+            
+            filters = []
+            for row in rows:
+                # Contar pontos no cache
+                point_count = self._prediction_cache.point_count(row['filter_id'])
                 
-                filters = []
-                for row in rows:
-                    # Contar pontos no cache
-                    point_count = len(self._prediction_cache.get(row['filter_id'], []))
-                    
-                    filters.append({
-                        "filter_id": row['filter_id'],
-                        "name": row['name'],
-                        "type": row['filter_type'],
-                        "description": row['description'],
-                        "last_updated": row['last_updated'].isoformat(),
-                        "is_active": row['is_active'],
-                        "point_count": point_count
-                    })
-                
-                return filters
-                
-            finally:
-                await conn.close()
+                filters.append({
+                    "filter_id": row['filter_id'],
+                    "name": row['name'],
+                    "type": row['filter_type'],
+                    "description": row['description'],
+                    "last_updated": row['last_updated'].isoformat(),
+                    "is_active": row['is_active'],
+                    "point_count": point_count
+                })
+            
+            return filters
                 
         except Exception as e:
             self.logger.error(f"❌ Erro obtendo filtros disponíveis: {e}")
@@ -512,9 +617,7 @@ class PredictiveFilterManager:
     async def get_filter_statistics(self) -> Dict[str, Any]:
         """Obtém estatísticas dos filtros"""
         try:
-            conn = await asyncpg.connect(self.db_settings.postgres_url)
-            
-            try:
+            async with (await self._pool()).acquire() as conn:
                 # Estatísticas gerais
                 stats = await conn.fetchrow("""
                     SELECT 
@@ -534,19 +637,17 @@ class PredictiveFilterManager:
                     GROUP BY filter_type
                 """)
                 
-                # Total de pontos em cache
-                total_cached_points = sum(len(points) for points in self._prediction_cache.values())
-                
-                return {
-                    "general": dict(stats) if stats else {},
-                    "by_type": [dict(row) for row in type_stats],
-                    "cached_points": total_cached_points,
-                    "cache_size": len(self._prediction_cache),
-                    "active_filters_in_memory": len(self._active_filters)
-                }
-                
-            finally:
-                await conn.close()
+            # Total de pontos em cache
+            total_cached_points = self._prediction_cache.point_count()
+            
+            return {
+                "general": dict(stats) if stats else {},
+                "by_type": [dict(row) for row in type_stats],
+                "cached_points": total_cached_points,
+                "cache_size": len(self._prediction_cache),
+                "cache_stats": dict(self._prediction_cache.stats),
+                "active_filters_in_memory": len(self._active_filters)
+            }
                 
         except Exception as e:
             self.logger.error(f"❌ Erro obtendo estatísticas: {e}")
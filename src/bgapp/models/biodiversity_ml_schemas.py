@@ -336,6 +336,7 @@ CREATE TABLE IF NOT EXISTS prediction_results (
 -- Índices
 CREATE INDEX IF NOT EXISTS idx_prediction_results_model ON prediction_results(model_id);
 CREATE INDEX IF NOT EXISTS idx_prediction_results_timestamp ON prediction_results(prediction_timestamp);
+CREATE INDEX IF NOT EXISTS idx_prediction_results_model_time ON prediction_results(model_id, prediction_timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_prediction_results_location ON prediction_results USING GIST(geom);
 CREATE INDEX IF NOT EXISTS idx_prediction_results_mapping ON prediction_results(used_for_mapping);
 """
@@ -9,9 +9,10 @@ import hashlib
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import logging
 import asyncio
+import threading
 import aiohttp
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -51,6 +52,60 @@ class OfflineRecord:
         return hashlib.sha256(hash_input.encode()).hexdigest()[:16]
 
 
+# Endpoints por tipo de dados (envio individual)
+ENDPOINT_MAP = {
+    'observation': '/collections/occurrences/items',
+    'sample': '/collections/samples/items',
+    'measurement': '/collections/measurements/items'
+}
+
+RECORD_COLUMNS = """
+    id, timestamp, data_type, content, latitude, longitude,
+    collector_id, device_id, sync_status, sync_attempts,
+    last_sync_attempt, hash
+"""
+
+
+def _row_to_record(row: Tuple) -> OfflineRecord:
+    """Converter linha da tabela offline_records em OfflineRecord"""
+    return OfflineRecord(
+        id=row[0],
+        timestamp=row[1],
+        data_type=row[2],
+        content=json.loads(row[3]),
+        location=(row[4], row[5]),
+        collector_id=row[6],
+        device_id=row[7],
+        sync_status=row[8],
+        sync_attempts=row[9],
+        last_sync_attempt=row[10],
+        hash=row[11]
+    )
+
+
+def _row_payload_json(row: Tuple) -> str:
+    """JSON de envio de uma linha, reutilizando o conteúdo já serializado"""
+    header = json.dumps({
+        'id': row[0],
+        'timestamp': row[1],
+        'data_type': row[2],
+        'location': {'latitude': row[4], 'longitude': row[5]},
+        'collector_id': row[6],
+        'device_id': row[7],
+        'hash': row[11],
+        'source': 'offline_sync'
+    })
+    return f'{header[:-1]}, "content": {row[3]}}}'
+
+
+def _status_from_http(status_code: int) -> SyncStatus:
+    if status_code in (200, 201):
+        return SyncStatus.SYNCED
+    if status_code == 409:
+        return SyncStatus.CONFLICT
+    return SyncStatus.ERROR
+
+
 class OfflineSyncManager:
     """Gerenciador de sincronização offline"""
     
@@ -63,12 +118,35 @@ class OfflineSyncManager:
         self.max_sync_attempts = 5
         self.sync_batch_size = 50
         self.retry_delay_hours = [1, 2, 6, 24, 72]  # Backoff exponencial
+        self.read_page_size = 1000          # linhas por página na leitura dos pendentes
+        self.upload_batch_size = 500        # registos por pedido de envio em lote
+        self.max_concurrent_uploads = 4     # pedidos de lote simultâneos
+        self.bulk_sync_endpoint = "/sync/offline/bulk"
+        self.bulk_supported: Optional[bool] = None  # detetado no primeiro envio
         
+        # Ligação única (WAL) partilhada por todas as operações
+        self._lock = threading.RLock()
+        self._conn = self._connect()
         self._init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Abrir a ligação SQLite em modo WAL"""
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    def close(self):
+        """Fechar a ligação à base de dados local"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
     def _init_database(self):
         """Inicializar base de dados SQLite local"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS offline_records (
                     id TEXT PRIMARY KEY,
@@ -103,181 +181,265 @@ class OfflineSyncManager:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_status ON offline_records (sync_status)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON offline_records (timestamp)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_hash ON offline_records (hash)")
+            # Leitura paginada dos pendentes por (timestamp, id)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_pending_order
+                ON offline_records (sync_status, timestamp, id)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_log_record ON sync_log (record_id)")
     
     def store_record(self, record: OfflineRecord) -> bool:
         """Armazenar registo offline"""
+        return self.store_records([record]) == 1
+    
+    def store_records(self, records: List[OfflineRecord]) -> int:
+        """Armazenar vários registos offline numa única transação"""
+        if not records:
+            return 0
+        
+        rows = [
+            (
+                record.id, record.timestamp, record.data_type,
+                json.dumps(record.content), record.location[0], record.location[1],
+                record.collector_id, record.device_id, record.sync_status,
+                record.sync_attempts, record.last_sync_attempt, record.hash
+            )
+            for record in records
+        ]
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO offline_records 
-                    (id, timestamp, data_type, content, latitude, longitude, 
-                     collector_id, device_id, sync_status, sync_attempts, 
-                     last_sync_attempt, hash)
+            with self._lock, self._conn as conn:
+                conn.executemany(f"""
+                    INSERT OR REPLACE INTO offline_records ({RECORD_COLUMNS})
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    record.id, record.timestamp, record.data_type,
-                    json.dumps(record.content), record.location[0], record.location[1],
-                    record.collector_id, record.device_id, record.sync_status,
-                    record.sync_attempts, record.last_sync_attempt, record.hash
-                ))
-                
-                self._log_action(record.id, "store", "success", "Registo armazenado localmente")
-                return True
+                """, rows)
+                self._log_actions(conn, [
+                    (record.id, "store", "success", "Registo armazenado localmente")
+                    for record in records
+                ])
+            return len(rows)
                 
         except sqlite3.IntegrityError as e:
             if "hash" in str(e):
-                self.logger.warning(f"Registo duplicado detectado: {record.hash}")
-                return False
+                self.logger.warning(f"Registo duplicado detectado: {e}")
+                return 0
             raise
         except Exception as e:
             self.logger.error(f"Erro ao armazenar registo: {e}")
-            return False
+            return 0
+    
+    def _pending_pages(self, limit: int = None, page_size: int = None) -> Iterator[List[Tuple]]:
+        """Linhas pendentes em páginas ordenadas por (timestamp, id)"""
+        page_size = page_size or self.read_page_size
+        remaining = limit
+        last_key = ("", "")
+        
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            with self._lock:
+                rows = self._conn.execute(f"""
+                    SELECT {RECORD_COLUMNS}
+                    FROM offline_records
+                    WHERE sync_status = 'pending' AND (timestamp, id) > (?, ?)
+                    ORDER BY timestamp ASC, id ASC
+                    LIMIT ?
+                """, (*last_key, size)).fetchall()
+            
+            if not rows:
+                return
+            yield rows
+            
+            last_key = (rows[-1][1], rows[-1][0])
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+    
+    def iter_pending_records(self, limit: int = None, page_size: int = None) -> Iterator[OfflineRecord]:
+        """Iterar registos pendentes sem os carregar todos em memória"""
+        for rows in self._pending_pages(limit, page_size):
+            for row in rows:
+                yield _row_to_record(row)
     
     def get_pending_records(self, limit: int = None) -> List[OfflineRecord]:
         """Obter registos pendentes de sincronização"""
-        query = """
-            SELECT id, timestamp, data_type, content, latitude, longitude,
-                   collector_id, device_id, sync_status, sync_attempts,
-                   last_sync_attempt, hash
-            FROM offline_records 
-            WHERE sync_status = 'pending' 
-            ORDER BY timestamp ASC
-        """
-        
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        records = []
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(query)
-            for row in cursor.fetchall():
-                record = OfflineRecord(
-                    id=row[0],
-                    timestamp=row[1],
-                    data_type=row[2],
-                    content=json.loads(row[3]),
-                    location=(row[4], row[5]),
-                    collector_id=row[6],
-                    device_id=row[7],
-                    sync_status=row[8],
-                    sync_attempts=row[9],
-                    last_sync_attempt=row[10],
-                    hash=row[11]
-                )
-                records.append(record)
-        
-        return records
+        return list(self.iter_pending_records(limit))
     
     def update_sync_status(self, record_id: str, status: SyncStatus, message: str = ""):
         """Atualizar status de sincronização"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        self.apply_sync_results([(record_id, status, message)])
+    
+    def apply_sync_results(self, results: List[Tuple[str, SyncStatus, str]]):
+        """Aplicar os resultados de sincronização de vários registos numa transação"""
+        if not results:
+            return
+        
+        now = datetime.now().isoformat()
+        with self._lock, self._conn as conn:
+            conn.executemany("""
                 UPDATE offline_records 
                 SET sync_status = ?, last_sync_attempt = ?, sync_attempts = sync_attempts + 1
                 WHERE id = ?
-            """, (status.value, datetime.now().isoformat(), record_id))
+            """, [(status.value, now, record_id) for record_id, status, _ in results])
             
-            self._log_action(record_id, "sync_update", status.value, message)
+            self._log_actions(conn, [
+                (record_id, "sync_update", status.value, message)
+                for record_id, status, message in results
+            ])
     
     def _log_action(self, record_id: str, action: str, status: str, message: str):
         """Registar ação no log"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO sync_log (record_id, action, status, message)
-                VALUES (?, ?, ?, ?)
-            """, (record_id, action, status, message))
+        with self._lock, self._conn as conn:
+            self._log_actions(conn, [(record_id, action, status, message)])
     
-    async def sync_single_record(self, record: OfflineRecord, session: aiohttp.ClientSession) -> bool:
-        """Sincronizar um registo individual"""
+    @staticmethod
+    def _log_actions(conn: sqlite3.Connection, entries: List[Tuple[str, str, str, str]]):
+        """Registar várias ações no log (dentro da transação do chamador)"""
+        conn.executemany("""
+            INSERT INTO sync_log (record_id, action, status, message)
+            VALUES (?, ?, ?, ?)
+        """, entries)
+    
+    async def _post_record_json(self, record_id: str, data_type: str, payload: str,
+                                session: aiohttp.ClientSession) -> Tuple[str, SyncStatus, str]:
+        """Enviar um registo (JSON já serializado) e devolver o resultado"""
+        endpoint = ENDPOINT_MAP.get(data_type, '/collections/data/items')
+        url = f"{self.api_base_url}{endpoint}"
+        
         try:
-            # Preparar dados para envio
-            sync_data = {
-                'id': record.id,
-                'timestamp': record.timestamp,
-                'data_type': record.data_type,
-                'content': record.content,
-                'location': {
-                    'latitude': record.location[0],
-                    'longitude': record.location[1]
-                },
-                'collector_id': record.collector_id,
-                'device_id': record.device_id,
-                'hash': record.hash,
-                'source': 'offline_sync'
-            }
-            
-            # Determinar endpoint baseado no tipo de dados
-            endpoint_map = {
-                'observation': '/collections/occurrences/items',
-                'sample': '/collections/samples/items',
-                'measurement': '/collections/measurements/items'
-            }
-            
-            endpoint = endpoint_map.get(record.data_type, '/collections/data/items')
-            url = f"{self.api_base_url}{endpoint}"
-            
-            # Enviar dados
-            async with session.post(url, json=sync_data) as response:
-                if response.status == 200 or response.status == 201:
-                    self.update_sync_status(record.id, SyncStatus.SYNCED, "Sincronizado com sucesso")
-                    return True
-                elif response.status == 409:
-                    # Conflito - registo já existe
-                    self.update_sync_status(record.id, SyncStatus.CONFLICT, "Registo já existe no servidor")
-                    return False
-                else:
-                    error_msg = f"Erro HTTP {response.status}: {await response.text()}"
-                    self.update_sync_status(record.id, SyncStatus.ERROR, error_msg)
-                    return False
+            async with session.post(url, data=payload,
+                                    headers={'Content-Type': 'application/json'}) as response:
+                status = _status_from_http(response.status)
+                if status == SyncStatus.SYNCED:
+                    return record_id, status, "Sincronizado com sucesso"
+                if status == SyncStatus.CONFLICT:
+                    return record_id, status, "Registo já existe no servidor"
+                return record_id, status, f"Erro HTTP {response.status}: {await response.text()}"
                     
         except Exception as e:
-            error_msg = f"Erro de sincronização: {str(e)}"
-            self.update_sync_status(record.id, SyncStatus.ERROR, error_msg)
-            self.logger.error(f"Erro ao sincronizar registo {record.id}: {e}")
-            return False
+            self.logger.error(f"Erro ao sincronizar registo {record_id}: {e}")
+            return record_id, SyncStatus.ERROR, f"Erro de sincronização: {str(e)}"
+    
+    async def sync_single_record(self, record: OfflineRecord, session: aiohttp.ClientSession) -> bool:
+        """Sincronizar um registo individual"""
+        row = (
+            record.id, record.timestamp, record.data_type, json.dumps(record.content),
+            record.location[0], record.location[1], record.collector_id, record.device_id,
+            record.sync_status, record.sync_attempts, record.last_sync_attempt, record.hash
+        )
+        result = await self._post_record_json(record.id, record.data_type, _row_payload_json(row), session)
+        self.apply_sync_results([result])
+        return result[1] == SyncStatus.SYNCED
+    
+    async def _upload_rows(self, rows: List[Tuple],
+                           session: aiohttp.ClientSession) -> List[Tuple[str, SyncStatus, str]]:
+        """
+        Enviar um lote de linhas num único pedido ao endpoint de envio em lote.
+        
+        O servidor responde ``{"results": [{"id", "status", "message"}]}`` com o
+        código HTTP de cada registo. Se o endpoint não existir (404/405), os
+        registos são enviados individualmente pelos endpoints das coleções.
+        """
+        if self.bulk_supported is not False:
+            body = '{"source": "offline_sync", "records": [' + ', '.join(
+                _row_payload_json(row) for row in rows
+            ) + ']}'
+            url = f"{self.api_base_url}{self.bulk_sync_endpoint}"
+            
+            try:
+                async with session.post(url, data=body,
+                                        headers={'Content-Type': 'application/json'}) as response:
+                    if response.status in (404, 405):
+                        self.bulk_supported = False
+                        self.logger.info("Endpoint de envio em lote indisponível; a enviar registo a registo")
+                    elif response.status in (200, 201, 207):
+                        self.bulk_supported = True
+                        payload = await response.json()
+                        by_id = {
+                            item.get('id'): item for item in payload.get('results', [])
+                        }
+                        results = []
+                        for row in rows:
+                            item = by_id.get(row[0])
+                            if item is None:
+                                results.append((row[0], SyncStatus.ERROR, "Sem resultado na resposta do lote"))
+                                continue
+                            status = _status_from_http(int(item.get('status', 500)))
+                            results.append((row[0], status, item.get('message') or status.value))
+                        return results
+                    else:
+                        error_msg = f"Erro HTTP {response.status}: {await response.text()}"
+                        return [(row[0], SyncStatus.ERROR, error_msg) for row in rows]
+                        
+            except Exception as e:
+                self.logger.error(f"Erro ao enviar lote de {len(rows)} registos: {e}")
+                return [(row[0], SyncStatus.ERROR, f"Erro de sincronização: {str(e)}") for row in rows]
+        
+        return list(await asyncio.gather(*[
+            self._post_record_json(row[0], row[2], _row_payload_json(row), session)
+            for row in rows
+        ]))
     
     async def sync_batch(self, max_records: int = None) -> Dict[str, int]:
         """Sincronizar lote de registos"""
         if max_records is None:
             max_records = self.sync_batch_size
+        return await self.sync_pending(max_records)
+    
+    async def sync_pending(self, max_records: int = None) -> Dict[str, int]:
+        """
+        Sincronizar registos pendentes (todos, se ``max_records`` for None)
         
-        pending_records = self.get_pending_records(max_records)
+        As linhas são lidas em páginas e enviadas em lotes de
+        ``upload_batch_size``, com até ``max_concurrent_uploads`` pedidos em
+        curso; os resultados de cada lote são gravados numa só transação.
+        """
+        results = {'total': 0, 'success': 0, 'error': 0, 'conflict': 0}
         
-        if not pending_records:
-            return {'total': 0, 'success': 0, 'error': 0, 'conflict': 0}
+        def count(batch_results):
+            for _, status, _ in batch_results:
+                if status == SyncStatus.SYNCED:
+                    results['success'] += 1
+                elif status == SyncStatus.CONFLICT:
+                    results['conflict'] += 1
+                else:
+                    results['error'] += 1
         
-        results = {'total': len(pending_records), 'success': 0, 'error': 0, 'conflict': 0}
+        async def upload(rows):
+            batch_results = await self._upload_rows(rows, session)
+            self.apply_sync_results(batch_results)
+            return batch_results
         
         # Criar sessão HTTP assíncrona
-        timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            
-            # Processar registos em paralelo (limitado)
-            semaphore = asyncio.Semaphore(5)  # Máximo 5 requisições simultâneas
+        timeout = aiohttp.ClientTimeout(total=120)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent_uploads * 2)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            in_flight = set()
             
-            async def sync_with_semaphore(record):
-                async with semaphore:
-                    return await self.sync_single_record(record, session)
-            
-            # Executar sincronizações
-            tasks = [sync_with_semaphore(record) for record in pending_records]
-            sync_results = await asyncio.gather(*tasks, return_exceptions=True)
+            for page in self._pending_pages(max_records):
+                for i in range(0, len(page), self.upload_batch_size):
+                    batch = page[i:i + self.upload_batch_size]
+                    results['total'] += len(batch)
+                    in_flight.add(asyncio.ensure_future(upload(batch)))
+                    
+                    # Limitar os pedidos de lote em curso
+                    if len(in_flight) >= self.max_concurrent_uploads:
+                        done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            count(task.result())
             
-            # Contar resultados
-            for result in sync_results:
-                if isinstance(result, Exception):
-                    results['error'] += 1
-                elif result:
-                    results['success'] += 1
-                else:
-                    results['error'] += 1
+            if in_flight:
+                for batch_results in await asyncio.gather(*in_flight):
+                    count(batch_results)
         
-        self.logger.info(f"Sincronização concluída: {results}")
+        if results['total']:
+            self.logger.info(f"Sincronização concluída: {results}")
         return results
     
     def get_sync_statistics(self) -> Dict[str, Any]:
         """Obter estatísticas de sincronização"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock:
+            conn = self._conn
             # Contar por status
             status_counts = {}
             cursor = conn.execute("""
@@ -348,9 +510,9 @@ class OfflineSyncManager:
         query += " ORDER BY timestamp"
         
         records = []
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(query, params)
-            for row in cursor.fetchall():
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            for row in cursor:
                 record = {
                     'id': row[0],
                     'timestamp': row[1],
@@ -403,7 +565,7 @@ class OfflineSyncManager:
         """Limpar registos antigos já sincronizados"""
         cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
             cursor = conn.execute("""
                 DELETE FROM offline_records 
                 WHERE sync_status = 'synced' AND timestamp < ?
@@ -431,8 +593,8 @@ class OfflineSyncManager:
                     try:
                         async with session.get(f"{self.api_base_url}/health", timeout=5) as response:
                             if response.status == 200:
-                                # Servidor disponível, tentar sincronizar
-                                results = await self.sync_batch()
+                                # Servidor disponível, escoar todos os pendentes
+                                results = await self.sync_pending()
                                 if results['total'] > 0:
                                     self.logger.info(f"Sincronização automática: {results}")
                     except:
@@ -4,9 +4,7 @@ Sistema de geração automática de relatórios com mapas e estatísticas
 """
 
 import json
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.backends.backend_pdf import PdfPages
 import seaborn as sns
@@ -16,7 +14,6 @@ from pathlib import Path
 import logging
 from dataclasses import dataclass
 from enum import Enum
-import io
 import base64
 
 from reportlab.lib.pagesizes import A4, letter
@@ -35,6 +32,7 @@ from .temporal_visualization import TemporalVisualization
 from .spatial_analysis import SpatialAnalysisTools
 from .biomass_calculator import AdvancedBiomassCalculator, BiomassType
 from .migration_overlay import MigrationOverlaySystem
+from .report_charts import render_chart_file
 
 logger = logging.getLogger(__name__)
 
@@ -78,13 +76,7 @@ class AutomatedReportGenerator:
     """
     
     def __init__(self):
-        # Configurar matplotlib para português
-        plt.rcParams['font.size'] = 10
-        plt.rcParams['axes.titlesize'] = 12
-        plt.rcParams['axes.labelsize'] = 10
-        plt.rcParams['xtick.labelsize'] = 9
-        plt.rcParams['ytick.labelsize'] = 9
-        plt.rcParams['legend.fontsize'] = 9
+        # Estilo dos gráficos definido em report_charts.CHART_RC (sem alterar plt.rcParams global)
         
         # Inicializar módulos de análise
         self.temporal_viz = TemporalVisualization()
@@ -122,6 +114,15 @@ class AutomatedReportGenerator:
                 layout='standard',
                 language='pt',
                 branding={'logo': 'bgapp_logo.png', 'color': '#1e5d8b'}
+            ),
+            ReportType.MONTHLY_MONITORING: ReportTemplate(
+                report_type=ReportType.MONTHLY_MONITORING,
+                title="Monitorização Mensal da ZEE de Angola",
+                sections=['executive_summary', 'methodology', 'temporal_trends',
+                         'spatial_distribution', 'conclusions', 'recommendations'],
+                layout='standard',
+                language='pt',
+                branding={'logo': 'bgapp_logo.png', 'color': '#1e5d8b'}
             )
         }
         
@@ -209,38 +210,12 @@ class AutomatedReportGenerator:
             # Criar documento PDF
             output_file = Path(output_path)
             output_file.parent.mkdir(parents=True, exist_ok=True)
+            doc = self.create_document(output_file)
             
-            doc = SimpleDocTemplate(
-                str(output_file),
-                pagesize=A4,
-                rightMargin=2*cm,
-                leftMargin=2*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
-            
-            # Construir conteúdo do relatório
-            story = []
-            
-            # Página de título
-            story.extend(self._create_title_page(template, data))
-            story.append(PageBreak())
-            
-            # Índice
-            story.extend(self._create_table_of_contents(sections_to_include))
-            story.append(PageBreak())
-            
-            # Gerar cada seção
+            # Construir conteúdo do relatório: título, índice e cada seção
+            story = self.build_front_matter(template, data, sections_to_include)
             for section_name in sections_to_include:
-                try:
-                    section_content = self._generate_section(
-                        section_name, report_type, data
-                    )
-                    story.extend(section_content)
-                    story.append(Spacer(1, 20))
-                except Exception as e:
-                    logger.error(f"Erro ao gerar seção {section_name}: {e}")
-                    continue
+                story.extend(self.build_section(section_name, report_type, data))
             
             # Construir PDF
             doc.build(story)
@@ -252,6 +227,42 @@ class AutomatedReportGenerator:
             logger.error(f"Erro ao gerar relatório: {e}")
             return False
     
+    def create_document(self, output_file: Path) -> SimpleDocTemplate:
+        """Documento A4 com as margens padrão dos relatórios"""
+        return SimpleDocTemplate(
+            str(output_file),
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2*cm,
+            bottomMargin=2*cm
+        )
+    
+    def build_front_matter(self, 
+                           template: ReportTemplate, 
+                           data: Dict[str, Any],
+                           sections: List[str]) -> List[Any]:
+        """Página de título e índice"""
+        story = []
+        story.extend(self._create_title_page(template, data))
+        story.append(PageBreak())
+        story.extend(self._create_table_of_contents(sections))
+        story.append(PageBreak())
+        return story
+    
+    def build_section(self, 
+                      section_name: str, 
+                      report_type: ReportType, 
+                      data: Dict[str, Any]) -> List[Any]:
+        """Flowables de uma seção (vazio em caso de erro, como no relatório completo)"""
+        try:
+            section_content = self._generate_section(section_name, report_type, data)
+            section_content.append(Spacer(1, 20))
+            return section_content
+        except Exception as e:
+            logger.error(f"Erro ao gerar seção {section_name}: {e}")
+            return []
+    
     def _create_title_page(self, 
                           template: ReportTemplate, 
                           data: Dict[str, Any]) -> List[Any]:
@@ -829,42 +840,44 @@ class AutomatedReportGenerator:
         
         return story
     
+    def chart_specs(self, section_name: str, data: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Gráficos (tipo, dados) que uma seção vai incluir, para pré-renderização paralela"""
+        if section_name == 'terrestrial_biomass':
+            zones = data.get('terrestrial_biomass', {}).get('zones', [])
+            return [('biomass', self._biomass_chart_payload(zones))] if zones else []
+        if section_name == 'temporal_trends':
+            return [('time_series', {'seed': 42})] if 'temporal_analysis' in data else []
+        if section_name == 'spatial_distribution':
+            return [('map', {'seed': 42})]
+        if section_name == 'risk_assessment':
+            return [('risk', self._risk_chart_payload(data['risk_assessment']))] if 'risk_assessment' in data else []
+        return []
+    
+    def _biomass_chart_payload(self, zones_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        top_zones = zones_data[:5]  # Top 5 zonas
+        return {
+            'zone_names': [zone.get('zone_name', 'N/A')[:15] for zone in top_zones],  # Truncar nomes longos
+            'biomass_values': [float(zone.get('biomass_result', {}).get('total_biomass', 0)) for zone in top_zones],
+            'colors': self.color_palettes['biomass'],
+        }
+    
+    def _risk_chart_payload(self, risk_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'risk_counts': [
+                risk_data.get('high_risk_interactions', 5),
+                risk_data.get('medium_risk_interactions', 12),
+                risk_data.get('low_risk_interactions', 8)
+            ]
+        }
+    
+    def _chart_image(self, kind: str, payload: Dict[str, Any], width: float, height: float) -> Image:
+        """Image reportlab apoiada no PNG em disco (reutiliza o ficheiro se já pré-renderizado)"""
+        return Image(render_chart_file(kind, payload), width=width, height=height)
+    
     def _create_biomass_chart(self, zones_data: List[Dict[str, Any]]) -> Optional[Image]:
         """Criar gráfico de biomassa por zona"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            zone_names = []
-            biomass_values = []
-            
-            for zone in zones_data[:5]:  # Top 5 zonas
-                zone_names.append(zone.get('zone_name', 'N/A')[:15])  # Truncar nomes longos
-                biomass_result = zone.get('biomass_result', {})
-                biomass_values.append(biomass_result.get('total_biomass', 0))
-            
-            bars = ax.bar(zone_names, biomass_values, color=self.color_palettes['biomass'])
-            ax.set_ylabel('Biomassa (toneladas)')
-            ax.set_title('Biomassa Total por Zona Ecológica')
-            ax.tick_params(axis='x', rotation=45)
-            
-            # Adicionar valores nas barras
-            for bar, value in zip(bars, biomass_values):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                       f'{value:,.0f}', ha='center', va='bottom', fontsize=9)
-            
-            plt.tight_layout()
-            
-            # Converter para imagem
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            img = Image(img_buffer, width=15*cm, height=9*cm)
-            plt.close()
-            
-            return img
-            
+            return self._chart_image('biomass', self._biomass_chart_payload(zones_data), 15*cm, 9*cm)
         except Exception as e:
             logger.error(f"Erro ao criar gráfico de biomassa: {e}")
             return None
@@ -872,45 +885,7 @@ class AutomatedReportGenerator:
     def _create_time_series_chart(self, temporal_data: Dict[str, Any]) -> Optional[Image]:
         """Criar gráfico de séries temporais"""
         try:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            # Dados simulados para demonstração
-            months = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
-                     'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-            
-            # Simular 3 variáveis
-            ndvi_values = [0.3 + 0.2 * np.sin(2 * np.pi * i / 12) + np.random.normal(0, 0.02) for i in range(12)]
-            chl_values = [2.0 + 1.5 * np.sin(2 * np.pi * (i + 3) / 12) + np.random.normal(0, 0.1) for i in range(12)]
-            sst_values = [22 + 4 * np.sin(2 * np.pi * (i + 6) / 12) + np.random.normal(0, 0.3) for i in range(12)]
-            
-            ax.plot(months, ndvi_values, 'o-', label='NDVI', color='green', linewidth=2)
-            ax2 = ax.twinx()
-            ax2.plot(months, chl_values, 's-', label='Chl-a (mg/m³)', color='blue', linewidth=2)
-            ax2.plot(months, sst_values, '^-', label='SST (°C)', color='red', linewidth=2)
-            
-            ax.set_ylabel('NDVI', color='green')
-            ax2.set_ylabel('Chl-a / SST', color='blue')
-            ax.set_xlabel('Mês')
-            ax.set_title('Evolução Temporal das Variáveis Ambientais')
-            
-            # Combinar legendas
-            lines1, labels1 = ax.get_legend_handles_labels()
-            lines2, labels2 = ax2.get_legend_handles_labels()
-            ax.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
-            
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Converter para imagem
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            img = Image(img_buffer, width=16*cm, height=9*cm)
-            plt.close()
-            
-            return img
-            
+            return self._chart_image('time_series', {'seed': 42}, 16*cm, 9*cm)
         except Exception as e:
             logger.error(f"Erro ao criar gráfico temporal: {e}")
             return None
@@ -918,35 +893,7 @@ class AutomatedReportGenerator:
     def _create_risk_chart(self, risk_data: Dict[str, Any]) -> Optional[Image]:
         """Criar gráfico de avaliação de risco"""
         try:
-            fig, ax = plt.subplots(figsize=(8, 8))
-            
-            # Dados de risco
-            risk_levels = ['Alto', 'Médio', 'Baixo']
-            risk_counts = [
-                risk_data.get('high_risk_interactions', 5),
-                risk_data.get('medium_risk_interactions', 12),
-                risk_data.get('low_risk_interactions', 8)
-            ]
-            
-            colors = ['#DC143C', '#FFA500', '#32CD32']
-            
-            wedges, texts, autotexts = ax.pie(risk_counts, labels=risk_levels, colors=colors,
-                                            autopct='%1.1f%%', startangle=90)
-            
-            ax.set_title('Distribuição de Interações por Nível de Risco', fontsize=12, pad=20)
-            
-            plt.tight_layout()
-            
-            # Converter para imagem
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            img = Image(img_buffer, width=12*cm, height=12*cm)
-            plt.close()
-            
-            return img
-            
+            return self._chart_image('risk', self._risk_chart_payload(risk_data), 12*cm, 12*cm)
         except Exception as e:
             logger.error(f"Erro ao criar gráfico de risco: {e}")
             return None
@@ -954,57 +901,11 @@ class AutomatedReportGenerator:
     def _create_map_placeholder(self) -> Image:
         """Criar placeholder para mapa"""
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            # Simular contorno de Angola
-            angola_lat = np.array([-4.2, -6, -8, -10, -12, -14, -16, -18, -18, -16, -14, -12, -10, -8, -6, -4.2])
-            angola_lon = np.array([12, 12.5, 13, 13.5, 13.8, 13.5, 13, 12.5, 15, 16, 16.5, 17, 17.5, 17, 16, 14])
-            
-            ax.plot(angola_lon, angola_lat, 'k-', linewidth=2, label='Costa de Angola')
-            ax.fill(angola_lon, angola_lat, alpha=0.3, color='lightblue')
-            
-            # Adicionar pontos simulados de biomassa
-            np.random.seed(42)
-            biomass_points_lat = np.random.uniform(-18, -4.2, 20)
-            biomass_points_lon = np.random.uniform(12, 17, 20)
-            biomass_values = np.random.uniform(10, 100, 20)
-            
-            scatter = ax.scatter(biomass_points_lon, biomass_points_lat, c=biomass_values,
-                               cmap='viridis', s=60, alpha=0.7)
-            
-            ax.set_xlabel('Longitude')
-            ax.set_ylabel('Latitude')
-            ax.set_title('Distribuição Espacial da Biomassa - ZEE Angola')
-            ax.grid(True, alpha=0.3)
-            ax.legend()
-            
-            # Barra de cores
-            cbar = plt.colorbar(scatter, ax=ax)
-            cbar.set_label('Biomassa (t/km²)')
-            
-            plt.tight_layout()
-            
-            # Converter para imagem
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            img = Image(img_buffer, width=15*cm, height=12*cm)
-            plt.close()
-            
-            return img
-            
+            return self._chart_image('map', {'seed': 42}, 15*cm, 12*cm)
         except Exception as e:
             logger.error(f"Erro ao criar mapa: {e}")
             # Retornar imagem vazia em caso de erro
-            fig, ax = plt.subplots(figsize=(10, 8))
-            ax.text(0.5, 0.5, 'Mapa não disponível', ha='center', va='center', transform=ax.transAxes)
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=150)
-            img_buffer.seek(0)
-            img = Image(img_buffer, width=15*cm, height=12*cm)
-            plt.close()
-            return img
+            return self._chart_image('unavailable', {'message': 'Mapa não disponível'}, 15*cm, 12*cm)
     
     def generate_monthly_report(self, 
                                month: int, 
@@ -1014,36 +915,7 @@ class AutomatedReportGenerator:
         Gerar relatório mensal automático
         """
         try:
-            # Simular dados mensais
-            monthly_data = {
-                'analysis_period': {
-                    'start': f'{year}-{month:02d}-01',
-                    'end': f'{year}-{month:02d}-28'
-                },
-                'executive_summary': [
-                    f'Análise mensal para {month:02d}/{year}',
-                    'Condições oceanográficas dentro da normalidade',
-                    'Atividade pesqueira moderada',
-                    'Sem eventos extremos registrados'
-                ],
-                'key_findings': [
-                    'Temperatura superficial do mar estável',
-                    'Concentração de clorofila-a sazonal',
-                    'Migração de baleias jubarte detectada'
-                ],
-                'summary_statistics': {
-                    'total_observations': 1250,
-                    'average_sst': 24.5,
-                    'max_chlorophyll': 8.2,
-                    'fishing_vessels_tracked': 45
-                },
-                'data_sources': [
-                    'Copernicus Marine Service',
-                    'MODIS Aqua/Terra',
-                    'Sentinel-2',
-                    'VMS Fishing Vessels'
-                ]
-            }
+            monthly_data = self.monthly_report_data(month, year)
             
             # Nome do arquivo
             filename = f'relatorio_mensal_{year}_{month:02d}.pdf'
@@ -1064,6 +936,38 @@ class AutomatedReportGenerator:
         except Exception as e:
             logger.error(f"Erro ao gerar relatório mensal: {e}")
             return False
+    
+    def monthly_report_data(self, month: int, year: int) -> Dict[str, Any]:
+        """Dados (simulados) do relatório mensal"""
+        return {
+            'analysis_period': {
+                'start': f'{year}-{month:02d}-01',
+                'end': f'{year}-{month:02d}-28'
+            },
+            'executive_summary': [
+                f'Análise mensal para {month:02d}/{year}',
+                'Condições oceanográficas dentro da normalidade',
+                'Atividade pesqueira moderada',
+                'Sem eventos extremos registrados'
+            ],
+            'key_findings': [
+                'Temperatura superficial do mar estável',
+                'Concentração de clorofila-a sazonal',
+                'Migração de baleias jubarte detectada'
+            ],
+            'summary_statistics': {
+                'total_observations': 1250,
+                'average_sst': 24.5,
+                'max_chlorophyll': 8.2,
+                'fishing_vessels_tracked': 45
+            },
+            'data_sources': [
+                'Copernicus Marine Service',
+                'MODIS Aqua/Terra',
+                'Sentinel-2',
+                'VMS Fishing Vessels'
+            ]
+        }
 
 
 def create_biomass_assessment_report(output_path: str) -> bool:
@@ -15,11 +15,23 @@ import logging
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    import dask  # noqa: F401  (backend dos cubos xarray em blocos)
+    DASK_AVAILABLE = True
+except ImportError:
+    DASK_AVAILABLE = False
+
 from ..models.biomass import chl_to_npp_empirical, ndvi_to_biomass_regression, validate_biomass_model
 from ..models.angola_oceanography import AngolaOceanographicModel
 
 logger = logging.getLogger(__name__)
 
+# Passos temporais por bloco Dask nos cubos (time, lat, lon); cubos em memória
+# abaixo de CUBE_DASK_MIN_BYTES são calculados diretamente com NumPy
+CUBE_TIME_CHUNK = 12
+CUBE_DASK_MIN_BYTES = 256 * 1024 ** 2
+CUBE_KERNEL_BYTES = 4 * 1024 ** 2
+
 
 class BiomassType(Enum):
     """Tipos de biomassa suportados"""
@@ -56,12 +68,56 @@ class BiomassTimeSeries:
     statistics: Dict[str, float]
 
 
+def valid_pixel_mask(values: Union[np.ndarray, xr.DataArray], biomass_type: BiomassType):
+    """Intervalos válidos de NDVI, Chl-a e NPP (NaN é sempre inválido)"""
+    if biomass_type == BiomassType.TERRESTRIAL:
+        return (values >= 0.1) & (values <= 0.9)
+    if biomass_type == BiomassType.MARINE_PHYTOPLANKTON:
+        return (values >= 0.1) & (values <= 50.0)
+    return (values > 0) & (values < 5000)
+
+
+def _zone_density_sums(block: np.ndarray, labels: np.ndarray, table: np.ndarray,
+                       biomass_type: BiomassType) -> np.ndarray:
+    """
+    Soma das densidades por (data, zona) de um bloco (..., lat, lon)
+    `table` tem por zona [scale, offset, clip_min, clip_max]; rótulo -1 fica de fora.
+    Processa sub-blocos de ~CUBE_KERNEL_BYTES para as temporárias ficarem em cache
+    """
+    lead_shape = block.shape[:-2]
+    flat_labels = labels.ravel()
+    inside = flat_labels >= 0
+    flat = block.reshape(-1, flat_labels.size)
+    
+    # Parâmetros por píxel e matriz one-hot (píxel × zona) calculados uma vez por bloco
+    pixel_params = np.full((4, flat_labels.size), np.nan)
+    pixel_params[:, inside] = table[flat_labels[inside]].T
+    scale, offset, clip_min, clip_max = pixel_params
+    one_hot = np.zeros((flat_labels.size, len(table)))
+    one_hot[np.flatnonzero(inside), flat_labels[inside]] = 1.0
+    
+    sums = np.empty((flat.shape[0], len(table)))
+    step = max(1, CUBE_KERNEL_BYTES // max(1, flat.shape[1] * 8))
+    for start in range(0, flat.shape[0], step):
+        values = flat[start:start + step]
+        valid = valid_pixel_mask(values, biomass_type) & inside
+        density = values * scale
+        density += offset
+        np.clip(density, clip_min, clip_max, out=density)
+        density[~valid] = 0.0
+        sums[start:start + step] = density @ one_hot
+    return sums.reshape(*lead_shape, len(table))
+
+
 class AdvancedBiomassCalculator:
     """
     Calculadora avançada de biomassa para Angola
     Implementa múltiplos métodos e modelos científicos
     """
     
+    # Tipos com modelo de conversão por píxel (caminho vetorizado)
+    CUBE_BIOMASS_TYPES = (BiomassType.TERRESTRIAL, BiomassType.MARINE_PHYTOPLANKTON, BiomassType.MARINE_FISH)
+    
     def __init__(self):
         self.angola_model = AngolaOceanographicModel()
         
@@ -408,51 +464,109 @@ class AdvancedBiomassCalculator:
         Calcular série temporal de biomassa
         """
         timestamps = sorted(data_series.keys())
-        biomass_values = []
         
-        for timestamp in timestamps:
-            data = data_series[timestamp]
-            
+        if biomass_type not in self.CUBE_BIOMASS_TYPES:
+            logger.error(f"Tipo de biomassa não suportado: {biomass_type}")
+            return BiomassTimeSeries(timestamps, [], biomass_type, "toneladas", region_name, {})
+        
+        # Grelhas iguais: empilhar num cubo e calcular a série numa única passagem
+        arrays = [np.asarray(data_series[timestamp]) for timestamp in timestamps]
+        if arrays and all(array.shape == arrays[0].shape and array.ndim == 2 for array in arrays):
+            cube = xr.DataArray(np.stack(arrays), dims=('time', 'y', 'x'), coords={'time': timestamps})
+            return self.calculate_biomass_time_series_cube(cube, biomass_type, region_bounds, region_name)
+        
+        # Grelhas heterogéneas: cálculo por data
+        biomass_values = []
+        for timestamp, data in zip(timestamps, arrays):
             if biomass_type == BiomassType.TERRESTRIAL:
                 result = self.calculate_terrestrial_biomass(data, region_bounds, calculation_date=timestamp)
             elif biomass_type == BiomassType.MARINE_PHYTOPLANKTON:
                 result = self.calculate_marine_phytoplankton_biomass(data, region_bounds=region_bounds, calculation_date=timestamp)
-            elif biomass_type == BiomassType.MARINE_FISH:
-                result = self.calculate_marine_fish_biomass(data, region_bounds=region_bounds, calculation_date=timestamp)
             else:
-                logger.error(f"Tipo de biomassa não suportado: {biomass_type}")
-                continue
-            
+                result = self.calculate_marine_fish_biomass(data, region_bounds=region_bounds, calculation_date=timestamp)
             biomass_values.append(result.total_biomass)
         
-        # Calcular estatísticas da série temporal
-        if biomass_values:
-            statistics = {
-                'mean': float(np.mean(biomass_values)),
-                'std': float(np.std(biomass_values)),
-                'min': float(np.min(biomass_values)),
-                'max': float(np.max(biomass_values)),
-                'trend': self._calculate_trend(biomass_values),
-                'seasonal_pattern': self._detect_seasonality(timestamps, biomass_values)
-            }
-        else:
-            statistics = {}
-        
-        # Determinar unidades
-        if biomass_type in [BiomassType.TERRESTRIAL, BiomassType.AGRICULTURAL, BiomassType.FOREST]:
-            units = "toneladas"
-        else:
-            units = "toneladas"
-        
         return BiomassTimeSeries(
             timestamps=timestamps,
             biomass_values=biomass_values,
             biomass_type=biomass_type,
-            units=units,
+            units="toneladas",
             region_name=region_name,
-            statistics=statistics
+            statistics=self._series_statistics(timestamps, biomass_values)
         )
     
+    def calculate_biomass_time_series_cube(self, 
+                                         cube: xr.DataArray,
+                                         biomass_type: BiomassType,
+                                         region_bounds: Optional[Dict[str, float]] = None,
+                                         region_name: str = "Angola",
+                                         vegetation_type: str = 'mixed',
+                                         time_chunk: int = CUBE_TIME_CHUNK) -> BiomassTimeSeries:
+        """
+        Série temporal de biomassa a partir de um cubo (time, lat, lon) numa única passagem
+        Máscara, modelo de conversão e recorte pela região aplicados a todas as datas de uma vez
+        """
+        region = {
+            'name': region_name,
+            'bounds': region_bounds or self.angola_model.bounds,
+            'vegetation_type': vegetation_type
+        }
+        return self.calculate_zone_time_series_cube(cube, [region], biomass_type, time_chunk)[region_name]
+    
+    def calculate_zone_time_series_cube(self, 
+                                      cube: xr.DataArray,
+                                      zones: List[Dict[str, Any]],
+                                      biomass_type: BiomassType,
+                                      time_chunk: int = CUBE_TIME_CHUNK) -> Dict[str, BiomassTimeSeries]:
+        """
+        Séries temporais de biomassa por zona a partir de um cubo (time, lat, lon)
+        Cada bloco de `time_chunk` datas é reduzido a somas por zona (produto com o
+        raster de rótulos one-hot) num único grafo Dask, sem chamadas por data nem por zona
+        """
+        if biomass_type not in self.CUBE_BIOMASS_TYPES:
+            raise ValueError(f"Tipo de biomassa não suportado: {biomass_type}")
+        if 'time' not in cube.dims or cube.ndim != 3:
+            raise ValueError("O cubo deve ter dimensões (time, lat, lon)")
+        
+        cube = cube.transpose('time', ...)
+        _, y_dim, x_dim = cube.dims
+        if DASK_AVAILABLE and (cube.chunks is not None or cube.nbytes >= CUBE_DASK_MIN_BYTES):
+            cube = cube.chunk({'time': time_chunk, y_dim: -1, x_dim: -1})
+        
+        lat, lon = self._grid_coordinates(cube, zones)
+        labels = self.zone_label_raster(zones, lat, lon)
+        models = [self._conversion_model(biomass_type, zone) for zone in zones]
+        
+        table = np.array([[model['scale'], model['offset'], model['clip'][0], model['clip'][1]]
+                          for model in models])
+        
+        # Um único kernel por bloco de datas: máscara, modelo, recorte e somas por zona
+        sums = xr.apply_ufunc(
+            _zone_density_sums, cube,
+            kwargs={'labels': labels, 'table': table, 'biomass_type': biomass_type},
+            input_core_dims=[[y_dim, x_dim]],
+            output_core_dims=[['zone']],
+            dask='parallelized',
+            output_dtypes=[np.float64],
+            dask_gufunc_kwargs={'output_sizes': {'zone': len(zones)}}
+        ).compute()
+        
+        timestamps = self._cube_timestamps(cube)
+        series = {}
+        for index, (zone, model) in enumerate(zip(zones, models)):
+            totals = sums.isel(zone=index).values * model['total_factor']
+            biomass_values = [float(value) for value in totals]
+            zone_name = zone.get('name', f'zone_{index}')
+            series[zone_name] = BiomassTimeSeries(
+                timestamps=timestamps,
+                biomass_values=biomass_values,
+                biomass_type=biomass_type,
+                units="toneladas",
+                region_name=zone_name,
+                statistics=self._series_statistics(timestamps, biomass_values)
+            )
+        return series
+    
     def compare_biomass_zones(self, 
                             data: Union[np.ndarray, xr.DataArray],
                             zones: List[Dict[str, Any]],
@@ -460,50 +574,234 @@ class AdvancedBiomassCalculator:
                             calculation_date: str = None) -> List[Dict[str, Any]]:
         """
         Comparar biomassa entre diferentes zonas
+        Cada píxel é atribuído a uma zona por um raster de rótulos e as estatísticas
+        de todas as zonas saem de um único groupby (sem ciclo por zona sobre os dados)
         """
         if calculation_date is None:
             calculation_date = datetime.now().isoformat()[:10]
         
-        zone_results = []
+        if biomass_type not in self.CUBE_BIOMASS_TYPES or not zones:
+            return []
         
-        for zone in zones:
-            zone_bounds = zone.get('bounds', {})
-            zone_name = zone.get('name', 'Unnamed Zone')
-            
-            # Extrair dados da zona (simplificação - em produção usar masking espacial)
-            # Aqui assumimos que os dados já estão filtrados para a zona
-            
-            if biomass_type == BiomassType.TERRESTRIAL:
-                result = self.calculate_terrestrial_biomass(
-                    data, zone_bounds, 
-                    vegetation_type=zone.get('vegetation_type', 'mixed'),
-                    calculation_date=calculation_date
-                )
-            elif biomass_type == BiomassType.MARINE_PHYTOPLANKTON:
-                result = self.calculate_marine_phytoplankton_biomass(
-                    data, region_bounds=zone_bounds, calculation_date=calculation_date
-                )
-            elif biomass_type == BiomassType.MARINE_FISH:
-                result = self.calculate_marine_fish_biomass(
-                    data, region_bounds=zone_bounds, calculation_date=calculation_date
+        values = np.asarray(data, dtype=np.float64)
+        lat, lon = self._grid_coordinates(data, zones)
+        labels = self.zone_label_raster(zones, lat, lon)
+        models = [self._conversion_model(biomass_type, zone) for zone in zones]
+        
+        valid = valid_pixel_mask(values, biomass_type) & (labels >= 0)
+        pixel_labels = labels[valid]
+        raw = values[valid]
+        
+        table = np.array([[model['scale'], model['offset'], model['clip'][0], model['clip'][1]]
+                          for model in models])
+        zone_scale, zone_offset, zone_min, zone_max = table[pixel_labels].T
+        density = np.clip(raw * zone_scale + zone_offset, zone_min, zone_max)
+        
+        stats = pd.DataFrame({'zone': pixel_labels, 'raw': raw, 'density': density}).groupby('zone').agg(
+            valid_pixels=('raw', 'size'),
+            raw_mean=('raw', 'mean'),
+            raw_std=('raw', lambda column: column.std(ddof=0)),
+            raw_min=('raw', 'min'),
+            raw_max=('raw', 'max'),
+            density_mean=('density', 'mean'),
+            density_sum=('density', 'sum')
+        )
+        total_pixels = np.bincount(labels[labels >= 0], minlength=len(zones))
+        
+        zone_results = []
+        for index, (zone, model) in enumerate(zip(zones, models)):
+            if index in stats.index:
+                result = self._zone_biomass_result(
+                    biomass_type, model, stats.loc[index], int(total_pixels[index]),
+                    zone.get('bounds', {}), calculation_date
                 )
             else:
-                continue
+                result = self._create_empty_biomass_result(biomass_type)
             
-            zone_result = {
-                'zone_name': zone_name,
+            zone_results.append({
+                'zone_name': zone.get('name', 'Unnamed Zone'),
                 'zone_properties': zone,
                 'biomass_result': result,
                 'biomass_per_km2': result.total_biomass / result.area_km2 if result.area_km2 > 0 else 0
-            }
-            
-            zone_results.append(zone_result)
+            })
         
         # Ordenar por biomassa total (decrescente)
         zone_results.sort(key=lambda x: x['biomass_result'].total_biomass, reverse=True)
         
         return zone_results
     
+    def _conversion_model(self, biomass_type: BiomassType, zone: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Modelo linear por píxel (densidade = scale * valor + offset, limitada a clip)
+        com o fator que converte a soma das densidades em toneladas (píxeis de ~1km²)
+        """
+        bounds = zone.get('bounds') or self.angola_model.bounds
+        
+        if biomass_type == BiomassType.TERRESTRIAL:
+            vegetation_type = zone.get('vegetation_type', 'mixed')
+            params = self.conversion_parameters['ndvi_to_biomass'].get(
+                vegetation_type, self.conversion_parameters['ndvi_to_biomass']['mixed']
+            )
+            ecological_zone = self._identify_ecological_zone(bounds)
+            clip = (-np.inf, np.inf)
+            if ecological_zone:
+                density_range = self.ecological_zones[ecological_zone]['biomass_density_range']
+                clip = (density_range[0] * 0.5, density_range[1] * 1.2)
+            return {
+                'scale': params['slope'], 'offset': params['intercept'], 'clip': clip,
+                'total_factor': 100.0,  # toneladas/ha × km² → toneladas
+                'density_factor': 1.0,
+                'confidence': params['r2'], 'quality_weighted': False,
+                'method': f"NDVI_regression_{vegetation_type}",
+                'statistics_key': 'ndvi_statistics',
+                'metadata': {'vegetation_type': vegetation_type, 'ecological_zone': ecological_zone}
+            }
+        
+        if biomass_type == BiomassType.MARINE_PHYTOPLANKTON:
+            marine_zone = self._identify_marine_zone(bounds)
+            zone_params = self.conversion_parameters['chl_to_phytoplankton']['coastal']
+            if marine_zone:
+                zone_type = self.marine_zones[marine_zone]['zone_type']
+                if zone_type in ('upwelling', 'offshore'):
+                    zone_params = self.conversion_parameters['chl_to_phytoplankton'][zone_type]
+            euphotic_depth_m = 50
+            return {
+                # Chl-a → carbono → biomassa úmida (10% carbono em peso seco, 20% peso seco)
+                'scale': zone_params['carbon_ratio'] * zone_params['depth_factor'] / 0.1 / 0.2,
+                'offset': 0.0, 'clip': (-np.inf, np.inf),
+                'total_factor': euphotic_depth_m / 1000,  # mg/m³ × km³ → toneladas
+                'density_factor': 1 / 1000,
+                'confidence': 0.7, 'quality_weighted': True,
+                'method': "chlorophyll_carbon_conversion",
+                'statistics_key': 'chl_statistics',
+                'metadata': {
+                    'marine_zone': marine_zone,
+                    'euphotic_depth_m': euphotic_depth_m,
+                    'carbon_ratio': zone_params['carbon_ratio'],
+                    'depth_factor': zone_params['depth_factor']
+                }
+            }
+        
+        transfer_params = self.conversion_parameters['npp_to_fish']
+        fish_type = zone.get('fish_type', 'total')
+        fish_efficiency = transfer_params['trophic_levels'].get(fish_type, 0.15)
+        return {
+            # NPP diário → biomassa anual de peixes (mg/m²)
+            'scale': transfer_params['transfer_efficiency'] * fish_efficiency * 365 / 0.1 / 0.2,
+            'offset': 0.0, 'clip': (-np.inf, np.inf),
+            'total_factor': 1e-3,  # mg/m² × km² → toneladas
+            'density_factor': 1e-6,
+            'confidence': 0.5, 'quality_weighted': True,
+            'method': f"npp_trophic_transfer_{fish_type}",
+            'statistics_key': 'npp_statistics',
+            'metadata': {
+                'fish_type': fish_type,
+                'transfer_efficiency': transfer_params['transfer_efficiency'],
+                'fish_efficiency': fish_efficiency
+            }
+        }
+    
+    def _zone_biomass_result(self, 
+                           biomass_type: BiomassType,
+                           model: Dict[str, Any],
+                           stats: pd.Series,
+                           total_pixels: int,
+                           bounds: Dict[str, float],
+                           calculation_date: str) -> BiomassResult:
+        """BiomassResult de uma zona a partir das estatísticas agregadas"""
+        valid_pixels = int(stats['valid_pixels'])
+        area_km2 = float(valid_pixels)  # píxeis de ~1km²
+        data_quality = valid_pixels / total_pixels if total_pixels else 0.0
+        confidence = model['confidence'] * (data_quality if model['quality_weighted'] else 1.0)
+        
+        metadata = dict(model['metadata'])
+        if biomass_type == BiomassType.MARINE_PHYTOPLANKTON:
+            metadata['total_volume_km3'] = area_km2 * metadata['euphotic_depth_m'] / 1000
+        metadata.update({
+            'valid_pixels': valid_pixels,
+            'total_pixels': total_pixels,
+            'data_quality': float(data_quality),
+            model['statistics_key']: {
+                'mean': float(stats['raw_mean']),
+                'std': float(stats['raw_std']),
+                'min': float(stats['raw_min']),
+                'max': float(stats['raw_max'])
+            }
+        })
+        
+        return BiomassResult(
+            biomass_type=biomass_type,
+            total_biomass=float(stats['density_sum'] * model['total_factor']),
+            biomass_density=float(stats['density_mean'] * model['density_factor']),
+            area_km2=area_km2,
+            calculation_method=model['method'],
+            confidence_level=float(confidence),
+            temporal_coverage={'date': calculation_date},
+            spatial_bounds=bounds,
+            metadata=metadata
+        )
+    
+    def _grid_coordinates(self, 
+                        data: Union[np.ndarray, xr.DataArray],
+                        zones: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Latitudes/longitudes da grelha: coordenadas do DataArray quando existem,
+        senão a grelha é assumida a cobrir a extensão conjunta das zonas (norte no topo)
+        """
+        n_lat, n_lon = data.shape[-2:]
+        if isinstance(data, xr.DataArray):
+            coords = {name: data.coords[name].values for name in data.coords}
+            lat = next((coords[n] for n in ('lat', 'latitude') if n in coords), None)
+            lon = next((coords[n] for n in ('lon', 'longitude') if n in coords), None)
+            if lat is not None and lon is not None:
+                return np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        
+        extents = [zone.get('bounds') or self.angola_model.bounds for zone in zones]
+        lat = np.linspace(max(b['lat_max'] for b in extents), min(b['lat_min'] for b in extents), n_lat)
+        lon = np.linspace(min(b['lon_min'] for b in extents), max(b['lon_max'] for b in extents), n_lon)
+        return lat, lon
+    
+    def zone_label_raster(self, 
+                        zones: List[Dict[str, Any]],
+                        lat: np.ndarray,
+                        lon: np.ndarray) -> np.ndarray:
+        """
+        Raster (lat, lon) com o índice da zona de cada píxel (-1 fora de todas)
+        Em zonas sobrepostas prevalece a primeira da lista
+        """
+        labels = np.full((len(lat), len(lon)), -1, dtype=np.int16)
+        for index in reversed(range(len(zones))):
+            bounds = zones[index].get('bounds') or self.angola_model.bounds
+            rows = (lat >= bounds['lat_min']) & (lat <= bounds['lat_max'])
+            cols = (lon >= bounds['lon_min']) & (lon <= bounds['lon_max'])
+            labels[np.ix_(rows, cols)] = index
+        return labels
+    
+    def _cube_timestamps(self, cube: xr.DataArray) -> List[str]:
+        """Datas do cubo como texto ISO"""
+        if 'time' not in cube.coords:
+            return [str(index) for index in range(cube.sizes['time'])]
+        values = cube['time'].values
+        if np.issubdtype(values.dtype, np.datetime64):
+            index = pd.DatetimeIndex(values)
+            if (index == index.normalize()).all():
+                return list(index.strftime('%Y-%m-%d'))
+            return [timestamp.isoformat() for timestamp in index]
+        return [str(value) for value in values]
+    
+    def _series_statistics(self, timestamps: List[str], biomass_values: List[float]) -> Dict[str, Any]:
+        """Estatísticas, tendência e sazonalidade de uma série temporal"""
+        if not biomass_values:
+            return {}
+        return {
+            'mean': float(np.mean(biomass_values)),
+            'std': float(np.std(biomass_values)),
+            'min': float(np.min(biomass_values)),
+            'max': float(np.max(biomass_values)),
+            'trend': self._calculate_trend(biomass_values),
+            'seasonal_pattern': self._detect_seasonality(timestamps, biomass_values)
+        }
+    
     def _identify_ecological_zone(self, bounds: Dict[str, float]) -> Optional[str]:
         """Identificar zona ecológica baseada nos limites espaciais"""
         center_lat = (bounds.get('lat_min', 0) + bounds.get('lat_max', 0)) / 2
@@ -7,18 +7,21 @@ import json
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, List, Any, Tuple, Union
 from pathlib import Path
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
-from shapely.geometry import Point, LineString, Polygon, MultiLineString
+import shapely
+from shapely.geometry import Point, LineString, MultiLineString, shape
 from shapely.ops import unary_union, nearest_points
 import geopandas as gpd
 from scipy.spatial.distance import cdist
 from scipy.interpolate import interp1d
 
+from .trajectory_store import STATUS_CODES, TrajectoryStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -78,6 +81,53 @@ class FishingZoneInteraction:
     interaction_type: str  # 'crossing', 'feeding', 'resting'
     risk_level: str  # 'low', 'medium', 'high'
     environmental_conditions: Dict[str, float]
+    visits: List[Dict[str, Any]] = field(default_factory=list)  # entradas/saídas da zona
+
+
+# Duração assumida (horas) de uma passagem pela zona registada por um único ponto
+SINGLE_FIX_HOURS = 2.0
+
+
+class FishingZoneIndex:
+    """
+    Índice espacial das zonas de pesca: STRtree sobre polígonos preparados
+    O teste ponto-em-polígono é vetorizado sobre arrays de coordenadas
+    """
+    
+    def __init__(self, fishing_zones: List[Dict[str, Any]]):
+        self.zones: List[Dict[str, Any]] = []
+        for zone in fishing_zones:
+            try:
+                if zone['geometry']['type'] not in ('Polygon', 'MultiPolygon'):
+                    continue
+                self.zones.append({
+                    'geometry': shape(zone['geometry']),
+                    'properties': zone.get('properties', {}),
+                    'zone_id': zone.get('id', f"zone_{len(self.zones)}")
+                })
+            except Exception as e:
+                logger.error(f"Erro ao processar zona de pesca: {e}")
+                continue
+        
+        self.geometries = np.array([zone['geometry'] for zone in self.zones], dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+    
+    def __len__(self) -> int:
+        return len(self.zones)
+    
+    def query_points(self, lons: np.ndarray, lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pares (índice do ponto, índice da zona) com o ponto dentro da zona ou na fronteira
+        (candidatos pelas bounding boxes da STRtree, confirmados com intersects_xy)
+        """
+        if not len(self.zones) or not len(lons):
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        
+        point_index, zone_index = self.tree.query(shapely.points(lons, lats))
+        inside = shapely.intersects_xy(self.geometries[zone_index], lons[point_index], lats[point_index])
+        return point_index[inside], zone_index[inside]
 
 
 class MigrationOverlaySystem:
@@ -180,6 +230,8 @@ class MigrationOverlaySystem:
                 trajectories = self._load_argos_data(data_source)
             elif data_format == 'csv':
                 trajectories = self._load_csv_data(data_source)
+            elif data_format == 'parquet':
+                return self.load_migration_store(data_source).to_trajectories()
             else:
                 logger.error(f"Formato não suportado: {data_format}")
         
@@ -197,6 +249,19 @@ class MigrationOverlaySystem:
         logger.info(f"Carregadas {len(angola_trajectories)} trajetórias na ZEE angolana")
         return angola_trajectories
     
+    def load_migration_store(self, data_source: Union[str, Path, TrajectoryStore]) -> TrajectoryStore:
+        """
+        Carregar telemetria em formato colunar (Parquet gravado por TrajectoryStore)
+        já recortada à ZEE angolana, sem materializar MigrationPoint
+        """
+        store = data_source if isinstance(data_source, TrajectoryStore) else TrajectoryStore.from_parquet(data_source)
+        angola_store = store.select_bbox(self.angola_bounds, clip=True)
+        angola_store.metadata = [{**metadata, 'filtered_to_angola': True} for metadata in angola_store.metadata]
+        
+        logger.info(f"Carregadas {len(angola_store)} trajetórias ({angola_store.n_points} pontos, "
+                    f"{angola_store.nbytes / 1e6:.1f} MB) na ZEE angolana")
+        return angola_store
+    
     def _generate_simulated_trajectories(self, config: Dict[str, Any]) -> List[MigrationTrajectory]:
         """Gerar trajetórias simuladas para demonstração"""
         trajectories = []
@@ -357,95 +422,117 @@ class MigrationOverlaySystem:
         return angola_trajectories
     
     def analyze_fishing_zone_interactions(self, 
-                                        trajectories: List[MigrationTrajectory],
-                                        fishing_zones: List[Dict[str, Any]]) -> List[FishingZoneInteraction]:
+                                        trajectories: Union[List[MigrationTrajectory], TrajectoryStore],
+                                        fishing_zones: Union[List[Dict[str, Any]], FishingZoneIndex]) -> List[FishingZoneInteraction]:
         """
         Analisar interações entre trajetórias de migração e zonas de pesca
+        Todos os pontos de todas as trajetórias são testados de uma vez contra o índice
+        espacial; entradas/saídas saem de run-lengths da máscara de pertença e estados e
+        condições ambientais são agregados por segmentos (reduceat) sobre as colunas
         """
-        interactions = []
-        
-        # Converter zonas de pesca para geometrias Shapely
-        fishing_polygons = []
-        for zone in fishing_zones:
-            try:
-                if zone['geometry']['type'] == 'Polygon':
-                    poly = Polygon(zone['geometry']['coordinates'][0])
-                    fishing_polygons.append({
-                        'geometry': poly,
-                        'properties': zone.get('properties', {}),
-                        'zone_id': zone.get('id', f"zone_{len(fishing_polygons)}")
-                    })
-            except Exception as e:
-                logger.error(f"Erro ao processar zona de pesca: {e}")
-                continue
+        zone_index = fishing_zones if isinstance(fishing_zones, FishingZoneIndex) else FishingZoneIndex(fishing_zones)
+        store = trajectories if isinstance(trajectories, TrajectoryStore) else TrajectoryStore.from_trajectories(trajectories)
+        if not store.n_points or not len(zone_index):
+            return []
+        
+        # Colunas na ordem da vista (sem cópia quando a store é contígua)
+        lons = store.column('lons').astype(np.float64)
+        lats = store.column('lats').astype(np.float64)
+        times = store.datetimes()
+        trajectory_of_point = store.trajectory_of_point()
+        
+        point_idx, zone_idx = zone_index.query_points(lons, lats)
+        if not len(point_idx):
+            return []
+        
+        # Ordenar por (trajetória, zona, ordem temporal do ponto)
+        order = np.lexsort((point_idx, zone_idx, trajectory_of_point[point_idx]))
+        point_idx, zone_idx = point_idx[order], zone_idx[order]
+        pair_key = trajectory_of_point[point_idx] * len(zone_index) + zone_idx
+        
+        # Run-length da máscara de pertença: nova visita quando muda o par ou há um salto de pontos
+        new_pair = np.r_[True, pair_key[1:] != pair_key[:-1]]
+        new_run = new_pair | np.r_[True, point_idx[1:] != point_idx[:-1] + 1]
+        run_starts = np.flatnonzero(new_run)
+        run_ends = np.r_[run_starts[1:], len(point_idx)] - 1
+        run_pair = np.cumsum(new_pair)[run_starts] - 1
+        
+        entry_times = times[point_idx[run_starts]]
+        exit_times = times[point_idx[run_ends]]
+        run_points = run_ends - run_starts + 1
+        run_hours = (exit_times - entry_times) / np.timedelta64(1, 'h')
+        run_hours = np.where(run_points > 1, run_hours, SINGLE_FIX_HOURS)
+        visits = [
+            {'entry_time': entry, 'exit_time': exit_, 'points': points, 'hours': hours}
+            for entry, exit_, points, hours in zip(
+                np.datetime_as_string(entry_times, unit='s').tolist(),
+                np.datetime_as_string(exit_times, unit='s').tolist(),
+                run_points.tolist(), run_hours.tolist()
+            )
+        ]
+        intersection_points = shapely.points(lons[point_idx], lats[point_idx]).tolist()
+        
+        pair_starts = np.flatnonzero(new_pair)
+        pair_ends = np.r_[pair_starts[1:], len(point_idx)]
+        run_bounds = np.searchsorted(run_pair, np.arange(len(pair_starts) + 1))
+        pair_hours = np.add.reduceat(run_hours, run_bounds[:-1])
+        
+        # Estados presentes e médias ambientais por par (trajetória, zona)
+        status = store.column('status')[point_idx]
+        has_feeding = np.logical_or.reduceat(status == STATUS_CODES['feeding'], pair_starts)
+        has_resting = np.logical_or.reduceat(status == STATUS_CODES['resting'], pair_starts)
+        pair_points = pair_ends - pair_starts
+        env_means = {}
+        for var in store.env:
+            values = store.column(f'env.{var}')[point_idx]
+            env_means[var] = (
+                ~np.isnan(values[pair_starts]),  # variáveis do primeiro ponto na zona
+                np.add.reduceat(np.nan_to_num(values, nan=0.0).astype(np.float64), pair_starts) / pair_points
+            )
         
-        # Analisar cada trajetória
-        for trajectory in trajectories:
-            trajectory_line = trajectory.trajectory_geometry
+        species = store.attributes['species']
+        individual_ids = store.attributes['individual_id']
+        interactions = []
+        for pair, (start, end) in enumerate(zip(pair_starts.tolist(), pair_ends.tolist())):
+            trajectory_number = trajectory_of_point[point_idx[start]]
+            runs = slice(run_bounds[pair], run_bounds[pair + 1])
+            env_conditions = {var: float(means[pair]) for var, (present, means) in env_means.items() if present[pair]}
             
-            for fishing_zone in fishing_polygons:
-                fishing_poly = fishing_zone['geometry']
-                zone_id = fishing_zone['zone_id']
-                
-                # Verificar interseção
-                if trajectory_line.intersects(fishing_poly):
-                    interaction = self._analyze_single_interaction(
-                        trajectory, fishing_zone, fishing_poly
-                    )
-                    if interaction:
-                        interactions.append(interaction)
+            interactions.append(self._build_interaction(
+                species[trajectory_number], individual_ids[trajectory_number],
+                zone_index.zones[zone_idx[start]],
+                self._classify_status_flags(bool(has_feeding[pair]), bool(has_resting[pair]), end - start),
+                intersection_points[start:end],
+                float(pair_hours[pair]), env_conditions, visits[runs]
+            ))
         
         return interactions
     
-    def _analyze_single_interaction(self, 
-                                  trajectory: MigrationTrajectory,
-                                  fishing_zone: Dict[str, Any],
-                                  fishing_poly: Polygon) -> Optional[FishingZoneInteraction]:
-        """Analisar uma interação específica"""
-        
-        # Encontrar pontos da trajetória dentro da zona
-        points_in_zone = []
-        intersection_points = []
-        
-        for point in trajectory.points:
-            point_geom = Point(point.longitude, point.latitude)
-            if fishing_poly.contains(point_geom) or fishing_poly.touches(point_geom):
-                points_in_zone.append(point)
-                intersection_points.append(point_geom)
-        
-        if not points_in_zone:
-            return None
-        
-        # Calcular tempo na zona
-        if len(points_in_zone) > 1:
-            time_in_zone = (points_in_zone[-1].timestamp - points_in_zone[0].timestamp).total_seconds() / 3600
-        else:
-            time_in_zone = 2.0  # Assumir 2 horas se apenas um ponto
-        
-        # Determinar tipo de interação
-        interaction_type = self._classify_interaction_type(points_in_zone, trajectory)
+    def _build_interaction(self, 
+                         species: str,
+                         individual_id: str,
+                         fishing_zone: Dict[str, Any],
+                         interaction_type: str,
+                         intersection_points: List[Point],
+                         time_in_zone: float,
+                         env_conditions: Dict[str, float],
+                         visits: List[Dict[str, Any]]) -> FishingZoneInteraction:
+        """Caracterizar uma interação já localizada e classificada"""
         
         # Calcular nível de risco
         risk_level = self._calculate_risk_level(
-            trajectory.species, fishing_zone['properties'], time_in_zone
+            species, fishing_zone['properties'], time_in_zone
         )
         
-        # Calcular condições ambientais médias
-        env_conditions = {}
-        if points_in_zone:
-            env_vars = points_in_zone[0].environmental_data.keys()
-            for var in env_vars:
-                values = [p.environmental_data.get(var, 0) for p in points_in_zone]
-                env_conditions[var] = np.mean(values)
-        
         return FishingZoneInteraction(
-            trajectory_id=trajectory.individual_id,
+            trajectory_id=individual_id,
             fishing_zone_id=fishing_zone['zone_id'],
             intersection_points=intersection_points,
             time_in_zone_hours=time_in_zone,
             interaction_type=interaction_type,
             risk_level=risk_level,
-            environmental_conditions=env_conditions
+            environmental_conditions=env_conditions,
+            visits=visits
         )
     
     def _classify_interaction_type(self, 
@@ -458,14 +545,19 @@ class MigrationOverlaySystem:
         
         # Analisar status dos pontos na zona
         statuses = [p.status for p in points_in_zone]
-        
-        if MigrationStatus.FEEDING in statuses:
+        return self._classify_status_flags(
+            MigrationStatus.FEEDING in statuses, MigrationStatus.RESTING in statuses, len(points_in_zone)
+        )
+    
+    def _classify_status_flags(self, has_feeding: bool, has_resting: bool, n_points: int) -> str:
+        """Tipo de interação a partir dos estados presentes e do número de pontos na zona"""
+        if has_feeding:
             return 'feeding'
-        elif MigrationStatus.RESTING in statuses:
+        elif has_resting:
             return 'resting'
-        elif len(points_in_zone) == 1:
+        elif n_points == 1:
             return 'crossing'
-        elif len(points_in_zone) > 5:  # Muitos pontos = permanência
+        elif n_points > 5:  # Muitos pontos = permanência
             return 'extended_stay'
         else:
             return 'crossing'
@@ -852,7 +944,8 @@ def create_migration_fishing_analysis(species_config: Dict[str, Any] = None) ->
                 'interaction_type': i.interaction_type,
                 'risk_level': i.risk_level,
                 'time_in_zone_hours': i.time_in_zone_hours,
-                'intersection_points_count': len(i.intersection_points)
+                'intersection_points_count': len(i.intersection_points),
+                'visits': i.visits
             } for i in interactions
         ],
         'temporal_analysis': temporal_analysis,
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Gráficos dos relatórios automáticos QGIS
+Funções de topo (serializáveis para o pool de processos) que desenham com a API
+orientada a objetos do matplotlib e gravam PNG em ficheiros temporários
+endereçados pelo conteúdo, referenciados pelo reportlab em vez de buffers em memória
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+CHART_DPI = 300
+
+CHARTS_DIR = Path(os.getenv(
+    "REPORT_CHARTS_DIR",
+    str(Path(tempfile.gettempdir()) / "bgapp" / "report_charts")
+))
+
+# Mesmas definições que o AutomatedReportGenerator aplicava via plt.rcParams
+CHART_RC = {
+    'font.size': 10,
+    'axes.titlesize': 12,
+    'axes.labelsize': 10,
+    'xtick.labelsize': 9,
+    'ytick.labelsize': 9,
+    'legend.fontsize': 9,
+}
+
+
+def _biomass_chart(payload: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    zone_names = payload['zone_names']
+    biomass_values = payload['biomass_values']
+
+    bars = ax.bar(zone_names, biomass_values, color=payload['colors'])
+    ax.set_ylabel('Biomassa (toneladas)')
+    ax.set_title('Biomassa Total por Zona Ecológica')
+    ax.tick_params(axis='x', rotation=45)
+
+    # Adicionar valores nas barras
+    for bar, value in zip(bars, biomass_values):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+                f'{value:,.0f}', ha='center', va='bottom', fontsize=9)
+    return fig
+
+
+def _time_series_chart(payload: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    # Dados simulados para demonstração (semente fixa para o gráfico ser reprodutível)
+    months = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
+              'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    rng = np.random.default_rng(payload.get('seed', 42))
+    phase = np.arange(12)
+
+    ndvi_values = 0.3 + 0.2 * np.sin(2 * np.pi * phase / 12) + rng.normal(0, 0.02, 12)
+    chl_values = 2.0 + 1.5 * np.sin(2 * np.pi * (phase + 3) / 12) + rng.normal(0, 0.1, 12)
+    sst_values = 22 + 4 * np.sin(2 * np.pi * (phase + 6) / 12) + rng.normal(0, 0.3, 12)
+
+    ax.plot(months, ndvi_values, 'o-', label='NDVI', color='green', linewidth=2)
+    ax2 = ax.twinx()
+    ax2.plot(months, chl_values, 's-', label='Chl-a (mg/m³)', color='blue', linewidth=2)
+    ax2.plot(months, sst_values, '^-', label='SST (°C)', color='red', linewidth=2)
+
+    ax.set_ylabel('NDVI', color='green')
+    ax2.set_ylabel('Chl-a / SST', color='blue')
+    ax.set_xlabel('Mês')
+    ax.set_title('Evolução Temporal das Variáveis Ambientais')
+
+    # Combinar legendas
+    lines1, labels1 = ax.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
+    ax.tick_params(axis='x', rotation=45)
+    return fig
+
+
+def _risk_chart(payload: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+
+    ax.pie(payload['risk_counts'], labels=['Alto', 'Médio', 'Baixo'],
+           colors=['#DC143C', '#FFA500', '#32CD32'], autopct='%1.1f%%', startangle=90)
+    ax.set_title('Distribuição de Interações por Nível de Risco', fontsize=12, pad=20)
+    return fig
+
+
+def _map_placeholder(payload: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    # Simular contorno de Angola
+    angola_lat = np.array([-4.2, -6, -8, -10, -12, -14, -16, -18, -18, -16, -14, -12, -10, -8, -6, -4.2])
+    angola_lon = np.array([12, 12.5, 13, 13.5, 13.8, 13.5, 13, 12.5, 15, 16, 16.5, 17, 17.5, 17, 16, 14])
+
+    ax.plot(angola_lon, angola_lat, 'k-', linewidth=2, label='Costa de Angola')
+    ax.fill(angola_lon, angola_lat, alpha=0.3, color='lightblue')
+
+    # Adicionar pontos simulados de biomassa
+    rng = np.random.RandomState(payload.get('seed', 42))
+    biomass_points_lat = rng.uniform(-18, -4.2, 20)
+    biomass_points_lon = rng.uniform(12, 17, 20)
+    biomass_values = rng.uniform(10, 100, 20)
+
+    scatter = ax.scatter(biomass_points_lon, biomass_points_lat, c=biomass_values,
+                         cmap='viridis', s=60, alpha=0.7)
+
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.set_title('Distribuição Espacial da Biomassa - ZEE Angola')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # Barra de cores
+    cbar = fig.colorbar(scatter, ax=ax)
+    cbar.set_label('Biomassa (t/km²)')
+    return fig
+
+
+def _unavailable_chart(payload: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.text(0.5, 0.5, payload.get('message', 'Gráfico não disponível'),
+            ha='center', va='center', transform=ax.transAxes)
+    return fig
+
+
+CHART_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Figure]] = {
+    'biomass': _biomass_chart,
+    'time_series': _time_series_chart,
+    'risk': _risk_chart,
+    'map': _map_placeholder,
+    'unavailable': _unavailable_chart,
+}
+
+
+def chart_key(kind: str, payload: Dict[str, Any], dpi: int = CHART_DPI) -> str:
+    """Hash SHA-256 do tipo, dados e DPI do gráfico"""
+    canonical = json.dumps([kind, payload, dpi], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def chart_path(kind: str, payload: Dict[str, Any], dpi: int = CHART_DPI) -> Path:
+    """Ficheiro PNG onde o gráfico é (ou será) gravado"""
+    return CHARTS_DIR / f"{chart_key(kind, payload, dpi)}.png"
+
+
+def render_chart_file(kind: str, payload: Dict[str, Any], dpi: int = CHART_DPI) -> str:
+    """Renderizar um gráfico para o seu ficheiro (executado no pool de processos)"""
+    import matplotlib
+
+    path = chart_path(kind, payload, dpi)
+    if path.exists():
+        return str(path)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with matplotlib.rc_context(CHART_RC):
+        fig = CHART_BUILDERS[kind](payload)
+        FigureCanvasAgg(fig)
+        fig.tight_layout()
+        # Escrita atómica: relatórios concorrentes podem pedir o mesmo gráfico
+        fd, tmp_name = tempfile.mkstemp(suffix='.png', dir=path.parent)
+        with os.fdopen(fd, 'wb') as handle:
+            fig.savefig(handle, format='png', dpi=dpi, bbox_inches='tight')
+    os.replace(tmp_name, path)
+    return str(path)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Geração de relatórios PDF em streaming para BGAPP
+Gráficos renderizados em paralelo no pool de processos para ficheiros temporários,
+seções construídas por workers independentes, PDF montado em disco e enviado ao
+cliente em blocos, com eventos de progresso consultáveis por job
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from ..core.executors import run_cpu, run_io, run_process
+from .automated_reports import AutomatedReportGenerator, ReportType
+from .report_charts import chart_path, render_chart_file
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Fração do progresso atribuída a cada fase
+_STAGE_WEIGHTS = {"charts": (0.0, 0.45), "sections": (0.45, 0.6), "layout": (0.6, 0.98)}
+
+
+@dataclass
+class ReportJob:
+    """Estado e eventos de progresso de um relatório em geração"""
+    job_id: str
+    report_type: str
+    sections: List[str]
+    status: str = "queued"  # queued | running | completed | failed
+    stage: str = "queued"
+    progress: float = 0.0
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    output_path: Optional[str] = None
+    size_bytes: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self, since: int = 0) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "report_type": self.report_type,
+            "sections": self.sections,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "size_bytes": self.size_bytes,
+            "error": self.error,
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.created_at, 3),
+            "events": [event for event in self.events if event["seq"] >= since],
+        }
+
+
+class ReportJobRegistry:
+    """Registo em memória dos jobs de relatório (eventos emitidos também a partir de threads)"""
+
+    def __init__(self, output_dir: Path, max_jobs: int = 200, ttl_seconds: int = 3600):
+        self.output_dir = Path(output_dir)
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self, report_type: str, sections: List[str]) -> ReportJob:
+        self._prune()
+        job = ReportJob(job_id=uuid.uuid4().hex, report_type=report_type, sections=list(sections))
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self.emit(job, "queued", "Relatório em fila")
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    def emit(self, job: ReportJob, stage: str, message: str, progress: Optional[float] = None):
+        with self._lock:
+            if progress is not None:
+                job.progress = max(job.progress, min(1.0, progress))
+            job.stage = stage
+            job.events.append({
+                "seq": len(job.events),
+                "timestamp": time.time(),
+                "stage": stage,
+                "message": message,
+                "progress": round(job.progress, 3),
+            })
+
+    def output_file(self, job: ReportJob) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return self.output_dir / f"{job.job_id}.pdf"
+
+    def discard(self, job: ReportJob):
+        """Apagar o PDF de um job (ex.: após streaming direto)"""
+        if job.output_path:
+            Path(job.output_path).unlink(missing_ok=True)
+            job.output_path = None
+
+    def _prune(self):
+        """Remover jobs terminados há mais de ttl_seconds (e os seus ficheiros)"""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.finished_at),
+                key=lambda job: job.finished_at
+            )
+            excess = max(0, len(self._jobs) - self.max_jobs)
+            for index, job in enumerate(finished):
+                if index >= excess and now - job.finished_at < self.ttl_seconds:
+                    break
+                self._jobs.pop(job.job_id, None)
+                if job.output_path:
+                    Path(job.output_path).unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        by_status: Dict[str, int] = {}
+        for job in jobs:
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {"jobs": len(jobs), "by_status": by_status, "output_dir": str(self.output_dir)}
+
+
+class StreamingReportBuilder:
+    """Constrói relatórios do AutomatedReportGenerator em fases paralelas e emite o PDF em blocos"""
+
+    def __init__(self, generator: AutomatedReportGenerator, registry: ReportJobRegistry):
+        self.generator = generator
+        self.registry = registry
+        self._tasks: Set[asyncio.Task] = set()
+
+    def create_job(self, report_type: ReportType, custom_sections: Optional[List[str]] = None) -> ReportJob:
+        if report_type not in self.generator.report_templates:
+            raise ValueError(f"Tipo de relatório não suportado: {report_type.value}")
+        sections = custom_sections or self.generator.report_templates[report_type].sections
+        return self.registry.create(report_type.value, sections)
+
+    def _stage_progress(self, stage: str, fraction: float) -> float:
+        start, end = _STAGE_WEIGHTS[stage]
+        return start + (end - start) * fraction
+
+    async def _render_charts(self, job: ReportJob, data: Dict[str, Any]):
+        specs: Dict[Path, Tuple[str, Dict[str, Any]]] = {}
+        for section_name in job.sections:
+            for kind, payload in self.generator.chart_specs(section_name, data):
+                specs.setdefault(chart_path(kind, payload), (kind, payload))
+        pending = [spec for path, spec in specs.items() if not path.exists()]
+
+        self.registry.emit(job, "charts", f"{len(pending)} gráficos a renderizar "
+                                          f"({len(specs) - len(pending)} em cache)",
+                           self._stage_progress("charts", 0.0))
+        done = 0
+
+        async def render(kind: str, payload: Dict[str, Any]):
+            nonlocal done
+            try:
+                await run_process(render_chart_file, kind, payload)
+            except Exception as e:
+                # A seção volta a tentar (e regista o erro) ao construir a imagem
+                logger.warning(f"⚠️ Falha ao pré-renderizar gráfico {kind}: {e}")
+            done += 1
+            self.registry.emit(job, "charts", f"Gráfico {kind} pronto",
+                               self._stage_progress("charts", done / len(pending)))
+
+        await asyncio.gather(*(render(kind, payload) for kind, payload in pending))
+
+    async def _build_sections(self, job: ReportJob, report_type: ReportType,
+                              data: Dict[str, Any]) -> List[List[Any]]:
+        done = 0
+
+        async def build(section_name: str) -> List[Any]:
+            nonlocal done
+            flowables = await run_cpu(self.generator.build_section, section_name, report_type, data)
+            done += 1
+            self.registry.emit(job, "sections", f"Seção {section_name} construída",
+                               self._stage_progress("sections", done / len(job.sections)))
+            return flowables
+
+        # gather preserva a ordem das seções, qualquer que seja a ordem de conclusão
+        return await asyncio.gather(*(build(name) for name in job.sections))
+
+    def _layout(self, job: ReportJob, story: List[Any], output_file: Path):
+        """Paginação reportlab (thread do pool CPU) com eventos a cada ~5% dos flowables"""
+        doc = self.generator.create_document(output_file)
+        total = max(1, len(story))
+        step = max(1, total // 20)
+
+        def on_progress(event: str, value: int):
+            if event == "PROGRESS" and (value % step == 0 or value == total):
+                self.registry.emit(job, "layout", f"{value}/{total} elementos paginados",
+                                   self._stage_progress("layout", value / total))
+
+        doc.setProgressCallBack(on_progress)
+        doc.build(story)
+
+    async def build(self, job: ReportJob, report_type: ReportType, data: Dict[str, Any]) -> Path:
+        """Gerar o PDF do job em disco, emitindo eventos de progresso"""
+        template = self.generator.report_templates[report_type]
+        output_file = self.registry.output_file(job)
+        job.status = "running"
+        try:
+            await self._render_charts(job, data)
+            sections = await self._build_sections(job, report_type, data)
+
+            # Imagens referenciam os PNG em disco: a story só guarda texto e tabelas
+            story = self.generator.build_front_matter(template, data, job.sections)
+            for flowables in sections:
+                story.extend(flowables)
+
+            self.registry.emit(job, "layout", "A paginar o documento",
+                               self._stage_progress("layout", 0.0))
+            await run_cpu(self._layout, job, story, output_file)
+
+            job.output_path = str(output_file)
+            job.size_bytes = output_file.stat().st_size
+            job.status = "completed"
+            job.finished_at = time.time()
+            self.registry.emit(job, "completed", f"PDF gerado ({job.size_bytes / 1024:.0f} KB)", 1.0)
+            logger.info(f"📄 Relatório {job.report_type} gerado em streaming: {output_file}")
+            return output_file
+        except BaseException as e:
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+            job.finished_at = time.time()
+            output_file.unlink(missing_ok=True)
+            self.registry.emit(job, "failed", f"Erro ao gerar relatório: {job.error}")
+            logger.error(f"❌ Erro ao gerar relatório {job.report_type}: {job.error}")
+            raise
+
+    def start(self, job: ReportJob, report_type: ReportType, data: Dict[str, Any]) -> asyncio.Task:
+        """Gerar em segundo plano; o cliente consulta o progresso e descarrega depois"""
+        task = asyncio.create_task(self.build(job, report_type, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Erro já registado no job; evitar "Task exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def iter_pdf(self, job: ReportJob, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Ler o PDF de um job concluído em blocos, sem o carregar todo em memória"""
+        handle = await run_io(open, job.output_path, "rb")
+        try:
+            while True:
+                chunk = await run_io(handle.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            handle.close()
+
+    async def stream(self, job: ReportJob, report_type: ReportType, data: Dict[str, Any],
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Gerar e enviar o PDF em blocos; o ficheiro temporário é apagado no fim"""
+        try:
+            await self.build(job, report_type, data)
+            async for chunk in self.iter_pdf(job, chunk_size):
+                yield chunk
+        finally:
+            self.registry.discard(job)
+
+
+# Instância global do registo de jobs de relatório
+report_jobs = ReportJobRegistry(Path(os.getenv(
+    "REPORT_JOBS_DIR",
+    str(Path(tempfile.gettempdir()) / "bgapp" / "report_jobs")
+)))
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Armazenamento colunar de trajetórias de migração
+Struct-of-arrays (timestamps int64 em µs, lon/lat e variáveis ambientais float32,
+estado int8) com intervalos [start, end) por trajetória. Recortes por tempo,
+por bbox sem recorte de pontos e por subconjunto de trajetórias partilham as
+colunas (sem cópia); persistência em Parquet e adaptadores para os dataclasses
+MigrationTrajectory/MigrationPoint
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Estados na ordem de MigrationStatus (códigos int8 na coluna `status`)
+STATUS_LABELS = ("breeding", "feeding", "migration", "resting", "unknown")
+STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+
+TRAJECTORY_ATTRIBUTES = ("species", "species_type", "individual_id")
+_PARQUET_METADATA_KEY = b"bgapp.trajectories"
+_ENV_PREFIX = "env."
+
+
+def _cumulative(mask: np.ndarray) -> np.ndarray:
+    """Somas cumulativas com zero inicial: contagem em [s, e) = c[e] - c[s]"""
+    counts = np.zeros(len(mask) + 1, dtype=np.int64)
+    np.cumsum(mask, out=counts[1:])
+    return counts
+
+
+class TrajectoryStore:
+    """
+    Trajetórias em colunas partilhadas; cada trajetória i ocupa as linhas
+    [starts[i], ends[i]) das colunas, ordenadas por tempo
+    """
+
+    def __init__(self,
+                 timestamps: np.ndarray,
+                 lons: np.ndarray,
+                 lats: np.ndarray,
+                 status: np.ndarray,
+                 env: Dict[str, np.ndarray],
+                 starts: np.ndarray,
+                 ends: np.ndarray,
+                 attributes: Dict[str, np.ndarray],
+                 metadata: List[Dict[str, Any]]):
+        self.timestamps = timestamps
+        self.lons = lons
+        self.lats = lats
+        self.status = status
+        self.env = env
+        self.starts = starts
+        self.ends = ends
+        self.attributes = attributes
+        self.metadata = metadata
+
+    # --- construção -----------------------------------------------------------
+
+    @classmethod
+    def from_arrays(cls,
+                    trajectory_ids: Sequence[str],
+                    timestamps: np.ndarray,
+                    lons: np.ndarray,
+                    lats: np.ndarray,
+                    status: Optional[np.ndarray] = None,
+                    env: Optional[Dict[str, np.ndarray]] = None,
+                    attributes: Optional[Dict[str, Sequence[Any]]] = None) -> "TrajectoryStore":
+        """
+        Construir a partir de colunas por ponto (ex.: telemetria Movebank/ARGOS)
+        `trajectory_ids` identifica a trajetória de cada ponto; `attributes`
+        (species, species_type) é indexado pela ordem de primeira ocorrência
+        """
+        trajectory_ids = np.asarray(trajectory_ids)
+        timestamps = np.asarray(timestamps)
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            timestamps = timestamps.astype("datetime64[us]").astype(np.int64)
+
+        unique_ids, first_index, codes = np.unique(trajectory_ids, return_index=True, return_inverse=True)
+        # Manter a ordem de primeira ocorrência das trajetórias
+        appearance = np.argsort(first_index)
+        rank = np.empty_like(appearance)
+        rank[appearance] = np.arange(len(appearance))
+        codes = rank[codes]
+
+        order = np.lexsort((timestamps, codes))
+        counts = np.bincount(codes, minlength=len(unique_ids))
+        ends = np.cumsum(counts)
+
+        n = len(order)
+        attributes = {key: np.asarray(values, dtype=object) for key, values in (attributes or {}).items()}
+        attributes.setdefault("individual_id", unique_ids[appearance].astype(object))
+        for key in TRAJECTORY_ATTRIBUTES:
+            attributes.setdefault(key, np.full(len(unique_ids), None, dtype=object))
+
+        return cls(
+            timestamps=np.ascontiguousarray(timestamps[order], dtype=np.int64),
+            lons=np.ascontiguousarray(np.asarray(lons)[order], dtype=np.float32),
+            lats=np.ascontiguousarray(np.asarray(lats)[order], dtype=np.float32),
+            status=(np.asarray(status)[order].astype(np.int8) if status is not None
+                    else np.full(n, STATUS_CODES["unknown"], dtype=np.int8)),
+            env={name: np.ascontiguousarray(np.asarray(values)[order], dtype=np.float32)
+                 for name, values in (env or {}).items()},
+            starts=ends - counts,
+            ends=ends,
+            attributes=attributes,
+            metadata=[{} for _ in range(len(unique_ids))]
+        )
+
+    @classmethod
+    def from_trajectories(cls, trajectories: Iterable[Any]) -> "TrajectoryStore":
+        """Adaptador a partir de MigrationTrajectory (uma passagem pelos pontos)"""
+        trajectories = list(trajectories)
+        counts = np.array([len(t.points) for t in trajectories], dtype=np.int64)
+        points = [p for t in trajectories for p in t.points]
+
+        env_names = sorted({name for p in points for name in p.environmental_data})
+        env = {
+            name: np.array([p.environmental_data.get(name, np.nan) for p in points], dtype=np.float32)
+            for name in env_names
+        }
+        ends = np.cumsum(counts)
+
+        store = cls(
+            timestamps=np.array([p.timestamp for p in points], dtype="datetime64[us]").astype(np.int64),
+            lons=np.array([p.longitude for p in points], dtype=np.float32),
+            lats=np.array([p.latitude for p in points], dtype=np.float32),
+            status=np.array([STATUS_CODES.get(p.status.value, STATUS_CODES["unknown"]) for p in points],
+                            dtype=np.int8),
+            env=env,
+            starts=ends - counts,
+            ends=ends,
+            attributes={
+                "species": np.array([t.species for t in trajectories], dtype=object),
+                "species_type": np.array([t.species_type.value for t in trajectories], dtype=object),
+                "individual_id": np.array([t.individual_id for t in trajectories], dtype=object),
+                "total_distance_km": np.array([t.total_distance_km for t in trajectories], dtype=np.float64),
+                "average_speed_kmh": np.array([t.average_speed_kmh for t in trajectories], dtype=np.float64),
+            },
+            metadata=[dict(t.metadata) for t in trajectories]
+        )
+        # Ordem temporal dentro de cada trajetória (os recortes por tempo dependem dela)
+        if len(points) > 1:
+            step = np.diff(store.timestamps)
+            boundary = np.zeros(len(step), dtype=bool)
+            boundary[store.starts[1:][store.starts[1:] > 0] - 1] = True
+            if np.any((step < 0) & ~boundary):
+                return store.sorted()
+        return store
+
+    def sorted(self) -> "TrajectoryStore":
+        """Cópia compacta com os pontos de cada trajetória ordenados por tempo"""
+        index = self.point_index()
+        order = index[np.lexsort((self.timestamps[index], self.trajectory_of_point()))]
+        return self._take(order)
+
+    def to_trajectories(self) -> List[Any]:
+        """Adaptador para List[MigrationTrajectory] (materializa os objetos)"""
+        from shapely.geometry import LineString
+        from .migration_overlay import MigrationPoint, MigrationStatus, MigrationTrajectory, SpeciesType
+
+        statuses = [MigrationStatus(label) for label in STATUS_LABELS]
+        distances = self.attributes.get("total_distance_km")
+        if distances is None:
+            distances = self.distances_km()
+        speeds = self.attributes.get("average_speed_kmh", np.zeros(len(self)))
+
+        trajectories = []
+        for i in range(len(self)):
+            start, end = int(self.starts[i]), int(self.ends[i])
+            if start == end:
+                continue
+            times = self.timestamps[start:end].astype("datetime64[us]").tolist()
+            lons = self.lons[start:end].astype(np.float64).tolist()
+            lats = self.lats[start:end].astype(np.float64).tolist()
+            codes = self.status[start:end].tolist()
+            env_rows = [dict(zip(self.env, values))
+                        for values in zip(*(column[start:end].astype(np.float64).tolist()
+                                            for column in self.env.values()))] or [{} for _ in times]
+            species = self.attributes["species"][i]
+            individual_id = self.attributes["individual_id"][i]
+
+            points = [
+                MigrationPoint(
+                    timestamp=timestamp, latitude=lat, longitude=lon,
+                    species=species, individual_id=individual_id,
+                    status=statuses[code],
+                    environmental_data={k: v for k, v in env_data.items() if not np.isnan(v)},
+                    metadata={}
+                )
+                for timestamp, lon, lat, code, env_data in zip(times, lons, lats, codes, env_rows)
+            ]
+            coords = list(zip(lons, lats))
+            species_type = self.attributes["species_type"][i]
+            trajectories.append(MigrationTrajectory(
+                species=species,
+                species_type=SpeciesType(species_type) if species_type else SpeciesType.OTHER,
+                individual_id=individual_id,
+                points=points,
+                start_date=times[0],
+                end_date=times[-1],
+                total_distance_km=float(distances[i]),
+                average_speed_kmh=float(speeds[i]),
+                trajectory_geometry=LineString(coords if len(coords) > 1 else coords * 2),
+                metadata=dict(self.metadata[i])
+            ))
+        return trajectories
+
+    # --- propriedades ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def n_points(self) -> int:
+        return int(np.sum(self.ends - self.starts))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes das colunas (partilhadas entre vistas) e dos índices"""
+        columns = [self.timestamps, self.lons, self.lats, self.status, *self.env.values()]
+        return int(sum(column.nbytes for column in columns) + self.starts.nbytes + self.ends.nbytes)
+
+    @property
+    def is_contiguous(self) -> bool:
+        """Vista cobre as colunas inteiras, sem lacunas (colunas usáveis diretamente)"""
+        if len(self) == 0:
+            return len(self.timestamps) == 0
+        return bool(self.starts[0] == 0 and self.ends[-1] == len(self.timestamps)
+                    and np.array_equal(self.starts[1:], self.ends[:-1]))
+
+    def point_index(self) -> np.ndarray:
+        """Índices das linhas da vista, trajetória a trajetória"""
+        if self.is_contiguous:
+            return np.arange(len(self.timestamps))
+        lengths = self.ends - self.starts
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(self.starts - offsets, lengths) + np.arange(int(lengths.sum()))
+
+    def trajectory_of_point(self) -> np.ndarray:
+        """Número (na vista) da trajetória de cada ponto"""
+        return np.repeat(np.arange(len(self)), self.ends - self.starts)
+
+    def offsets(self) -> np.ndarray:
+        """Offsets (n+1) das trajetórias nas colunas devolvidas por `column`"""
+        return np.concatenate(([0], np.cumsum(self.ends - self.starts)))
+
+    def column(self, name: str) -> np.ndarray:
+        """Coluna na ordem da vista (sem cópia quando a vista é contígua)"""
+        values = self.env[name[len(_ENV_PREFIX):]] if name.startswith(_ENV_PREFIX) else getattr(self, name)
+        return values if self.is_contiguous else values[self.point_index()]
+
+    def datetimes(self) -> np.ndarray:
+        return self.column("timestamps").astype("datetime64[us]")
+
+    # --- recortes -------------------------------------------------------------
+
+    def _view(self, keep: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> "TrajectoryStore":
+        return TrajectoryStore(
+            self.timestamps, self.lons, self.lats, self.status, self.env,
+            starts[keep], ends[keep],
+            {key: values[keep] for key, values in self.attributes.items()},
+            [self.metadata[i] for i in np.flatnonzero(keep)]
+        )
+
+    def select(self, trajectories: Union[Sequence[int], np.ndarray]) -> "TrajectoryStore":
+        """Subconjunto de trajetórias (índices ou máscara), sem cópia das colunas"""
+        keep = np.zeros(len(self), dtype=bool)
+        keep[np.asarray(trajectories)] = True
+        return self._view(keep, self.starts, self.ends)
+
+    def slice_time(self, start: Any = None, end: Any = None) -> "TrajectoryStore":
+        """
+        Pontos com start <= timestamp <= end (datetime, datetime64 ou µs int64)
+        Cada trajetória é um intervalo contíguo: só os índices mudam
+        """
+        starts, ends = self.starts, self.ends
+        if start is not None:
+            before = _cumulative(self.timestamps < self._to_us(start))
+            starts = starts + (before[ends] - before[starts])
+        if end is not None:
+            after = _cumulative(self.timestamps > self._to_us(end))
+            ends = ends - (after[ends] - after[self.starts])
+        return self._view(ends > starts, starts, np.maximum(ends, starts))
+
+    def select_bbox(self, bounds: Dict[str, float], clip: bool = False) -> "TrajectoryStore":
+        """
+        Trajetórias com pelo menos um ponto na bbox {'north','south','east','west'}
+        clip=False devolve as trajetórias inteiras sem cópia; clip=True copia só
+        os pontos dentro da bbox (como _filter_trajectories_by_bounds)
+        """
+        inside = self.bbox_mask(bounds)
+        counts = _cumulative(inside)
+        keep = (counts[self.ends] - counts[self.starts]) > 0
+        if not clip:
+            return self._view(keep, self.starts, self.ends)
+
+        view = self._view(keep, self.starts, self.ends)
+        index = view.point_index()
+        return view._take(index[inside[index]])
+
+    def bbox_mask(self, bounds: Dict[str, float]) -> np.ndarray:
+        """Máscara (sobre as colunas) dos pontos dentro da bbox, limites incluídos"""
+        return ((self.lats >= bounds['south']) & (self.lats <= bounds['north']) &
+                (self.lons >= bounds['west']) & (self.lons <= bounds['east']))
+
+    def compact(self) -> "TrajectoryStore":
+        """Cópia com colunas contíguas só com os pontos da vista"""
+        return self if self.is_contiguous else self._take(self.point_index())
+
+    def _take(self, index: np.ndarray) -> "TrajectoryStore":
+        """Nova store com as linhas `index` (agrupadas por trajetória da vista)"""
+        owner = np.searchsorted(self.ends, index, side='right') if self._sorted_ranges() else \
+            self._owner_of_rows(index)
+        counts = np.bincount(owner, minlength=len(self))
+        keep = counts > 0
+        ends = np.cumsum(counts[keep])
+        return TrajectoryStore(
+            self.timestamps[index], self.lons[index], self.lats[index], self.status[index],
+            {name: values[index] for name, values in self.env.items()},
+            ends - counts[keep], ends,
+            {key: values[keep] for key, values in self.attributes.items()},
+            [self.metadata[i] for i in np.flatnonzero(keep)]
+        )
+
+    def _sorted_ranges(self) -> bool:
+        return bool(np.all(self.starts[1:] >= self.ends[:-1]))
+
+    def _owner_of_rows(self, index: np.ndarray) -> np.ndarray:
+        owner = np.full(len(self.timestamps), -1, dtype=np.int64)
+        owner[self.point_index()] = self.trajectory_of_point()
+        return owner[index]
+
+    @staticmethod
+    def _to_us(value: Any) -> int:
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        return int(np.datetime64(value, "us").astype(np.int64))
+
+    # --- análises vetorizadas ---------------------------------------------------
+
+    def environmental_means(self, names: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Média por trajetória de cada variável ambiental (NaN ignorados)"""
+        owner = self.trajectory_of_point()
+        means = {}
+        for name in (names or self.env):
+            values = self.column(_ENV_PREFIX + name).astype(np.float64)
+            valid = ~np.isnan(values)
+            sums = np.bincount(owner[valid], weights=values[valid], minlength=len(self))
+            counts = np.bincount(owner[valid], minlength=len(self))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means[name] = np.where(counts > 0, sums / counts, np.nan)
+        return means
+
+    def distances_km(self) -> np.ndarray:
+        """Distância percorrida por trajetória (aproximação 1° ≈ 111 km)"""
+        lons = self.column("lons").astype(np.float64)
+        lats = self.column("lats").astype(np.float64)
+        steps = np.hypot(np.diff(lons), np.diff(lats)) * 111
+        # Descartar os passos entre o fim de uma trajetória e o início da seguinte
+        boundaries = self.offsets()[1:-1] - 1
+        steps[boundaries[(boundaries >= 0) & (boundaries < len(steps))]] = 0.0
+        totals = _cumulative(steps)
+        offsets = self.offsets()
+        return totals[np.maximum(offsets[1:] - 1, 0)] - totals[offsets[:-1]]
+
+    # --- Parquet ---------------------------------------------------------------
+
+    def to_parquet(self, path: Union[str, Path], compression: str = "zstd") -> Path:
+        """Gravar uma linha por ponto; atributos das trajetórias nos metadados do esquema"""
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow não disponível: instale pyarrow para usar Parquet")
+
+        store = self.compact()
+        columns = {
+            "trajectory": pa.array(store.trajectory_of_point().astype(np.int32)),
+            "timestamp": pa.array(store.timestamps.astype("datetime64[us]")),
+            "lon": pa.array(store.lons),
+            "lat": pa.array(store.lats),
+            "status": pa.array(store.status),
+        }
+        columns.update({_ENV_PREFIX + name: pa.array(values) for name, values in store.env.items()})
+
+        trajectories = [
+            {key: (values[i].item() if hasattr(values[i], "item") else values[i])
+             for key, values in store.attributes.items()}
+            for i in range(len(store))
+        ]
+        metadata = {"status_labels": STATUS_LABELS, "trajectories": trajectories, "metadata": store.metadata}
+        table = pa.table(columns).replace_schema_metadata({
+            _PARQUET_METADATA_KEY: json.dumps(metadata, default=str).encode("utf-8")
+        })
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, path, compression=compression)
+        return path
+
+    @classmethod
+    def from_parquet(cls, path: Union[str, Path], env: Optional[Sequence[str]] = None) -> "TrajectoryStore":
+        """Ler uma store gravada com to_parquet (opcionalmente só algumas variáveis ambientais)"""
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow não disponível: instale pyarrow para usar Parquet")
+
+        schema = pq.read_schema(path)
+        env_columns = [name for name in schema.names if name.startswith(_ENV_PREFIX)]
+        if env is not None:
+            env_columns = [_ENV_PREFIX + name for name in env if _ENV_PREFIX + name in schema.names]
+        table = pq.read_table(path, columns=["trajectory", "timestamp", "lon", "lat", "status", *env_columns])
+        metadata = json.loads(schema.metadata[_PARQUET_METADATA_KEY])
+
+        trajectory = table.column("trajectory").to_numpy()
+        counts = np.bincount(trajectory, minlength=len(metadata["trajectories"]))
+        ends = np.cumsum(counts)
+        attributes = {
+            key: np.array([item[key] for item in metadata["trajectories"]],
+                          dtype=np.float64 if key in ("total_distance_km", "average_speed_kmh") else object)
+            for key in (metadata["trajectories"][0] if metadata["trajectories"] else TRAJECTORY_ATTRIBUTES)
+        }
+        return cls(
+            timestamps=table.column("timestamp").to_numpy().astype("datetime64[us]").astype(np.int64),
+            lons=table.column("lon").to_numpy(),
+            lats=table.column("lat").to_numpy(),
+            status=table.column("status").to_numpy(),
+            env={name[len(_ENV_PREFIX):]: table.column(name).to_numpy() for name in env_columns},
+            starts=ends - counts,
+            ends=ends,
+            attributes=attributes,
+            metadata=metadata["metadata"]
+        )
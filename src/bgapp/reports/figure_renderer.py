@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Serviço de renderização de figuras científicas para BGAPP
+Figuras matplotlib (backend Agg) renderizadas num pool de processos, em cache
+por hash do conteúdo (tipo, dados, estilo, formato, DPI) e guardadas em ficheiros
+referenciados pelos relatórios em vez de base64 embutido
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from cycler import cycler
+from matplotlib import cm, style as mpl_style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from ..core.executors import run_process
+
+try:
+    import seaborn as sns
+    SEABORN_AVAILABLE = True
+except ImportError:
+    SEABORN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+
+FIGURE_STYLE = {
+    "matplotlib_style": "seaborn-v0_8-whitegrid",
+    "palette": "husl",
+    "colors": {
+        "primary": "#1e3a8a",
+        "secondary": "#0ea5e9",
+        "accent": "#dc2626",
+        "success": "#16a34a",
+        "warning": "#ea580c",
+    },
+}
+
+# DPI por formato de saída do relatório (ecrã vs. impressão)
+DPI_BY_FORMAT = {"html": 110, "json": 110, "markdown": 110, "pdf": 300}
+
+FIGURE_FORMATS = {"png": "image/png", "svg": "image/svg+xml", "pdf": "application/pdf"}
+_FILENAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(png|svg|pdf)$")
+
+
+# --- construtores de figuras (executados nos processos do pool) -------------
+
+def _species_abundance(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    sorted_data = sorted(zip(data["species"], data["abundances"]), key=lambda x: x[1], reverse=True)
+    species = [item[0] for item in sorted_data]
+    abundances = [item[1] for item in sorted_data]
+
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    bars = ax.barh(range(len(species)), abundances, color=cm.viridis(np.linspace(0, 1, len(species))))
+    ax.set_yticks(range(len(species)))
+    ax.set_yticklabels([f"*{s}*" for s in species], fontsize=10, style='italic')
+    ax.set_xlabel('Abundância (número de indivíduos)', fontsize=12)
+    ax.set_title('Abundância por Espécie na ZEE Angola\nMARÍTIMO ANGOLA',
+                 fontsize=16, fontweight='bold', color=style['colors']['primary'])
+
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + max(abundances) * 0.01, bar.get_y() + bar.get_height() / 2,
+                f'{int(width)}', ha='left', va='center', fontsize=9)
+    return fig
+
+
+def _diversity_radar(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    labels, values = data["labels"], data["values"]
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.add_subplot(projection='polar')
+    ax.plot(angles + angles[:1], values + values[:1], 'o-', color=style['colors']['primary'], linewidth=2)
+    ax.fill(angles + angles[:1], values + values[:1], color=style['colors']['primary'], alpha=0.3)
+    ax.set_xticks(angles)
+    ax.set_xticklabels(labels, fontsize=11)
+    ax.set_ylim(0, 1)
+    ax.set_yticks(np.arange(0.2, 1.01, 0.2))
+    ax.set_title('Perfil de Diversidade - ZEE Angola\nMARÍTIMO ANGOLA',
+                 fontsize=16, color=style['colors']['primary'], pad=20)
+    return fig
+
+
+def _species_accumulation(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(data["sample_sizes"], data["accumulated_species"], '-', linewidth=3,
+            color=style['colors']['primary'], label='Espécies Acumuladas')
+    ax.axhline(y=data["species_count"], color=style['colors']['accent'],
+               linestyle='--', label=f'Total Observado ({data["species_count"]})')
+    ax.set_xlabel('Número de Indivíduos Amostrados', fontsize=12)
+    ax.set_ylabel('Número de Espécies Acumuladas', fontsize=12)
+    ax.set_title('Curva de Acumulação de Espécies\nZEE Angola - MARÍTIMO ANGOLA',
+                 fontsize=14, fontweight='bold', color=style['colors']['primary'])
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    return fig
+
+
+def _sst_timeseries(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    dates = np.array(data["dates"], dtype='datetime64[D]')
+    values = np.asarray(data["values"])
+    trend = np.polyfit(np.arange(len(values)), values, 1)
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(dates, values, color=style['colors']['primary'], linewidth=1.5)
+    ax.plot(dates, np.poly1d(trend)(np.arange(len(values))), "--", color=style['colors']['accent'],
+            linewidth=2, label=f'Tendência: {trend[0] * 365:.3f}°C/ano')
+    ax.set_xlabel('Data', fontsize=12)
+    ax.set_ylabel('Temperatura Superficial do Mar (°C)', fontsize=12)
+    ax.set_title(f'Temperatura Superficial do Mar - ZEE Angola {data.get("year", "")}\n'
+                 'Dados Copernicus CMEMS - MARÍTIMO ANGOLA',
+                 fontsize=14, fontweight='bold', color=style['colors']['primary'])
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    return fig
+
+
+def _spatial_distribution(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    lon_grid, lat_grid = np.meshgrid(data["lons"], data["lats"])
+
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    contour = ax.contourf(lon_grid, lat_grid, np.asarray(data["grid"]), levels=20, cmap='RdYlBu_r')
+    ax.set_xlabel('Longitude (°E)', fontsize=12)
+    ax.set_ylabel('Latitude (°S)', fontsize=12)
+    ax.set_title('Distribuição Espacial da Temperatura Superficial\nZEE Angola - MARÍTIMO ANGOLA',
+                 fontsize=14, fontweight='bold', color=style['colors']['primary'])
+    fig.colorbar(contour, ax=ax).set_label('Temperatura (°C)', fontsize=12)
+
+    west, south, east, north = data["zee_bounds"]
+    ax.plot([west, east, east, west, west], [south, south, north, north, south],
+            'k-', linewidth=2, label='Limites ZEE Angola')
+    ax.legend()
+    return fig
+
+
+def _upwelling_analysis(data: Dict[str, Any], style: Dict[str, Any]) -> Figure:
+    months, intensity = data["months"], data["intensity"]
+
+    fig = Figure(figsize=(10, 8))
+    ax1, ax2 = fig.subplots(2, 1, height_ratios=[2, 1])
+    ax1.bar(months, intensity, color=[style['colors']['primary'] if x > 0.8 else
+                                      style['colors']['secondary'] for x in intensity])
+    ax1.set_ylabel('Intensidade do Upwelling', fontsize=12)
+    ax1.set_title('Sazonalidade do Upwelling de Benguela\nZEE Angola Sul - MARÍTIMO ANGOLA',
+                  fontsize=14, fontweight='bold', color=style['colors']['primary'])
+    ax1.grid(True, alpha=0.3)
+
+    ax2.plot(months, data["productivity"], 'o-', color=style['colors']['success'],
+             linewidth=2, markersize=6, label='Produtividade Primária')
+    ax2.set_ylabel('Produtividade Relativa', fontsize=12)
+    ax2.set_xlabel('Mês', fontsize=12)
+    ax2.grid(True, alpha=0.3)
+    ax2.legend()
+    return fig
+
+
+FIGURE_BUILDERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Figure]] = {
+    "species_abundance": _species_abundance,
+    "diversity_radar": _diversity_radar,
+    "species_accumulation": _species_accumulation,
+    "sst_timeseries": _sst_timeseries,
+    "spatial_distribution": _spatial_distribution,
+    "upwelling_analysis": _upwelling_analysis,
+}
+
+
+def _style_sheets(style: Dict[str, Any]) -> List[Any]:
+    """Estilo matplotlib e ciclo de cores da paleta (seaborn, se disponível)"""
+    sheets: List[Any] = [style.get("matplotlib_style", "default")]
+    if style.get("palette") and SEABORN_AVAILABLE:
+        sheets.append({"axes.prop_cycle": cycler(color=sns.color_palette(style["palette"]).as_hex())})
+    return sheets
+
+
+def render_figure(figure_type: str, data: Dict[str, Any], style: Dict[str, Any],
+                  fmt: str = "png", dpi: int = 110) -> bytes:
+    """Renderizar uma figura com o canvas Agg (sem pyplot nem estado global)"""
+    with mpl_style.context(_style_sheets(style)):
+        fig = FIGURE_BUILDERS[figure_type](data, style)
+        FigureCanvasAgg(fig)
+        fig.tight_layout()
+        buffer = BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+# --- serviço ----------------------------------------------------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def figure_cache_key(figure_type: str, data: Dict[str, Any], style: Dict[str, Any],
+                     fmt: str, dpi: int) -> str:
+    """Hash SHA-256 do conteúdo que determina a figura"""
+    payload = json.dumps([figure_type, data, style, fmt, dpi], sort_keys=True,
+                         default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class FigureJob:
+    """Pedido de renderização de uma figura"""
+    figure_type: str
+    data: Dict[str, Any]
+
+
+@dataclass
+class RenderedFigure:
+    key: str
+    figure_type: str
+    path: Path
+    url: str
+    cached: bool
+
+
+class FigureRenderer:
+    """Renderização paralela (pool de processos) com cache em disco por hash"""
+
+    def __init__(self, output_dir: Path, url_prefix: str = "/admin-dashboard/reports/figures",
+                 style: Optional[Dict[str, Any]] = None):
+        self.output_dir = Path(output_dir)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.style = style or FIGURE_STYLE
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"rendered": 0, "cache_hits": 0, "render_seconds": 0.0}
+
+    async def render(self, figure_type: str, data: Dict[str, Any], fmt: str = "png",
+                     dpi: int = DPI_BY_FORMAT["html"],
+                     style: Optional[Dict[str, Any]] = None) -> RenderedFigure:
+        """Renderizar (ou reutilizar) uma figura e devolver o ficheiro/URL"""
+        if figure_type not in FIGURE_BUILDERS:
+            raise ValueError(f"Tipo de figura desconhecido: {figure_type}")
+        if fmt not in FIGURE_FORMATS:
+            raise ValueError(f"Formato de figura não suportado: {fmt}")
+
+        style = style or self.style
+        key = figure_cache_key(figure_type, data, style, fmt, dpi)
+        path = self.output_dir / f"{key}.{fmt}"
+
+        if path.exists():
+            self.stats["cache_hits"] += 1
+            return self._result(key, figure_type, path, cached=True)
+
+        # Pedidos concorrentes da mesma figura partilham a mesma renderização
+        pending = self._inflight.get(key)
+        if pending is not None:
+            await asyncio.shield(pending)
+            self.stats["cache_hits"] += 1
+            return self._result(key, figure_type, path, cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            start = time.perf_counter()
+            content = await run_process(render_figure, figure_type, data, style, fmt, dpi)
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(content)
+            tmp.replace(path)
+            self.stats["rendered"] += 1
+            self.stats["render_seconds"] += time.perf_counter() - start
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evitar aviso "exception never retrieved"
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        return self._result(key, figure_type, path, cached=False)
+
+    async def render_many(self, jobs: List[FigureJob], fmt: str = "png",
+                          dpi: int = DPI_BY_FORMAT["html"]) -> List[RenderedFigure]:
+        """Renderizar várias figuras em paralelo (ordem preservada)"""
+        return list(await asyncio.gather(*(self.render(job.figure_type, job.data, fmt, dpi) for job in jobs)))
+
+    def _result(self, key: str, figure_type: str, path: Path, cached: bool) -> RenderedFigure:
+        return RenderedFigure(key=key, figure_type=figure_type, path=path,
+                              url=f"{self.url_prefix}/{path.name}", cached=cached)
+
+    def get_path(self, filename: str) -> Optional[Path]:
+        """Caminho de uma figura guardada (None se o nome for inválido ou não existir)"""
+        if not _FILENAME_PATTERN.match(filename):
+            return None
+        path = self.output_dir / filename
+        return path if path.exists() else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "output_dir": str(self.output_dir), "inflight": len(self._inflight)}
+
+
+# Instância global do serviço de figuras
+figure_renderer = FigureRenderer(Path(os.getenv("REPORT_FIGURES_DIR", ROOT_DIR / "data" / "reports" / "figures")))
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌍 Cubo de Variáveis Ambientais para Modelação MaxEnt
+====================================================
+
+Camadas ambientais empilhadas num cubo (bandas x linhas x colunas) numa grelha
+regular, com amostragem vetorizada por índice para pontos de presença, de
+background e de predição. Inclui a função de treino/predição executada por
+espécie no pool de processos, com o cubo partilhado em disco (memmap).
+
+Autor: Sistema BGAPP
+Data: Janeiro 2025
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ENVIRONMENTAL_VARIABLES = [
+    'sea_surface_temperature',
+    'salinity',
+    'chlorophyll_a',
+    'bathymetry',
+    'current_speed',
+    'primary_productivity'
+]
+
+# Linhas por chamada a predict_proba (limita a memória da predição)
+PREDICTION_CHUNK_ROWS = 250_000
+
+
+def _tmp_path(path: Path) -> Path:
+    """Temporário exclusivo desta escrita (vários processos podem gravar o mesmo ficheiro)"""
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+
+@dataclass
+class EnvironmentalStack:
+    """Cubo ambiental (bandas x latitude x longitude) numa grelha regular"""
+    data: np.ndarray
+    variables: List[str]
+    min_lat: float
+    min_lon: float
+    resolution: float
+    _fingerprint: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape[1], self.data.shape[2]
+
+    @property
+    def lats(self) -> np.ndarray:
+        """Latitudes dos centros das células"""
+        return self.min_lat + (np.arange(self.shape[0]) + 0.5) * self.resolution
+
+    @property
+    def lons(self) -> np.ndarray:
+        """Longitudes dos centros das células"""
+        return self.min_lon + (np.arange(self.shape[1]) + 0.5) * self.resolution
+
+    @classmethod
+    def simulated(cls, bounds: Dict[str, float], resolution: float, seed: int = 42) -> 'EnvironmentalStack':
+        """
+        Cubo com os valores simulados do MaxEntService, calculados uma vez por célula
+        (ruído fixo por semente: a mesma localização devolve sempre os mesmos valores)
+        """
+        n_rows = int(np.ceil((bounds['max_lat'] - bounds['min_lat']) / resolution))
+        n_cols = int(np.ceil((bounds['max_lon'] - bounds['min_lon']) / resolution))
+        lats = bounds['min_lat'] + (np.arange(n_rows) + 0.5) * resolution
+        lons = bounds['min_lon'] + (np.arange(n_cols) + 0.5) * resolution
+        lat, lon = np.meshgrid(lats, lons, indexing='ij')
+        rng = np.random.default_rng(seed)
+
+        def noise(scale: float) -> np.ndarray:
+            return rng.normal(0, scale, lat.shape)
+
+        # Temperatura do mar (baseada na latitude - mais quente no norte)
+        sst = 24 + (lat + 18) * 0.3 + noise(1)
+
+        # Salinidade
+        salinity = 35 + noise(0.5)
+
+        # Clorofila-a (maior perto da costa devido ao upwelling)
+        coastal_distance = np.minimum(np.abs(lon - 13), np.abs(lat + 12))  # Aproximação
+        chlorophyll = np.maximum(0.1, 2.0 - coastal_distance * 0.1 + noise(0.2))
+
+        # Profundidade (simulada baseada na distância da costa)
+        bathymetry = -50 - coastal_distance * 100 + noise(20)
+
+        # Velocidade da corrente
+        current_speed = 0.2 + noise(0.1)
+
+        # Produtividade primária
+        primary_productivity = chlorophyll * 50 + noise(10)
+
+        bands = {
+            'sea_surface_temperature': np.clip(sst, 20, 30),
+            'salinity': np.clip(salinity, 30, 40),
+            'chlorophyll_a': np.maximum(0.01, chlorophyll),
+            'bathymetry': np.minimum(-10, bathymetry),
+            'current_speed': np.maximum(0, current_speed),
+            'primary_productivity': np.maximum(0, primary_productivity)
+        }
+        return cls(
+            data=np.stack([bands[name] for name in ENVIRONMENTAL_VARIABLES]).astype(np.float32),
+            variables=list(ENVIRONMENTAL_VARIABLES),
+            min_lat=float(bounds['min_lat']),
+            min_lon=float(bounds['min_lon']),
+            resolution=float(resolution)
+        )
+
+    @classmethod
+    def from_rasters(cls, layers: Dict[str, str]) -> 'EnvironmentalStack':
+        """Empilhar GeoTIFFs (EPSG:4326, mesma grelha) - uma banda por camada"""
+        if not RASTERIO_AVAILABLE:
+            raise RuntimeError("rasterio não disponível: instale rasterio para ler camadas raster")
+
+        bands, grid = [], None
+        for name, path in layers.items():
+            with rasterio.open(path) as src:
+                band = src.read(1, masked=True).astype(np.float32).filled(np.nan)
+                layer_grid = (src.transform, src.shape)
+            if grid is not None and layer_grid != grid:
+                raise ValueError(f"❌ Camada '{name}' não está na mesma grelha das restantes")
+            grid = layer_grid
+            bands.append(band)
+
+        transform, (n_rows, _) = grid
+        if abs(transform.a) != abs(transform.e):
+            raise ValueError("❌ Camadas ambientais têm de ter píxeis quadrados")
+
+        data = np.stack(bands)
+        # GeoTIFF norte-para-cima: inverter para latitudes crescentes
+        if transform.e < 0:
+            data = data[:, ::-1, :]
+        return cls(
+            data=np.ascontiguousarray(data),
+            variables=list(layers),
+            min_lat=float(transform.f + transform.e * n_rows if transform.e < 0 else transform.f),
+            min_lon=float(transform.c),
+            resolution=float(transform.a)
+        )
+
+    def to_xarray(self):
+        """Cubo como xarray.DataArray (variable, lat, lon)"""
+        import xarray as xr
+
+        return xr.DataArray(
+            self.data,
+            dims=('variable', 'lat', 'lon'),
+            coords={'variable': self.variables, 'lat': self.lats, 'lon': self.lons},
+            name='environment'
+        )
+
+    def fingerprint(self) -> str:
+        """Hash do conteúdo e da grelha do cubo"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps([self.variables, self.min_lat, self.min_lon,
+                                      self.resolution, self.data.shape]).encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.data).data)
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def cell_indices(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Índices (linha, coluna) das células e máscara dos pontos dentro do cubo"""
+        rows = np.floor((np.asarray(lats, dtype=np.float64) - self.min_lat) / self.resolution).astype(np.int64)
+        cols = np.floor((np.asarray(lons, dtype=np.float64) - self.min_lon) / self.resolution).astype(np.int64)
+        n_rows, n_cols = self.shape
+        # Pontos sobre o limite superior pertencem à última célula
+        rows[rows == n_rows] = n_rows - 1
+        cols[cols == n_cols] = n_cols - 1
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        return np.where(inside, rows, 0), np.where(inside, cols, 0), inside
+
+    def sample(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Valores das bandas (pontos x variáveis); NaN fora do cubo"""
+        rows, cols, inside = self.cell_indices(lats, lons)
+        values = self.data[:, rows, cols].T.astype(np.float64)
+        values[~inside] = np.nan
+        return values
+
+    def save(self, directory: Path) -> Path:
+        """
+        Gravar o cubo (.npy + metadados) para ser aberto em memmap pelos workers
+
+        Seguro com escritores concorrentes: cada escrita usa um temporário próprio
+        e os metadados ficam no lugar antes do .npy (que marca o cubo como pronto)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.fingerprint()}.npy"
+        if not path.exists():
+            meta_path = path.with_suffix('.json')
+            meta_tmp = _tmp_path(meta_path)
+            meta_tmp.write_text(json.dumps({
+                'variables': self.variables, 'min_lat': self.min_lat,
+                'min_lon': self.min_lon, 'resolution': self.resolution
+            }), encoding='utf-8')
+            meta_tmp.replace(meta_path)
+
+            tmp = _tmp_path(path)
+            with open(tmp, 'wb') as f:
+                np.save(f, self.data)
+            tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> 'EnvironmentalStack':
+        path = Path(path)
+        meta = json.loads(path.with_suffix('.json').read_text(encoding='utf-8'))
+        return cls(
+            data=np.load(path, mmap_mode='r' if mmap else None),
+            _fingerprint=path.stem,
+            **meta
+        )
+
+
+# Cubos abertos em cada processo worker (reutilizados entre espécies)
+_worker_stacks: Dict[str, EnvironmentalStack] = {}
+
+
+def _worker_stack(path: str) -> EnvironmentalStack:
+    stack = _worker_stacks.get(path)
+    if stack is None:
+        stack = _worker_stacks[path] = EnvironmentalStack.load(Path(path))
+    return stack
+
+
+def prediction_grid(bounds: Dict[str, float], resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordenadas da grelha de predição (mesma orientação do MaxEntService)"""
+    lats = np.arange(bounds['min_lat'], bounds['max_lat'], resolution)
+    lons = np.arange(bounds['min_lon'], bounds['max_lon'], resolution)
+    return np.meshgrid(lats, lons)
+
+
+def predict_suitability(model, stack: EnvironmentalStack, bounds: Dict[str, float],
+                        resolution: float) -> np.ndarray:
+    """Mapa de adequação: amostragem do cubo na grelha e predição em blocos"""
+    lat_grid, lon_grid = prediction_grid(bounds, resolution)
+    features = stack.sample(lat_grid.ravel(), lon_grid.ravel())
+    valid = ~np.isnan(features).any(axis=1)
+
+    predictions = np.full(len(features), np.nan)
+    valid_rows = np.flatnonzero(valid)
+    for start in range(0, len(valid_rows), PREDICTION_CHUNK_ROWS):
+        rows = valid_rows[start:start + PREDICTION_CHUNK_ROWS]
+        predictions[rows] = model.predict_proba(features[rows])[:, 1]
+    return predictions.reshape(lat_grid.shape)
+
+
+def model_hash(presence: np.ndarray, background: np.ndarray, stack_fingerprint: str,
+               params: Dict[str, Any]) -> str:
+    """Identificador do modelo: dados de treino, cubo ambiental e parâmetros"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(presence, dtype=np.float64).data)
+    digest.update(np.ascontiguousarray(background, dtype=np.float64).data)
+    digest.update(stack_fingerprint.encode('utf-8'))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def fit_species_model(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Treinar (ou reabrir) o modelo de uma espécie e gerar o mapa de predição
+    Executado no pool de processos; modelos e mapas ficam em cache em disco
+    pelo hash do modelo (e bbox/resolução no caso dos mapas)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    stack = _worker_stack(task['stack_path'])
+    params = task['params']
+    model_file = Path(task['model_path'])
+
+    if model_file.exists():
+        with open(model_file, 'rb') as f:
+            fitted = pickle.load(f)
+    else:
+        # Amostragem vetorizada do cubo (presença = 1, background = 0)
+        presence = stack.sample(task['presence'][:, 0], task['presence'][:, 1])
+        background = stack.sample(task['background'][:, 0], task['background'][:, 1])
+        X = np.vstack([presence, background])
+        y = np.r_[np.ones(len(presence), dtype=np.int8), np.zeros(len(background), dtype=np.int8)]
+        valid = ~np.isnan(X).any(axis=1)
+        X, y = X[valid], y[valid]
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=params['test_size'],
+            random_state=params['random_state'], stratify=y
+        )
+
+        # Random Forest como aproximação ao MaxEnt (um worker por espécie: n_jobs=1)
+        model = RandomForestClassifier(
+            n_estimators=params['n_estimators'],
+            max_depth=params['max_depth'],
+            random_state=params['random_state'],
+            class_weight='balanced',
+            n_jobs=1
+        )
+        model.fit(X_train, y_train)
+
+        fitted = {
+            'model': model,
+            'feature_cols': stack.variables,
+            'auc_score': float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+            'training_accuracy': float(model.score(X_train, y_train)),
+            'test_accuracy': float(model.score(X_test, y_test)),
+            'feature_importance': dict(zip(stack.variables, model.feature_importances_.tolist()))
+        }
+        model_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(model_file)
+        with open(tmp, 'wb') as f:
+            pickle.dump(fitted, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(model_file)
+
+    prediction_file = Path(task['prediction_path'])
+    if prediction_file.exists():
+        prediction_map = np.load(prediction_file)
+    else:
+        prediction_map = predict_suitability(fitted['model'], stack, task['bounds'], task['resolution'])
+        prediction_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(prediction_file)
+        with open(tmp, 'wb') as f:
+            np.save(f, prediction_map)
+        tmp.replace(prediction_file)
+
+    return {**fitted, 'prediction_map': prediction_map}
@@ -25,12 +25,11 @@ import geopandas as gpd
 from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
 import json
+import pickle
 from datetime import datetime
 import asyncio
 import aiohttp
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import roc_auc_score, classification_report
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report
 import rasterio
 from rasterio.mask import mask
 from shapely.geometry import Point, Polygon
@@ -38,6 +37,10 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from dataclasses import dataclass
 import warnings
+
+from ...core.executors import run_io, run_process
+from .environmental_stack import EnvironmentalStack, fit_species_model, model_hash, predict_suitability
+
 warnings.filterwarnings('ignore')
 
 # Configuração do logging
@@ -95,6 +98,11 @@ class MaxEntService:
         self.models: Dict[str, any] = {}
         self.environmental_layers: Dict[str, EnvironmentalLayer] = {}
         self.species_data: Dict[str, List[SpeciesOccurrence]] = {}
+        self._environmental_stack: Optional[EnvironmentalStack] = None
+        self._environmental_stack_path: Optional[Path] = None
+        self._background: Optional[np.ndarray] = None
+        # Resultados por (espécie, hash do modelo, bbox, resolução)
+        self._results_cache: Dict[Tuple, MaxEntResult] = {}
         
         # Diretórios de trabalho
         self.data_dir = Path(self.config.get('data_dir', 'data/maxent'))
@@ -119,6 +127,10 @@ class MaxEntService:
             'test_size': 0.2,
             'random_state': 42,
             'n_background_points': 10000,
+            'environmental_resolution': 0.02,  # Resolução (graus) do cubo ambiental
+            'prediction_resolution': 0.1,  # Resolução (graus) dos mapas de predição
+            'n_estimators': 100,
+            'max_depth': 10,
             'angola_bounds': {
                 'min_lat': -18.0,
                 'max_lat': -4.0,
@@ -268,8 +280,40 @@ class MaxEntService:
             layer: Camada ambiental com metadados
         """
         self.environmental_layers[layer.name] = layer
+        self._environmental_stack = None
+        self._environmental_stack_path = None
         logger.info(f"✅ Camada ambiental '{layer.name}' adicionada")
     
+    def get_environmental_stack(self) -> EnvironmentalStack:
+        """
+        🌍 Cubo ambiental usado na amostragem (criado sob demanda)
+        
+        Camadas raster registadas são empilhadas; sem camadas, usa valores
+        simulados para Angola numa grelha de 'environmental_resolution' graus
+        """
+        if self._environmental_stack is None:
+            if self.environmental_layers:
+                self._environmental_stack = EnvironmentalStack.from_rasters(
+                    {name: layer.file_path for name, layer in self.environmental_layers.items()}
+                )
+            else:
+                self._environmental_stack = EnvironmentalStack.simulated(
+                    self.config['angola_bounds'],
+                    self.config['environmental_resolution'],
+                    seed=self.config['random_state']
+                )
+            stack = self._environmental_stack
+            logger.info(f"🌍 Cubo ambiental {len(stack.variables)}x{stack.shape[0]}x{stack.shape[1]} "
+                        f"({stack.data.nbytes / 1e6:.1f} MB) pronto")
+        return self._environmental_stack
+    
+    async def _save_environmental_stack(self) -> Path:
+        """Gravar o cubo ambiental em disco (uma vez) para ser partilhado pelos workers"""
+        if self._environmental_stack_path is None:
+            stack = self.get_environmental_stack()
+            self._environmental_stack_path = await run_io(stack.save, self.data_dir / 'environmental_stack')
+        return self._environmental_stack_path
+    
     def generate_background_points(self, n_points: Optional[int] = None) -> List[Tuple[float, float]]:
         """
         🎲 Gerar pontos de background para modelação MaxEnt
@@ -280,19 +324,28 @@ class MaxEntService:
         Returns:
             Lista de coordenadas (lat, lon)
         """
+        background_points = list(map(tuple, self._background_array(n_points).tolist()))
+        
+        logger.info(f"🎲 Gerados {len(background_points)} pontos de background")
+        return background_points
+    
+    def _background_array(self, n_points: Optional[int] = None, rng=np.random) -> np.ndarray:
+        """Pontos de background como array (n, 2) de (lat, lon)"""
         if n_points is None:
             n_points = self.config['n_background_points']
         
         bounds = self.config['angola_bounds']
         
         # Gerar pontos aleatórios dentro dos limites de Angola
-        lats = np.random.uniform(bounds['min_lat'], bounds['max_lat'], n_points)
-        lons = np.random.uniform(bounds['min_lon'], bounds['max_lon'], n_points)
-        
-        background_points = list(zip(lats, lons))
-        
-        logger.info(f"🎲 Gerados {len(background_points)} pontos de background")
-        return background_points
+        lats = rng.uniform(bounds['min_lat'], bounds['max_lat'], n_points)
+        lons = rng.uniform(bounds['min_lon'], bounds['max_lon'], n_points)
+        return np.column_stack([lats, lons])
+    
+    def _model_background(self) -> np.ndarray:
+        """Background partilhado por todas as espécies (fixo pela semente: modelos reprodutíveis)"""
+        if self._background is None:
+            self._background = self._background_array(rng=np.random.default_rng(self.config['random_state']))
+        return self._background
     
     def extract_environmental_values(
         self, 
@@ -309,54 +362,17 @@ class MaxEntService:
         """
         logger.info(f"🌍 Extraindo valores ambientais para {len(coordinates)} pontos")
         
-        # Por agora, usar valores simulados baseados em dados reais de Angola
-        # Em implementação futura, integrar com rasters reais
+        stack = self.get_environmental_stack()
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
         
-        data = []
-        for lat, lon in coordinates:
-            # Simular valores ambientais baseados na localização
-            env_values = self._simulate_environmental_values(lat, lon)
-            env_values['latitude'] = lat
-            env_values['longitude'] = lon
-            data.append(env_values)
+        # Amostragem vetorizada por índice de célula
+        df = pd.DataFrame(stack.sample(coords[:, 0], coords[:, 1]), columns=stack.variables)
+        df['latitude'] = coords[:, 0]
+        df['longitude'] = coords[:, 1]
         
-        df = pd.DataFrame(data)
         logger.info(f"✅ Valores ambientais extraídos para {len(df)} pontos")
         return df
     
-    def _simulate_environmental_values(self, lat: float, lon: float) -> Dict[str, float]:
-        """Simular valores ambientais baseados na localização"""
-        # Valores simulados mas realistas para Angola
-        
-        # Temperatura do mar (baseada na latitude - mais quente no norte)
-        sst = 24 + (lat + 18) * 0.3 + np.random.normal(0, 1)
-        
-        # Salinidade (varia com proximidade à costa)
-        salinity = 35 + np.random.normal(0, 0.5)
-        
-        # Clorofila-a (maior perto da costa devido ao upwelling)
-        # Costa de Angola tem upwelling forte
-        coastal_distance = min(abs(lon - 13), abs(lat + 12))  # Aproximação
-        chlorophyll = max(0.1, 2.0 - coastal_distance * 0.1 + np.random.normal(0, 0.2))
-        
-        # Profundidade (simulada baseada na distância da costa)
-        bathymetry = -50 - coastal_distance * 100 + np.random.normal(0, 20)
-        
-        # Velocidade da corrente
-        current_speed = 0.2 + np.random.normal(0, 0.1)
-        
-        # Produtividade primária
-        primary_productivity = chlorophyll * 50 + np.random.normal(0, 10)
-        
-        return {
-            'sea_surface_temperature': max(20, min(30, sst)),
-            'salinity': max(30, min(40, salinity)),
-            'chlorophyll_a': max(0.01, chlorophyll),
-            'bathymetry': min(-10, bathymetry),
-            'current_speed': max(0, current_speed),
-            'primary_productivity': max(0, primary_productivity)
-        }
-    
     async def train_maxent_model(
         self, 
         species_name: str, 
@@ -383,80 +399,117 @@ class MaxEntService:
         if len(occurrences) < 10:
             raise ValueError(f"❌ Insuficientes ocorrências ({len(occurrences)}) para treinar modelo")
         
-        # Preparar dados de treino
-        presence_coords = [(occ.latitude, occ.longitude) for occ in occurrences]
-        background_coords = self.generate_background_points()
-        
-        # Extrair valores ambientais
-        presence_env = self.extract_environmental_values(presence_coords)
-        background_env = self.extract_environmental_values(background_coords)
-        
-        # Preparar dataset
-        presence_env['presence'] = 1
-        background_env['presence'] = 0
-        
-        # Combinar dados
-        full_dataset = pd.concat([presence_env, background_env], ignore_index=True)
-        
-        # Preparar features e target
-        feature_cols = [col for col in full_dataset.columns 
-                       if col not in ['latitude', 'longitude', 'presence']]
-        X = full_dataset[feature_cols]
-        y = full_dataset['presence']
-        
-        # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=self.config['test_size'], 
-            random_state=self.config['random_state'], stratify=y
-        )
-        
-        # Treinar modelo (Random Forest como aproximação ao MaxEnt)
-        model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=self.config['random_state'],
-            class_weight='balanced'
-        )
-        
-        logger.info("🔄 Treinando modelo...")
-        model.fit(X_train, y_train)
+        result = await self._run_species_model(species_name, occurrences)
         
-        # Avaliar modelo
-        train_pred = model.predict_proba(X_train)[:, 1]
-        test_pred = model.predict_proba(X_test)[:, 1]
-        
-        auc_score = roc_auc_score(y_test, test_pred)
-        train_accuracy = model.score(X_train, y_train)
-        test_accuracy = model.score(X_test, y_test)
+        logger.info(f"✅ Modelo MaxEnt treinado com sucesso!")
+        logger.info(f"📊 AUC: {result.auc_score:.3f}, Precisão Teste: {result.test_accuracy:.3f}")
         
-        # Importância das features
-        feature_importance = dict(zip(feature_cols, model.feature_importances_))
+        return result
+    
+    async def train_multiple_species(
+        self,
+        species_occurrences: Dict[str, List[SpeciesOccurrence]],
+        bounds: Optional[Dict[str, float]] = None,
+        resolution: Optional[float] = None
+    ) -> Dict[str, Union[MaxEntResult, Exception]]:
+        """
+        🎯 Treinar modelos para várias espécies em paralelo (uma espécie por worker)
         
-        # Gerar mapa de predição
-        prediction_map = self._generate_prediction_map(model, feature_cols)
+        Args:
+            species_occurrences: Ocorrências por espécie
+            bounds: Limites dos mapas de predição (opcional)
+            resolution: Resolução dos mapas de predição em graus (opcional)
+            
+        Returns:
+            Resultado (ou exceção) por espécie
+        """
+        logger.info(f"🎯 Treino paralelo de {len(species_occurrences)} espécies")
+        
+        # Cubo gravado antes de lançar as espécies: os workers só o abrem
+        stack_path = await self._save_environmental_stack()
+        results = await asyncio.gather(*(
+            self._run_species_model(species_name, occurrences, bounds, resolution, stack_path)
+            for species_name, occurrences in species_occurrences.items()
+        ), return_exceptions=True)
+        
+        failed = sum(isinstance(result, Exception) for result in results)
+        logger.info(f"✅ {len(results) - failed} modelos treinados, {failed} falhados")
+        return dict(zip(species_occurrences, results))
+    
+    async def _run_species_model(
+        self,
+        species_name: str,
+        occurrences: List[SpeciesOccurrence],
+        bounds: Optional[Dict[str, float]] = None,
+        resolution: Optional[float] = None,
+        stack_path: Optional[Path] = None
+    ) -> MaxEntResult:
+        """Treino e predição de uma espécie no pool de processos, com cache de resultados"""
+        if len(occurrences) < 10:
+            raise ValueError(f"❌ Insuficientes ocorrências ({len(occurrences)}) para treinar modelo")
         
-        # Salvar modelo
-        model_path = self.models_dir / f"{species_name.replace(' ', '_')}_maxent_model.pkl"
+        bounds = bounds or self.config['angola_bounds']
+        resolution = resolution or self.config['prediction_resolution']
+        
+        stack = self.get_environmental_stack()
+        presence = np.array([(occ.latitude, occ.longitude) for occ in occurrences], dtype=np.float64)
+        background = self._model_background()
+        params = {
+            'test_size': self.config['test_size'],
+            'random_state': self.config['random_state'],
+            'n_estimators': self.config['n_estimators'],
+            'max_depth': self.config['max_depth']
+        }
+        model_id = model_hash(presence, background, stack.fingerprint(), params)
+        bbox = tuple(round(bounds[key], 6) for key in ('min_lat', 'max_lat', 'min_lon', 'max_lon'))
+        cache_key = (species_name, model_id, bbox, round(resolution, 6))
+        
+        cached = self._results_cache.get(cache_key)
+        if cached is not None:
+            if species_name not in self.models:
+                self.models[species_name] = self._load_model(cached.model_path)
+            return cached
+        
+        species_clean = species_name.replace(' ', '_')
+        model_path = self.models_dir / f"{species_clean}_{model_id}_maxent_model.pkl"
+        prediction_path = (self.output_dir / 'predictions' /
+                           f"{species_clean}_{model_id}_{'_'.join(map(str, bbox))}_{resolution}.npy")
+        
+        if stack_path is None:
+            stack_path = await self._save_environmental_stack()
+        
+        logger.info(f"🔄 Treinando modelo para {species_name} ({len(presence)} presenças)...")
+        fitted = await run_process(fit_species_model, {
+            'stack_path': str(stack_path),
+            'presence': presence,
+            'background': background,
+            'params': params,
+            'bounds': bounds,
+            'resolution': resolution,
+            'model_path': str(model_path),
+            'prediction_path': str(prediction_path)
+        })
         
         result = MaxEntResult(
             species_name=species_name,
-            auc_score=auc_score,
-            training_accuracy=train_accuracy,
-            test_accuracy=test_accuracy,
-            feature_importance=feature_importance,
-            prediction_map=prediction_map,
+            auc_score=fitted['auc_score'],
+            training_accuracy=fitted['training_accuracy'],
+            test_accuracy=fitted['test_accuracy'],
+            feature_importance=fitted['feature_importance'],
+            prediction_map=fitted['prediction_map'],
             model_path=str(model_path),
             created_at=datetime.now()
         )
         
         # Armazenar modelo
-        self.models[species_name] = model
-        
-        logger.info(f"✅ Modelo MaxEnt treinado com sucesso!")
-        logger.info(f"📊 AUC: {auc_score:.3f}, Precisão Teste: {test_accuracy:.3f}")
-        
+        self.models[species_name] = fitted['model']
+        self._results_cache[cache_key] = result
         return result
     
+    def _load_model(self, model_path: str):
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)['model']
+    
     def _generate_prediction_map(
         self, 
         model, 
@@ -464,25 +517,8 @@ class MaxEntService:
         resolution: float = 0.1
     ) -> np.ndarray:
         """Gerar mapa de predição de adequação de habitat"""
-        bounds = self.config['angola_bounds']
-        
-        # Criar grid de predição
-        lats = np.arange(bounds['min_lat'], bounds['max_lat'], resolution)
-        lons = np.arange(bounds['min_lon'], bounds['max_lon'], resolution)
-        
-        lat_grid, lon_grid = np.meshgrid(lats, lons)
-        coords = list(zip(lat_grid.ravel(), lon_grid.ravel()))
-        
-        # Extrair valores ambientais para o grid
-        env_data = self.extract_environmental_values(coords)
-        
-        # Fazer predições
-        predictions = model.predict_proba(env_data[feature_cols])[:, 1]
-        
-        # Reformatar como mapa
-        prediction_map = predictions.reshape(lat_grid.shape)
-        
-        return prediction_map
+        return predict_suitability(model, self.get_environmental_stack(),
+                                   self.config['angola_bounds'], resolution)
     
     def visualize_results(self, result: MaxEntResult, save_path: Optional[str] = None) -> None:
         """
@@ -585,13 +621,13 @@ class MaxEntService:
         model = self.models[species_name]
         
         # Extrair valores ambientais
-        env_values = self.extract_environmental_values([(latitude, longitude)])
-        feature_cols = [col for col in env_values.columns 
-                       if col not in ['latitude', 'longitude']]
+        features = self.get_environmental_stack().sample(np.array([latitude]), np.array([longitude]))
+        if np.isnan(features).any():
+            raise ValueError(f"❌ Localização ({latitude}, {longitude}) fora do cubo ambiental")
         
         # Fazer predição
-        probability = model.predict_proba(env_values[feature_cols])[0, 1]
-        prediction = model.predict(env_values[feature_cols])[0]
+        probability = model.predict_proba(features)[0, 1]
+        prediction = model.predict(features)[0]
         
         return {
             'species': species_name,
@@ -30,12 +30,13 @@ from pathlib import Path
 import json
 from datetime import datetime
 import asyncio
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import warnings
 warnings.filterwarnings('ignore')
@@ -44,6 +45,34 @@ warnings.filterwarnings('ignore')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pontos de referência da costa angolana (lat, lon)
+ANGOLA_COAST_POINTS = np.array([
+    (-5.55, 12.20),   # Cabinda
+    (-8.84, 13.23),   # Luanda
+    (-12.58, 13.41),  # Benguela
+    (-15.20, 12.15),  # Namibe
+])
+LUANDA_PORT = (-8.84, 13.23)
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat, lon, ref_lat: float, ref_lon: float) -> np.ndarray:
+    """Distância de grande círculo (km), vetorizada sobre arrays de latitude/longitude"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(ref_lat), np.radians(ref_lon)
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def coastal_distance_km(lat, lon) -> np.ndarray:
+    """Distância (km) ao ponto de costa de referência mais próximo"""
+    distance = np.full(np.broadcast(lat, lon).shape, np.inf)
+    for coast_lat, coast_lon in ANGOLA_COAST_POINTS:
+        np.minimum(distance, haversine_km(lat, lon, coast_lat, coast_lon), out=distance)
+    return distance
+
+
 class CriterionType(Enum):
     """Tipos de critérios"""
     BENEFIT = "benefit"      # Quanto maior, melhor
@@ -83,6 +112,50 @@ class Alternative:
     final_score: float = 0.0
     rank: int = 0
     
+@dataclass
+class CriteriaGrid:
+    """Grelha espacial como matriz de critérios (células x critérios, células linha a linha)"""
+    lats: np.ndarray
+    lons: np.ndarray
+    criteria: List[str]
+    matrix: np.ndarray
+    
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.lats), len(self.lons)
+    
+    @property
+    def n_cells(self) -> int:
+        return self.matrix.shape[0]
+    
+    def column(self, name: str) -> np.ndarray:
+        """Valores de um critério em todas as células"""
+        return self.matrix[:, self.criteria.index(name)]
+    
+    def field(self, name: str) -> np.ndarray:
+        """Valores de um critério como raster (lat x lon)"""
+        return self.column(name).reshape(self.shape)
+    
+    def cell_coordinates(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows, cols = np.divmod(np.asarray(cells), len(self.lons))
+        return self.lats[rows], self.lons[cols]
+    
+    def to_alternatives(self, cells: Optional[np.ndarray] = None) -> List[Alternative]:
+        """Materializar células (todas por omissão) como Alternative"""
+        cells = np.arange(self.n_cells) if cells is None else np.asarray(cells)
+        lats, lons = self.cell_coordinates(cells)
+        rows = self.matrix[cells].astype(np.float64).tolist()
+        return [
+            Alternative(
+                id=f"GRID_{cell + 1:04d}",
+                name=f"Ponto {cell + 1}",
+                latitude=lat,
+                longitude=lon,
+                criteria_values=dict(zip(self.criteria, values))
+            )
+            for cell, lat, lon, values in zip(cells.tolist(), lats.tolist(), lons.tolist(), rows)
+        ]
+
 @dataclass
 class MCDAResult:
     """Resultado da análise MCDA"""
@@ -94,6 +167,8 @@ class MCDAResult:
     consistency_ratio: Optional[float] = None
     sensitivity_analysis: Optional[Dict] = None
     created_at: datetime = field(default_factory=datetime.now)
+    suitability: Optional[np.ndarray] = None  # raster de scores (análises em grelha)
+    grid: Optional[CriteriaGrid] = None
 
 class MCDAService:
     """
@@ -113,6 +188,7 @@ class MCDAService:
         self.config = self._load_config(config_path)
         self.criteria_library: Dict[str, Dict] = {}
         self.results_history: List[MCDAResult] = []
+        self._grid_cache: "OrderedDict[Tuple, CriteriaGrid]" = OrderedDict()
         
         # Diretórios
         self.data_dir = Path(self.config.get('data_dir', 'data/mcda'))
@@ -139,6 +215,7 @@ class MCDAService:
                 'max_lon': 16.0  # Incluir área oceânica
             },
             'grid_resolution_km': 10,  # Resolução da grelha de análise
+            'grid_cache_size': 4,  # Grelhas de critérios mantidas em memória (por bbox e resolução)
             'consistency_threshold': 0.1,  # Threshold para AHP
             'sensitivity_steps': 20  # Passos para análise de sensibilidade
         }
@@ -268,29 +345,80 @@ class MCDAService:
         
         logger.info(f"🗺️ Criando grelha espacial (resolução: {resolution_km}km)")
         
+        lats, lons = self._grid_axes(bounds, resolution_km)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        
+        alternatives = [
+            Alternative(
+                id=f"GRID_{alt_id:04d}",
+                name=f"Ponto {alt_id}",
+                latitude=lat,
+                longitude=lon
+            )
+            for alt_id, (lat, lon) in enumerate(zip(lat_grid.ravel().tolist(), lon_grid.ravel().tolist()), start=1)
+        ]
+        
+        logger.info(f"✅ Grelha criada com {len(alternatives)} pontos")
+        return alternatives
+    
+    def _grid_axes(self, bounds: Dict, resolution_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Eixos de latitude e longitude da grelha"""
         # Converter resolução para graus (aproximação)
         resolution_deg = resolution_km / 111.0  # ~111 km por grau
         
-        # Criar grelha
         lats = np.arange(bounds['min_lat'], bounds['max_lat'], resolution_deg)
         lons = np.arange(bounds['min_lon'], bounds['max_lon'], resolution_deg)
+        return lats, lons
+    
+    def build_criteria_grid(
+        self,
+        bounds: Optional[Dict] = None,
+        resolution_km: Optional[float] = None
+    ) -> CriteriaGrid:
+        """
+        🗺️ Grelha de critérios vetorizada, em cache por (bbox, resolução)
         
-        alternatives = []
-        alt_id = 1
+        Args:
+            bounds: Limites da área (opcional)
+            resolution_km: Resolução em km (opcional)
+            
+        Returns:
+            Matriz de critérios de todas as células da grelha
+        """
+        if bounds is None:
+            bounds = self.config['angola_marine_area']
         
-        for lat in lats:
-            for lon in lons:
-                alternative = Alternative(
-                    id=f"GRID_{alt_id:04d}",
-                    name=f"Ponto {alt_id}",
-                    latitude=lat,
-                    longitude=lon
-                )
-                alternatives.append(alternative)
-                alt_id += 1
+        if resolution_km is None:
+            resolution_km = self.config['grid_resolution_km']
         
-        logger.info(f"✅ Grelha criada com {len(alternatives)} pontos")
-        return alternatives
+        key = (
+            round(bounds['min_lat'], 6), round(bounds['max_lat'], 6),
+            round(bounds['min_lon'], 6), round(bounds['max_lon'], 6),
+            round(float(resolution_km), 6)
+        )
+        grid = self._grid_cache.get(key)
+        if grid is not None:
+            self._grid_cache.move_to_end(key)
+            return grid
+        
+        lats, lons = self._grid_axes(bounds, resolution_km)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        fields = self._simulate_environmental_fields(lat_grid.ravel(), lon_grid.ravel())
+        
+        grid = CriteriaGrid(
+            lats=lats,
+            lons=lons,
+            criteria=list(fields),
+            matrix=np.column_stack([values.astype(np.float32) for values in fields.values()])
+        )
+        
+        self._grid_cache[key] = grid
+        while len(self._grid_cache) > self.config['grid_cache_size']:
+            self._grid_cache.popitem(last=False)
+        
+        logger.info(f"✅ Grelha de critérios {grid.shape[0]}x{grid.shape[1]} "
+                    f"({grid.matrix.nbytes / 1e6:.1f} MB) criada")
+        return grid
     
     def populate_criteria_values(
         self, 
@@ -309,16 +437,14 @@ class MCDAService:
         """
         logger.info(f"📊 Preenchendo valores dos critérios para {objective.value}")
         
-        objective_criteria = self.criteria_library.get(objective.value, {})
-        
-        for alternative in alternatives:
-            # Simular valores baseados na localização
-            values = self._simulate_environmental_data(
-                alternative.latitude, 
-                alternative.longitude, 
-                objective
-            )
-            alternative.criteria_values = values
+        # Simular valores baseados na localização (todas as alternativas de uma vez)
+        fields = self._simulate_environmental_fields(
+            np.array([alt.latitude for alt in alternatives], dtype=np.float64),
+            np.array([alt.longitude for alt in alternatives], dtype=np.float64)
+        )
+        names = list(fields)
+        for alternative, values in zip(alternatives, zip(*(column.tolist() for column in fields.values()))):
+            alternative.criteria_values = dict(zip(names, values))
         
         logger.info(f"✅ Valores preenchidos para {len(alternatives)} alternativas")
         return alternatives
@@ -330,51 +456,48 @@ class MCDAService:
         objective: PlanningObjective
     ) -> Dict[str, float]:
         """Simular dados ambientais baseados na localização"""
+        fields = self._simulate_environmental_fields(np.array([lat]), np.array([lon]))
+        return {name: float(values[0]) for name, values in fields.items()}
+    
+    def _simulate_environmental_fields(self, lats: np.ndarray, lons: np.ndarray) -> Dict[str, np.ndarray]:
+        """Simular dados ambientais para arrays de coordenadas"""
+        n = len(lats)
         
-        # Distância à costa (aproximação)
-        coastal_distance = self._calculate_coastal_distance(lat, lon)
+        # Distância à costa
+        coastal_distance = coastal_distance_km(lats, lons)
         
         # Profundidade (simulada baseada na distância à costa)
-        depth = -10 - (coastal_distance * 10) + np.random.normal(0, 20)
-        depth = max(-2000, min(-5, depth))  # Limitar entre 5m e 2000m
+        depth = np.clip(-10 - (coastal_distance * 10) + np.random.normal(0, 20, n), -2000, -5)  # Entre 5m e 2000m
         
         # Temperatura (baseada na latitude)
-        temperature = 26 - (lat + 11) * 0.5 + np.random.normal(0, 1)
-        temperature = max(18, min(30, temperature))
+        temperature = np.clip(26 - (lats + 11) * 0.5 + np.random.normal(0, 1, n), 18, 30)
         
         # Clorofila-a (maior perto da costa devido ao upwelling)
-        chlorophyll = max(0.1, 3.0 - coastal_distance * 0.1 + np.random.normal(0, 0.5))
+        chlorophyll = np.maximum(0.1, 3.0 - coastal_distance * 0.1 + np.random.normal(0, 0.5, n))
         
         # Velocidade da corrente
-        current_speed = 0.2 + np.random.normal(0, 0.1)
-        current_speed = max(0, min(1.0, current_speed))
+        current_speed = np.clip(0.2 + np.random.normal(0, 0.1, n), 0, 1.0)
         
         # Altura das ondas (maior em águas abertas)
-        wave_height = 1.0 + coastal_distance * 0.05 + np.random.normal(0, 0.3)
-        wave_height = max(0.5, min(4.0, wave_height))
+        wave_height = np.clip(1.0 + coastal_distance * 0.05 + np.random.normal(0, 0.3, n), 0.5, 4.0)
         
         # Distância ao porto (Luanda como referência)
-        port_distance = self._calculate_distance_to_luanda(lat, lon)
+        port_distance = haversine_km(lats, lons, *LUANDA_PORT)
         
         # Biodiversidade (simulada)
-        biodiversity = 0.7 + np.random.normal(0, 0.2)
-        biodiversity = max(0, min(1, biodiversity))
+        biodiversity = np.clip(0.7 + np.random.normal(0, 0.2, n), 0, 1)
         
         # Qualidade do habitat
-        habitat_quality = 0.8 - (coastal_distance * 0.01) + np.random.normal(0, 0.1)
-        habitat_quality = max(0, min(1, habitat_quality))
+        habitat_quality = np.clip(0.8 - (coastal_distance * 0.01) + np.random.normal(0, 0.1, n), 0, 1)
         
         # Pressão humana (maior perto da costa)
-        human_pressure = max(0, 0.8 - coastal_distance * 0.02 + np.random.normal(0, 0.1))
-        human_pressure = max(0, min(1, human_pressure))
+        human_pressure = np.clip(0.8 - coastal_distance * 0.02 + np.random.normal(0, 0.1, n), 0, 1)
         
         # Abundância de peixe (baseada na clorofila e profundidade)
-        fish_abundance = chlorophyll * 100 * (1 + abs(depth) / 1000) + np.random.normal(0, 50)
-        fish_abundance = max(0, fish_abundance)
+        fish_abundance = np.maximum(0, chlorophyll * 100 * (1 + np.abs(depth) / 1000) + np.random.normal(0, 50, n))
         
         # Conectividade (simulada)
-        connectivity = 0.6 + np.random.normal(0, 0.2)
-        connectivity = max(0, min(1, connectivity))
+        connectivity = np.clip(0.6 + np.random.normal(0, 0.2, n), 0, 1)
         
         return {
             'depth': depth,
@@ -393,26 +516,11 @@ class MCDAService:
     
     def _calculate_coastal_distance(self, lat: float, lon: float) -> float:
         """Calcular distância aproximada à costa"""
-        # Coordenadas aproximadas da costa angolana
-        coast_points = [
-            (-5.55, 12.20),   # Cabinda
-            (-8.84, 13.23),   # Luanda
-            (-12.58, 13.41),  # Benguela
-            (-15.20, 12.15),  # Namibe
-        ]
-        
-        min_distance = float('inf')
-        for coast_lat, coast_lon in coast_points:
-            distance = ((lat - coast_lat)**2 + (lon - coast_lon)**2)**0.5 * 111  # Converter para km
-            min_distance = min(min_distance, distance)
-        
-        return min_distance
+        return float(coastal_distance_km(lat, lon))
     
     def _calculate_distance_to_luanda(self, lat: float, lon: float) -> float:
         """Calcular distância ao porto de Luanda"""
-        luanda_lat, luanda_lon = -8.84, 13.23
-        distance = ((lat - luanda_lat)**2 + (lon - luanda_lon)**2)**0.5 * 111
-        return distance
+        return float(haversine_km(lat, lon, *LUANDA_PORT))
     
     def setup_ahp_criteria(
         self, 
@@ -493,73 +601,92 @@ class MCDAService:
         """
         logger.info("🧮 Calculando scores AHP")
         
-        # Normalizar valores dos critérios
-        scaler = MinMaxScaler()
+        if not alternatives:
+            return alternatives
         
-        for criterion in criteria:
-            criterion_name = criterion.name.lower().replace(' ', '_')
-            
-            # Extrair valores para este critério
-            values = []
-            for alt in alternatives:
-                # Mapear nomes dos critérios
-                mapped_name = self._map_criterion_name(criterion_name)
-                if mapped_name in alt.criteria_values:
-                    values.append(alt.criteria_values[mapped_name])
-                else:
-                    values.append(0)
-            
-            if not values:
-                continue
-                
-            values = np.array(values).reshape(-1, 1)
-            
-            # Normalizar baseado no tipo de critério
-            if criterion.criterion_type == CriterionType.BENEFIT:
-                # Maior é melhor
-                normalized = scaler.fit_transform(values).flatten()
-            elif criterion.criterion_type == CriterionType.COST:
-                # Menor é melhor (inverter)
-                normalized = 1 - scaler.fit_transform(values).flatten()
-            else:  # TARGET
+        normalized, final_scores = self.ahp_matrix_scores(self._criteria_matrix(alternatives, criteria), criteria)
+        
+        # Atribuir scores normalizados
+        score_names = [criterion.name.lower().replace(' ', '_') for criterion in criteria]
+        for alt, row, final_score in zip(alternatives, normalized.tolist(), final_scores.tolist()):
+            alt.scores.update(zip(score_names, row))
+            alt.final_score = final_score
+        
+        # Ranking
+        self._rank_alternatives(alternatives)
+        
+        logger.info("✅ Scores AHP calculados")
+        return alternatives
+    
+    def _criterion_keys(self, criteria: List[Criterion]) -> List[str]:
+        """Nomes dos dados correspondentes a cada critério"""
+        return [self._map_criterion_name(c.name.lower().replace(' ', '_')) for c in criteria]
+    
+    def _criteria_matrix(self, alternatives: List[Alternative], criteria: List[Criterion]) -> np.ndarray:
+        """Matriz de decisão (alternativas x critérios); valores em falta contam como 0"""
+        keys = self._criterion_keys(criteria)
+        return np.array([[alt.criteria_values.get(key, 0) for key in keys] for alt in alternatives],
+                        dtype=np.float64).reshape(len(alternatives), len(keys))
+    
+    def _grid_matrix(self, grid: CriteriaGrid, criteria: List[Criterion]) -> np.ndarray:
+        """Colunas da grelha correspondentes aos critérios (0 para critérios sem dados)"""
+        columns = [
+            grid.column(key).astype(np.float64) if key in grid.criteria else np.zeros(grid.n_cells)
+            for key in self._criterion_keys(criteria)
+        ]
+        return np.column_stack(columns) if columns else np.zeros((grid.n_cells, 0))
+    
+    def ahp_matrix_scores(self, matrix: np.ndarray, criteria: List[Criterion]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Normalização por critério e score ponderado AHP sobre a matriz de decisão
+        
+        Returns:
+            (scores normalizados alternativas x critérios, score final por alternativa)
+        """
+        normalized = np.empty_like(matrix, dtype=np.float64)
+        for i, criterion in enumerate(criteria):
+            values = matrix[:, i]
+            if criterion.criterion_type == CriterionType.TARGET and criterion.target_value is not None:
                 # Proximidade ao valor alvo
-                if criterion.target_value is not None:
-                    distances = np.abs(values.flatten() - criterion.target_value)
-                    max_distance = np.max(distances)
-                    if max_distance > 0:
-                        normalized = 1 - (distances / max_distance)
-                    else:
-                        normalized = np.ones(len(values))
-                else:
-                    normalized = scaler.fit_transform(values).flatten()
-            
-            # Atribuir scores normalizados
-            for i, alt in enumerate(alternatives):
-                alt.scores[criterion_name] = normalized[i]
-        
-        # Calcular score final ponderado
-        for alt in alternatives:
-            final_score = 0
-            total_weight = 0
-            
-            for criterion in criteria:
-                criterion_name = criterion.name.lower().replace(' ', '_')
-                if criterion_name in alt.scores:
-                    final_score += alt.scores[criterion_name] * criterion.weight
-                    total_weight += criterion.weight
+                distances = np.abs(values - criterion.target_value)
+                max_distance = distances.max()
+                normalized[:, i] = 1 - distances / max_distance if max_distance > 0 else 1.0
+                continue
             
-            if total_weight > 0:
-                alt.final_score = final_score / total_weight
-            else:
-                alt.final_score = 0
+            # Min-max (como o MinMaxScaler: critério constante -> 0)
+            value_range = values.max() - values.min()
+            scaled = (values - values.min()) / value_range if value_range > 0 else np.zeros_like(values)
+            # Custo: menor é melhor (inverter)
+            normalized[:, i] = 1 - scaled if criterion.criterion_type == CriterionType.COST else scaled
+        
+        weights = np.array([c.weight for c in criteria], dtype=np.float64)
+        total_weight = weights.sum()
+        final_scores = normalized @ weights / total_weight if total_weight > 0 else np.zeros(len(matrix))
+        return normalized, final_scores
+    
+    def topsis_matrix_scores(self, matrix: np.ndarray, criteria: List[Criterion]) -> np.ndarray:
+        """Scores TOPSIS (proximidade relativa à solução ideal) sobre a matriz de decisão"""
+        # Normalizar matriz e aplicar pesos
+        weights = np.array([c.weight for c in criteria], dtype=np.float64)
+        weighted_matrix = matrix / np.sqrt(np.sum(matrix ** 2, axis=0)) * weights
+        
+        # Determinar soluções ideais (custo e alvo: menor é melhor)
+        benefit = np.array([c.criterion_type == CriterionType.BENEFIT for c in criteria])
+        column_max, column_min = weighted_matrix.max(axis=0), weighted_matrix.min(axis=0)
+        ideal_positive = np.where(benefit, column_max, column_min)
+        ideal_negative = np.where(benefit, column_min, column_max)
         
-        # Ranking
+        # Calcular distâncias
+        distances_positive = np.sqrt(np.sum((weighted_matrix - ideal_positive) ** 2, axis=1))
+        distances_negative = np.sqrt(np.sum((weighted_matrix - ideal_negative) ** 2, axis=1))
+        
+        return distances_negative / (distances_positive + distances_negative)
+    
+    def _rank_alternatives(self, alternatives: List[Alternative]) -> None:
+        """Ordenar por score final (decrescente, estável) e atribuir ranks"""
         alternatives.sort(key=lambda x: x.final_score, reverse=True)
         for i, alt in enumerate(alternatives):
             alt.rank = i + 1
-        
-        logger.info("✅ Scores AHP calculados")
-        return alternatives
     
     def _map_criterion_name(self, criterion_name: str) -> str:
         """Mapear nomes de critérios para nomes dos dados"""
@@ -596,63 +723,81 @@ class MCDAService:
         """
         logger.info("📊 Realizando análise TOPSIS")
         
-        # Criar matriz de decisão
-        criterion_names = [c.name.lower().replace(' ', '_') for c in criteria]
-        decision_matrix = []
-        
-        for alt in alternatives:
-            row = []
-            for criterion in criteria:
-                criterion_name = criterion.name.lower().replace(' ', '_')
-                mapped_name = self._map_criterion_name(criterion_name)
-                value = alt.criteria_values.get(mapped_name, 0)
-                row.append(value)
-            decision_matrix.append(row)
-        
-        decision_matrix = np.array(decision_matrix)
+        if not alternatives:
+            return alternatives
         
-        # Normalizar matriz
-        norm_matrix = decision_matrix / np.sqrt(np.sum(decision_matrix**2, axis=0))
-        
-        # Aplicar pesos
-        weights = np.array([c.weight for c in criteria])
-        weighted_matrix = norm_matrix * weights
-        
-        # Determinar soluções ideais
-        ideal_positive = []
-        ideal_negative = []
-        
-        for i, criterion in enumerate(criteria):
-            if criterion.criterion_type == CriterionType.BENEFIT:
-                ideal_positive.append(np.max(weighted_matrix[:, i]))
-                ideal_negative.append(np.min(weighted_matrix[:, i]))
-            else:  # COST or TARGET
-                ideal_positive.append(np.min(weighted_matrix[:, i]))
-                ideal_negative.append(np.max(weighted_matrix[:, i]))
-        
-        ideal_positive = np.array(ideal_positive)
-        ideal_negative = np.array(ideal_negative)
-        
-        # Calcular distâncias
-        distances_positive = np.sqrt(np.sum((weighted_matrix - ideal_positive)**2, axis=1))
-        distances_negative = np.sqrt(np.sum((weighted_matrix - ideal_negative)**2, axis=1))
-        
-        # Calcular scores TOPSIS
-        topsis_scores = distances_negative / (distances_positive + distances_negative)
+        topsis_scores = self.topsis_matrix_scores(self._criteria_matrix(alternatives, criteria), criteria)
         
         # Atribuir scores às alternativas
-        for i, alt in enumerate(alternatives):
-            alt.final_score = topsis_scores[i]
-            alt.scores['topsis'] = topsis_scores[i]
+        for alt, score in zip(alternatives, topsis_scores.tolist()):
+            alt.final_score = score
+            alt.scores['topsis'] = score
         
         # Ranking
-        alternatives.sort(key=lambda x: x.final_score, reverse=True)
-        for i, alt in enumerate(alternatives):
-            alt.rank = i + 1
+        self._rank_alternatives(alternatives)
         
         logger.info("✅ Análise TOPSIS concluída")
         return alternatives
     
+    def analyze_grid(
+        self,
+        objective: PlanningObjective,
+        method: str = 'AHP',
+        bounds: Optional[Dict] = None,
+        resolution_km: Optional[float] = None,
+        custom_weights: Optional[Dict[str, float]] = None,
+        top_n: int = 100
+    ) -> MCDAResult:
+        """
+        🧮 Análise MCDA em grelha, como operações matriciais sobre a grelha em cache
+        
+        Args:
+            objective: Objetivo de planeamento
+            method: 'AHP' ou 'TOPSIS'
+            bounds: Limites da área (opcional)
+            resolution_km: Resolução em km (opcional)
+            custom_weights: Pesos personalizados (opcional)
+            top_n: Número de melhores células materializadas como alternativas
+            
+        Returns:
+            Resultado com as top_n alternativas e o raster de adequação completo
+        """
+        criteria = self.setup_ahp_criteria(objective, custom_weights)
+        if not criteria:
+            # Sem critérios todos os scores seriam 0 (AHP) ou NaN (TOPSIS)
+            raise ValueError(f"❌ Objetivo {objective.value} não tem critérios definidos")
+        
+        grid = self.build_criteria_grid(bounds, resolution_km)
+        matrix = self._grid_matrix(grid, criteria)
+        
+        if method.upper() == 'TOPSIS':
+            scores = self.topsis_matrix_scores(matrix, criteria)
+        elif method.upper() == 'AHP':
+            _, scores = self.ahp_matrix_scores(matrix, criteria)
+        else:
+            raise ValueError(f"❌ Método {method} não suportado")
+        
+        # Melhores células (ordem estável por score decrescente, como _rank_alternatives)
+        top_n = min(top_n, grid.n_cells)
+        candidates = np.argpartition(-scores, top_n - 1)[:top_n] if 0 < top_n < grid.n_cells else np.arange(top_n)
+        top_cells = candidates[np.lexsort((candidates, -scores[candidates]))]
+        
+        alternatives = grid.to_alternatives(top_cells)
+        for rank, (alt, score) in enumerate(zip(alternatives, scores[top_cells].tolist()), start=1):
+            alt.final_score = score
+            alt.rank = rank
+        
+        logger.info(f"✅ Análise {method.upper()} em grelha: {grid.n_cells} células")
+        return MCDAResult(
+            objective=objective,
+            method=method.upper(),
+            alternatives=alternatives,
+            criteria=criteria,
+            weights={c.name: c.weight for c in criteria},
+            suitability=scores.reshape(grid.shape),
+            grid=grid
+        )
+    
     def perform_sensitivity_analysis(
         self,
         alternatives: List[Alternative],
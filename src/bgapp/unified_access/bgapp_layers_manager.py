@@ -8,14 +8,18 @@ models, qgis, services, apis através do admin-dashboard.
 import asyncio
 import json
 import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterable, List, Optional, Any, Union
 import importlib
-import inspect
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from .layer_manifest import LayerManifest
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -82,6 +86,14 @@ class BGAPPLayersManager:
         # Cache de instâncias
         self.instances_cache = {}
         
+        # Manifesto de descoberta (sem imports) e imports em background
+        self.manifest = LayerManifest()
+        self.warmup_workers = int(os.getenv('LAYERS_WARMUP_WORKERS', '4'))
+        self.warmup_enabled = os.getenv('LAYERS_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+        self._import_pool: Optional[ThreadPoolExecutor] = None
+        self._module_futures: Dict[str, Future] = {}
+        self._import_lock = threading.Lock()
+        
         # Configuração das camadas
         self.layers_config = {
             # Camada de Ingestão
@@ -312,42 +324,91 @@ class BGAPPLayersManager:
         """
         🔍 Descobrir todas as camadas BGAPP disponíveis
         
+        O estado vem do manifesto (análise do código fonte, sem imports); os
+        módulos são importados em background por um pool de threads.
+        
         Returns:
             Dicionário com camadas organizadas por tipo
         """
         logger.info("🔍 Descobrindo camadas BGAPP...")
         
+        # Só os ficheiros alterados desde a última descoberta são reanalisados
+        await asyncio.to_thread(self.manifest.refresh, self.layers_registry)
+        
         discovered_layers = {layer_type.value: [] for layer_type in LayerType}
         
         for layer_id, layer in self.layers_registry.items():
             # Verificar disponibilidade da camada
-            layer_status = await self._check_layer_availability(layer)
+            layer_status = self._check_layer_availability(layer_id, layer)
             layer.status = layer_status
             layer.last_check = datetime.now()
             
             discovered_layers[layer.type.value].append(layer)
         
+        if self.warmup_enabled:
+            self.warm_up()
+        
         logger.info(f"✅ Descobertas {len(self.layers_registry)} camadas BGAPP")
         return discovered_layers
     
-    async def _check_layer_availability(self, layer: BGAPPLayer) -> LayerStatus:
-        """Verificar disponibilidade de uma camada"""
-        try:
-            # Tentar importar o módulo
-            module = importlib.import_module(layer.module_path)
-            
-            # Verificar se tem as funções/classes esperadas
-            if hasattr(module, 'main') or hasattr(module, '__all__') or len(dir(module)) > 10:
-                return LayerStatus.AVAILABLE
-            else:
-                return LayerStatus.ERROR
-                
-        except ImportError as e:
-            layer.error_message = f"Erro de importação: {str(e)}"
+    def _check_layer_availability(self, layer_id: str, layer: BGAPPLayer) -> LayerStatus:
+        """Verificar disponibilidade de uma camada (manifesto e resultado do import, se já feito)"""
+        entry = self.manifest.get(layer_id)
+        if entry is None:
+            layer.error_message = "Camada ausente do manifesto"
             return LayerStatus.ERROR
-        except Exception as e:
-            layer.error_message = f"Erro geral: {str(e)}"
+        
+        layer.metadata = {
+            **(layer.metadata or {}),
+            'source': entry.get('source'),
+            'class_name': entry.get('class_name'),
+            'doc': entry.get('doc')
+        }
+        
+        if entry.get('error'):
+            layer.error_message = entry['error']
             return LayerStatus.ERROR
+        
+        future = self._module_futures.get(layer_id)
+        if future is not None:
+            if not future.done():
+                return LayerStatus.LOADING
+            error = future.exception()
+            if error is not None:
+                layer.error_message = f"Erro de importação: {error}"
+                return LayerStatus.ERROR
+            layer.error_message = None
+            return LayerStatus.AVAILABLE
+        
+        missing = self.manifest.missing_imports(entry)
+        if missing:
+            layer.error_message = f"Erro de importação: dependências em falta ({', '.join(missing)})"
+            return LayerStatus.ERROR
+        
+        layer.error_message = None
+        return LayerStatus.AVAILABLE
+    
+    def _import_module(self, layer_id: str) -> Future:
+        """Agendar (uma vez) o import do módulo da camada no pool de threads"""
+        with self._import_lock:
+            future = self._module_futures.get(layer_id)
+            if future is None:
+                if self._import_pool is None:
+                    self._import_pool = ThreadPoolExecutor(
+                        max_workers=max(1, self.warmup_workers),
+                        thread_name_prefix="bgapp-layers"
+                    )
+                module_path = self.layers_registry[layer_id].module_path
+                future = self._import_pool.submit(importlib.import_module, module_path)
+                self._module_futures[layer_id] = future
+            return future
+    
+    def warm_up(self, layer_ids: Optional[Iterable[str]] = None):
+        """Importar em background os módulos das camadas sem erros no manifesto"""
+        for layer_id in list(layer_ids if layer_ids is not None else self.layers_registry):
+            entry = self.manifest.get(layer_id)
+            if layer_id in self.layers_registry and entry and not entry.get('error'):
+                self._import_module(layer_id)
     
     async def get_layer_instance(self, layer_id: str) -> Optional[Any]:
         """
@@ -370,20 +431,24 @@ class BGAPPLayersManager:
         layer = self.layers_registry[layer_id]
         
         try:
-            # Importar módulo
-            module = importlib.import_module(layer.module_path)
+            if self.manifest.get(layer_id) is None:
+                await asyncio.to_thread(self.manifest.refresh, self.layers_registry)
+            entry = self.manifest.get(layer_id) or {}
             
-            # Tentar encontrar classe principal ou função main
-            instance = None
+            # Importar módulo (no pool de threads; reaproveita o warm-up em curso)
+            module = await asyncio.wrap_future(self._import_module(layer_id))
             
-            # Procurar por classes principais
-            for name, obj in inspect.getmembers(module, inspect.isclass):
-                if name.lower().replace('_', '') in layer.name.lower().replace(' ', '').replace('_', ''):
-                    try:
-                        instance = obj()
-                        break
-                    except:
-                        continue
+            # Classes candidatas registadas no manifesto (sem inspecionar o módulo)
+            instance = None
+            for class_name in entry.get('class_candidates', []):
+                cls = getattr(module, class_name, None)
+                if cls is None:
+                    continue
+                try:
+                    instance = cls()
+                    break
+                except Exception:
+                    continue
             
             # Se não encontrou classe, procurar função main
             if instance is None and hasattr(module, 'main'):
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+BGAPP Layer Manifest - Manifesto de descoberta das camadas
+Regista, sem importar os módulos, o ficheiro fonte, mtime, classe principal e
+metadados de cada camada (via análise AST). É persistido em disco e só as
+entradas cujo ficheiro mudou são reconstruídas.
+"""
+
+import ast
+import importlib.util
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Raiz do repositório (os module_path das camadas começam em "src.")
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def resolve_module_source(module_path: str, root: Path = REPO_ROOT) -> Optional[Path]:
+    """Ficheiro fonte de um módulo sem o importar"""
+    parts = module_path.split(".")
+    for base in (root, root / "src"):
+        candidate = base.joinpath(*parts)
+        for source in (candidate.with_suffix(".py"), candidate / "__init__.py"):
+            if source.is_file():
+                return source
+    return None
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace("_", "").replace(" ", "")
+
+
+def _class_candidates(classes: List[str], layer_name: str) -> List[str]:
+    """Classes cujo nome aparece no nome da camada, pela ordem do módulo"""
+    target = _normalize(layer_name)
+    return [name for name in classes if _normalize(name) in target]
+
+
+def _required_imports(tree: ast.Module) -> List[str]:
+    """Pacotes de topo importados fora de try/except (dependências obrigatórias)"""
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module.split(".")[0])
+    return sorted(set(names))
+
+
+def scan_module(source: Path, layer_name: str) -> Dict[str, Any]:
+    """Metadados de um módulo a partir do código fonte (sem importar)"""
+    tree = ast.parse(source.read_bytes(), filename=str(source))
+    classes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+    functions = {node.name for node in tree.body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    exports = any(
+        isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "__all__" for t in node.targets)
+        for node in tree.body
+    )
+    doc = ast.get_docstring(tree) or ""
+    candidates = _class_candidates(classes, layer_name)
+    return {
+        "class_name": candidates[0] if candidates else None,
+        "class_candidates": candidates,
+        "classes": classes,
+        "has_main": "main" in functions,
+        "has_all": exports,
+        "doc": doc.strip().splitlines()[0] if doc.strip() else "",
+        "imports": _required_imports(tree),
+        "error": None,
+    }
+
+
+class LayerManifest:
+    """
+    📇 Manifesto persistido das camadas BGAPP
+
+    Cada entrada guarda module_path, ficheiro fonte, mtime/tamanho, classe
+    principal e metadados. ``refresh`` só volta a analisar os ficheiros cujo
+    mtime ou tamanho mudou.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("LAYERS_MANIFEST_PATH", "data/cache/layers_manifest.json"))
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+
+    def load(self):
+        """Ler o manifesto do disco (ignorado se ausente ou de outra versão)"""
+        self._loaded = True
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Manifesto de camadas ilegível ({self.path}): {e}")
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("layers", {})
+
+    def save(self):
+        """Gravar o manifesto de forma atómica"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "layers": self.entries},
+                                      indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível gravar o manifesto de camadas: {e}")
+
+    def refresh(self, layers: Dict[str, Any]) -> List[str]:
+        """
+        Atualizar as entradas das camadas indicadas (id -> BGAPPLayer)
+
+        Returns:
+            IDs das camadas cujas entradas foram reconstruídas
+        """
+        if not self._loaded:
+            self.load()
+
+        rebuilt = []
+        for layer_id, layer in layers.items():
+            source = resolve_module_source(layer.module_path)
+            try:
+                stat = source.stat() if source else None
+            except OSError:
+                stat = None
+
+            signature = {
+                "module_path": layer.module_path,
+                "source": str(source) if source else None,
+                "mtime": stat.st_mtime if stat else None,
+                "size": stat.st_size if stat else None,
+            }
+            current = self.entries.get(layer_id)
+            if current and all(current.get(k) == v for k, v in signature.items()) \
+                    and current.get("name") == layer.name:
+                continue
+
+            entry = {**signature, "name": layer.name}
+            if source is None:
+                entry.update(class_name=None, class_candidates=[], classes=[], imports=[],
+                             error=f"Módulo {layer.module_path} não encontrado")
+            else:
+                try:
+                    entry.update(scan_module(source, layer.name))
+                except (SyntaxError, ValueError, OSError) as e:
+                    entry.update(class_name=None, class_candidates=[], classes=[], imports=[],
+                                 error=f"Erro de análise: {e}")
+            self.entries[layer_id] = entry
+            rebuilt.append(layer_id)
+
+        for layer_id in set(self.entries) - set(layers):
+            del self.entries[layer_id]
+            rebuilt.append(layer_id)
+
+        if rebuilt:
+            self.save()
+            logger.info(f"📇 Manifesto de camadas atualizado ({len(rebuilt)} entradas)")
+        return rebuilt
+
+    def get(self, layer_id: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(layer_id)
+
+    @staticmethod
+    def missing_imports(entry: Dict[str, Any]) -> List[str]:
+        """Dependências obrigatórias não instaladas (find_spec não importa o pacote)"""
+        missing = []
+        for name in entry.get("imports", []):
+            if name in sys.modules or name in sys.builtin_module_names:
+                continue
+            try:
+                if importlib.util.find_spec(name) is None:
+                    missing.append(name)
+            except (ImportError, ValueError):
+                missing.append(name)
+        return missing
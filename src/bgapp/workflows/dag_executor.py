@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Executor DAG para workflows científicos
+Cada passo arranca assim que as suas próprias dependências terminam (as-completed),
+com um limite global de passos em execução. Resultados ficam numa cache em disco
+endereçada por hash de (função, parâmetros, hashes das entradas) e o estado dos
+workflows é persistido em SQLite para retomar após reinício do processo
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ..core.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Estado persistido de um workflow em execução (valor de WorkflowStatus.RUNNING)
+WORKFLOW_RUNNING = "executando"
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+WORKFLOW_CACHE_DIR = Path(os.getenv("WORKFLOW_CACHE_DIR", ROOT_DIR / "data" / "cache" / "workflow_steps"))
+WORKFLOW_STATE_DB = Path(os.getenv("WORKFLOW_STATE_DB", ROOT_DIR / "data" / "workflows" / "state.db"))
+
+
+def canonical_hash(value: Any) -> str:
+    """SHA-256 da serialização JSON canónica (chaves ordenadas)"""
+    canonical = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def step_cache_key(function: str, parameters: Dict[str, Any], input_hashes: Iterable[str]) -> str:
+    """Chave de cache de um passo: tipo, parâmetros e hashes dos resultados das dependências"""
+    return canonical_hash([function, parameters, list(input_hashes)])
+
+
+@dataclass
+class StepRecord:
+    """Resultado (ou falha) de um passo executado ou reutilizado"""
+    step_id: str
+    status: str
+    cache_key: str
+    result_hash: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    cached: bool = False
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+
+class StepFailed(Exception):
+    """Passo obrigatório falhado (interrompe o workflow)"""
+
+    def __init__(self, record: StepRecord):
+        super().__init__(record.error)
+        self.record = record
+
+
+class StepCache:
+    """Cache em disco de resultados de passos, um ficheiro JSON por chave"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str, max_age: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Entrada {'result', 'result_hash', 'stored_at'} ou None (ausente ou mais antiga que max_age)"""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        if max_age is not None and time.time() - entry["stored_at"] > max_age:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, result: Any, result_hash: str):
+        path = self._path(key)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Nome temporário único: escritas concorrentes da mesma chave não se misturam
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                             prefix=f".{key}.", suffix=".tmp", delete=False) as tmp:
+                tmp_name = tmp.name
+                json.dump({
+                    "result": result, "result_hash": result_hash, "stored_at": time.time()
+                }, tmp, default=str)
+            os.replace(tmp_name, path)
+            self.stats["writes"] += 1
+        except OSError as e:
+            if tmp_name is not None:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+            logger.warning(f"⚠️ Não foi possível guardar resultado do passo em cache ({path}): {e}")
+
+
+class WorkflowStateStore:
+    """Estado dos workflows e dos seus passos em SQLite"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflows (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_steps (
+                    workflow_id TEXT NOT NULL,
+                    step_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    cache_key TEXT NOT NULL,
+                    result_hash TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cached INTEGER DEFAULT 0,
+                    started_at REAL,
+                    finished_at REAL,
+                    PRIMARY KEY (workflow_id, step_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_workflows_status ON workflows (status)")
+
+    def save_workflow(self, workflow_id: str, status: str, payload: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workflows (id, status, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (workflow_id, status, json.dumps(payload, default=str), time.time())
+            )
+
+    def save_step(self, workflow_id: str, record: StepRecord):
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO workflow_steps
+                (workflow_id, step_id, status, cache_key, result_hash, result, error,
+                 cached, started_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                workflow_id, record.step_id, record.status, record.cache_key, record.result_hash,
+                json.dumps(record.result, default=str), record.error, int(record.cached),
+                record.started_at, record.finished_at
+            ))
+
+    def clear_steps(self, workflow_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workflow_steps WHERE workflow_id = ?", (workflow_id,))
+
+    def load_workflows(self, statuses: Iterable[str]) -> List[Dict[str, Any]]:
+        """Payloads dos workflows nos estados indicados"""
+        statuses = list(statuses)
+        placeholders = ",".join("?" * len(statuses))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT payload FROM workflows WHERE status IN ({placeholders}) ORDER BY updated_at",
+                statuses
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def load_completed_steps(self, workflow_id: str) -> Dict[str, StepRecord]:
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT step_id, status, cache_key, result_hash, result, error, cached, started_at, finished_at
+                FROM workflow_steps WHERE workflow_id = ? AND status = ?
+            """, (workflow_id, COMPLETED)).fetchall()
+        return {
+            row[0]: StepRecord(
+                step_id=row[0], status=row[1], cache_key=row[2], result_hash=row[3],
+                result=json.loads(row[4]) if row[4] is not None else None, error=row[5],
+                cached=bool(row[6]), started_at=row[7], finished_at=row[8]
+            )
+            for row in rows
+        }
+
+    def count_workflows(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM workflows WHERE status = ?", (status,)).fetchone()[0]
+
+
+def count_persisted_workflows(status: str, db_path: Path = WORKFLOW_STATE_DB) -> int:
+    """Workflows num estado, sem criar a base de dados nem carregar o gestor"""
+    if not Path(db_path).exists():
+        return 0
+    return WorkflowStateStore(db_path).count_workflows(status)
+
+
+class DAGExecutor:
+    """
+    Executor as-completed partilhado entre workflows
+    O semáforo limita os passos em execução em todos os workflows em simultâneo
+    """
+
+    def __init__(self, cache: StepCache, max_concurrency: int = 8):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"executed": 0, "cached": 0, "failed": 0, "running": 0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Criado no primeiro uso, dentro do event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def validate(steps: List[Any]):
+        """Rejeitar dependências desconhecidas e ciclos (ordenação de Kahn)"""
+        step_ids = {step.step_id for step in steps}
+        for step in steps:
+            unknown = set(step.dependencies) - step_ids
+            if unknown:
+                raise ValueError(f"Passo '{step.step_id}' depende de passos inexistentes: {sorted(unknown)}")
+
+        remaining = {step.step_id: set(step.dependencies) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependência circular entre os passos: {sorted(remaining)}")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    async def run(self,
+                  steps: List[Any],
+                  run_step: Callable[[Any], Awaitable[Any]],
+                  completed: Optional[Dict[str, StepRecord]] = None,
+                  on_step_done: Optional[Callable[[StepRecord], Awaitable[None]]] = None) -> Dict[str, StepRecord]:
+        """
+        Executar os passos (objetos com step_id, function, parameters, dependencies,
+        optional e cache_ttl); `completed` são passos já concluídos numa execução anterior
+        Levanta StepFailed quando um passo obrigatório falha (os restantes são cancelados)
+        """
+        self.validate(steps)
+        records: Dict[str, StepRecord] = dict(completed or {})
+        pending_deps = {
+            step.step_id: set(step.dependencies) - set(records)
+            for step in steps if step.step_id not in records
+        }
+        dependents: Dict[str, List[str]] = {step.step_id: [] for step in steps}
+        for step in steps:
+            for dep in step.dependencies:
+                dependents[dep].append(step.step_id)
+        steps_by_id = {step.step_id: step for step in steps}
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready():
+            for step_id, deps in list(pending_deps.items()):
+                if not deps:
+                    del pending_deps[step_id]
+                    step = steps_by_id[step_id]
+                    input_hashes = [records[dep].result_hash or f"{FAILED}:{records[dep].cache_key}"
+                                    for dep in sorted(step.dependencies)]
+                    running[asyncio.create_task(self._run_step(step, run_step, input_hashes))] = step_id
+
+        launch_ready()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step_id = running.pop(task)
+                    record = task.result()
+                    records[step_id] = record
+                    if on_step_done:
+                        await on_step_done(record)
+                    if record.status == FAILED and not steps_by_id[step_id].optional:
+                        raise StepFailed(record)
+                    # Passo terminado (ou opcional falhado): libertar os dependentes
+                    for dependent in dependents[step_id]:
+                        if dependent in pending_deps:
+                            pending_deps[dependent].discard(step_id)
+                launch_ready()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return records
+
+    async def _run_step(self, step: Any, run_step: Callable[[Any], Awaitable[Any]],
+                        input_hashes: List[str]) -> StepRecord:
+        record = StepRecord(
+            step_id=step.step_id,
+            status=COMPLETED,
+            cache_key=step_cache_key(step.function, step.parameters, input_hashes)
+        )
+        # Cache só para passos com validade definida (cache_ttl > 0)
+        cache_ttl = getattr(step, "cache_ttl", 0) or 0
+
+        if cache_ttl > 0:
+            entry = await run_io(self.cache.get, record.cache_key, cache_ttl)
+            if entry is not None:
+                record.result = entry["result"]
+                record.result_hash = entry["result_hash"]
+                record.cached = True
+                record.finished_at = time.time()
+                self.stats["cached"] += 1
+                return record
+
+        async with self.semaphore:
+            record.started_at = time.time()
+            self.stats["running"] += 1
+            try:
+                record.result = await run_step(step)
+            except Exception as e:
+                record.status = FAILED
+                record.error = str(e) or e.__class__.__name__
+                self.stats["failed"] += 1
+            finally:
+                self.stats["running"] -= 1
+                record.finished_at = time.time()
+
+        if record.status == COMPLETED:
+            self.stats["executed"] += 1
+            record.result_hash = canonical_hash(record.result)
+            if cache_ttl > 0:
+                await run_io(self.cache.put, record.cache_key, record.result, record.result_hash)
+        return record
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "max_concurrency": self.max_concurrency, "cache": dict(self.cache.stats)}
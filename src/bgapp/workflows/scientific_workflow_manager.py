@@ -8,14 +8,21 @@ workflows pré-definidos e personalizáveis para investigação marinha de Angol
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 import schedule
-import time
+
+from ..core.executors import run_io
+from .dag_executor import (
+    COMPLETED, WORKFLOW_CACHE_DIR, WORKFLOW_RUNNING, WORKFLOW_STATE_DB,
+    DAGExecutor, StepCache, StepFailed, StepRecord, WorkflowStateStore
+)
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -37,7 +44,7 @@ class WorkflowStatus(Enum):
     """Status dos workflows"""
     CREATED = "criado"
     SCHEDULED = "agendado"
-    RUNNING = "executando"
+    RUNNING = WORKFLOW_RUNNING
     COMPLETED = "concluido"
     FAILED = "falhado"
     CANCELLED = "cancelado"
@@ -65,6 +72,7 @@ class WorkflowStep:
     retry_count: int = 3
     timeout: int = 3600  # 1 hora
     optional: bool = False
+    cache_ttl: int = 0  # segundos de validade do resultado em cache (0 = sem cache)
 
 
 @dataclass
@@ -117,6 +125,14 @@ class ScientificWorkflowManager:
         # Scheduler para workflows recorrentes
         self.scheduler_active = False
         
+        # Executor DAG (limite global de passos em execução) com cache de resultados em disco
+        self.dag_executor = DAGExecutor(
+            StepCache(WORKFLOW_CACHE_DIR),
+            max_concurrency=int(os.getenv("WORKFLOW_MAX_CONCURRENT_STEPS", "8"))
+        )
+        self.state_store = WorkflowStateStore(WORKFLOW_STATE_DB)
+        self._workflow_tasks: Dict[str, asyncio.Task] = {}
+        
         # Métricas de workflows
         self.workflow_metrics = {
             'total_workflows': 0,
@@ -128,6 +144,9 @@ class ScientificWorkflowManager:
             'species_analyzed': set(),
             'publications_generated': 0
         }
+        
+        # Workflows por concluir de execuções anteriores do processo
+        self._load_persisted_workflows()
     
     def _initialize_workflow_templates(self) -> Dict[str, Dict[str, Any]]:
         """Inicializar templates de workflows científicos"""
@@ -159,6 +178,7 @@ class ScientificWorkflowManager:
                         'name': 'Calcular Índices de Biodiversidade',
                         'function': 'calculate_biodiversity_indices',
                         'parameters': {'include_shannon': True, 'include_simpson': True},
+                        'cache_ttl': 7 * 86400,
                         'dependencies': ['collect_obis_data', 'collect_gbif_data']
                     },
                     {
@@ -196,6 +216,7 @@ class ScientificWorkflowManager:
                         'name': 'Controle de Qualidade',
                         'function': 'perform_quality_control',
                         'parameters': {'threshold': 0.8, 'remove_outliers': True},
+                        'cache_ttl': 12 * 3600,
                         'dependencies': ['fetch_copernicus']
                     },
                     {
@@ -203,6 +224,7 @@ class ScientificWorkflowManager:
                         'name': 'Calcular Estatísticas',
                         'function': 'calculate_oceanographic_statistics',
                         'parameters': {'include_trends': True, 'compare_historical': True},
+                        'cache_ttl': 12 * 3600,
                         'dependencies': ['quality_control']
                     },
                     {
@@ -233,6 +255,7 @@ class ScientificWorkflowManager:
                         'name': 'Analisar Tendências de Captura',
                         'function': 'analyze_catch_trends',
                         'parameters': {'include_species_breakdown': True, 'compare_quotas': True},
+                        'cache_ttl': 86400,
                         'dependencies': ['collect_fishing_data']
                     },
                     {
@@ -240,6 +263,7 @@ class ScientificWorkflowManager:
                         'name': 'Avaliar Sustentabilidade',
                         'function': 'assess_fishing_sustainability',
                         'parameters': {'use_msy_reference': True, 'include_recommendations': True},
+                        'cache_ttl': 86400,
                         'dependencies': ['analyze_catch_trends']
                     },
                     {
@@ -277,6 +301,7 @@ class ScientificWorkflowManager:
                         'name': 'Executar Modelos MaxEnt',
                         'function': 'run_maxent_species_models',
                         'parameters': {'cross_validation': True, 'feature_classes': 'auto'},
+                        'cache_ttl': 7 * 86400,
                         'dependencies': ['prepare_occurrence_data', 'prepare_environmental_layers']
                     },
                     {
@@ -284,6 +309,7 @@ class ScientificWorkflowManager:
                         'name': 'Validar Modelos',
                         'function': 'validate_distribution_models',
                         'parameters': {'auc_threshold': 0.7, 'test_percentage': 25},
+                        'cache_ttl': 7 * 86400,
                         'dependencies': ['run_maxent_models']
                     },
                     {
@@ -314,6 +340,7 @@ class ScientificWorkflowManager:
                         'name': 'Detectar Eventos de Upwelling',
                         'function': 'detect_upwelling_events',
                         'parameters': {'temperature_threshold': -2.0, 'duration_threshold': 5},
+                        'cache_ttl': 30 * 86400,
                         'dependencies': ['collect_sst_data']
                     },
                     {
@@ -321,6 +348,7 @@ class ScientificWorkflowManager:
                         'name': 'Analisar Impacto na Produtividade',
                         'function': 'analyze_upwelling_productivity',
                         'parameters': {'chlorophyll_lag_days': 7, 'fisheries_correlation': True},
+                        'cache_ttl': 30 * 86400,
                         'dependencies': ['detect_upwelling_events']
                     },
                     {
@@ -372,6 +400,66 @@ class ScientificWorkflowManager:
             'prepare_environmental_layers': self._prepare_environmental_layers
         }
     
+    def _workflow_payload(self, workflow: ScientificWorkflow) -> Dict[str, Any]:
+        """Workflow serializável em JSON (enums por valor, datas em ISO)"""
+        payload = asdict(workflow)
+        payload['workflow_type'] = workflow.workflow_type.value
+        payload['status'] = workflow.status.value
+        payload['priority'] = workflow.priority.value
+        for key in ('created_at', 'scheduled_at', 'started_at', 'completed_at'):
+            payload[key] = payload[key].isoformat() if payload[key] else None
+        return payload
+    
+    def _workflow_from_payload(self, payload: Dict[str, Any]) -> ScientificWorkflow:
+        for key in ('created_at', 'scheduled_at', 'started_at', 'completed_at'):
+            payload[key] = datetime.fromisoformat(payload[key]) if payload[key] else None
+        payload['workflow_type'] = WorkflowType(payload['workflow_type'])
+        payload['status'] = WorkflowStatus(payload['status'])
+        payload['priority'] = WorkflowPriority(payload['priority'])
+        payload['steps'] = [WorkflowStep(**step) for step in payload['steps']]
+        return ScientificWorkflow(**payload)
+    
+    async def _persist_workflow(self, workflow: ScientificWorkflow):
+        try:
+            await run_io(self.state_store.save_workflow, workflow.id, workflow.status.value,
+                         self._workflow_payload(workflow))
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível persistir o workflow {workflow.id}: {e}")
+    
+    def _load_persisted_workflows(self):
+        """Recarregar workflows não terminados; os que estavam a executar ficam em pausa para retomar"""
+        try:
+            payloads = self.state_store.load_workflows(
+                status.value for status in (WorkflowStatus.CREATED, WorkflowStatus.SCHEDULED,
+                                            WorkflowStatus.RUNNING, WorkflowStatus.PAUSED)
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro ao carregar estado dos workflows: {e}")
+            return
+        
+        for payload in payloads:
+            workflow = self._workflow_from_payload(payload)
+            if workflow.status == WorkflowStatus.RUNNING:
+                workflow.status = WorkflowStatus.PAUSED
+                workflow.metadata['interrupted'] = True
+            self.workflows_registry[workflow.id] = workflow
+            if workflow.status == WorkflowStatus.SCHEDULED:
+                self.scheduled_workflows[workflow.id] = workflow
+        
+        if payloads:
+            logger.info(f"📋 {len(payloads)} workflows recuperados do estado persistido")
+    
+    async def resume_interrupted_workflows(self) -> List[str]:
+        """▶️ Retomar workflows interrompidos por reinício (passos concluídos não são repetidos)"""
+        resumed = []
+        for workflow in list(self.workflows_registry.values()):
+            if workflow.status == WorkflowStatus.PAUSED and workflow.metadata.pop('interrupted', False):
+                await self.execute_workflow(workflow.id)
+                resumed.append(workflow.id)
+        if resumed:
+            logger.info(f"▶️ {len(resumed)} workflows interrompidos retomados")
+        return resumed
+    
     async def create_workflow_from_template(self, 
                                           template_id: str,
                                           custom_name: Optional[str] = None,
@@ -413,7 +501,9 @@ class ScientificWorkflowManager:
                 function=step_template['function'],
                 parameters=step_params,
                 dependencies=step_template.get('dependencies', []),
-                estimated_duration=step_template.get('estimated_duration', 300)
+                estimated_duration=step_template.get('estimated_duration', 300),
+                optional=step_template.get('optional', False),
+                cache_ttl=step_template.get('cache_ttl') or 0
             )
             workflow_steps.append(step)
         
@@ -456,6 +546,8 @@ class ScientificWorkflowManager:
         if schedule_time:
             self.workflow_metrics['scheduled_workflows'] += 1
         
+        await self._persist_workflow(workflow)
+        
         logger.info(f"📋 Workflow criado: {workflow.name} ({workflow_id})")
         
         return workflow_id
@@ -479,10 +571,25 @@ class ScientificWorkflowManager:
         if workflow.status == WorkflowStatus.RUNNING:
             raise ValueError(f"Workflow '{workflow_id}' já está em execução")
         
+        # Validar o grafo antes de arrancar
+        self.dag_executor.validate(workflow.steps)
+        
+        # Retomar passos concluídos se o workflow foi interrompido; senão começar do zero
+        if workflow.status == WorkflowStatus.PAUSED:
+            completed_steps = await run_io(self.state_store.load_completed_steps, workflow_id)
+        else:
+            completed_steps = {}
+            await run_io(self.state_store.clear_steps, workflow_id)
+            workflow.started_at = datetime.now()
+            workflow.output_data = {}
+        
         # Mover para workflows ativos
         workflow.status = WorkflowStatus.RUNNING
-        workflow.started_at = datetime.now()
+        workflow.completed_at = None
+        self.scheduled_workflows.pop(workflow_id, None)
+        self.completed_workflows.pop(workflow_id, None)
         self.active_workflows[workflow_id] = workflow
+        await self._persist_workflow(workflow)
         
         # Atualizar métricas
         self.workflow_metrics['active_workflows'] += 1
@@ -490,7 +597,9 @@ class ScientificWorkflowManager:
         logger.info(f"▶️ Iniciando execução do workflow: {workflow.name}")
         
         # Executar em background
-        asyncio.create_task(self._execute_workflow_steps(workflow))
+        task = asyncio.create_task(self._execute_workflow_steps(workflow, completed_steps))
+        self._workflow_tasks[workflow_id] = task
+        task.add_done_callback(lambda _: self._workflow_tasks.pop(workflow_id, None))
         
         return {
             'workflow_id': workflow_id,
@@ -498,59 +607,49 @@ class ScientificWorkflowManager:
             'estimated_completion': (datetime.now() + timedelta(seconds=workflow.metadata.get('estimated_total_duration', 3600))).isoformat()
         }
     
-    async def _execute_workflow_steps(self, workflow: ScientificWorkflow):
-        """Executar passos do workflow"""
+    async def _execute_workflow_steps(self, workflow: ScientificWorkflow,
+                                      completed_steps: Optional[Dict[str, StepRecord]] = None):
+        """Executar passos do workflow (cada passo arranca quando as suas dependências terminam)"""
         
         try:
             total_steps = len(workflow.steps)
-            completed_steps = 0
-            
-            # Criar grafo de dependências
             steps_by_id = {step.step_id: step for step in workflow.steps}
-            completed_step_ids = set()
+            completed_steps = completed_steps or {}
+            finished_steps = len(completed_steps)
+            
+            for step_id, record in completed_steps.items():
+                workflow.output_data[step_id] = record.result
             
-            while completed_steps < total_steps:
-                # Encontrar passos prontos para execução
-                ready_steps = []
-                for step in workflow.steps:
-                    if (step.step_id not in completed_step_ids and
-                        all(dep_id in completed_step_ids for dep_id in step.dependencies)):
-                        ready_steps.append(step)
+            async def on_step_done(record: StepRecord):
+                nonlocal finished_steps
+                step = steps_by_id[record.step_id]
+                finished_steps += 1
                 
-                if not ready_steps:
-                    # Deadlock ou erro na configuração de dependências
-                    raise Exception("Nenhum passo pronto para execução - possível dependência circular")
+                # Atualizar progresso
+                workflow.progress = (finished_steps / total_steps) * 100
                 
-                # Executar passos prontos em paralelo
-                step_tasks = []
-                for step in ready_steps:
-                    task = asyncio.create_task(self._execute_workflow_step(workflow, step))
-                    step_tasks.append((step.step_id, task))
+                if record.status == COMPLETED:
+                    workflow.current_step = f"Concluído: {step.name}"
+                    
+                    # Armazenar resultado
+                    workflow.output_data[record.step_id] = record.result
+                    
+                    origin = " (cache)" if record.cached else ""
+                    logger.info(f"✅ Passo concluído{origin}: {step.name}")
+                else:
+                    error_msg = f"Erro no passo {record.step_id}: {record.error}"
+                    workflow.error_log.append(error_msg)
+                    logger.error(f"❌ {error_msg}")
                 
-                # Aguardar conclusão dos passos
-                for step_id, task in step_tasks:
-                    try:
-                        step_result = await task
-                        completed_step_ids.add(step_id)
-                        completed_steps += 1
-                        
-                        # Atualizar progresso
-                        workflow.progress = (completed_steps / total_steps) * 100
-                        workflow.current_step = f"Concluído: {steps_by_id[step_id].name}"
-                        
-                        # Armazenar resultado
-                        workflow.output_data[step_id] = step_result
-                        
-                        logger.info(f"✅ Passo concluído: {steps_by_id[step_id].name}")
-                        
-                    except Exception as e:
-                        error_msg = f"Erro no passo {step_id}: {str(e)}"
-                        workflow.error_log.append(error_msg)
-                        logger.error(f"❌ {error_msg}")
-                        
-                        # Se passo não é opcional, falhar workflow
-                        if not steps_by_id[step_id].optional:
-                            raise Exception(error_msg)
+                await run_io(self.state_store.save_step, workflow.id, record)
+                await self._persist_workflow(workflow)
+            
+            await self.dag_executor.run(
+                workflow.steps,
+                partial(self._execute_workflow_step, workflow),
+                completed=completed_steps,
+                on_step_done=on_step_done
+            )
             
             # Workflow concluído com sucesso
             workflow.status = WorkflowStatus.COMPLETED
@@ -567,14 +666,16 @@ class ScientificWorkflowManager:
             self.workflow_metrics['successful_workflows'] += 1
             execution_hours = (workflow.completed_at - workflow.started_at).total_seconds() / 3600
             self.workflow_metrics['total_analysis_hours'] += execution_hours
+            await self._persist_workflow(workflow)
             
             logger.info(f"✅ Workflow concluído com sucesso: {workflow.name}")
             
         except Exception as e:
             # Workflow falhado
+            error = f"Erro no passo {e.record.step_id}: {e}" if isinstance(e, StepFailed) else str(e)
             workflow.status = WorkflowStatus.FAILED
             workflow.completed_at = datetime.now()
-            workflow.error_log.append(f"Falha geral do workflow: {str(e)}")
+            workflow.error_log.append(f"Falha geral do workflow: {error}")
             
             # Mover para workflows concluídos
             self.completed_workflows[workflow.id] = workflow
@@ -584,8 +685,9 @@ class ScientificWorkflowManager:
             # Atualizar métricas
             self.workflow_metrics['active_workflows'] -= 1
             self.workflow_metrics['failed_workflows'] += 1
+            await self._persist_workflow(workflow)
             
-            logger.error(f"❌ Workflow falhado: {workflow.name} - {str(e)}")
+            logger.error(f"❌ Workflow falhado: {workflow.name} - {error}")
     
     async def _execute_workflow_step(self, workflow: ScientificWorkflow, step: WorkflowStep) -> Dict[str, Any]:
         """Executar um passo individual do workflow"""
@@ -602,10 +704,10 @@ class ScientificWorkflowManager:
                 timeout=step.timeout
             )
             
+            # Sem metadados de execução: o hash do resultado alimenta as chaves de cache dos dependentes
             return {
                 'success': True,
-                'result': result,
-                'execution_time': time.time()
+                'result': result
             }
             
         except asyncio.TimeoutError:
@@ -1163,12 +1265,18 @@ class ScientificWorkflowManager:
             workflow.status = WorkflowStatus.CANCELLED
             workflow.completed_at = datetime.now()
             
+            # Interromper os passos em execução
+            task = self._workflow_tasks.pop(workflow_id, None)
+            if task:
+                task.cancel()
+            
             # Mover para concluídos
             self.completed_workflows[workflow_id] = workflow
             del self.active_workflows[workflow_id]
             
             # Atualizar métricas
             self.workflow_metrics['active_workflows'] -= 1
+            await self._persist_workflow(workflow)
             
             logger.info(f"⏹️ Workflow cancelado: {workflow.name}")
             return True
@@ -1179,6 +1287,7 @@ class ScientificWorkflowManager:
             
             del self.scheduled_workflows[workflow_id]
             self.workflow_metrics['scheduled_workflows'] -= 1
+            await self._persist_workflow(workflow)
             
             logger.info(f"⏹️ Workflow agendado cancelado: {workflow.name}")
             return True
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes das tarefas em lote do processamento assíncrono (Celery)
+Os lotes são chords: nenhum worker pode ficar à espera de subtarefas, pelo que
+um lote maior que o pool de workers tem de terminar.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+pytest.importorskip("celery")
+
+from celery.contrib.testing.worker import start_worker  # noqa: E402
+
+from bgapp.async_processing.celery_app import celery_app  # noqa: E402
+from bgapp.async_processing import tasks  # noqa: E402
+
+POOL_SIZE = 2
+
+
+@pytest.fixture(scope="module")
+def in_memory_app():
+    """App Celery com broker e backend em memória"""
+    previous = {key: celery_app.conf[key] for key in
+                ("broker_url", "result_backend", "task_always_eager",
+                 "broker_transport_options")}
+    celery_app.conf.update(
+        broker_url="memory://",
+        broker_transport_options={"polling_interval": 0.05},
+        result_backend="cache+memory://",
+        task_always_eager=False,
+    )
+    yield celery_app
+    celery_app.conf.update(previous)
+
+
+@pytest.fixture
+def fast_loaders(monkeypatch):
+    """Evitar as pausas das funções simuladas de carregamento"""
+    monkeypatch.setattr(tasks, "_load_local_data", lambda parameters: tasks.np.random.rand(50, 3))
+    monkeypatch.setattr(tasks, "_process_parameters", lambda data, parameters: data)
+    monkeypatch.setattr(tasks, "cache", None)
+
+
+def test_batches_larger_than_pool_finish(in_memory_app, fast_loaders):
+    """Vários lotes, cada um com mais subtarefas do que workers, terminam"""
+    sources = [
+        {"source": "local", "params": {"region": "cabinda", "index": i}}
+        for i in range(POOL_SIZE * 3)
+    ]
+    models = [{"type": f"model_{i}", "horizon": 5} for i in range(POOL_SIZE * 3)]
+
+    with start_worker(in_memory_app, pool="threads", concurrency=POOL_SIZE,
+                      perform_ping_check=False, shutdown_timeout=30):
+        # Mais lotes do que workers: com join dentro da tarefa, isto bloqueava o pool
+        batches = [tasks.process_oceanographic_data_batch.delay(sources) for _ in range(POOL_SIZE + 1)]
+        batches.append(tasks.generate_ml_predictions_batch.delay(models))
+
+        results = [batch.get(timeout=60) for batch in batches]
+
+    for result in results[:-1]:
+        assert result["status"] == "completed"
+        assert result["total_jobs"] == len(sources)
+        assert result["successful_jobs"] == len(sources)
+
+    assert results[-1]["total_models"] == len(models)
+    assert results[-1]["successful_predictions"] == len(models)
+
+
+def test_batch_runs_in_eager_mode(in_memory_app):
+    """Em modo eager o chord é executado de imediato e devolve o agregado"""
+    in_memory_app.conf.task_always_eager = True
+    try:
+        result = tasks.generate_ml_predictions_batch.delay(
+            [{"type": "temperature", "horizon": 3}, {"type": "salinity", "horizon": 4}]
+        ).get(timeout=10)
+    finally:
+        in_memory_app.conf.task_always_eager = False
+
+    assert result["total_models"] == 2
+    assert result["successful_predictions"] == 2
+    assert [len(r["predictions"]) for r in result["results"]] == [3, 4]